@@ -1,4 +1,5 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+import io
 import os
 import time
 import json
@@ -7,12 +8,35 @@ import html
 import requests
 import numpy as np
 import traceback
-from threading import Lock
+from collections import defaultdict
+from threading import Lock, Thread
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
 # Pastikan tsp_agent.py sudah berisi 5 Class Agent (Base, QL, Sarsa, MC, TD, Dyna)
-from tsp_agent import QLearningAgent, SarsaAgent, MonteCarloAgent, TDLambdaAgent, DynaQAgent, TSPBaseAgent
+from tsp_agent import QLearningAgent, SarsaAgent, MonteCarloAgent, TDLambdaAgent, DynaQAgent, LinearQAgent, TSPBaseAgent
+from app.core.registry import SimulationRegistry, JsonCheckpointStore, InvalidSimulationId, validate_sim_id
+from app.core.snapshots import SnapshotPublisher, summarize_agent
+from app.core.geometry_cache import GeometryCache, coords_key, shrink_route_payload
+from app.core.map_store import MapStore, map_fingerprint
+from app.core.legs import LegGeometryStore, decode_polyline, encode_polyline
+from app.core.economics import VEHICLES, CARGO, DEFAULT_CONFIG, fleet_economics
+from app.core.vrp import VRPProblem, solve_vrp
+from app.core.scenario import ScenarioEngine, apply_disaster, cities_within, tour_length
+from app.core.sweep import SweepRunner, block_edge, disaster_candidate, edge_candidate
+from app.core.vulnerability import VulnerabilityTracker
+from app.core.timeslices import TimeSlicedMatrix, MINUTES_PER_DAY, parse_clock, format_clock
+from app.core.hierarchical import HierarchicalSolver
+from app.core.result_cache import ResultCache
+from app.core.eventlog import EventLog, ReplayEngine, DISASTER_ADD, DISASTER_CLEAR, SABOTAGE, CONFIG
+from app.core.halloffame import HallOfFame
+from app.core.convergence import ConvergenceMonitor, EpsilonSchedule
+from app.core.policy import PolicyCache, distill_policy
+from app.core.replan import complete_route, follow_route, DEFAULT_BUDGET_MS
+from app.core.evaluation import SCORE_FIELDS, as_route_array, score_tours, scores_to_records
+from app.core.history import EpisodeHistory, history_dir
+from app.core.payload import PayloadEncoder, encode_body
+from app.core.qanalytics import QAnalyticsTracker, decision_factors
 
 # Flask App Configuration (V5.6 - Production Ready)
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -97,34 +121,196 @@ if os.path.exists("q_table.npy"):
         print(">>> Memory Wiped (New Map Loaded)")
     except: pass
 
-print(">>> Initializing Physics (OSRM Shared Matrix)...")
-# Fetch Matrix 1x untuk dipakai ramai-ramai
-base_physics = TSPBaseAgent(cities_data)
-shared_matrix = base_physics.dist_matrix
-
-# V5.0: Backup original matrix for disaster recovery (P0 Fix #2: Deep Copy)
-base_matrix = shared_matrix.copy()
-
-print(">>> Spawning THE FULL GRID (5 Agents)...")
-agents = {
-    'QL-Bot': QLearningAgent(cities_data, dist_matrix=shared_matrix, name="QL-Bot", color="blue"),
-    'Sarsa-Bot': SarsaAgent(cities_data, dist_matrix=shared_matrix, name="Sarsa-Bot", color="green"),
-    'MC-Bot': MonteCarloAgent(cities_data, dist_matrix=shared_matrix, name="MC-Bot", color="red"),
-    'TD-Bot': TDLambdaAgent(cities_data, dist_matrix=shared_matrix, name="TD-Bot", color="orange"),
-    'Dyna-Bot': DynaQAgent(cities_data, dist_matrix=shared_matrix, name="Dyna-Bot", color="purple")
-}
+# V5.9: Agent roster shared by every simulation (name, class, color)
+AGENT_ROSTER = [
+    ('QL-Bot', QLearningAgent, 'blue'),
+    ('Sarsa-Bot', SarsaAgent, 'green'),
+    ('MC-Bot', MonteCarloAgent, 'red'),
+    ('TD-Bot', TDLambdaAgent, 'orange'),
+    ('Dyna-Bot', DynaQAgent, 'purple'),
+]
+
+
+# V5.9: Beyond this many cities (city, bitmask) Q-tables stop fitting in a machine word
+# (and in memory), so every slot of the grid switches to linear function approximation
+LARGE_MAP_CITIES = int(os.getenv('LARGE_MAP_CITIES', '63'))
+LARGE_MAP_ROSTER = [
+    ('QL-Bot', LinearQAgent, 'blue', {}),
+    ('Sarsa-Bot', LinearQAgent, 'green', {'on_policy': True}),
+    ('MC-Bot', LinearQAgent, 'red', {'on_policy': True, 'lambda_val': 1.0}),
+    ('TD-Bot', LinearQAgent, 'orange', {'on_policy': True, 'lambda_val': 0.7}),
+    ('Dyna-Bot', LinearQAgent, 'purple', {'planning_steps': 5}),
+]
+
+
+def is_large_map(cities):
+    return len(cities) > LARGE_MAP_CITIES
+
+
+def spawn_agents(cities, dist_matrix):
+    """Spawn THE FULL GRID (5 Agents) on one shared distance matrix."""
+    if is_large_map(cities):
+        return {
+            name: agent_cls(cities, dist_matrix=dist_matrix, name=name, color=color, **options)
+            for name, agent_cls, color, options in LARGE_MAP_ROSTER
+        }
+    return {
+        name: agent_cls(cities, dist_matrix=dist_matrix, name=name, color=color)
+        for name, agent_cls, color in AGENT_ROSTER
+    }
+
+
+# V5.9: OSRM geometry cache shared by the Flask and ASGI /api/route handlers
+OSRM_URL = os.getenv('OSRM_URL', 'https://router.project-osrm.org')
+route_cache = GeometryCache(
+    max_entries=int(os.getenv('ROUTE_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('ROUTE_CACHE_TTL', '600'))
+)
+
+# V5.9: Optional matrix fetcher hook (ASGI mode installs one backed by its async OSRM pool)
+matrix_fetcher = None
+
+# V5.9: Pre-fork hooks (app/api/prefork.py): the trainer mirrors every published snapshot to
+# shared files (None = evicted); HTTP workers resolve simulations to read-only views of them
+snapshot_mirror = None
+simulation_view = None
+
+# V5.9: Per-map physics (matrix.npy + legs.json) persisted under MAP_DATA_DIR; empty = off
+MAP_DATA_DIR = os.getenv('MAP_DATA_DIR', os.path.join('data', 'maps'))
+map_store = MapStore(MAP_DATA_DIR) if MAP_DATA_DIR else None
+
+
+def fetch_distance_matrix(cities):
+    """Fetch Matrix 1x untuk dipakai ramai-ramai (OSRM with Haversine fallback)."""
+    if map_store is not None:
+        matrix = map_store.load_matrix(cities)
+        if matrix is not None:
+            print(f">>> Physics loaded from map store ({map_fingerprint(cities)}).")
+            return matrix
+
+    print(">>> Initializing Physics (OSRM Shared Matrix)...")
+    matrix, source = None, None
+    if matrix_fetcher is not None:
+        matrix = matrix_fetcher(cities)
+        if matrix is not None:
+            print(">>> SUCCESS: OSRM Real Distances Loaded (async pool).")
+            source = 'osrm'
+    if matrix is None:
+        physics = TSPBaseAgent(cities)
+        matrix, source = physics.dist_matrix, physics.matrix_source
+
+    # Only real road distances are persisted; Haversine is retried next start
+    if map_store is not None and source == 'osrm':
+        try:
+            map_store.save_matrix(cities, matrix)
+        except OSError as e:
+            print(f">>> Map store write failed: {e}")
+    return matrix
+
+
+# V5.9: Time-of-day matrices - slices.npy in the map store (memory-mapped) or a synthetic profile
+TIME_PROFILE = os.getenv('TIME_PROFILE', 'off')  # off | rush_hour
+TIME_SLOTS = int(os.getenv('TIME_SLOTS', '24'))
+CLOCK_MINUTES_PER_EPISODE = float(os.getenv('CLOCK_MINUTES_PER_EPISODE', '10'))
+
+
+def time_slices_for(cities, base_matrix, profile=None):
+    """Time-sliced stack for a map, or None for static physics."""
+    profile = TIME_PROFILE if profile is None else profile
+    if profile == 'off':
+        return None
+    if map_store is not None:
+        path = map_store.slices_path(cities)
+        if os.path.exists(path):
+            slices = TimeSlicedMatrix.load(path, mmap=True)
+            if slices.size == len(cities):
+                print(f">>> Time slices memory-mapped from {path} ({slices.slots} slots).")
+                return slices
+    if profile == 'rush_hour':
+        return TimeSlicedMatrix.synthetic(base_matrix, slots=TIME_SLOTS)
+    return None
+
+
+# V5.9: Per-simulation event journal (disasters, sabotage, config + matrix keyframes/deltas)
+EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', '')  # Empty = in memory (lost on restart)
+EVENT_LOG_MAX_MB = float(os.getenv('EVENT_LOG_MAX_MB', '64'))  # In-memory journals only
+
+
+def open_event_log(sim_id):
+    path = os.path.join(EVENT_LOG_DIR, f'{sim_id}.evlog') if EVENT_LOG_DIR else None
+    return EventLog(path, max_bytes=int(EVENT_LOG_MAX_MB * 1024 * 1024))
+
 
-# V5.0: Thread Lock for Safe Concurrent Access (P0 Fix #1)
-lock = Lock()
+# V5.9: Hall of Fame sizes; HALL_OF_FAME_DIR keeps an all-time board per simulation and map
+HALL_OF_FAME_SIZE = int(os.getenv('HALL_OF_FAME_SIZE', '5'))
+HALL_OF_FAME_PER_AGENT = int(os.getenv('HALL_OF_FAME_PER_AGENT', '5'))
+HALL_OF_FAME_DIR = os.getenv('HALL_OF_FAME_DIR', '')  # Empty = no all-time board
 
-# V5.4: Implement Real Economy Constants
-PRICE_DIESEL = 15000   # Rp / Liter
-PRICE_ELECTRIC = 2500  # Rp / kWh
-DRIVER_WAGE_KM = 3000  # Rp / KM (Labor + Maintenance)
 
-# V5.0: Disaster Management State
-active_disasters = []  # List of {id, lat, lon, type, radius, multiplier}
-disaster_id_counter = 0
+def hall_of_fame_for(sim_id, cities):
+    store = os.path.join(HALL_OF_FAME_DIR, f'{sim_id}-{map_fingerprint(cities)}.json') if HALL_OF_FAME_DIR else None
+    return HallOfFame(k=HALL_OF_FAME_SIZE, per_agent_k=HALL_OF_FAME_PER_AGENT, store_path=store)
+
+
+# V5.9: Convergence monitor - epsilon schedule plus throttling/pausing of agents that stopped improving
+CONVERGENCE_MONITOR = os.getenv('CONVERGENCE_MONITOR', 'true').lower() == 'true'
+EPSILON_SCHEDULE = os.getenv('EPSILON_SCHEDULE', 'exponential')  # constant | exponential | linear
+EPSILON_MIN = float(os.getenv('EPSILON_MIN', '0.01'))
+EPSILON_DECAY = float(os.getenv('EPSILON_DECAY', '0.9995'))
+EPSILON_EPISODES = int(os.getenv('EPSILON_EPISODES', '5000'))  # Linear schedule length
+CONVERGENCE_PATIENCE = int(os.getenv('CONVERGENCE_PATIENCE', '200'))
+
+
+def convergence_monitor_for(agents):
+    schedule = EpsilonSchedule(EPSILON_SCHEDULE, end=EPSILON_MIN, decay=EPSILON_DECAY, episodes=EPSILON_EPISODES)
+    return ConvergenceMonitor(list(agents), schedule, enabled=CONVERGENCE_MONITOR, patience=CONVERGENCE_PATIENCE)
+
+
+# V5.9: Episode history - in-memory ring of HISTORY_CAPACITY rows, spilled to HISTORY_DIR tables
+HISTORY_CAPACITY = int(os.getenv('HISTORY_CAPACITY', '1000000'))
+HISTORY_DIR = os.getenv('HISTORY_DIR', '')  # Empty = memory only (oldest rows overwritten)
+COMPARISON_WINDOW = int(os.getenv('COMPARISON_WINDOW', '100'))  # Episodes behind agent_comparison averages
+
+
+def history_for(sim_id, cities, agents):
+    spill = history_dir(HISTORY_DIR, sim_id, map_fingerprint(cities))
+    return EpisodeHistory(list(agents), capacity=HISTORY_CAPACITY, spill_dir=spill)
+
+
+# V5.9: Compact /api/train (?compact=1&since=<v>) - versions kept for deltas, compression threshold
+PAYLOAD_VERSIONS = int(os.getenv('PAYLOAD_VERSIONS', '16'))
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+
+# V5.9: Q-table analytics (explain / agent_comparison) - background rebuilds at most every N seconds
+Q_ANALYTICS_INTERVAL = float(os.getenv('Q_ANALYTICS_INTERVAL', '2.0'))
+
+
+# V5.9: Compiled greedy policies (<sim>/<agent>.npz) - route queries without the Q-table
+POLICY_DIR = os.getenv('POLICY_DIR', os.path.join('data', 'policies'))
+policy_cache = PolicyCache()
+
+
+# V5.9: Live re-planning serves many trucks per dispatcher; its own (much higher) rate limit
+REPLAN_RATE_LIMIT = os.getenv('REPLAN_RATE_LIMIT', '500 per second')
+
+
+def policy_path(sim_id, agent_name):
+    return os.path.join(POLICY_DIR, sim_id, f'{agent_name}.npz')
+
+
+# V5.9: Default map matrix is fetched once and cloned for every simulation on it
+_default_map_matrix = None
+_default_map_lock = Lock()
+
+
+def default_map_matrix():
+    global _default_map_matrix
+    with _default_map_lock:
+        if _default_map_matrix is None:
+            _default_map_matrix = fetch_distance_matrix(cities_data)
+        return _default_map_matrix.copy()
+
+# V5.0: Disaster Management (state lives per simulation, see SimulationManager)
 DISASTER_LIMIT = 10  # P0 Fix #3: DoS Prevention
 
 # V5.1: Severity-Based Disaster Configuration
@@ -158,29 +344,6 @@ SEVERITY_LEVELS = {
 # V5.1: Disaster Types (now just categories, severity determines impact)
 DISASTER_TYPES = ['flood', 'quake', 'landslide']
 
-# V5.4: Fleet Economy Configuration (Real Efficiency Model)
-VEHICLES = {
-    'diesel': {'label': 'Diesel Heavy', 'co2': 2.6, 'efficiency': 3.0, 'fuel': 'diesel', 'icon': 'bi-truck'}, # 3 km/L
-    'hybrid': {'label': 'Hybrid Wingbox', 'co2': 1.8, 'efficiency': 5.0, 'fuel': 'diesel', 'icon': 'bi-battery-half'}, # 5 km/L
-    'ev': {'label': 'Electric Semi', 'co2': 0.0, 'efficiency': 1.0, 'fuel': 'electric', 'icon': 'bi-lightning-charge'}, # 1 km/kWh (300kWh pack / 300km)
-    'lng': {'label': 'LNG Truck', 'co2': 1.2, 'efficiency': 3.5, 'fuel': 'diesel', 'icon': 'bi-droplet'} # Simplified as diesel-equivalent for now or add LNG price later
-}
-
-CARGO = {
-    'general': {'label': 'General Goods 📦', 'multiplier': 1.0, 'baseRevenue': 25000000},
-    'cold': {'label': 'Cold Chain ❄️', 'multiplier': 1.8, 'baseRevenue': 65000000},
-    'danger': {'label': 'Hazardous ☣️', 'multiplier': 2.5, 'baseRevenue': 85000000},
-    'express': {'label': 'Express ⚡', 'multiplier': 1.5, 'baseRevenue': 45000000},
-    # V5.3: Humanitarian Cargo
-    'humanitarian': {
-        'label': '🚑 Bantuan Bencana', 
-        'multiplier': 0.5,        # Low commercial value
-        'baseRevenue': 15000000,  # Flat rate (Rp 15jt)
-        'reputation': 100,        # +100 Karma per delivery
-        'is_emergency': True
-    }
-}
-
 # V5.0.1: Disaster Type Configuration (Fix NameError)
 DISASTER_TYPES_INFO = {
     'flood': {
@@ -221,9 +384,6 @@ DISASTER_TYPES_INFO = {
     }
 }
 
-# V5.3: Global State
-global_reputation = 0  # Starts at 0, max 1000
-
 # V4.9.1: Fleet Configuration (matches frontend defaults)
 fleet_config = {
     'QL-Bot': {'v': 'diesel', 'c': 'general'},
@@ -265,345 +425,886 @@ WEATHER_PRESETS = {
     }
 }
 
-top_records = []
-total_episodes = 0
 
-# --- 3. API ENDPOINTS ---
+# --- V5.4 REFACTOR: SIMULATION MANAGER ---
+# V5.9: Each SimulationManager owns one map: its matrix, agents, disasters and records
+class SimulationManager:
+    def __init__(self, cities, dist_matrix=None, sim_id='default'):
+        self.sim_id = sim_id
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+        # State Guards (V5.9: per simulation, so independent maps train concurrently)
+        self.lock = Lock()
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """
-    Health check endpoint for monitoring and load balancers.
-    Returns system status and key metrics.
-    """
-    return jsonify({
-        "status": "healthy",
-        "version": "V5.8.1",
-        "agents": len(agents),
-        "cities": len(cities_data),
-        "disasters": len(active_disasters),
-        "episodes": total_episodes,
-        "uptime": "running",
-        "features": ["CORS", "Rate-Limiting", "Multi-Stage-Docker", "OSRM-Proxy"]
-    }), 200
+        # V5.9: Read-copy-update - readers use self.snapshots.latest, never self.lock
+        self.snapshots = SnapshotPublisher()
+        # V5.9: Compact /api/train states, one version per tick (deltas against the client's version)
+        self.payloads = PayloadEncoder(PAYLOAD_VERSIONS)
+        self.matrix_version = 0
+        # V5.9: Bumped by disasters, sabotage and map loads only - not by the clock moving to a new slot
+        self.disruption_version = 0
+        # V5.9: Simulated departure clock (drives time-sliced matrices)
+        self.clock_minutes = 0.0
+        self.minutes_per_episode = CLOCK_MINUTES_PER_EPISODE
+        self.interpolate_slices = False
+        # V5.9: Background vulnerability index, rebuilt whenever the disruption version moves
+        self.vulnerability = VulnerabilityTracker()
+        # V5.9: Append-only journal; replay rebuilds the matrix as of any episode
+        self.replay = ReplayEngine(open_event_log(sim_id))
+        self.load_map(cities, dist_matrix)
 
-# V5.6: OSRM Proxy Endpoint with Timeout
-@app.route('/api/route', methods=['POST'])
-@limiter.limit("100 per minute")
-def get_osrm_route():
-    """
-    Proxy endpoint for OSRM routing with timeout protection.
-    Prevents hanging requests to external OSRM service.
-    """
-    try:
-        coords = request.json.get('coords')
-        if not coords:
-            return jsonify({"error": "Missing coordinates"}), 400
-        
-        # Call OSRM with 5-second timeout
-        osrm_url = f"https://router.project-osrm.org/route/v1/driving/{coords}?overview=full&geometries=geojson"
-        response = requests.get(osrm_url, timeout=5)
-        
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "OSRM service error"}), response.status_code
-            
-    except requests.Timeout:
-        return jsonify({"error": "Route service timeout"}), 504
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    def load_map(self, cities, dist_matrix=None):
+        """Load a map: fetch physics, spawn agents, reset stats (keeps the lock)."""
+        self.cities = cities
+        if dist_matrix is None:
+            dist_matrix = fetch_distance_matrix(cities)
+        self.shared_matrix = dist_matrix
 
-@app.route('/get_cities')
-def get_cities():
-    simple_data = {info['name']: [info['lat'], info['lon']] for _, info in cities_data.items()}
-    return jsonify(simple_data)
+        # V5.0: Backup original matrix for disaster recovery (P0 Fix #2: Deep Copy)
+        self.base_matrix = self.shared_matrix.copy()
+        self.time_slices = time_slices_for(cities, self.base_matrix)
+        self._time_key = None
+        self._slot = None
 
-@app.route('/api/reset')
-def reset_sim():
-    # V5.4: Use SimulationManager
-    sim_manager.reset()
-    
-    # Reset Physics
-    global shared_matrix
-    shared_matrix[:] = base_matrix.copy()
-    
-    for agent in agents:
-        agent.q_table.clear()
-        agent.epsilon = 1.0
-        agent.dist_matrix = shared_matrix 
-        if hasattr(agent, 'e_traces'): agent.e_traces.clear()
-        if hasattr(agent, 'model'): agent.model.clear()
-    return jsonify({"status": "reset"})
+        print(f">>> [{self.sim_id}] Spawning THE FULL GRID ({len(AGENT_ROSTER)} Agents)...")
+        self.agents = spawn_agents(cities, self.shared_matrix)
+        # Fine-grained guard per agent: Q-table copies wait for one episode, not five
+        self.agent_locks = {name: Lock() for name in self.agents}
+        self.convergence = convergence_monitor_for(self.agents)
+        self.history = history_for(self.sim_id, cities, self.agents)
+        self.q_analytics = QAnalyticsTracker(self.agents, min_interval=Q_ANALYTICS_INTERVAL)
 
-# --- V5.4 REFACTOR: SIMULATION MANAGER ---
-class SimulationManager:
-    def __init__(self):
         self.reputation = 0
-        self.disasters = []
+        self.disasters = []  # List of {id, lat, lon, type, radius, multiplier}
+        self.disaster_id_counter = 0
+        self.blocked_roads = set()  # V5.9: God Mode sabotage, (u, v) with u < v - reapplied like disasters
         self.total_episodes = 0
-        self.top_records = []
-        
-        # State Guards
-        self.lock = Lock()
-        
+        self.hall_of_fame = hall_of_fame_for(self.sim_id, cities)
+        self.top_records = self.hall_of_fame.top_records()
+        self.replay.start_run(0, reason='load_map', map=map_fingerprint(cities), cities=len(cities))
+
+        self.update_physics()  # Start from the clock's slot, not the static matrix
+        self.publish_snapshot()
+
+    def time_key(self):
+        """What the current time matrix depends on: slot index, or the clock when interpolating."""
+        if self.time_slices is None:
+            return None
+        return self.clock_minutes if self.interpolate_slices else self.time_slices.slot_for(self.clock_minutes)
+
+    def time_matrix(self):
+        """Undisturbed matrix for the current simulated clock (base_matrix when static)."""
+        if self.time_slices is None:
+            return self.base_matrix
+        return self.time_slices.at(self.clock_minutes, self.interpolate_slices)
+
     def reset(self):
         self.reputation = 0
         self.disasters = []
+        self.disaster_id_counter = 0
+        self.blocked_roads = set()
         self.total_episodes = 0
-        self.top_records = []
-        global disaster_id_counter, active_disasters
-        disaster_id_counter = 0
-        active_disasters = [] # Sync with legacy global for now
-        
-    def update_physics(self):
-        """Encapsulated Physics Update"""
-        global shared_matrix, active_disasters
-        
-        # Sync disasters from global to internal state
-        self.disasters = active_disasters
-        
-        # P0 Fix #9: Start from clean slate
-        shared_matrix[:] = base_matrix.copy()
-        
-        # Apply disasters
+        self.hall_of_fame.reset()  # The all-time board (HALL_OF_FAME_DIR) survives
+        self.top_records = self.hall_of_fame.top_records()
+        self.replay.start_run(0, reason='reset')
+        self.convergence.reset()
+        self.history.rewind(0)
+
+        # Reset Physics
+        self.update_physics()
+        for agent in self.agents.values():
+            with self.agent_locks[agent.name]:  # V5.9: Q analytics copy tables in the background
+                agent.q_table.clear()
+                if agent.edge_visits is not None:
+                    agent.edge_visits[:] = 0
+            agent.epsilon = 1.0
+            if hasattr(agent, 'e_traces'): agent.e_traces.clear()
+            if hasattr(agent, 'model'):
+                agent.model.clear()
+                agent.model_keys.clear()
+            if hasattr(agent, 'weights'):
+                agent.weights[:] = 0.0
+                agent.replay.clear()
+        self.q_analytics.invalidate()  # After the tables were cleared: a running build goes stale
+        self.publish_snapshot()
+
+    def publish_snapshot(self, summaries=None):
+        """
+        Publish an immutable view of this simulation for lock-free readers.
+        Caller holds self.lock; summaries are re-extracted when not supplied.
+        """
+        if summaries is None:
+            summaries = []
+            for name, agent in self.agents.items():
+                with self.agent_locks[name]:
+                    summaries.append(summarize_agent(agent))
+        snapshot = self.snapshots.publish(
+            episode=self.total_episodes,
+            matrix=self.shared_matrix,
+            matrix_version=self.matrix_version,
+            cities=self.cities,
+            summaries=summaries,
+            disasters=self.disasters,
+            reputation=self.reputation,
+            top_records=self.top_records,
+            q_analytics=self.q_analytics.summaries(),
+            disruption_version=self.disruption_version
+        )
+        # Closure costs re-run 2-opt per road: only affordable on tabular-size maps
+        if not is_large_map(self.cities):
+            self.vulnerability.refresh_if_stale(snapshot)
+            # V5.9: Whole-table analytics for agents that trained since the last build (linear agents have no table)
+            self.q_analytics.refresh_if_stale(self.agents, self.agent_locks, self.cities)
+        # V5.9: Journaled per disruption; slot changes are CONFIG events, not a keyframe every tick
+        self.replay.record(self.shared_matrix, self.total_episodes, self.disruption_version)
+        if snapshot_mirror is not None:
+            snapshot_mirror(self.sim_id, snapshot)
+        return snapshot
+
+    def apply_disruptions(self, matrix):
+        """Apply the active disasters and sabotaged roads to matrix in place."""
+        # Apply disasters (V5.9: vectorized, only affected rows/columns are touched)
         for disaster in self.disasters:
-            lat = disaster['lat']
-            lon = disaster['lon']
-            radius = disaster['radius']
-            multiplier = disaster['multiplier']
-            
-            # Optimization: Pre-calc affected cities
-            affected_cities = []
-            for city_id, city_data in cities_data.items():
-                d = haversine_distance(lat, lon, city_data['lat'], city_data['lon'])
-                if d <= radius: affected_cities.append(city_id)
-            
-            # V5.1: Graduated Severity Penalties
-            severity = disaster.get('severity', 2)  # Default to L2
-            num_cities = len(cities_data)
-            
-            if severity == 1:
-                # L1: Only penalize roads FULLY inside zone (both endpoints affected)
-                for city_i in affected_cities:
-                    for city_j in affected_cities:
-                        if city_i != city_j:
-                            dist_ij = shared_matrix[city_i][city_j]
-                            dist_ji = shared_matrix[city_j][city_i]
-                            shared_matrix[city_i][city_j] = min(dist_ij * multiplier, 100000)
-                            shared_matrix[city_j][city_i] = min(dist_ji * multiplier, 100000)
-            
-            elif severity == 2:
-                # L2: Penalize any road TOUCHING zone (one endpoint affected)
-                for city_i in affected_cities:
-                    for city_j in range(num_cities):
-                        if city_i != city_j:
-                            dist_ij = shared_matrix[city_i][city_j]
-                            dist_ji = shared_matrix[city_j][city_i]
-                            shared_matrix[city_i][city_j] = min(dist_ij * multiplier, 100000)
-                            shared_matrix[city_j][city_i] = min(dist_ji * multiplier, 100000)
-            
-            else:  # severity == 3
-                # L3: Complete blockage (100x multiplier creates effective closure)
-                for city_i in affected_cities:
-                    for city_j in range(num_cities):
-                        if city_i != city_j:
-                            dist_ij = shared_matrix[city_i][city_j]
-                            dist_ji = shared_matrix[city_j][city_i]
-                            shared_matrix[city_i][city_j] = min(dist_ij * multiplier, 100000)
-                            shared_matrix[city_j][city_i] = min(dist_ji * multiplier, 100000)
-                     
+            affected = cities_within(self.cities, disaster['lat'], disaster['lon'], disaster['radius'])
+            apply_disaster(matrix, affected, disaster['multiplier'], disaster.get('severity', 2))
+        # V5.9: Sabotage is simulation state too, so a new time slot does not reopen the road
+        for u, v in self.blocked_roads:
+            block_edge(matrix, u, v)
+        return matrix
+
+    def update_physics(self, disrupted=True):
+        """
+        Encapsulated Physics Update
+
+        Args:
+            disrupted: False when only the simulated clock moved (new time slot):
+                the matrix is rebuilt, but the vulnerability index, the journal
+                and the convergence monitor are not told about a new disruption
+        """
+        shared_matrix = self.shared_matrix
+
+        # P0 Fix #9: Start from clean slate (V5.9: the current time slot's matrix)
+        shared_matrix[:] = self.time_matrix()
+        self._time_key = self.time_key()
+        self._slot = self.time_slices.slot_for(self.clock_minutes) if self.time_slices is not None else None
+        self.apply_disruptions(shared_matrix)
+
         # Propagate to agents
-        for agent in agents:
+        for agent in self.agents.values():
             agent.dist_matrix = shared_matrix
-            
+        self.matrix_version += 1
+        if disrupted:
+            self.disruption_version += 1
+            # What the convergence monitor compares: the disruptions without the time-of-day factor
+            self.disrupted_base = (self.shared_matrix if self.time_slices is None
+                                   else self.apply_disruptions(np.array(self.base_matrix, copy=True)))
+
     def update_disasters_lifecycle(self):
         """Encapsulated Lifecycle Logic"""
-        global active_disasters
-        
-        # Sync from global
-        self.disasters = active_disasters
-        
         expired_ids = []
         modified = False
-        
+
         for d in self.disasters:
             d['age'] += 1
             if d.get('is_moving', False):
                 d['lon'] += d['velocity'][0]
                 d['lat'] += d['velocity'][1]
                 modified = True
-                
+
             if d.get('is_decaying', False):
                 d['radius'] = max(10, d['radius'] - d['decay_rate'])
                 modified = True
                 if d['radius'] <= 10: expired_ids.append(d['id'])
-                
+
             lifetime = d.get('lifetime')
             if lifetime and d['age'] >= lifetime:
                 expired_ids.append(d['id'])
-                
+
         if expired_ids:
              self.disasters = [d for d in self.disasters if d['id'] not in expired_ids]
-             active_disasters = self.disasters  # Sync back to global
              modified = True
-             
+             self.replay.log_event(DISASTER_CLEAR, self.total_episodes,
+                                   {'ids': sorted(set(expired_ids)), 'reason': 'expired'})
+
         if modified:
             self.update_physics()
-            
+
         return len(expired_ids)
 
-# Initialize Singleton
-sim_manager = SimulationManager()
+    def add_disaster(self, disaster):
+        disaster['id'] = self.disaster_id_counter
+        self.disaster_id_counter += 1
+        self.disasters.append(disaster)
+        self.replay.log_event(DISASTER_ADD, self.total_episodes, disaster)
+        self.update_physics()
+        self.publish_snapshot()
+        return disaster
 
-# Legacy recalculate_physics definition removed (Moved to SimManager)
+    def clear_disasters(self):
+        count = len(self.disasters)
+        self.replay.log_event(DISASTER_CLEAR, self.total_episodes,
+                              {'ids': [d['id'] for d in self.disasters], 'reason': 'cleared'})
+        self.disasters = []
+        self.disaster_id_counter = 0
+        # Reset physics to original state (P0 Fix #1: propagates to agents)
+        self.update_physics()
+        self.publish_snapshot()
+        return count
 
-# V5.2: Temporal Disaster System - Update Function
-def update_disasters():
-    """
-    Update disaster positions and properties based on lifecycle.
-    Called after each training episode to simulate temporal evolution.
-    Returns: Number of disasters expired
-    """
-    global active_disasters
-    
-    disasters_modified = False
-    expired_disasters = []
-    
-    for disaster in active_disasters:
-        disaster['age'] += 1
-        
-        # V5.2: Movement Logic (storms drift East)
-        if disaster.get('is_moving', False):
-            velocity = disaster.get('velocity', [0, 0])
-            disaster['lon'] += velocity[0]  # East/West movement
-            disaster['lat'] += velocity[1]  # North/South movement
-            disasters_modified = True
-            
-            # Boundary check: Keep disaster within Java region
-            disaster['lat'] = max(-9.0, min(-5.0, disaster['lat']))
-            disaster['lon'] = max(105.0, min(115.0, disaster['lon']))
-        
-        # V5.2: Decay Logic (floods recede)
-        if disaster.get('is_decaying', False):
-            decay_rate = disaster.get('decay_rate', 0)
-            disaster['radius'] = max(10, disaster['radius'] - decay_rate)
-            disasters_modified = True
-            
-            # Auto-remove if shrunk to minimum
-            if disaster['radius'] <= 10:
-                expired_disasters.append(disaster['id'])
-                print(f">>> Disaster {disaster['id']} ({disaster['type']}) expired (shrunk to minimum)")
-        
-# --- LEGACY FUNCTIONS REMOVED (Moved to SimulationManager) ---
-# recalculate_physics and update_disasters logic is now inside SimulationManager
-# For backward compatibility during refactor transition:
-def recalculate_physics(): sim_manager.update_physics()
-def update_disasters(): return sim_manager.update_disasters_lifecycle()
+    def set_road_status(self, id_from, id_to, status):
+        # God Mode sabotage (V5.9: kept as simulation state and reapplied on every physics update)
+        road = (min(id_from, id_to), max(id_from, id_to))
+        if status == 'blocked':
+            self.blocked_roads.add(road)
+        elif status == 'open':
+            self.blocked_roads.discard(road)
+        self.replay.log_event(SABOTAGE, self.total_episodes, (id_from, id_to, status))
+        self.update_physics()
+        self.publish_snapshot()
 
-# --- V5.0/5.2: DISASTER API ENDPOINTS ---
+    def train_tick(self, indices_out=None):
+        """
+        Train every agent one episode and return the /api/train payload.
 
-@app.route('/api/train')
-@limiter.limit("30 per minute")  # P0 Security: Rate limit training endpoint
-def train_step():
-    try:
-        global total_episodes # Legacy global
-        
-        # Batch Size Kecil agar Browser tidak lag dengan 5 agen
-        batch_size = 5 
-        
+        Args:
+            indices_out: Optional dict, filled with agent -> route as city indices
+                (the compact payload; names are not unique)
+        """
         routes_data = []
-        with lock:
-            for agent_name, agent in agents.items():
+        summaries = []
+        with self.lock:
+            # V5.9: Episodes depart at the simulated clock; switch slot when it moves on
+            departure = self.clock_minutes
+            if self.time_key() != self._time_key:
+                slot = self.time_slices.slot_for(departure)
+                if slot != self._slot:
+                    self.replay.log_event(CONFIG, self.total_episodes, {
+                        'action': 'time_slot', 'slot': slot, 'clock': format_clock(departure)
+                    })
+                self.update_physics(disrupted=False)
+
+            # V5.9: A disaster / sabotage wakes converged agents (a new slot does not); then budget the tick
+            self.convergence.check_matrix(self.disrupted_base, self.disruption_version)
+            plan = self.convergence.plan(self.total_episodes)
+
+            trained = []
+            for agent_name, agent in self.agents.items():
                 # Get current fleet config
-                conf = fleet_config.get(agent_name, {'v': 'diesel', 'c': 'general'})
+                conf = fleet_config.get(agent_name, DEFAULT_CONFIG)
+
+                # Determine Objective (V5.3)
+                objective = 'time' if conf['c'] == 'humanitarian' else 'profit'
+
+                # Train this tick's episodes & get best route (V5.9: only this agent's Q-table is locked;
+                # a paused / throttled agent reuses its last route and its slot goes to a learning one)
+                runs = plan[agent_name]
+                with self.agent_locks[agent_name]:
+                    if runs:
+                        before = self.convergence.probe(agent_name, agent)
+                        for _ in range(runs):
+                            agent.train_episode(objective=objective)
+                        self.q_analytics.bump(agent_name, runs)
+                        dist, route_indices = agent.get_best_route_distance()
+                        self.convergence.observe(agent_name, agent, runs, dist, route_indices, before)
+                    else:
+                        dist, route_indices = self.convergence.last(agent_name)
+                    summaries.append(summarize_agent(agent, route_indices, dist))
+                trained.append((agent_name, agent, conf, dist, route_indices))
+
+            # V5.4: Real Cost Calculation (V5.9: whole fleet in one vectorized pass)
+            economics = fleet_economics.evaluate([t[3] for t in trained], [t[2] for t in trained])
+            hall_changed = False
+
+            for k, (agent_name, agent, conf, dist, route_indices) in enumerate(trained):
                 cargo_type = conf['c']
                 cargo_props = CARGO.get(cargo_type, CARGO['general'])
-                
-                # Determine Objective (V5.3)
-                objective = 'time' if cargo_type == 'humanitarian' else 'profit'
-                
-                # Train one episode
-                agent.train_episode(objective=objective)
-                
-                # Get best route & stats
-                dist, route_indices = agent.get_best_route_distance()
-                path_names = [cities_data[idx]['name'] for idx in route_indices] if route_indices else []
-                
-                # V5.4: Real Cost Calculation
-                vehicle_props = VEHICLES.get(conf['v'], VEHICLES['diesel'])
-                efficiency = vehicle_props.get('efficiency', 3.0)
-                fuel_type = vehicle_props.get('fuel', 'diesel')
-                fuel_price = PRICE_ELECTRIC if fuel_type == 'electric' else PRICE_DIESEL
-                
-                fuel_needed = dist / efficiency
-                fuel_cost = fuel_needed * fuel_price
-                labor_cost = dist * DRIVER_WAGE_KM
-                total_cost = (fuel_cost + labor_cost) * cargo_props['multiplier']
-                
-                revenue = cargo_props['baseRevenue']
-                profit = revenue - total_cost
-                
+                path_names = [self.cities[idx]['name'] for idx in route_indices] if route_indices else []
+                if indices_out is not None:
+                    indices_out[agent_name] = [int(idx) for idx in route_indices] if route_indices else []
+
                 # V5.3: Reputation Update
                 if cargo_type == 'humanitarian':
-                    sim_manager.reputation += cargo_props.get('reputation', 0)
-                    if sim_manager.reputation > 1000: sim_manager.reputation = 1000
-                
+                    self.reputation += cargo_props.get('reputation', 0)
+                    if self.reputation > 1000: self.reputation = 1000
+
                 routes_data.append({
                     'agent': agent_name,
-                    'episode': total_episodes, 
+                    'episode': self.total_episodes,
                     'distance': round(dist, 2),
-                    'cost': round(total_cost, 0),
-                    'profit': round(profit, 0),
+                    'cost': round(float(economics.cost[k]), 0),
+                    'profit': round(float(economics.profit[k]), 0),
                     'epsilon': round(agent.epsilon, 4),
                     'color': agent.color,
                     'path': path_names,  # Changed from 'route' to 'path' for V4.9.1 frontend
                     'cargo': cargo_type
                 })
-                
-                # Hall of Fame Logic
-                rounded_dist = round(dist, 2)
-                is_duplicate = False
-                for r in sim_manager.top_records:
-                    if abs(r['distance'] - rounded_dist) < 0.01:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate and rounded_dist > 0:
-                    if len(sim_manager.top_records) < 5 or rounded_dist < sim_manager.top_records[-1]['distance']:
-                        sim_manager.top_records.append({'agent': agent.name, 'distance': rounded_dist, 'rank': 0})
-                        sim_manager.top_records.sort(key=lambda x: x['distance'])
-                        sim_manager.top_records = sim_manager.top_records[:5]
-                        for i, rec in enumerate(sim_manager.top_records): rec['rank'] = i + 1
-        
-        total_episodes += 1
-        
-        # Temporal Disaster Cycle
-        expired = sim_manager.update_disasters_lifecycle()
 
-        return jsonify({
+                # Hall of Fame Logic (V5.9: bounded heap + exact route dedup, O(log K) per agent)
+                if self.hall_of_fame.offer(agent.name, dist, route_indices, self.total_episodes):
+                    hall_changed = True
+
+            if hall_changed:
+                self.top_records = self.hall_of_fame.top_records()
+            # V5.9: Keep this tick's results (columnar ring; /api/history, agent_comparison averages)
+            self.history.append(
+                self.total_episodes, [t[3] for t in trained], economics.cost, economics.profit,
+                [agent.epsilon for _, agent, _, _, _ in trained], [s.state_count for s in summaries],
+                agents=[t[0] for t in trained]
+            )
+            self.hall_of_fame.save()
+            self.total_episodes += 1
+            self.clock_minutes = (self.clock_minutes + self.minutes_per_episode) % MINUTES_PER_DAY
+
+            # Temporal Disaster Cycle
+            expired = self.update_disasters_lifecycle()
+
+            self.publish_snapshot(summaries)
+
+        return {
             'routes': routes_data,
-            'best_routes': sim_manager.top_records,
-            'episode': total_episodes,
+            'best_routes': self.top_records,
+            'episode': self.total_episodes,
             'disasters_expired': expired,
-            'reputation': sim_manager.reputation
+            'reputation': self.reputation,
+            'clock': format_clock(departure),
+            'time_slot': self.time_slices.slot_for(departure) if self.time_slices is not None else None
+        }
+
+    def export_brain(self):
+        """Serialize Q-tables to the V4.9 brain format."""
+        dump = {
+            'version': '4.9',
+            'num_cities': len(self.cities),
+            'episodes': self.total_episodes,
+            'agents': {}
+        }
+
+        for name, agent in self.agents.items():
+            q_data = {}
+            # Convert tuple state keys to string for JSON compatibility
+            # V5.9: Copy under the agent lock - consistent per agent, training keeps going
+            with self.agent_locks[name]:
+                for state, actions in agent.q_table.items():
+                    key = f"{state[0]}|{state[1]}"  # "city_id|visited_mask"
+                    q_data[key] = dict(actions)
+
+            dump['agents'][agent.name] = {
+                'q_table': q_data,
+                'epsilon': agent.epsilon
+            }
+            if hasattr(agent, 'weights'):
+                dump['agents'][agent.name]['weights'] = agent.weights.tolist()
+        return dump
+
+    def import_brain(self, data):
+        """
+        Restore Q-tables from a brain dump with validation.
+        Raises ValueError with a user-facing message when the brain is rejected.
+        """
+        # VALIDATION #1: City Count Compatibility
+        saved_cities = data.get('num_cities', 0)
+        if saved_cities != len(self.cities):
+            raise ValueError(f"Brain incompatible! Saved for {saved_cities} cities, current map has {len(self.cities)} cities.")
+
+        # VALIDATION #2: Version Check (optional warning)
+        saved_version = data.get('version', 'unknown')
+        if saved_version != '4.9':
+            print(f">>> WARNING: Loading brain from version {saved_version}")
+
+        # VALIDATION #4: Q-table Size Limit (prevent memory bomb) - checked before touching any agent
+        for agent_name, saved_data in data.get('agents', {}).items():
+            q_table_data = saved_data.get('q_table', {})
+            if len(q_table_data) > 100000:
+                raise ValueError(f"{agent_name} Q-table too large ({len(q_table_data)} states, max 100k)")
+            # VALIDATION #6 (V5.9): Linear agent weights must match the feature count
+            weights = saved_data.get('weights')
+            if weights is not None:
+                try:
+                    values = np.asarray(weights, dtype=np.float64)
+                    valid = values.shape == (len(LinearQAgent.FEATURES),) and np.isfinite(values).all()
+                except (TypeError, ValueError):
+                    valid = False
+                if not valid:
+                    raise ValueError(f"{agent_name} weights invalid (expected {len(LinearQAgent.FEATURES)} finite numbers)")
+
+        # Restore episode counter (V5.9: the journal starts a new run - episodes jumped)
+        self.total_episodes = data.get('episodes', 0)
+        self.replay.start_run(self.total_episodes, reason='load_brain')
+        self.convergence.reset()  # New brain: progress signals start over
+        self.history.rewind(self.total_episodes)  # Keep what happened before the brain's episode
+
+        for agent in self.agents.values():
+            if agent.name not in data.get('agents', {}):
+                continue
+
+            saved_data = data['agents'][agent.name]
+
+            # VALIDATION #3: Epsilon Clamping (0.01-1.0 range)
+            raw_epsilon = saved_data.get('epsilon', 1.0)
+            agent.epsilon = max(0.01, min(1.0, raw_epsilon))
+            self.convergence.sync_epsilon(agent.name, agent.epsilon)  # Schedule continues from here
+
+            # Restore Q-values (parsed off-lock, swapped in under the agent lock)
+            restored = {}
+            for key_str, actions in saved_data.get('q_table', {}).items():
+                try:
+                    # Parse "city|mask" back to tuple (city_id, visited_mask)
+                    parts = key_str.split('|')
+                    city_id = int(parts[0])
+                    mask = int(parts[1])
+
+                    # VALIDATION #5: State Range Check (skip invalid states)
+                    if city_id >= len(self.cities):
+                        continue  # Skip states for cities that don't exist
+
+                    state = (city_id, mask)
+
+                    # Restore actions
+                    state_q = restored.setdefault(state, defaultdict(float))
+                    for action_str, value in actions.items():
+                        action = int(action_str)
+                        state_q[action] = float(value)
+
+                except (ValueError, IndexError) as e:
+                    print(f">>> Skipping corrupt state: {key_str}")
+                    continue
+
+            # V5.9: Linear agents (large maps) keep their brain in a weight vector
+            weights = saved_data.get('weights')
+
+            with self.agent_locks[agent.name]:
+                # Clear existing Q-table
+                agent.q_table.clear()
+                agent.q_table.update(restored)
+                if agent.edge_visits is not None:
+                    agent.edge_visits[:] = 0  # The brain carries no driving record
+                if weights is not None and hasattr(agent, 'weights'):
+                    agent.weights[:] = weights
+
+        self.q_analytics.invalidate()
+        self.publish_snapshot()
+
+    def compile_policies(self, names=None):
+        """
+        Distill agents' greedy policies into POLICY_DIR artifacts.
+
+        Returns:
+            dict: name -> artifact stats, or {'error': reason} for agents that cannot be distilled
+        """
+        fingerprint = map_fingerprint(self.cities)
+        results = {}
+        for name in (names or list(self.agents)):
+            agent = self.agents[name]
+            try:
+                with self.agent_locks[name]:
+                    policy = distill_policy(agent, self.base_matrix, {
+                        'map': fingerprint, 'sim_id': self.sim_id, 'episode': self.total_episodes
+                    })
+            except ValueError as e:
+                results[name] = {'error': str(e)}
+                continue
+            path = policy_path(self.sim_id, name)
+            policy.save(path)
+            results[name] = dict(policy.stats(), path=path)
+        return results
+
+    def export_checkpoint(self):
+        """Brain dump plus the map itself, so an evicted simulation can be rebuilt."""
+        checkpoint = self.export_brain()
+        checkpoint['sim_id'] = self.sim_id
+        checkpoint['cities'] = {str(k): v for k, v in self.cities.items()}
+        checkpoint['base_matrix'] = self.base_matrix.tolist()
+        checkpoint['reputation'] = self.reputation
+        return checkpoint
+
+
+# --- V5.9: SIMULATION REGISTRY (MULTI-MAP / MULTI-TENANT) ---
+DEFAULT_SIM_ID = 'default'
+SIM_MAX_ACTIVE = int(os.getenv('SIM_MAX_ACTIVE', '8'))
+SIM_IDLE_TIMEOUT = float(os.getenv('SIM_IDLE_TIMEOUT', '0')) or None  # Seconds, 0 = never
+SIM_CHECKPOINT_DIR = os.getenv('SIM_CHECKPOINT_DIR', '')  # Empty = no checkpoint on eviction
+
+checkpoint_store = JsonCheckpointStore(SIM_CHECKPOINT_DIR) if SIM_CHECKPOINT_DIR else None
+
+
+def build_simulation(sim_id):
+    """Registry factory: restore from checkpoint if one exists, else clone the default map."""
+    checkpoint = checkpoint_store.load(sim_id) if checkpoint_store else None
+    if checkpoint:
+        cities = {int(k): v for k, v in checkpoint['cities'].items()}
+        matrix = np.array(checkpoint['base_matrix'], dtype=np.float32)
+        sim = SimulationManager(cities, dist_matrix=matrix, sim_id=sim_id)
+        sim.import_brain(checkpoint)
+        sim.reputation = checkpoint.get('reputation', 0)
+        print(f">>> Simulation '{sim_id}' restored from checkpoint (Episode {sim.total_episodes})")
+        return sim
+    return SimulationManager(cities_data, dist_matrix=default_map_matrix(), sim_id=sim_id)
+
+
+def checkpoint_simulation(sim_id, sim):
+    sim.hall_of_fame.save(force=True)
+    sim.history.spill()
+    if checkpoint_store is not None:
+        path = checkpoint_store.save(sim_id, sim.export_checkpoint())
+        print(f">>> Simulation '{sim_id}' checkpointed to {path}")
+    if snapshot_mirror is not None:
+        snapshot_mirror(sim_id, None)  # Workers stop serving the evicted simulation
+
+
+registry = SimulationRegistry(
+    build_simulation,
+    max_active=SIM_MAX_ACTIVE,
+    idle_timeout=SIM_IDLE_TIMEOUT,
+    on_evict=checkpoint_simulation
+)
+registry.pin(DEFAULT_SIM_ID)
+
+# V5.9: Lazy startup - importing app.py builds nothing. The default map's matrix and
+# agents are created on first use, or by the background warmup create_app() starts
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'true').lower() == 'true'
+_warmup = {'thread': None, 'started_at': None, 'finished_at': None, 'error': None}
+_warmup_lock = Lock()
+
+
+def default_simulation():
+    """Default-map simulation (backs every request without ?sim=); built on first call."""
+    return registry.get(DEFAULT_SIM_ID)
+
+
+def __getattr__(name):
+    # Backward compatibility: module.sim_manager still works, resolved lazily
+    if name == 'sim_manager':
+        return default_simulation()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _run_warmup():
+    started = time.perf_counter()
+    try:
+        default_simulation()
+        print(f">>> Warmup complete in {time.perf_counter() - started:.1f}s (default map ready).")
+    except Exception as e:
+        _warmup['error'] = str(e)
+        print(f">>> Warmup failed: {e}")
+    finally:
+        _warmup['finished_at'] = time.time()
+
+
+def start_warmup():
+    """Build the default simulation on a background thread (idempotent; retries after a failure)."""
+    with _warmup_lock:
+        thread = _warmup['thread']
+        if thread is None or (_warmup['error'] is not None and not thread.is_alive()):
+            _warmup['started_at'], _warmup['finished_at'], _warmup['error'] = time.time(), None, None
+            _warmup['thread'] = Thread(target=_run_warmup, name='twin-warmup', daemon=True)
+            _warmup['thread'].start()
+        return _warmup['thread']
+
+
+def default_snapshot():
+    """Latest default-map snapshot without building anything (None while warming up)."""
+    if simulation_view is not None:
+        view = simulation_view(DEFAULT_SIM_ID)
+        return view.snapshots.latest if view is not None else None
+    sim = registry.peek(DEFAULT_SIM_ID)
+    return sim.snapshots.latest if sim is not None else None
+
+
+def is_ready():
+    return default_snapshot() is not None
+
+
+def create_app(warmup=None):
+    """
+    App factory: the configured Flask app, with the default simulation warming up in the
+    background so the server accepts connections (and liveness probes) immediately.
+
+    Args:
+        warmup: Start the background warmup (default WARMUP_ON_START env)
+    """
+    if WARMUP_ON_START if warmup is None else warmup:
+        start_warmup()
+    return app
+
+
+def get_simulation():
+    """Resolve the simulation for this request (?sim=<id> or X-Simulation-ID header)."""
+    sim_id = request.args.get('sim') or request.headers.get('X-Simulation-ID') or DEFAULT_SIM_ID
+    if simulation_view is not None:
+        view = simulation_view(validate_sim_id(sim_id))
+        if view is not None:
+            return view
+    return registry.get(validate_sim_id(sim_id))
+
+
+@app.errorhandler(InvalidSimulationId)
+def handle_invalid_sim_id(e):
+    return jsonify({"status": "error", "message": str(e)}), 400
+
+
+# --- LEGACY FUNCTIONS REMOVED (Moved to SimulationManager) ---
+# recalculate_physics and update_disasters logic is now inside SimulationManager
+# For backward compatibility during refactor transition:
+def recalculate_physics(): default_simulation().update_physics()
+def update_disasters(): return default_simulation().update_disasters_lifecycle()
+
+# --- 3. API ENDPOINTS ---
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/health', methods=['GET'])
+@limiter.exempt
+def health_check():
+    """
+    Health check endpoint for monitoring and load balancers.
+    Liveness: answers immediately and never builds a simulation (V5.9);
+    "ready" tells whether the default map has finished warming up.
+    """
+    snapshot = default_snapshot()
+    return jsonify({
+        "status": "healthy",
+        "ready": snapshot is not None,
+        "version": "V5.8.1",
+        "agents": len(snapshot.agents) if snapshot else 0,
+        "cities": len(snapshot.cities) if snapshot else len(cities_data),
+        "disasters": len(snapshot.disasters) if snapshot else 0,
+        "episodes": snapshot.episode if snapshot else 0,
+        "simulations": len(registry),
+        "uptime": "running",
+        "features": ["CORS", "Rate-Limiting", "Multi-Stage-Docker", "OSRM-Proxy", "Multi-Map-Registry"]
+    }), 200
+
+
+@app.route('/health/ready', methods=['GET'])
+@limiter.exempt
+def readiness_check():
+    """Readiness: 200 once the default simulation exists, 503 while it warms up."""
+    if is_ready():
+        return jsonify({"status": "ready"}), 200
+    if simulation_view is None:
+        start_warmup()  # Probes alone bring a server without create_app() up
+    return jsonify({
+        "status": "warming_up" if _warmup['error'] is None else "warmup_failed",
+        "error": _warmup['error'],
+        "warmup_started_at": _warmup['started_at']
+    }), 503
+
+def parse_route_options(payload):
+    """Read optional payload shrinking options: simplify (degrees), precision (decimals)."""
+    simplify = payload.get('simplify')
+    precision = payload.get('precision')
+    simplify = max(0.0, min(0.1, float(simplify))) if simplify is not None else None
+    precision = max(0, min(7, int(precision))) if precision is not None else None
+    return simplify, precision
+
+
+def fetch_osrm_route(coords):
+    """Call OSRM with 5-second timeout. Returns (status, payload)."""
+    osrm_url = f"{OSRM_URL}/route/v1/driving/{coords}?overview=full&geometries=geojson"
+    try:
+        response = requests.get(osrm_url, timeout=5)
+    except requests.Timeout:
+        return 504, {"error": "Route service timeout"}
+
+    if response.status_code == 200:
+        return 200, response.json()
+    return response.status_code, {"error": "OSRM service error"}
+
+
+# V5.6: OSRM Proxy Endpoint with Timeout
+# V5.9: LRU+TTL geometry cache; concurrent identical requests share one upstream call
+@app.route('/api/route', methods=['POST'])
+@limiter.limit("100 per minute")
+def get_osrm_route():
+    """
+    Proxy endpoint for OSRM routing with timeout protection.
+    Prevents hanging requests to external OSRM service.
+    Optional "simplify" / "precision" fields shrink the returned geometry.
+    """
+    try:
+        payload = request.json or {}
+        coords = payload.get('coords')
+        if not coords:
+            return jsonify({"error": "Missing coordinates"}), 400
+        try:
+            key = coords_key(coords)
+            simplify, precision = parse_route_options(payload)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        status, body = route_cache.get_or_fetch(
+            key, lambda: fetch_osrm_route(coords), should_cache=lambda result: result[0] == 200
+        )
+        if status == 200:
+            body = shrink_route_payload(body, simplify=simplify, precision=precision)
+        return jsonify(body), status
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/route/stats', methods=['GET'])
+def get_route_cache_stats():
+    """Hit/miss/coalescing metrics for the OSRM geometry cache."""
+    return jsonify(route_cache.stats())
+
+# V5.9: Leg geometry - every route is drawn from cached city-to-city legs
+_leg_stores = {}
+_leg_stores_lock = Lock()
+
+
+def fetch_osrm_legs(points):
+    """One OSRM call with steps=true; returns one [[lat, lon], ...] array per leg, or None."""
+    coords = ";".join(f"{lon},{lat}" for lat, lon in points)
+    osrm_url = f"{OSRM_URL}/route/v1/driving/{coords}?overview=false&steps=true&geometries=polyline"
+    try:
+        response = requests.get(osrm_url, timeout=5)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if data.get('code') != 'Ok' or not data.get('routes'):
+            return None
+        legs = []
+        for leg in data['routes'][0]['legs']:
+            parts = [decode_polyline(step['geometry']) for step in leg.get('steps', []) if step.get('geometry')]
+            parts = [part for part in parts if len(part)]
+            if not parts:
+                return None
+            legs.append(np.concatenate([parts[0]] + [part[1:] for part in parts[1:]]))
+        return legs
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f">>> OSRM leg fetch failed ({e}). Drawing straight legs.")
+        return None
+
+
+def leg_store_for(cities):
+    """Leg store shared by every simulation running on the same map."""
+    fingerprint = map_fingerprint(cities)
+    with _leg_stores_lock:
+        store = _leg_stores.get(fingerprint)
+        if store is None:
+            path = map_store.legs_path(cities) if map_store is not None else None
+            store = LegGeometryStore(cities, path=path, fetch_legs=fetch_osrm_legs)
+            _leg_stores[fingerprint] = store
+        return store
+
+
+@app.route('/api/route_polylines', methods=['GET'])
+@limiter.limit("100 per minute")
+def get_route_polylines():
+    """
+    Encoded polyline (precision 5) of every agent's current best route.
+    Assembled from cached legs, so OSRM is only hit for legs never seen before.
+    ?fetch=0 never calls OSRM (unseen legs are drawn straight).
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    fetch = request.args.get('fetch', '1') != '0'
+    store = leg_store_for(snapshot.cities)
+
+    routes = []
+    for name, summary in snapshot.agents.items():
+        route = [int(c) for c in summary.route]
+        geometry = store.assemble(route, fetch=fetch)
+        routes.append({
+            "agent": name,
+            "color": summary.color,
+            "route": route,
+            "distance": round(float(summary.distance), 2),
+            "polyline": encode_polyline(geometry),
+            "points": len(geometry),
+            "straight_legs": store.ensure(route, fetch=False)
         })
 
+    return jsonify({
+        "snapshot_version": snapshot.version,
+        "precision": 5,
+        "routes": routes,
+        "legs": store.stats()
+    })
+
+@app.route('/get_cities')
+def get_cities():
+    sim = get_simulation()
+    simple_data = {info['name']: [info['lat'], info['lon']] for _, info in sim.cities.items()}
+    return jsonify(simple_data)
+
+@app.route('/api/reset')
+def reset_sim():
+    # V5.4: Use SimulationManager
+    sim = get_simulation()
+    with sim.lock:
+        sim.reset()
+    return jsonify({"status": "reset"})
+
+# --- V5.9: SIMULATION REGISTRY ENDPOINTS ---
+
+@app.route('/api/sims', methods=['GET'])
+def list_simulations():
+    """List live simulations with their size, progress and idle time."""
+    sims = []
+    for sim_id, sim in registry.items():
+        idle = registry.idle_seconds(sim_id)
+        sims.append({
+            "id": sim_id,
+            "cities": len(sim.cities),
+            "episodes": sim.total_episodes,
+            "disasters": len(sim.disasters),
+            "idle_seconds": round(idle, 1) if idle is not None else None,
+            "training": sim.lock.locked()
+        })
+    return jsonify({
+        "simulations": sims,
+        "count": len(sims),
+        "max_active": registry.max_active,
+        "checkpointing": checkpoint_store is not None
+    })
+
+@app.route('/api/sims/<sim_id>', methods=['DELETE'])
+def evict_simulation(sim_id):
+    """Evict a simulation (checkpointed first when SIM_CHECKPOINT_DIR is set)."""
+    validate_sim_id(sim_id)
+    if sim_id == DEFAULT_SIM_ID:
+        return jsonify({"status": "error", "message": "The default simulation cannot be evicted"}), 400
+    if not registry.evict(sim_id):
+        return jsonify({"status": "error", "message": f"Simulation '{sim_id}' not found"}), 404
+    return jsonify({"status": "success", "message": f"Simulation '{sim_id}' evicted"})
+
+# --- V5.0/5.2: DISASTER API ENDPOINTS ---
+
+@app.route('/api/train')
+@limiter.limit("30 per minute")  # P0 Security: Rate limit training endpoint
+def train_step():
+    sim = get_simulation()
+    try:
+        # Batch Size Kecil agar Browser tidak lag dengan 5 agen
+        route_indices = {}
+        tick = sim.train_tick(route_indices)
+        if request.args.get('compact') not in ('1', 'true'):
+            return jsonify(tick)
+        # V5.9: Index routes, only what changed since the client's version, gzip/brotli when large
+        since = request.args.get('since', type=int)
+        city_names = [sim.cities[i]['name'] for i in range(len(sim.cities))]
+        body, coding = encode_body(sim.payloads.encode(tick, route_indices, city_names, since),
+                                   request.headers.get('Accept-Encoding'), COMPRESS_MIN_BYTES)
+        response = Response(body, mimetype='application/json')
+        response.headers['Vary'] = 'Accept-Encoding'
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        return response
+
     except Exception as e:
         # 🚨 V5.0.1: LOUD ERROR LOGGING (Red Team Hardening)
         print(f"\n{'='*60}")
         print(f"🚨 CRITICAL ERROR IN /api/train")
-        print(f"Episode: {total_episodes}")
+        print(f"Simulation: {sim.sim_id}")
+        print(f"Episode: {sim.total_episodes}")
         print(f"Error Type: {type(e).__name__}")
         print(f"Error Message: {str(e)}")
         print(f"{'='*60}")
         traceback.print_exc()
         print(f"{'='*60}\n")
-        
+
         return jsonify({
             'error': str(e),
             'error_type': type(e).__name__,
@@ -614,21 +1315,22 @@ def train_step():
 
 @app.route('/api/sabotage', methods=['POST'])
 def sabotage():
+    sim = get_simulation()
     data = request.json
     city_from = data.get('from')
     city_to = data.get('to')
     status = data.get('status')
-    
+
     id_from, id_to = None, None
-    for pid, info in cities_data.items():
+    for pid, info in sim.cities.items():
         if info['name'] == city_from: id_from = pid
         if info['name'] == city_to: id_to = pid
-            
+
     if id_from is not None and id_to is not None:
-        for agent in agents:
-            agent.set_road_status(id_from, id_to, status)
+        with sim.lock:
+            sim.set_road_status(id_from, id_to, status)
         return jsonify({"status": "success", "message": f"Sabotage {status} applied!"})
-    
+
     return jsonify({"status": "error", "message": "City not found"}), 400
 
 # --- V5.0: DISASTER API ENDPOINTS ---
@@ -639,46 +1341,45 @@ def create_disaster():
     Create a disaster zone with severity levels (V5.1).
     Implements all P0 validation fixes + severity system.
     """
-    global disaster_id_counter, active_disasters
-    
+    sim = get_simulation()
+
     try:
         data = request.json
-        
+
         # P0 Fix #3: DoS Prevention - Disaster Limit
-        if len(active_disasters) >= DISASTER_LIMIT:
+        if len(sim.disasters) >= DISASTER_LIMIT:
             return jsonify({
-                "status": "error", 
+                "status": "error",
                 "message": f"Disaster limit reached ({DISASTER_LIMIT} max). Clear some disasters first."
             }), 429
-        
+
         # Extract parameters
         lat = float(data.get('lat', 0))
         lon = float(data.get('lon', 0))
         disaster_type = data.get('type', 'flood').lower()  # flood/quake/landslide
         severity = int(data.get('severity', 2))  # V5.1: Default to level 2
         radius = float(data.get('radius', 50))
-        
+
         # P0 Fix #5: Coordinate Validation (Java region bounds)
         if not (-9.0 <= lat <= -5.0 and 105.0 <= lon <= 115.0):
             return jsonify({
                 "status": "error",
                 "message": "Coordinates outside Java region (-9 to -5 lat, 105 to 115 lon)"
             }), 400
-        
+
         # V5.1: Severity Validation
         if severity not in SEVERITY_LEVELS:
             return jsonify({
                 "status": "error",
                 "message": f"Invalid severity level. Must be one of: {list(SEVERITY_LEVELS.keys())}"
             }), 400
-            
+
         # V5.2: Create disaster using Type Config & Severity
         sev_info = SEVERITY_LEVELS.get(severity, SEVERITY_LEVELS[2])
         severity_config = sev_info  # Alias for compatibility
         type_info = DISASTER_TYPES_INFO.get(disaster_type, DISASTER_TYPES_INFO['flood'])
-        
+
         disaster = {
-            'id': disaster_id_counter,
             'lat': lat,
             'lon': lon,
             'type': disaster_type,
@@ -688,23 +1389,21 @@ def create_disaster():
             'multiplier': sev_info['multiplier'],
             'color': sev_info['color'],
             'icon': sev_info['icon'],
-            
+
             # Lifecycle
             'age': 0,
-            'spawn_episode': total_episodes,
+            'spawn_episode': sim.total_episodes,
             'is_moving': type_info['moves'],
             'velocity': type_info['velocity'],
             'is_decaying': type_info['decays'],
             'decay_rate': type_info['decay_rate'],
             'lifetime': type_info['default_lifetime']
         }
-        
-        active_disasters.append(disaster)
-        disaster_id_counter += 1
-        
+
         # Update Physics
-        sim_manager.update_physics()
-        
+        with sim.lock:
+            sim.add_disaster(disaster)
+
         lifecycle_info = ""
         if type_info['moves']:
             lifecycle_info += f" [Moving {type_info['velocity'][0]*100:.1f}km/100ep]"
@@ -712,15 +1411,15 @@ def create_disaster():
             lifecycle_info += f" [Decaying {type_info['decay_rate']}km/ep]"
         if type_info['default_lifetime']:
             lifecycle_info += f" [TTL: {type_info['default_lifetime']}ep]"
-        
+
         print(f">>> Disaster Created: {severity_config['name']} ({disaster_type.upper()}) at ({lat:.2f}, {lon:.2f}), radius {radius}km{lifecycle_info}")
-        
+
         return jsonify({
             "status": "success",
             "disaster": disaster,
             "message": f"{severity_config['icon']} {severity_config['name']} created!"
         })
-        
+
     except (ValueError, TypeError) as e:
         return jsonify({
             "status": "error",
@@ -730,44 +1429,413 @@ def create_disaster():
 @app.route('/api/disaster', methods=['DELETE'])
 def clear_disasters():
     """
-    Clear all active disasters and restore original physics.
+    Clear all active disasters and restore original physics.
+    """
+    sim = get_simulation()
+    with sim.lock:
+        count = sim.clear_disasters()
+
+    print(f">>> All Disasters Cleared ({count} removed)")
+
+    return jsonify({
+        "status": "success",
+        "message": f"Cleared {count} disaster(s)",
+        "active_count": 0
+    })
+
+@app.route('/api/disasters', methods=['GET'])
+def get_disasters():
+    """
+    Get list of active disasters.
+    """
+    sim = get_simulation()
+    return jsonify({
+        "disasters": sim.disasters,
+        "count": len(sim.disasters),
+        "limit": DISASTER_LIMIT
+    })
+
+# V5.9: Compiled policies - distilled on the trainer, served from the artifact by any worker
+@app.route('/api/policy/compile', methods=['POST'])
+def compile_policy():
+    """Distill agents' Q-tables into lookup artifacts. Body: {agents: [names]} (default: all)."""
+    sim = get_simulation()
+    names = (request.get_json(silent=True) or {}).get('agents')
+    if names is not None and not (isinstance(names, list) and all(name in sim.agents for name in names)):
+        return jsonify({"status": "error", "message": "agents must be a list of agent names"}), 400
+    return jsonify({"status": "success", "episode": sim.total_episodes, "policies": sim.compile_policies(names)})
+
+
+@app.route('/api/policy/route', methods=['GET'])
+def policy_route():
+    """Greedy tour from a compiled policy: ?agent=<name>&start=<city index> (default 0)."""
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    agent_name = request.args.get('agent', '')
+    try:
+        start = int(request.args.get('start', 0))
+    except ValueError:
+        return jsonify({"status": "error", "message": "start must be an integer"}), 400
+    if agent_name not in snapshot.agents:
+        return jsonify({"status": "error", "message": f"Unknown agent '{agent_name}'"}), 404
+    policy = policy_cache.get(policy_path(sim.sim_id, agent_name))
+    if policy is None or policy.meta.get('map') != map_fingerprint(snapshot.cities):
+        return jsonify({"status": "error", "message": f"No compiled policy for {agent_name} on this map (POST /api/policy/compile)"}), 404
+    try:
+        route, coverage = policy.route(start)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({
+        "agent": agent_name,
+        "start": start,
+        "route": route,
+        "path": [snapshot.cities[c]['name'] for c in route],
+        "distance": round(tour_length(snapshot.matrix, route), 2),
+        "coverage": round(coverage, 4),
+        "compiled_episode": int(policy.meta.get('episode', 0)),
+        "states": policy.states
+    })
+
+
+# V5.9: Live re-planning - the best remaining order for a truck already on its tour
+@app.route('/api/replan', methods=['POST'])
+@limiter.limit(REPLAN_RATE_LIMIT)  # Dispatch backends re-plan every truck, often from one address
+def replan_route():
+    """
+    Body: {current, visited: [...], agent?, depot?, source?: agent|policy, improve?, budget_ms?}
+    Cities are indices or names. The agent's learned policy completes the tour;
+    unseen states fall back to nearest-neighbour plus delta 2-opt.
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"status": "error", "message": "Body must be a JSON object"}), 400
+    names = {info['name']: idx for idx, info in snapshot.cities.items()}
+
+    def city_index(value):
+        if isinstance(value, str) and value in names:
+            return names[value]
+        if isinstance(value, int) and not isinstance(value, bool) and value in snapshot.cities:
+            return value
+        raise ValueError(f"Unknown city {value!r}")
+
+    agent_name = payload.get('agent') or min(snapshot.agents.values(), key=lambda a: a.distance).name
+    if agent_name not in snapshot.agents:
+        return jsonify({"status": "error", "message": f"Unknown agent '{agent_name}'"}), 404
+    summary = snapshot.agents[agent_name]
+    try:
+        if 'current' not in payload or not isinstance(payload.get('visited', []), list):
+            raise ValueError("current is required and visited must be a list")
+        current = city_index(payload['current'])
+        visited = [city_index(v) for v in payload.get('visited', [])]
+        depot = city_index(payload['depot']) if 'depot' in payload else (summary.route[0] if summary.route else 0)
+        budget_ms = float(payload.get('budget_ms', DEFAULT_BUDGET_MS))
+        improve = payload.get('improve')
+        if improve is not None and not isinstance(improve, bool):
+            raise ValueError("improve must be true, false or null")
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    # Live Q-table on the trainer; workers (no live agents) and source=policy use the compiled artifact
+    live = getattr(sim, 'agents', None)
+    if payload.get('source') == 'policy' or live is None:
+        policy = policy_cache.get(policy_path(sim.sim_id, agent_name))
+        if policy is not None and policy.meta.get('map') == map_fingerprint(snapshot.cities):
+            choose, source = policy.lookup, 'policy'
+        elif live is None:
+            choose, source = None, 'none'  # Worker without an artifact: heuristic + 2-opt only
+        else:
+            return jsonify({"status": "error", "message": f"No compiled policy for {agent_name} on this map (POST /api/policy/compile)"}), 404
+    else:
+        agent, agent_lock = live[agent_name], sim.agent_locks[agent_name]
+        if hasattr(agent, 'weights'):
+            # Linear agents: one walk over a boolean visited array, heading for the requested depot
+            with agent_lock:
+                choose = follow_route(agent.get_route(current, visited, depot))
+        else:
+            def choose(city, mask):
+                with agent_lock:
+                    return agent.greedy_action(city, mask)
+        source = 'agent'
+
+    result = complete_route(choose, snapshot.matrix, current, visited, depot,
+                            budget_ms=budget_ms, improve=improve)
+    result.update({
+        "agent": agent_name,
+        "policy": source,
+        "episode": snapshot.episode,
+        "path": [snapshot.cities[c]['name'] for c in result['route']],
+        "distance": round(result['distance'], 2)
+    })
+    return jsonify(result)
+
+
+# V5.9: Hall of Fame boards, with every tour replayed on the current matrix
+@app.route('/api/hall_of_fame', methods=['GET'])
+def get_hall_of_fame():
+    """Overall, per-agent (?agent=<name> for one) and all-time top tours."""
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    boards = sim.hall_of_fame.view(agent=request.args.get('agent'))
+
+    def replay(records):
+        if records is None:
+            return None
+        for r in records:
+            route = list(r['route'])
+            valid = bool(route) and max(route) < len(snapshot.cities)
+            r['route'] = route
+            r['path'] = [snapshot.cities[c]['name'] for c in route] if valid else []
+            r['current_distance'] = round(tour_length(snapshot.matrix, route), 2) if valid else None
+        return records
+
+    return jsonify({
+        "episode": snapshot.episode,
+        "overall": replay(boards['overall']),
+        "per_agent": {name: replay(records) for name, records in boards['per_agent'].items()},
+        "all_time": replay(boards['all_time']),
+        "persistent": sim.hall_of_fame.store_path is not None
+    })
+
+
+# V5.9: Convergence monitor - per-agent progress, epsilon schedule and episode budget
+@app.route('/api/convergence', methods=['GET', 'POST'])
+def convergence_status():
+    """
+    GET: per-agent status (learning / throttled / paused) and signals.
+    POST: {schedule: {kind, start, end, decay, episodes}, enabled: bool, resume: [names] | true}
     """
-    global active_disasters, disaster_id_counter
-    
-    count = len(active_disasters)
-    active_disasters = []
-    disaster_id_counter = 0
-    
-    # Reset physics to original state
-    shared_matrix[:] = base_matrix.copy()
-    
-    # P0 Fix #1: Force propagate to agents
-    for agent in agents:
-        agent.dist_matrix = shared_matrix
-    
-    print(f">>> All Disasters Cleared ({count} removed)")
-    
+    sim = get_simulation()
+    monitor = sim.convergence
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        resume = payload.get('resume')
+        if resume is not None and resume is not True and not (
+                isinstance(resume, list) and all(name in sim.agents for name in resume)):
+            return jsonify({"status": "error", "message": "resume must be true or a list of agent names"}), 400
+        schedule = None
+        if 'schedule' in payload:
+            options = payload['schedule']
+            if not isinstance(options, dict):
+                return jsonify({"status": "error", "message": "schedule must be an object"}), 400
+            try:
+                schedule = EpsilonSchedule(**dict(monitor.schedule.to_dict(), **options))
+            except (TypeError, ValueError) as e:
+                return jsonify({"status": "error", "message": f"Invalid schedule: {e}"}), 400
+        with sim.lock:
+            if schedule is not None:
+                monitor.set_schedule(schedule, sim.agents)
+            if 'enabled' in payload:
+                monitor.enabled = bool(payload['enabled'])
+            if resume is not None:
+                monitor.resume(None if resume is True else resume)
+
+    agents = monitor.view(sim.agents)
+    counts = defaultdict(int)
+    for state in agents.values():
+        counts[state['status']] += 1
     return jsonify({
-        "status": "success",
-        "message": f"Cleared {count} disaster(s)",
-        "active_count": 0
+        "enabled": monitor.enabled,
+        "schedule": monitor.schedule.to_dict(),
+        "episode": sim.total_episodes,
+        "agents": agents,
+        "counts": dict(counts)
     })
 
-@app.route('/api/disasters', methods=['GET'])
-def get_disasters():
+
+# V5.9: Episode history - rolling averages and min/max-downsampled series
+@app.route('/api/history', methods=['GET'])
+def get_history():
     """
-    Get list of active disasters.
+    ?field=distance|cost|profit|epsilon|states &agent=<name> (repeatable, default all)
+    &start=&end= (episodes, inclusive) &points=500 (buckets) &window=50 (rolling mean)
+    """
+    sim = get_simulation()
+    try:
+        start, end, points, window = parse_journal_args('start', 'end', 'points', 'window')
+        series = sim.history.series(
+            request.args.get('field', 'distance'), agents=request.args.getlist('agent') or None,
+            start=start, end=end, points=min(points or 500, 5000), window=window or 50
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(dict(
+        sim.history.stats(), field=request.args.get('field', 'distance'), episode=sim.total_episodes,
+        oldest_episode=sim.history.oldest_episode, agents=series
+    ))
+
+
+# V5.9: Whole-table Q analytics (background, rebuilt per Q version)
+@app.route('/api/q_analytics', methods=['GET'])
+def get_q_analytics():
+    """
+    Coverage by depth, action entropy, Q histogram and most driven city pairs per agent
+    (?agent=<name>, default all); &heatmap=1 adds the full visits / learned entries / mean-Q matrices.
+    """
+    sim = get_simulation()
+    if is_large_map(sim.cities):
+        return jsonify({"status": "unavailable",
+                        "message": f"Q-table analytics are limited to maps of {LARGE_MAP_CITIES} cities"}), 409
+    names = request.args.getlist('agent') or list(sim.agents)
+    unknown = [name for name in names if name not in sim.agents]
+    if unknown:
+        return jsonify({"status": "error", "message": f"Unknown agents: {', '.join(unknown)}"}), 404
+
+    tracker = sim.q_analytics
+    tracker.refresh_if_stale(sim.agents, sim.agent_locks, sim.cities)
+    latest = tracker.latest
+    if not all(name in latest for name in names):
+        return jsonify({"status": "computing"}), 202
+
+    heatmap = request.args.get('heatmap') in ('1', 'true')
+    agents = {}
+    for name in names:
+        entry = dict(latest[name].summary, version=latest[name].version,
+                     current_version=tracker.versions[name], built_at=latest[name].built_at,
+                     compute_ms=round(latest[name].compute_ms, 1))
+        if heatmap:
+            entry['heatmap'] = {
+                'visits': latest[name].visits.tolist(),
+                'learned_entries': latest[name].learned.tolist(),
+                'mean_q': np.round(np.nan_to_num(latest[name].mean_q), 2).tolist()
+            }
+        agents[name] = entry
+    stale = any(latest[name].version != tracker.versions[name] for name in names)
+    return jsonify({"status": "stale" if stale else "ready", "episode": sim.total_episodes, "agents": agents})
+
+
+# V5.9: Event journal and matrix replay
+def parse_journal_args(*names):
+    """Integer query args (missing ones are None); ValueError on anything else."""
+    values = []
+    for name in names:
+        raw = request.args.get(name)
+        value = int(raw) if raw not in (None, '') else None
+        if value is not None and value < 0:
+            raise ValueError(f"{name} must be non-negative")
+        values.append(value)
+    return values
+
+
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    """
+    Disaster, sabotage and config events of the current run (?run=<n>, 0 = all runs),
+    optionally only from an episode on (?since=<episode>), newest ?limit= (max 1000).
+    """
+    sim = get_simulation()
+    try:
+        run, since, limit = parse_journal_args('run', 'since', 'limit')
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    events = sim.replay.events(run=run, since=since or 0, limit=min(limit or 200, 1000))
+    return jsonify(dict(sim.replay.stats(), events=events, count=len(events), episode=sim.total_episodes))
+
+
+@app.route('/api/matrix_as_of', methods=['GET'])
+def get_matrix_as_of():
     """
+    Distance matrix as it stood at the end of an episode (?episode=<n>, default now;
+    ?run=<n>, default current). ?format=npy returns the raw float32 .npy instead of JSON.
+    Matrices are journaled per disruption; time-of-day slot changes are config events.
+    """
+    sim = get_simulation()
+    try:
+        episode, run = parse_journal_args('episode', 'run')
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if episode is not None and run in (None, sim.replay.run) and episode > sim.total_episodes:
+        return jsonify({"status": "error",
+                        "message": f"Episode {episode} has not happened yet (current episode {sim.total_episodes})"}), 404
+    state = sim.replay.as_of(sim.total_episodes if episode is None else episode, run=run)
+    if state is None:
+        return jsonify({"status": "error", "message": "No matrix recorded for that episode (before the run started, or trimmed)"}), 404
+
+    if request.args.get('format') == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, state.matrix)
+        return Response(buffer.getvalue(), mimetype='application/octet-stream', headers={
+            'X-Run': str(state.run), 'X-Episode': str(state.episode), 'X-Matrix-Version': str(state.matrix_version)
+        })
     return jsonify({
-        "disasters": active_disasters,
-        "count": len(active_disasters),
-        "limit": DISASTER_LIMIT
+        "run": state.run,
+        "episode": state.episode,
+        "matrix_version": state.matrix_version,
+        "keyframe_episode": state.keyframe_episode,
+        "deltas_applied": state.deltas_applied,
+        "matrix": np.round(state.matrix.astype(np.float64), 3).tolist()
     })
 
+
+# V5.9: Rush-hour matrices and the simulated departure clock
+def time_slices_status(sim):
+    slices = sim.time_slices
+    return {
+        "enabled": slices is not None,
+        "clock": format_clock(sim.clock_minutes),
+        "minutes_per_episode": sim.minutes_per_episode,
+        "interpolate": sim.interpolate_slices,
+        "slots": slices.slots if slices is not None else None,
+        "slot": slices.slot_for(sim.clock_minutes) if slices is not None else None,
+        "memory_mapped": slices.memory_mapped if slices is not None else False,
+        "congestion_by_slot": slices.mean_factors(sim.base_matrix) if slices is not None else []
+    }
+
+
+@app.route('/api/time_slices', methods=['GET', 'POST'])
+def time_slices_config():
+    """
+    GET: clock / slot status. POST: {"profile": "rush_hour" | "off", "slots": 24,
+    "clock": "07:30", "minutes_per_episode": 10, "interpolate": false}
+    """
+    sim = get_simulation()
+    if request.method == 'GET':
+        return jsonify(time_slices_status(sim))
+
+    data = request.get_json(silent=True) or {}
+    try:
+        clock = parse_clock(data['clock']) if 'clock' in data else None
+        minutes = float(data.get('minutes_per_episode', sim.minutes_per_episode))
+        if not 0 <= minutes <= 240:
+            raise ValueError("minutes_per_episode must be within 0-240")
+        slots = int(data.get('slots', TIME_SLOTS))
+        if not 1 <= slots <= 288:
+            raise ValueError("slots must be within 1-288")
+        profile = data.get('profile')
+        if profile not in (None, 'off', 'rush_hour'):
+            raise ValueError("profile must be 'rush_hour' or 'off'")
+        interpolate = data.get('interpolate', sim.interpolate_slices)
+        if not isinstance(interpolate, bool):
+            raise ValueError("interpolate must be true or false")
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    with sim.lock:
+        if profile == 'off':
+            sim.time_slices = None
+        elif profile == 'rush_hour':
+            sim.time_slices = TimeSlicedMatrix.synthetic(sim.base_matrix, slots=slots)
+        if clock is not None:
+            sim.clock_minutes = clock
+        sim.minutes_per_episode = minutes
+        sim.interpolate_slices = interpolate
+        sim.replay.log_event(CONFIG, sim.total_episodes, {
+            'action': 'time_slices', 'enabled': sim.time_slices is not None,
+            'clock': format_clock(sim.clock_minutes), 'minutes_per_episode': minutes,
+            'interpolate': sim.interpolate_slices
+        })
+        sim.update_physics(disrupted=False)  # A new profile or clock is not a disruption
+        sim.publish_snapshot()
+        status = time_slices_status(sim)
+
+    return jsonify(dict(status, status="success"))
+
+
 @app.route('/api/update_config', methods=['POST'])
 def update_config():
-    global cities_data, agents, top_records, total_episodes, shared_matrix
-    
+    sim = get_simulation()
+
     try:
         new_data = request.json.get('cities')
         if not new_data:
@@ -783,34 +1851,19 @@ def update_config():
                 'lat': max(-90, min(90, float(v['lat']))),  # Clamp latitude range
                 'lon': max(-180, min(180, float(v['lon'])))  # Clamp longitude range
             }
-            
-        # 1. Update Global Data
-        cities_data = cleaned_cities
-        
-        # 2. Reset Memory
+
+        # 1. Reset Memory
         if os.path.exists("q_table.npy"):
             os.remove("q_table.npy")
-            
-        # 3. Re-Fetch OSRM Matrix (Berat, tapi perlu)
-        print(">>> Re-initializing Physics (New Map)...")
-        base_physics = TSPBaseAgent(cities_data)
-        shared_matrix = base_physics.dist_matrix
-        
-        # 4. Re-Spawn Agents
-        agents = [
-            QLearningAgent(cities_data, dist_matrix=shared_matrix, name="QL-Bot", color="blue"),
-            SarsaAgent(cities_data, dist_matrix=shared_matrix, name="Sarsa-Bot", color="green"),
-            MonteCarloAgent(cities_data, dist_matrix=shared_matrix, name="MC-Bot", color="red"),
-            TDLambdaAgent(cities_data, dist_matrix=shared_matrix, name="TD-Bot", color="orange"),
-            DynaQAgent(cities_data, dist_matrix=shared_matrix, name="Dyna-Bot", color="purple")
-        ]
-        
-        # 5. Reset Stats
-        top_records = []
-        total_episodes = 0
-        
+
+        # 2. Re-Fetch OSRM Matrix, Re-Spawn Agents, Reset Stats (Berat, tapi perlu)
+        # V5.9: Only this simulation is rebuilt - other maps keep training
+        print(f">>> Re-initializing Physics (New Map for '{sim.sim_id}')...")
+        with sim.lock:
+            sim.load_map(cleaned_cities)
+
         return jsonify({"status": "success", "message": "Map Updated! Simulation Reset."})
-        
+
     except Exception as e:
         print(f"Config Error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -823,26 +1876,10 @@ def save_brain():
     Serialize Q-tables to JSON format for persistent storage.
     Includes metadata for validation on load.
     """
-    dump = {
-        'version': '4.9',
-        'num_cities': len(cities_data),
-        'episodes': total_episodes,
-        'agents': {}
-    }
-    
-    for agent in agents:
-        q_data = {}
-        # Convert tuple state keys to string for JSON compatibility
-        for state, actions in agent.q_table.items():
-            key = f"{state[0]}|{state[1]}"  # "city_id|visited_mask"
-            q_data[key] = dict(actions)
-        
-        dump['agents'][agent.name] = {
-            'q_table': q_data,
-            'epsilon': agent.epsilon
-        }
-    
-    print(f">>> BRAIN SAVED: {len(dump['agents'])} agents, Episode {total_episodes}")
+    sim = get_simulation()
+    dump = sim.export_brain()  # V5.9: Per-agent locks only - training is never stalled
+
+    print(f">>> BRAIN SAVED: {len(dump['agents'])} agents, Episode {dump['episodes']}")
     return jsonify(dump)
 
 
@@ -852,70 +1889,17 @@ def load_brain():
     Restore Q-tables from JSON with validation.
     Hardening: city count, epsilon range, Q-table size.
     """
-    global total_episodes
-    
+    sim = get_simulation()
+
     try:
         data = request.json
-        
-        # VALIDATION #1: City Count Compatibility
-        saved_cities = data.get('num_cities', 0)
-        if saved_cities != len(cities_data):
-            return jsonify({
-                "msg": f"Brain incompatible! Saved for {saved_cities} cities, current map has {len(cities_data)} cities."
-            }), 400
-        
-        # VALIDATION #2: Version Check (optional warning)
-        saved_version = data.get('version', 'unknown')
-        if saved_version != '4.9':
-            print(f">>> WARNING: Loading brain from version {saved_version}")
-        
-        # Restore episode counter
-        total_episodes = data.get('episodes', 0)
-        
-        for agent in agents:
-            if agent.name not in data.get('agents', {}):
-                continue
-            
-            saved_data = data['agents'][agent.name]
-            
-            # VALIDATION #3: Epsilon Clamping (0.01-1.0 range)
-            raw_epsilon = saved_data.get('epsilon', 1.0)
-            agent.epsilon = max(0.01, min(1.0, raw_epsilon))
-            
-            # VALIDATION #4: Q-table Size Limit (prevent memory bomb)
-            q_table_data = saved_data.get('q_table', {})
-            if len(q_table_data) > 100000:
-                return jsonify({
-                    "msg": f"{agent.name} Q-table too large ({len(q_table_data)} states, max 100k)"
-                }), 400
-            
-            # Clear existing Q-table
-            agent.q_table.clear()
-            
-            # Restore Q-values
-            for key_str, actions in q_table_data.items():
-                try:
-                    # Parse "city|mask" back to tuple (city_id, visited_mask)
-                    parts = key_str.split('|')
-                    city_id = int(parts[0])
-                    mask = int(parts[1])
-                    
-                    # VALIDATION #5: State Range Check (skip invalid states)
-                    if city_id >= len(cities_data):
-                        continue  # Skip states for cities that don't exist
-                    
-                    state = (city_id, mask)
-                    
-                    # Restore actions
-                    for action_str, value in actions.items():
-                        action = int(action_str)
-                        agent.q_table[state][action] = float(value)
-                        
-                except (ValueError, IndexError) as e:
-                    print(f">>> Skipping corrupt state: {key_str}")
-                    continue
-        
-        print(f">>> BRAIN RESTORED: Episode {total_episodes}, {len(agents)} agents loaded")
+        with sim.lock:
+            sim.import_brain(data)
+
+        print(f">>> BRAIN RESTORED: Episode {sim.total_episodes}, {len(sim.agents)} agents loaded")
+        return jsonify({"msg": f"Brain loaded successfully (Episode {sim.total_episodes})"})
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
     except KeyError as e:
         return jsonify({"msg": f"Invalid brain file format: missing {str(e)}"}), 400
     except Exception as e:
@@ -925,29 +1909,41 @@ def load_brain():
 
 # --- P0: INTERPRETABILITY & WHAT-IF FEATURES ---
 
+def q_analytics_of(sim, snapshot):
+    """
+    Latest Q-table analytics summaries, agent -> summary (an agent is missing until its first build).
+    The trainer reads its tracker; pre-fork workers read what the snapshot carries.
+    """
+    tracker = getattr(sim, 'q_analytics', None)
+    return tracker.summaries() if tracker is not None else snapshot.q_analytics
+
+
 @app.route('/api/explain/<agent_name>', methods=['GET'])
 def explain_decision(agent_name):
     """
     P0.1: Decision Explanation - Interpretability Feature
     Returns why agent chose current route based on Q-values
     """
+    sim = get_simulation()
     try:
+        # V5.9: Serve from the latest published snapshot (no training lock)
+        snapshot = sim.snapshots.latest
+
         # agents is a dictionary, access directly by key
-        if agent_name not in agents:
+        if agent_name not in snapshot.agents:
             return jsonify({"error": "Agent not found"}), 404
         
-        target_agent = agents[agent_name]
+        target_agent = snapshot.agents[agent_name]
         
-        # Get current state (assuming start from city 0)
-        start_city = 0
+        # Get current state (V5.9: the root state at the agent's depot, where its route starts)
+        start_city = target_agent.route[0] if target_agent.route else 0
         mask = 1 << start_city
-        state = (start_city, mask)
         
         # Get valid actions (cities not yet visited)
-        valid_actions = [city for city in range(len(cities_data)) if not (mask & (1 << city))]
+        valid_actions = [city for city in range(len(snapshot.cities)) if not (mask & (1 << city))]
         
         # If Q-table empty, agent is still exploring
-        if not target_agent.q_table or state not in target_agent.q_table:
+        if not target_agent.state_count or not target_agent.root_q:
             return jsonify({
                 "agent": agent_name,
                 "status": "exploring",
@@ -960,8 +1956,8 @@ def explain_decision(agent_name):
         q_values = []
         total_q_magnitude = 0
         for action in valid_actions:
-            q_val = target_agent.q_table[state].get(action, 0.0)
-            city_name = cities_data[action]['name']
+            q_val = target_agent.root_q.get(action, 0.0)
+            city_name = snapshot.cities[action]['name']
             q_values.append({
                 "city_id": action,
                 "city_name": city_name,
@@ -980,39 +1976,92 @@ def explain_decision(agent_name):
             else:
                 item['percentage'] = 33.3  # Equal if all zeros
         
-        # Decision factors (simple heuristic based on Q-value magnitude)
-        best_q = top_3[0]['q_value'] if top_3 else 0
-        factors = []
-        if best_q > 500:
-            factors.append({"factor": "Short distance", "weight": 60})
-            factors.append({"factor": "Low cost", "weight": 40})
-        elif best_q > 200:
-            factors.append({"factor": "Moderate distance", "weight": 50})
-            factors.append({"factor": "Disaster avoidance", "weight": 30})
-            factors.append({"factor": "Cost efficiency", "weight": 20})
-        else:
-            factors.append({"factor": "Exploration", "weight": 70})
-            factors.append({"factor": "Unknown route", "weight": 30})
-        
+        # V5.9: Decision factors from the data - root Q gap, Q vs. closeness, whole-table entropy, epsilon
+        analytics = q_analytics_of(sim, snapshot).get(agent_name)
+        factors = decision_factors(target_agent.root_q, snapshot.matrix[start_city], target_agent.epsilon, analytics)
+
         return jsonify({
             "agent": agent_name,
             "status": "trained",
             "current_epsilon": round(target_agent.epsilon, 4),
             "top_routes": top_3,
             "decision_factors": factors,
-            "total_states_explored": len(target_agent.q_table)
+            "total_states_explored": target_agent.state_count,
+            "analytics": analytics,
+            "snapshot_version": snapshot.version
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# V5.9: Precomputed vulnerability index (background, rebuilt per disruption version)
+def vulnerability_near(index, affected):
+    """Indexed criticality of the roads and cities a disaster would touch."""
+    affected = set(affected)
+    roads = [(edge, entry) for edge, entry in index.edges.items() if edge[0] in affected or edge[1] in affected]
+    return {
+        "matrix_version": index.matrix_version,
+        "roads_on_best_tours": len(roads),
+        "max_closure_increase": round(max((e['max_increase'] for _, e in roads), default=0.0), 1),
+        "city_detour_cost": round(float(sum(index.cities[c] for c in affected)), 1)
+    }
+
+
+@app.route('/api/vulnerability', methods=['GET'])
+def get_vulnerability():
+    """
+    Most critical roads (closure cost on best / nearest-neighbour tours) and cities
+    (transit detour when unreachable). Served from the background index; ?top=N.
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    if is_large_map(snapshot.cities):
+        return jsonify({"status": "unavailable",
+                        "message": f"Vulnerability index is limited to maps of {LARGE_MAP_CITIES} cities"}), 409
+    index = sim.vulnerability.latest
+    sim.vulnerability.refresh_if_stale(snapshot)
+    if index is None:
+        return jsonify({"status": "computing", "matrix_version": snapshot.matrix_version}), 202
+
+    top = max(1, min(500, request.args.get('top', 20, type=int)))
+    names = {pid: info['name'] for pid, info in snapshot.cities.items()}
+    edges = sorted(index.edges.items(), key=lambda item: -item[1]['max_increase'])[:top]
+    cities = np.argsort(-index.cities)[:top]
+
+    return jsonify({
+        "status": "stale" if index.disruption_version != snapshot.disruption_version else "ready",
+        "matrix_version": index.matrix_version,
+        "current_matrix_version": snapshot.matrix_version,
+        "disruption_version": index.disruption_version,
+        "built_at": index.built_at,
+        "compute_ms": round(index.compute_ms, 1),
+        "recomputed": index.recomputed,
+        "reused": index.reused,
+        "roads": [{
+            "from": names[u], "to": names[v], "ids": [u, v],
+            "max_increase": round(entry['max_increase'], 1),
+            "total_increase": round(entry['total_increase'], 1),
+            "tours": entry['tours']
+        } for (u, v), entry in edges],
+        "cities": [{"city": names[int(c)], "id": int(c), "detour_cost": round(float(index.cities[c]), 1)}
+                   for c in cities]
+    })
+
+
+# V5.9: What-if previews re-route against a scratch matrix (cached per params + matrix version)
+scenario_engine = ScenarioEngine()
+
+
 @app.route('/api/disaster_impact', methods=['POST'])
 def calculate_disaster_impact():
     """
     P0.2: Disaster Impact Calculator - What-If Scenario Feature
     Simulates disaster without mutating state (preview mode)
+    V5.9: Every agent is actually re-routed on a scratch copy of the matrix;
+    reports real detour km and cost change (fleet economics).
     """
+    sim = get_simulation()
     try:
         data = request.json
         lat = float(data.get('lat', 0))
@@ -1023,54 +2072,46 @@ def calculate_disaster_impact():
         # Validate inputs
         if severity not in SEVERITY_LEVELS:
             return jsonify({"error": "Invalid severity level"}), 400
-        
-        # Calculate affected cities
-        affected_cities = []
-        for city_id, city_data in cities_data.items():
-            dist = haversine_distance(lat, lon, city_data['lat'], city_data['lon'])
-            if dist <= radius:
-                affected_cities.append({
-                    "id": city_id,
-                    "name": city_data['name'],
-                    "distance_from_disaster": round(dist, 1)
-                })
-        
-        # Simulate impact on current routes (read-only)
+
+        # V5.9: Read the latest published snapshot (no training lock, no torn routes)
+        snapshot = sim.snapshots.latest
         sev_info = SEVERITY_LEVELS[severity]
         multiplier = sev_info['multiplier']
-        
-        # Calculate cost increase for each agent's current route
-        route_impacts = []
-        total_affected_routes = 0
 
-        # agents is already a dictionary
-        for agent_name, agent in agents.items():
-            dist, route = agent.get_best_route_distance()
-            
-            # Check if route passes through affected zone
-            is_affected = False
-            for city_id in route:
-                if any(city_id == ac['id'] for ac in affected_cities):
-                    is_affected = True
-                    break
-            
-            if is_affected:
-                total_affected_routes += 1
-                original_cost = dist * 8000  # Base cost estimate
-                impacted_cost = dist * 8000 * multiplier
-                cost_increase = impacted_cost - original_cost
-                
-                route_impacts.append({
-                    "agent": agent_name,
-                    "original_distance": round(dist, 1),
-                    "cost_increase": round(cost_increase, 0),
-                    "cost_increase_pct": round(((multiplier - 1) * 100), 1),
-                    "affected_cities": [ac['name'] for ac in affected_cities if ac['id'] in route]
-                })
+        result = scenario_engine.preview(snapshot, lat, lon, radius, severity, multiplier, scope=sim.sim_id)
+        affected_names = [snapshot.cities[c]['name'] for c in result.affected]
+
+        # Cost before / after with each agent's own fleet configuration
+        configs = [fleet_config.get(impact.agent, DEFAULT_CONFIG) for impact in result.impacts]
+        before = fleet_economics.evaluate([impact.baseline_distance for impact in result.impacts], configs)
+        after = fleet_economics.evaluate([impact.rerouted_distance for impact in result.impacts], configs)
+
+        route_impacts = []
+        for k, impact in enumerate(result.impacts):
+            # Only routes the disaster actually makes longer
+            if impact.impacted_distance <= impact.distance + 0.01:
+                continue
+            cost_increase = float(after.cost[k] - before.cost[k])
+            route_impacts.append({
+                "agent": impact.agent,
+                "original_distance": round(impact.distance, 1),
+                "impacted_distance": round(impact.impacted_distance, 1),
+                "baseline_distance": round(impact.baseline_distance, 1),
+                "rerouted_distance": round(impact.rerouted_distance, 1),
+                "detour_km": round(impact.rerouted_real_distance - impact.baseline_distance, 1),
+                "penalized_legs": impact.penalized_legs,
+                "rerouted_path": [snapshot.cities[c]['name'] for c in impact.rerouted_route],
+                "cost_increase": round(cost_increase, 0),
+                "cost_increase_pct": round(cost_increase / float(before.cost[k]) * 100, 1) if before.cost[k] else 0.0,
+                "affected_cities": [snapshot.cities[c]['name'] for c in result.affected if c in impact.route]
+            })
+        total_affected_routes = len(route_impacts)
         
         # Find alternate routes (simplified - just show count)
-        alternate_options = len(cities_data) - len(affected_cities)
+        alternate_options = len(snapshot.cities) - len(result.affected)
         
+        index = sim.vulnerability.latest
+
         return jsonify({
             "disaster_preview": {
                 "severity": severity,
@@ -1081,12 +2122,15 @@ def calculate_disaster_impact():
                 "location": {"lat": lat, "lon": lon}
             },
             "impact_summary": {
-                "affected_cities_count": len(affected_cities),
-                "affected_cities": [ac['name'] for ac in affected_cities],
-                "routes_affected": f"{total_affected_routes}/{len(agents)}",
-                "alternate_routes_available": alternate_options
+                "affected_cities_count": len(result.affected),
+                "affected_cities": affected_names,
+                "routes_affected": f"{total_affected_routes}/{len(snapshot.agents)}",
+                "alternate_routes_available": alternate_options,
+                "matrix_version": snapshot.matrix_version,
+                "compute_ms": round(result.elapsed_ms, 1)
             },
             "agent_impacts": route_impacts,
+            "vulnerability": vulnerability_near(index, result.affected) if index is not None else None,
             "recommendation": "High impact - consider alternate routing" if total_affected_routes >= 3 else "Moderate impact - monitor situation"
         })
         
@@ -1094,45 +2138,463 @@ def calculate_disaster_impact():
         return jsonify({"error": str(e)}), 500
 
 
+# V5.9: Batch stress testing - many candidate disasters / closures per call
+SWEEP_MAX_CANDIDATES = 2000
+sweep_runner = SweepRunner()
+
+
+def parse_sweep_candidates(payload, cities, routes):
+    """
+    Build sweep candidates from explicit disasters, a lat/lon grid and/or road closures.
+
+    Returns:
+        list: Candidate list
+    Raises:
+        ValueError: On invalid fields or too many candidates
+    """
+    def severity_multiplier(level):
+        level = int(level)
+        if level not in SEVERITY_LEVELS:
+            raise ValueError(f"Invalid severity level {level}")
+        return level, SEVERITY_LEVELS[level]['multiplier']
+
+    candidates = []
+    for d in payload.get('disasters', []):
+        level, multiplier = severity_multiplier(d.get('severity', 2))
+        candidates.append(disaster_candidate(d['lat'], d['lon'], d.get('radius', 50), level, multiplier))
+
+    grid = payload.get('grid')
+    if grid:
+        lats = np.linspace(*[float(x) for x in grid['lat'][:2]], int(grid['lat'][2]))
+        lons = np.linspace(*[float(x) for x in grid['lon'][:2]], int(grid['lon'][2]))
+        radii = [float(r) for r in grid.get('radius', [50])]
+        levels = [severity_multiplier(level) for level in grid.get('severity', [2])]
+        if len(lats) * len(lons) * len(radii) * len(levels) > SWEEP_MAX_CANDIDATES:
+            raise ValueError(f"Too many candidates (max {SWEEP_MAX_CANDIDATES})")
+        for lat in lats:
+            for lon in lons:
+                for radius in radii:
+                    for level, multiplier in levels:
+                        candidates.append(disaster_candidate(lat, lon, radius, level, multiplier))
+
+    edges = payload.get('edges', [])
+    if edges == 'route_edges':
+        # Every road some agent currently drives (undirected, deduplicated)
+        edges = sorted({tuple(sorted((u, v))) for r in routes for u, v in zip(r[:-1], r[1:]) if u != v})
+    name_to_id = {info['name']: pid for pid, info in cities.items()}
+    for u, v in edges:
+        u, v = (name_to_id[x] if isinstance(x, str) else int(x) for x in (u, v))
+        if u == v or u not in cities or v not in cities:
+            raise ValueError(f"Invalid road {u}-{v}")
+        candidates.append(edge_candidate(u, v))
+
+    if not candidates:
+        raise ValueError("Provide disasters, grid or edges")
+    if len(candidates) > SWEEP_MAX_CANDIDATES:
+        raise ValueError(f"Too many candidates (max {SWEEP_MAX_CANDIDATES})")
+    return candidates
+
+
+@app.route('/api/scenario_sweep', methods=['POST'])
+@limiter.limit("10 per minute")
+def scenario_sweep():
+    """
+    Rank candidate disasters / road closures by the extra distance they force on the fleet.
+
+    Body: {"disasters": [{"lat", "lon", "radius", "severity"}],
+           "grid": {"lat": [min, max, steps], "lon": [min, max, steps], "radius": [...], "severity": [...]},
+           "edges": [[from, to], ...] | "route_edges", "top": 20}
+    Nothing is applied to the live simulation.
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    payload = request.get_json(silent=True) or {}
+    routes = [list(summary.route) for summary in snapshot.agents.values()]
+    try:
+        candidates = parse_sweep_candidates(payload, snapshot.cities, routes)
+        top = max(1, min(200, int(payload.get('top', 20))))
+    except (TypeError, ValueError, KeyError, IndexError) as e:
+        return jsonify({"error": f"Invalid sweep request: {e}"}), 400
+
+    started = time.time()
+    ranking = sweep_runner.run(snapshot.matrix, snapshot.cities, routes, candidates)
+
+    report = []
+    for result in ranking[:top]:
+        entry = dict(result)
+        entry['affected_cities'] = [snapshot.cities[c]['name'] for c in result['affected_cities']]
+        if result['kind'] == 'edge':
+            entry['road'] = [snapshot.cities[c]['name'] for c in result['params']]
+        for field in ('total_increase', 'worst_increase', 'real_detour_km'):
+            entry[field] = round(result[field], 1)
+        report.append(entry)
+
+    return jsonify({
+        "candidates": len(candidates),
+        "distinct_routes": len({tuple(r) for r in routes}),
+        "workers": sweep_runner.workers,
+        "matrix_version": snapshot.matrix_version,
+        "elapsed_ms": round((time.time() - started) * 1000, 1),
+        "ranking": report
+    })
+
+
+# V5.9: Fleet dispatch (capacitated multi-depot VRP) on the current matrix
+VRP_DEFAULT_DEPOTS = [0, 19, 10]  # Tg. Priok, Tg. Perak, Tg. Emas
+VRP_MAX_ORDERS = 1000
+VRP_MAX_TIME_LIMIT = 5.0
+
+
+def parse_vrp_request(payload, num_cities):
+    """
+    Validate a /api/vrp body into solver inputs.
+
+    Returns:
+        tuple: (depots, orders, options) where orders are (city, demand, window) tuples
+    Raises:
+        ValueError: On any invalid field
+    """
+    def city_index(value):
+        idx = int(value)
+        if idx < 0 or idx >= num_cities:
+            raise ValueError(f"Unknown city index {value}")
+        return idx
+
+    depots = [city_index(d) for d in payload.get('depots', VRP_DEFAULT_DEPOTS)]
+    if not depots or len(set(depots)) != len(depots):
+        raise ValueError("depots must be a non-empty list of distinct cities")
+
+    raw_orders = payload.get('orders')
+    if raw_orders is None:
+        raw_orders = [{'city': c} for c in range(num_cities) if c not in depots]
+    if not isinstance(raw_orders, list) or len(raw_orders) > VRP_MAX_ORDERS:
+        raise ValueError(f"orders must be a list of at most {VRP_MAX_ORDERS} entries")
+
+    orders = []
+    for order in raw_orders:
+        demand = float(order.get('demand', 1))
+        if demand < 0:
+            raise ValueError("demand must be non-negative")
+        window = order.get('window')
+        if window is not None:
+            earliest, latest = (float(x) for x in window)
+            if earliest > latest:
+                raise ValueError("window must be [earliest, latest]")
+            window = (earliest, latest)
+        orders.append((city_index(order['city']), demand, window))
+
+    options = {
+        'capacity': float(payload.get('capacity', 10)),
+        'speed_kmh': float(payload.get('speed_kmh', 60)),
+        'service_time': float(payload.get('service_time', 0.5)),
+        'time_limit': max(0.0, min(VRP_MAX_TIME_LIMIT, float(payload.get('time_limit', 1.0)))),
+        'vehicle': payload.get('vehicle', DEFAULT_CONFIG['v']),
+        'cargo': payload.get('cargo', DEFAULT_CONFIG['c'])
+    }
+    if options['vehicle'] not in VEHICLES or options['cargo'] not in CARGO:
+        raise ValueError("Unknown vehicle or cargo")
+    return depots, orders, options
+
+
+@app.route('/api/vrp', methods=['POST'])
+@limiter.limit("30 per minute")
+def solve_fleet_vrp():
+    """
+    Dispatch orders from several depots with capacity and optional time windows.
+
+    Body: {"depots": [0, 19, 10], "orders": [{"city": 3, "demand": 2, "window": [0, 8]}, ...],
+           "capacity": 10, "vehicle": "diesel", "cargo": "general", "speed_kmh": 60,
+           "service_time": 0.5, "time_limit": 1.0}
+    Several orders may target the same city. Distances come from the latest snapshot
+    (disaster penalties included).
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    try:
+        depots, orders, options = parse_vrp_request(request.get_json(silent=True) or {}, len(snapshot.cities))
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        return jsonify({"error": f"Invalid VRP request: {e}"}), 400
+
+    # Nodes: depots first, then one node per order (orders may share a city)
+    node_city = depots + [city for city, _, _ in orders]
+    matrix = np.asarray(snapshot.matrix, dtype=np.float64)[np.ix_(node_city, node_city)]
+    demands = [0.0] * len(depots) + [demand for _, demand, _ in orders]
+    windows = {len(depots) + k: window for k, (_, _, window) in enumerate(orders) if window is not None}
+
+    started = time.time()
+    try:
+        problem = VRPProblem(matrix, range(len(depots)), demands, options['capacity'],
+                             time_windows=windows, service_time=options['service_time'],
+                             speed_kmh=options['speed_kmh'])
+    except ValueError as e:
+        return jsonify({"error": f"Invalid VRP request: {e}"}), 400
+    solution = solve_vrp(problem, time_limit=options['time_limit'])
+    solve_ms = round((time.time() - started) * 1000, 1)
+
+    conf = {'v': options['vehicle'], 'c': options['cargo']}
+    economics = fleet_economics.evaluate([r.distance for r in solution.routes], [conf] * len(solution.routes))
+
+    def city_name(node):
+        return snapshot.cities[node_city[node]]['name']
+
+    vehicles = []
+    for k, route in enumerate(solution.routes):
+        vehicles.append({
+            "vehicle": k + 1,
+            "depot": city_name(route.depot),
+            "stops": [city_name(u) for u in route.stops],
+            "orders": [u - len(depots) for u in route.stops],
+            "load": route.load,
+            "distance": round(route.distance, 2),
+            "arrivals": [round(t, 2) for t in route.arrivals],
+            "cost": round(float(economics.cost[k]), 0),
+            "profit": round(float(economics.profit[k]), 0),
+            "co2": round(float(economics.co2[k]), 1)
+        })
+
+    return jsonify({
+        "vehicles": vehicles,
+        "vehicle_count": len(vehicles),
+        "total_distance": round(solution.distance, 2),
+        "total_cost": round(float(economics.cost.sum()), 0),
+        "total_profit": round(float(economics.profit.sum()), 0),
+        "total_co2": round(float(economics.co2.sum()), 1),
+        "unassigned_orders": [u - len(depots) for u in solution.unassigned],
+        "improving_moves": solution.iterations,
+        "solve_ms": solve_ms,
+        "vehicle_type": VEHICLES[options['vehicle']]['label'],
+        "cargo_type": CARGO[options['cargo']]['label']
+    })
+
+
+# V5.9: Fleet planning grid - every route x vehicle x cargo in one call
+FLEET_MATRIX_MAX_ROUTES = 5000
+
+
+@app.route('/api/fleet_matrix', methods=['GET', 'POST'])
+@limiter.limit("30 per minute")
+def get_fleet_matrix():
+    """
+    Cost, profit and CO2 of each route under every vehicle/cargo configuration.
+
+    GET uses the agents' current best routes. POST accepts
+    {"distances": [km, ...], "vehicles": [...], "cargo": [...]} (filters optional).
+    """
+    sim = get_simulation()
+    payload = request.get_json(silent=True) or {}
+
+    if 'distances' in payload:
+        distances = payload['distances']
+        if not isinstance(distances, list) or not distances:
+            return jsonify({"error": "distances must be a non-empty list"}), 400
+        if len(distances) > FLEET_MATRIX_MAX_ROUTES:
+            return jsonify({"error": f"Too many routes (max {FLEET_MATRIX_MAX_ROUTES})"}), 400
+        try:
+            distances = np.asarray(distances, dtype=np.float64)
+        except (TypeError, ValueError):
+            return jsonify({"error": "distances must be numbers"}), 400
+        if not np.all(np.isfinite(distances)) or np.any(distances < 0):
+            return jsonify({"error": "distances must be finite and non-negative"}), 400
+        labels = list(range(len(distances)))
+    else:
+        snapshot = sim.snapshots.latest
+        labels = list(snapshot.agents.keys())
+        distances = np.array([snapshot.agents[name].distance for name in labels], dtype=np.float64)
+
+    try:
+        grid = fleet_economics.grid(distances, vehicles=payload.get('vehicles'), cargo=payload.get('cargo'))
+    except (KeyError, TypeError) as e:
+        return jsonify({"error": f"Unknown vehicle or cargo: {e}"}), 400
+
+    # Best configuration per route by profit (flattened V x C argmax)
+    n_cargo = len(grid.cargo)
+    best = grid.profit.reshape(len(distances), -1).argmax(axis=1) if len(grid.vehicles) and n_cargo else []
+    return jsonify({
+        "routes": labels,
+        "distances": np.round(distances, 2).tolist(),
+        "vehicles": grid.vehicles,
+        "cargo": grid.cargo,
+        "cost": np.round(grid.cost, 0).tolist(),
+        "profit": np.round(grid.profit, 0).tolist(),
+        "co2": np.round(grid.co2, 1).tolist(),
+        "best": [{"vehicle": grid.vehicles[b // n_cargo], "cargo": grid.cargo[b % n_cargo]} for b in best]
+    })
+
+
+# V5.9: Bulk tour scoring for upstream planners (one gather + one economics pass per batch)
+EVALUATE_MAX_ROUTES = int(os.getenv('EVALUATE_MAX_ROUTES', '100000'))
+EVALUATE_STREAM_ROWS = 2000  # Larger JSON results are streamed column by column
+ROUTE_DTYPES = {'u1': '<u1', 'u2': '<u2', 'i4': '<i4'}
+ROUND_DIGITS = {'distance': 2, 'cost': 0, 'profit': 0, 'co2': 1}
+
+
+def parse_route_batch(num_cities):
+    """
+    Candidate tours from the request body.
+
+    JSON: {"routes": [[...], ...], "closed": bool, "config": {v, c} | "configs": [{v, c}, ...]}
+    Binary: application/x-npy (a 2-D integer .npy), or application/octet-stream with
+    ?length=<cities per route>&dtype=u1|u2|i4 (raw little-endian rows); config via ?v=&c=
+
+    Returns:
+        tuple: (route array, configs, closed)
+    Raises:
+        ValueError: On a malformed batch
+    """
+    content_type = request.mimetype
+    if content_type in ('application/x-npy', 'application/octet-stream'):
+        body = request.get_data()
+        if content_type == 'application/x-npy':
+            try:
+                routes = np.load(io.BytesIO(body), allow_pickle=False)
+            except (ValueError, EOFError, OSError) as e:
+                raise ValueError(f"Invalid .npy body: {e or 'empty'}")
+        else:
+            dtype = ROUTE_DTYPES.get(request.args.get('dtype', 'u2'))
+            length = int(request.args.get('length', 0))
+            if dtype is None or length < 2 or len(body) % (length * np.dtype(dtype).itemsize):
+                raise ValueError("Raw routes need ?length=<cities per route> (>= 2), a dtype of u1/u2/i4 and whole rows")
+            routes = np.frombuffer(body, dtype=dtype).reshape(-1, length)
+        closed = request.args.get('closed', 'false').lower() == 'true'
+        configs = {'v': request.args.get('v', DEFAULT_CONFIG['v']), 'c': request.args.get('c', DEFAULT_CONFIG['c'])}
+    else:
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object")
+        routes = payload.get('routes')
+        if not isinstance(routes, list) or not routes:
+            raise ValueError("routes must be a non-empty 2-D list")
+        closed = payload.get('closed', False)
+        if not isinstance(closed, bool):
+            raise ValueError("closed must be true or false")
+        configs = payload.get('configs', payload.get('config', DEFAULT_CONFIG))
+    routes = as_route_array(routes, num_cities, closed=closed)
+    if not len(routes) or len(routes) > EVALUATE_MAX_ROUTES:
+        raise ValueError(f"Between 1 and {EVALUATE_MAX_ROUTES} routes per request")
+    if isinstance(configs, list):
+        if len(configs) != len(routes) or not all(isinstance(conf, dict) for conf in configs):
+            raise ValueError("configs needs one {v, c} object per route")
+    elif not isinstance(configs, dict):
+        raise ValueError("config must be a {v, c} object")
+    # Unknown keys would silently be priced as the default truck / cargo
+    for conf in configs if isinstance(configs, list) else [configs]:
+        if conf.get('v', DEFAULT_CONFIG['v']) not in VEHICLES:
+            raise ValueError(f"Unknown vehicle {conf.get('v')!r} (one of {', '.join(VEHICLES)})")
+        if conf.get('c', DEFAULT_CONFIG['c']) not in CARGO:
+            raise ValueError(f"Unknown cargo {conf.get('c')!r} (one of {', '.join(CARGO)})")
+    return routes, configs, closed
+
+
+def stream_scores(scores, header):
+    """JSON of column arrays, emitted in chunks so a 100k-route answer never sits in memory twice."""
+    yield json.dumps(header)[:-1]
+    for field in SCORE_FIELDS:
+        values = getattr(scores, field)
+        if field in ROUND_DIGITS:
+            values = np.round(values, ROUND_DIGITS[field])
+        yield f', "{field}": ['
+        for lo in range(0, len(values), EVALUATE_STREAM_ROWS):
+            chunk = json.dumps(values[lo:lo + EVALUATE_STREAM_ROWS].tolist())[1:-1]
+            yield chunk if lo == 0 else ', ' + chunk
+        yield ']'
+    yield '}'
+
+
+@app.route('/api/evaluate_routes', methods=['POST'])
+@limiter.limit("30 per minute")
+def evaluate_routes():
+    """
+    Distance, completeness, blocked legs, cost, profit and CO2 of many candidate
+    tours on the current (disaster-adjusted) matrix. ?format=npy answers with a
+    structured .npy array instead of JSON.
+    """
+    sim = get_simulation()
+    snapshot = sim.snapshots.latest
+    try:
+        routes, configs, closed = parse_route_batch(len(snapshot.cities))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    scores = score_tours(snapshot.matrix, routes, fleet_economics, configs)
+
+    if request.args.get('format') == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, scores_to_records(scores))
+        return Response(buffer.getvalue(), mimetype='application/octet-stream', headers={
+            'X-Episode': str(snapshot.episode), 'X-Matrix-Version': str(snapshot.matrix_version)
+        })
+    header = {
+        "count": len(routes),
+        "episode": snapshot.episode,
+        "matrix_version": snapshot.matrix_version,
+        "closed": closed
+    }
+    if len(routes) > EVALUATE_STREAM_ROWS:
+        return Response(stream_with_context(stream_scores(scores, header)), mimetype='application/json')
+    for field in SCORE_FIELDS:
+        values = getattr(scores, field)
+        header[field] = (np.round(values, ROUND_DIGITS[field]) if field in ROUND_DIGITS else values).tolist()
+    return jsonify(header)
+
+
+# V5.9: Non-learning baselines reported next to the agents (?solvers=hierarchical)
+hierarchical_solver = HierarchicalSolver()
+solver_results = ResultCache(max_entries=32, ttl=600)
+
+
+def solve_hierarchical(sim, snapshot):
+    """
+    Cluster-first tour for a snapshot, solved in the background and cached per
+    simulation and matrix version (None while it is being computed).
+    """
+    key = ('hierarchical', sim.sim_id, snapshot.matrix_version, hierarchical_solver.cluster_size)
+    return solver_results.submit(
+        key, lambda: hierarchical_solver.solve(snapshot.cities, snapshot.matrix))
+
+
+COMPARISON_SOLVERS = {'hierarchical': ('Hierarchical', 'black', solve_hierarchical)}
+
+
 @app.route('/api/agent_comparison', methods=['GET'])
 def get_agent_comparison():
     """
     P0.3: Agent Comparison - Policy Comparison Feature
     Aggregates metrics for side-by-side agent analysis
     """
+    sim = get_simulation()
     try:
         comparison_data = []
-        
-        # agents is already a dictionary
-        for agent_name, agent in agents.items():
-            # Get current fleet config
-            conf = fleet_config.get(agent_name, {'v': 'diesel', 'c': 'general'})
+
+        # V5.9: Read the latest published snapshot (no training lock)
+        snapshot = sim.snapshots.latest
+        
+        # V5.9: Cost / profit / CO2 for the whole fleet in one vectorized pass
+        names = list(snapshot.agents.keys())
+        configs = [fleet_config.get(name, DEFAULT_CONFIG) for name in names]
+        # V5.9: "avg_*" are real means over each agent's last COMPARISON_WINDOW episodes when history
+        # exists (pre-fork workers and fresh agents fall back to the current best route)
+        history = getattr(sim, 'history', None)
+        averages = history.averages(COMPARISON_WINDOW) if history is not None else {}
+        distances = [averages[name]['distance'] if name in averages else snapshot.agents[name].distance for name in names]
+        economics = fleet_economics.evaluate(distances, configs)
+        analytics = q_analytics_of(sim, snapshot)
+
+        for k, agent_name in enumerate(names):
+            agent = snapshot.agents[agent_name]
+            conf = configs[k]
             vehicle = VEHICLES.get(conf['v'], VEHICLES['diesel'])
             cargo = CARGO.get(conf['c'], CARGO['general'])
             
             # Calculate metrics
-            dist, route = agent.get_best_route_distance()
-            
-            # Cost calculation
-            efficiency = vehicle.get('efficiency', 3.0)
-            fuel_type = vehicle.get('fuel', 'diesel')
-            fuel_price = PRICE_ELECTRIC if fuel_type == 'electric' else PRICE_DIESEL
-            
-            fuel_needed = dist / efficiency
-            fuel_cost = fuel_needed * fuel_price
-            labor_cost = dist * DRIVER_WAGE_KM
-            total_cost = (fuel_cost + labor_cost) * cargo['multiplier']
-            
-            # Revenue & Profit
-            revenue = cargo['baseRevenue']
-            profit = revenue - total_cost
+            dist = distances[k]
+            total_cost = averages[agent_name]['cost'] if agent_name in averages else float(economics.cost[k])
+            profit = averages[agent_name]['profit'] if agent_name in averages else float(economics.profit[k])
+            total_co2 = float(economics.co2[k])
             
-            # CO2 calculation
-            co2_per_km = vehicle.get('co2', 2.6)
-            total_co2 = dist * co2_per_km
-            
-            # Route diversity (unique states in Q-table)
-            unique_routes = len(agent.q_table)
+            # V5.9: Route diversity = effective number of roads actually driven while training
+            # (exp entropy of the visit counts), from the background analytics (None until the first build)
+            agent_analytics = analytics.get(agent_name)
+            unique_routes = agent_analytics['route_diversity'] if agent_analytics else None
+            entropy = agent_analytics['entropy']['mean'] if agent_analytics else None
             
             # Convergence (estimated from epsilon)
             convergence_pct = round((1.0 - agent.epsilon) * 100, 1)
@@ -1148,7 +2610,10 @@ def get_agent_comparison():
                     "avg_co2": round(total_co2, 1),
                     "avg_cost": round(total_cost, 0),
                     "route_diversity": unique_routes,
-                    "convergence": f"{convergence_pct}%"
+                    "action_entropy": entropy,
+                    "states_learned": agent.state_count,
+                    "convergence": f"{convergence_pct}%",
+                    "episodes_averaged": averages[agent_name]['episodes'] if agent_name in averages else 0
                 },
                 "ranking": {
                     "profit": 0,  # Will be calculated after sorting
@@ -1157,6 +2622,44 @@ def get_agent_comparison():
                 }
             })
         
+        # V5.9: Solver baselines ride along with the agents (same economics, same rankings);
+        # they are solved in the background and listed under pending_solvers until ready
+        requested = [name.strip() for name in request.args.get('solvers', '').split(',') if name.strip()]
+        unknown = [name for name in requested if name not in COMPARISON_SOLVERS]
+        if unknown:
+            return jsonify({"error": f"Unknown solvers: {', '.join(unknown)}"}), 400
+        pending = []
+        for solver in requested:
+            label, color, solve = COMPARISON_SOLVERS[solver]
+            result = solve(sim, snapshot)
+            if result is None:
+                pending.append(solver)
+                continue
+            conf = DEFAULT_CONFIG
+            economics = fleet_economics.evaluate([result.distance], [conf])
+            comparison_data.append({
+                "agent": label,
+                "color": color,
+                "solver": solver,
+                "vehicle": VEHICLES[conf['v']]['label'],
+                "cargo": CARGO[conf['c']]['label'],
+                "metrics": {
+                    "avg_profit": round(float(economics.profit[0]), 0),
+                    "avg_distance": round(result.distance, 1),
+                    "avg_co2": round(float(economics.co2[0]), 1),
+                    "avg_cost": round(float(economics.cost[0]), 0),
+                    "route_diversity": None,
+                    "action_entropy": None,
+                    "convergence": "n/a"
+                },
+                "solver_stats": {
+                    "clusters": result.clusters,
+                    "compute_ms": round(result.elapsed_ms, 1),
+                    "parallel": result.parallel
+                },
+                "ranking": {"profit": 0, "green": 0, "cost": 0}
+            })
+
         # Calculate rankings
         # Profit ranking (highest = best)
         profit_sorted = sorted(comparison_data, key=lambda x: x['metrics']['avg_profit'], reverse=True)
@@ -1185,7 +2688,9 @@ def get_agent_comparison():
                 "most_green": best_green['agent'],
                 "lowest_cost": best_cost['agent']
             },
-            "episode": total_episodes,
+            "pending_solvers": pending,
+            "episode": snapshot.episode,
+            "snapshot_version": snapshot.version,
             "timestamp": time.time()
         })
         
@@ -1198,7 +2703,7 @@ if __name__ == '__main__':
     print("🚀 JAVA LOGISTICS TWIN V5.4 - PRODUCTION READY")
     print("="*60)
     print(f"📍 Industrial Nodes: {len(cities_data)}")
-    print(f"🤖 Active Agents: {len(agents)}")
+    print(f"🤖 Active Agents: {len(AGENT_ROSTER)}")
     print(f"🧠 Save/Load: ENABLED (with validation)")
     print(f"🌦️ Dynamic Weather: Moving Storms + Receding Floods")
     print(f"🔍 NEW: Decision Explanation + Impact Preview + Agent Comparison")
@@ -1214,4 +2719,4 @@ if __name__ == '__main__':
     else:
         print("✅ Running in PRODUCTION mode (debug disabled)")
     
-    app.run(debug=debug_mode, host=host, port=port)
+    create_app().run(debug=debug_mode, host=host, port=port)
@@ -0,0 +1,359 @@
+"""
+ASGI Serving Mode (V5.9)
+Async front door for the Flask app, e.g.:
+
+    uvicorn --factory app.api.asgi:create_asgi_app --host 0.0.0.0 --port 5000
+
+- /api/route is proxied natively on a pooled async HTTP client (httpx) with a
+  concurrency limit, so slow OSRM calls never tie up a worker thread.
+- OSRM matrix fetches made by the Flask app (new maps) are routed through the
+  same async pool.
+- Every other route is the unchanged Flask app, run on a thread pool; CPU-bound
+  training (/api/train) gets its own executor so it cannot starve reads.
+"""
+
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.core.geometry_cache import coords_key, shrink_route_payload
+
+OSRM_URL = os.getenv('OSRM_URL', 'https://router.project-osrm.org')
+OSRM_MAX_CONNECTIONS = int(os.getenv('OSRM_MAX_CONNECTIONS', '20'))
+OSRM_MAX_CONCURRENCY = int(os.getenv('OSRM_MAX_CONCURRENCY', '10'))
+REQUEST_WORKERS = int(os.getenv('ASGI_REQUEST_WORKERS', '32'))
+TRAINING_WORKERS = int(os.getenv('ASGI_TRAINING_WORKERS', '4'))
+
+TRAINING_PATHS = ('/api/train',)
+
+APP_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'app.py'))
+
+
+def load_flask_module(module_name='twin_app'):
+    """
+    Import app.py by path (the app/ package shadows it for a plain `import app`).
+
+    Returns:
+        module: The loaded app.py module (cached in sys.modules)
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, APP_PY)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class AsyncOSRMClient:
+    """Pooled async OSRM client with a hard cap on in-flight upstream calls."""
+
+    def __init__(self, base_url=OSRM_URL, max_connections=OSRM_MAX_CONNECTIONS,
+                 max_concurrency=OSRM_MAX_CONCURRENCY, timeout=5.0, transport=None):
+        import httpx  # Optional dependency: only needed in ASGI mode
+
+        self._httpx = httpx
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def route(self, coords):
+        """
+        Fetch full GeoJSON geometry for a "lon,lat;lon,lat" coordinate string.
+
+        Returns:
+            tuple: (http_status, json_payload)
+        """
+        url = f"/route/v1/driving/{coords}"
+        try:
+            async with self._semaphore:
+                resp = await self._client.get(url, params={'overview': 'full', 'geometries': 'geojson'})
+        except self._httpx.TimeoutException:
+            return 504, {"error": "Route service timeout"}
+        except self._httpx.HTTPError as e:
+            return 502, {"error": str(e)}
+
+        if resp.status_code == 200:
+            return 200, resp.json()
+        return resp.status_code, {"error": "OSRM service error"}
+
+    async def table(self, cities, timeout=15.0):
+        """
+        Fetch the OSRM distance matrix (km) for a cities dict.
+
+        Returns:
+            numpy.ndarray or None: float32 matrix, None if OSRM failed
+        """
+        ids = sorted(cities.keys())
+        coords_str = ";".join(f"{cities[i]['lon']},{cities[i]['lat']}" for i in ids)
+        try:
+            async with self._semaphore:
+                resp = await self._client.get(f"/table/v1/driving/{coords_str}",
+                                              params={'annotations': 'distance'}, timeout=timeout)
+            data = resp.json() if resp.status_code == 200 else {}
+        except (self._httpx.HTTPError, ValueError) as e:
+            print(f"OSRM Failed ({str(e)}). Using Haversine Fallback.")
+            return None
+
+        if data.get('code') != 'Ok':
+            print(f"OSRM Error {resp.status_code} / {data.get('code')}. Fallback to Haversine.")
+            return None
+        # Konversi Meter ke KM
+        distances = np.array(data['distances'], dtype=np.float32) / 1000.0
+        if distances.shape != (len(ids), len(ids)):
+            print("OSRM Shape Mismatch. Fallback.")
+            return None
+        return distances
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class AsgiTwinApp:
+    """ASGI callable wrapping the Flask WSGI app plus the native async routes."""
+
+    def __init__(self, flask_module, osrm_transport=None,
+                 request_workers=REQUEST_WORKERS, training_workers=TRAINING_WORKERS):
+        self.flask_module = flask_module
+        self.wsgi_app = flask_module.app
+        self._osrm_transport = osrm_transport
+        self.osrm = None
+        self.loop = None
+        self.request_executor = ThreadPoolExecutor(request_workers, thread_name_prefix='twin-http')
+        self.training_executor = ThreadPoolExecutor(training_workers, thread_name_prefix='twin-train')
+        self._route_limiter = _RouteRateLimiter("100/minute")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        await self._ensure_started()
+        if scope['path'] == '/api/route' and scope['method'] == 'POST':
+            return await self._osrm_route(scope, receive, send)
+
+        executor = self.training_executor if scope['path'] in TRAINING_PATHS else self.request_executor
+        return await self._call_wsgi(scope, receive, send, executor)
+
+    # --- Lifecycle ---
+
+    async def _ensure_started(self):
+        if self.osrm is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.osrm = AsyncOSRMClient(transport=self._osrm_transport)
+        # Flask-side matrix fetches (update_config, restored maps) use the async pool too
+        self.flask_module.matrix_fetcher = self._fetch_matrix_blocking
+
+    async def startup(self):
+        await self._ensure_started()
+        # Warm the default map in the background (its matrix fetch goes through the async
+        # pool); startup completes at once and /health/ready turns 200 when it is done
+        self.flask_module.create_app()
+
+    async def shutdown(self):
+        self.flask_module.matrix_fetcher = None
+        if self.osrm is not None:
+            await self.osrm.aclose()
+            self.osrm = None
+        self.request_executor.shutdown(wait=False)
+        self.training_executor.shutdown(wait=False)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _fetch_matrix_blocking(self, cities):
+        """Called from executor threads: run the async fetch on the event loop and wait."""
+        future = asyncio.run_coroutine_threadsafe(self.osrm.table(cities), self.loop)
+        return future.result()
+
+    # --- Native async routes ---
+
+    async def _osrm_route(self, scope, receive, send):
+        client_ip = (scope.get('client') or ('unknown', 0))[0]
+        if not self._route_limiter.hit(client_ip):
+            return await _send_json(send, 429, {"error": "Rate limit exceeded (100 per minute)"})
+
+        try:
+            payload = json.loads((await _read_body(receive)) or b'{}')
+            coords = payload.get('coords')
+        except (ValueError, AttributeError):
+            return await _send_json(send, 400, {"error": "Invalid JSON body"})
+        if not coords:
+            return await _send_json(send, 400, {"error": "Missing coordinates"})
+        try:
+            key = coords_key(coords)
+            simplify, precision = self.flask_module.parse_route_options(payload)
+        except (TypeError, ValueError) as e:
+            return await _send_json(send, 400, {"error": str(e)})
+
+        # Same cache as the Flask handler: hits skip OSRM, concurrent misses share one call
+        status, body = await self.flask_module.route_cache.aget_or_fetch(
+            key, lambda: self.osrm.route(coords), should_cache=lambda result: result[0] == 200
+        )
+        if status == 200:
+            body = shrink_route_payload(body, simplify=simplify, precision=precision)
+        return await _send_json(send, status, body)
+
+    # --- WSGI bridge (thread pool, not a single shared thread) ---
+
+    async def _call_wsgi(self, scope, receive, send, executor):
+        body = await _read_body(receive)
+        environ = _build_environ(scope, body)
+        queue = asyncio.Queue()
+        loop = self.loop
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+            try:
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    started = False
+                    for chunk in result:
+                        if not started:
+                            emit(('start', response))
+                            started = True
+                        if chunk:
+                            emit(('body', chunk))
+                    if not started:
+                        emit(('start', response))
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+            except Exception as e:
+                emit(('error', e))
+            emit(('end', None))
+
+        executor_future = loop.run_in_executor(executor, run)
+        started = False
+        while True:
+            kind, item = await queue.get()
+            if kind == 'start':
+                started = True
+                await send({'type': 'http.response.start', 'status': item['status'], 'headers': item['headers']})
+            elif kind == 'body':
+                await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+            elif kind == 'error':
+                if not started:
+                    await _send_json(send, 500, {"error": str(item)})
+                    started = None  # Response already complete
+            elif kind == 'end':
+                if started:
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                break
+        await executor_future
+
+
+class _RouteRateLimiter:
+    """Per-client limit for the native /api/route (mirrors the Flask-Limiter rule)."""
+
+    def __init__(self, rule):
+        from limits import parse
+        from limits.storage import MemoryStorage
+        from limits.strategies import MovingWindowRateLimiter
+
+        self._item = parse(rule)
+        self._limiter = MovingWindowRateLimiter(MemoryStorage())
+
+    def hit(self, key):
+        return self._limiter.hit(self._item, 'api-route', key)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode('latin-1'))]})
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+def _build_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client_host, client_port = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client_host,
+        'REMOTE_PORT': str(client_port),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            continue  # Body is fully buffered; use its real length
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(flask_module=None, osrm_transport=None):
+    """
+    ASGI app factory (uvicorn --factory app.api.asgi:create_asgi_app).
+
+    Args:
+        flask_module: Loaded app.py module (default: imported by path)
+        osrm_transport: Optional httpx transport (tests / custom routing backends)
+    """
+    if flask_module is None:
+        flask_module = load_flask_module()
+    return AsgiTwinApp(flask_module, osrm_transport=osrm_transport)
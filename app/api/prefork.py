@@ -0,0 +1,231 @@
+"""
+Pre-fork Serving Mode (V5.9)
+One trainer process owns every simulation; any number of gunicorn workers serve HTTP:
+
+    gunicorn -c gunicorn.conf.py
+
+- The trainer (python -m app.api.prefork) loads app.py, mirrors every published
+  snapshot into SHARED_STATE_DIR (snapshot JSON + memory-mapped matrix, see
+  app/core/shared_state.py) and executes forwarded requests one at a time from
+  its command queue - the single writer, exactly like the single-process app.
+- Workers answer snapshot-only endpoints (comparison, explain, polylines, VRP,
+  sweeps, fleet matrix, OSRM proxy, compiled-policy routes, re-planning, bulk route scoring) themselves from the shared files. Everything
+  that mutates state or needs live agents (train, disasters, sabotage, config,
+  brains, ...) is forwarded over a local Unix socket and replayed through the
+  trainer's own Flask app, so handlers are identical in every mode.
+"""
+
+import os
+import queue
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+from flask import Response, jsonify, request
+
+from app.api.asgi import load_flask_module
+from app.core.registry import InvalidSimulationId, validate_sim_id
+from app.core.shared_state import SharedSimulationView, SharedStateReader, SharedStateWriter
+
+TRAINER_SOCKET = os.getenv('TRAINER_SOCKET', '/tmp/twin-trainer.sock')
+SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR', '/dev/shm/twin-state' if os.path.isdir('/dev/shm') else '/tmp/twin-state')
+TRAINER_TIMEOUT = float(os.getenv('TRAINER_TIMEOUT', '60'))
+
+# Served by every worker (static / stateless or snapshot-only); the rest goes to the trainer
+WORKER_PATHS = frozenset([
+    '/', '/health', '/health/ready', '/get_cities',
+    '/api/route', '/api/route/stats', '/api/route_polylines',
+    '/api/agent_comparison', '/api/fleet_matrix', '/api/vrp', '/api/scenario_sweep', '/api/policy/route',
+    '/api/replan', '/api/evaluate_routes'
+])
+WORKER_PREFIXES = ('/static/', '/api/explain/')
+# Snapshot-only endpoints need the trainer to have published that simulation first
+STATELESS_PATHS = frozenset(['/', '/health', '/health/ready', '/api/route', '/api/route/stats'])
+
+FORWARDED_HEADERS = ('Content-Type', 'Accept', 'Accept-Encoding', 'X-Simulation-ID')
+
+
+class TrainerUnavailable(RuntimeError):
+    pass
+
+
+def trainer_authkey():
+    """Shared secret for the command socket (gunicorn.conf.py generates one per deployment)."""
+    return os.getenv('TRAINER_AUTHKEY', 'logistics-twin-local').encode('utf-8')
+
+
+def is_worker_path(path):
+    return path in WORKER_PATHS or path.startswith(WORKER_PREFIXES)
+
+
+def request_sim_id():
+    return request.args.get('sim') or request.headers.get('X-Simulation-ID') or 'default'
+
+
+class TrainerServer:
+    """Accepts worker connections; one command thread executes forwarded requests in order."""
+
+    def __init__(self, flask_app, address=TRAINER_SOCKET, authkey=None):
+        self.flask_app = flask_app
+        self.address = address
+        if os.path.exists(address):
+            os.remove(address)  # Stale socket from a previous trainer
+        self.listener = Listener(address, family='AF_UNIX', authkey=authkey or trainer_authkey())
+        self.commands = queue.Queue()
+        self._closed = threading.Event()
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if self._closed.is_set():
+                    return
+                continue  # Failed handshake (wrong authkey) - keep serving
+            threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+
+    def _read_loop(self, conn):
+        """One reader per worker connection; a connection has at most one request in flight."""
+        try:
+            while True:
+                self.commands.put((conn, conn.recv()))
+        except (EOFError, OSError):
+            conn.close()
+
+    def execute(self, command):
+        """Replay a forwarded request through the Flask app -> (status, headers, body)."""
+        with self.flask_app.test_client() as client:
+            response = client.open(
+                command['path'], method=command['method'], query_string=command['query'],
+                headers=command['headers'], data=command['body'],
+                environ_overrides={'REMOTE_ADDR': command['remote_addr']}
+            )
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'content-length']
+            return response.status_code, headers, response.get_data()
+
+    def serve_forever(self):
+        threading.Thread(target=self._accept_loop, name='trainer-accept', daemon=True).start()
+        print(f">>> Trainer listening on {self.address}")
+        while not self._closed.is_set():
+            try:
+                conn, command = self.commands.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                reply = self.execute(command)
+            except Exception as e:
+                reply = (500, [('Content-Type', 'application/json')], f'{{"error": "{type(e).__name__}"}}'.encode())
+            try:
+                conn.send(reply)
+            except (OSError, EOFError):
+                pass  # Worker went away; its request is done anyway
+
+    def close(self):
+        self._closed.set()
+        self.listener.close()
+
+
+class TrainerClient:
+    """Worker side of the command socket: one persistent connection per worker thread."""
+
+    def __init__(self, address=TRAINER_SOCKET, authkey=None, timeout=TRAINER_TIMEOUT):
+        self.address = address
+        self.authkey = authkey or trainer_authkey()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, command):
+        """
+        Send one command and wait for its reply.
+
+        Raises:
+            TrainerUnavailable: If the trainer cannot be reached or does not answer in time
+        """
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(command)
+                if not conn.poll(self.timeout):
+                    self._drop()  # A late reply must not be read as the next request's answer
+                    raise TrainerUnavailable("Trainer did not answer in time")
+                return conn.recv()
+            except (OSError, EOFError) as e:
+                self._drop()
+                if attempt:
+                    raise TrainerUnavailable(f"Trainer unreachable: {e}")
+
+
+def install_worker(flask_module, client, reader):
+    """Turn a loaded app.py module into an HTTP worker (read locally, forward the rest)."""
+
+    def view(sim_id):
+        return SharedSimulationView(sim_id, reader) if reader.exists(sim_id) else None
+
+    flask_module.simulation_view = view
+    app = flask_module.app
+
+    def forward_to_trainer():
+        path = request.path
+        if is_worker_path(path):
+            if path in STATELESS_PATHS or path.startswith('/static/'):
+                return None
+            try:
+                if reader.exists(validate_sim_id(request_sim_id())):
+                    return None
+            except InvalidSimulationId:
+                return None  # The local handler answers 400
+        command = {
+            'method': request.method,
+            'path': path,
+            'query': request.query_string.decode('latin-1'),
+            'headers': {k: request.headers[k] for k in FORWARDED_HEADERS if k in request.headers},
+            'body': request.get_data(),
+            'remote_addr': request.remote_addr or '127.0.0.1'
+        }
+        try:
+            status, headers, body = client.call(command)
+        except TrainerUnavailable as e:
+            return jsonify({"status": "error", "message": str(e)}), 503
+        return Response(body, status=status, headers=headers)
+
+    # Ahead of every other hook: forwarded requests are rate limited once, by the trainer
+    app.before_request_funcs.setdefault(None, []).insert(0, forward_to_trainer)
+    return app
+
+
+def create_worker_app():
+    """WSGI factory for gunicorn workers (gunicorn.conf.py: wsgi_app)."""
+    flask_module = load_flask_module()
+    install_worker(flask_module, TrainerClient(), SharedStateReader(SHARED_STATE_DIR))
+    return flask_module.create_app(warmup=False)
+
+
+def run_trainer():
+    """Trainer process: own the simulations, mirror snapshots, execute forwarded writes."""
+    flask_module = load_flask_module()
+    flask_module.snapshot_mirror = SharedStateWriter(SHARED_STATE_DIR)
+    app = flask_module.create_app(warmup=True)
+    server = TrainerServer(app)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    sys.exit(run_trainer())
@@ -0,0 +1,371 @@
+"""
+Headless Training Campaigns (V5.9)
+Train agents offline - no Flask server, rate limiter or JSON in the loop:
+
+    python -m app.cli --episodes 1000000 --agents ql,sarsa,td \\
+        --cities cities.json --matrix matrix.npy --disasters schedule.json \\
+        --out runs/overnight --checkpoint-every 10000
+
+Every agent trains in its own process (spawn) on its own copy of the matrix.
+The disaster schedule is a pure function of the episode number, so all
+processes see identical physics without talking to each other:
+
+    [{"episode": 1000, "lat": -7.25, "lon": 112.75, "severity": 3, "radius": 40, "duration": 500},
+     {"episode": 5000, "clear": true}]
+
+Output per agent: <out>/checkpoints/<agent>.json (brain format; --resume
+continues from it) and <out>/metrics/<agent>/ (per-episode columnar metrics,
+see app/core/columnar.py, or metrics.csv with --metrics csv). When the
+campaign ends, <out>/brain.json merges every agent for /api/load_brain.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from app.core.columnar import ColumnarWriter
+from app.core.map_store import write_json_atomic
+from app.core.scenario import apply_disaster, cities_within
+
+METRIC_COLUMNS = [
+    ('episode', 'u8'), ('distance', 'f4'), ('best_distance', 'f4'), ('epsilon', 'f4'),
+    ('states', 'u4'), ('disasters', 'u2'), ('ms', 'f4')
+]
+BRAIN_VERSION = '4.9'
+
+
+# --- Inputs ---
+
+def load_cities(path):
+    """City file: {"0": {"name", "lat", "lon"}, ...} or the /api/update_config body {"cities": {...}} (names optional)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data = data.get('cities', data)
+    return {
+        int(k): {'name': str(v.get('name', f'City {k}')), 'lat': float(v['lat']), 'lon': float(v['lon'])}
+        for k, v in data.items()
+    }
+
+
+def load_matrix(path, num_cities):
+    matrix = np.load(path).astype(np.float32, copy=False)
+    if matrix.shape != (num_cities, num_cities):
+        raise ValueError(f"Matrix is {matrix.shape}, expected ({num_cities}, {num_cities})")
+    return matrix
+
+
+def parse_schedule(entries, severity_levels):
+    """
+    Validate a disaster schedule.
+
+    Returns:
+        dict: {'disasters': [{start, end, lat, lon, radius, severity, multiplier}], 'clears': [episode]}
+
+    Raises:
+        ValueError: On a malformed entry or unknown severity
+    """
+    disasters, clears = [], []
+    for entry in entries:
+        try:
+            start = int(entry['episode'])
+            if start < 0:
+                raise ValueError("episode must be non-negative")
+            if entry.get('clear'):
+                clears.append(start)
+                continue
+            severity = int(entry.get('severity', 2))
+            if severity not in severity_levels:
+                raise ValueError(f"unknown severity {severity}")
+            duration = entry.get('duration')
+            disasters.append({
+                'start': start,
+                'end': start + int(duration) if duration is not None else None,
+                'lat': float(entry['lat']),
+                'lon': float(entry['lon']),
+                'radius': float(entry.get('radius', 50)),
+                'severity': severity,
+                'multiplier': float(severity_levels[severity]['multiplier'])
+            })
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid schedule entry {entry}: {e}")
+    return {'disasters': disasters, 'clears': sorted(clears)}
+
+
+def active_disasters(schedule, episode):
+    """Disasters in force during an episode (a clear removes everything started before it)."""
+    last_clear = max((c for c in schedule['clears'] if c <= episode), default=-1)
+    return [d for d in schedule['disasters']
+            if last_clear <= d['start'] <= episode and (d['end'] is None or episode < d['end'])]
+
+
+def change_points(schedule):
+    points = set(schedule['clears'])
+    for d in schedule['disasters']:
+        points.add(d['start'])
+        if d['end'] is not None:
+            points.add(d['end'])
+    return points
+
+
+def schedule_matrix(base, cities, active):
+    matrix = base.copy()
+    for d in active:
+        affected = cities_within(cities, d['lat'], d['lon'], d['radius'])
+        apply_disaster(matrix, affected, d['multiplier'], d['severity'])
+    return matrix
+
+
+# --- Brain format (same layout as SimulationManager.export_brain) ---
+
+def agent_brain(agent):
+    brain = {
+        'q_table': {f"{state[0]}|{state[1]}": dict(actions) for state, actions in agent.q_table.items()},
+        'epsilon': agent.epsilon
+    }
+    if hasattr(agent, 'weights'):
+        brain['weights'] = agent.weights.tolist()
+    return brain
+
+
+def restore_agent(agent, saved):
+    for key_str, actions in saved.get('q_table', {}).items():
+        city_id, mask = (int(p) for p in key_str.split('|'))
+        state_q = agent.q_table.setdefault((city_id, mask), defaultdict(float))
+        for action, value in actions.items():
+            state_q[int(action)] = float(value)
+    agent.epsilon = max(0.01, min(1.0, saved.get('epsilon', 1.0)))
+    if saved.get('weights') is not None and hasattr(agent, 'weights'):
+        agent.weights[:] = saved['weights']
+
+
+def brain_dump(num_cities, episodes, agents):
+    return {'version': BRAIN_VERSION, 'num_cities': num_cities, 'episodes': episodes, 'agents': agents}
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CsvMetricsWriter:
+    """Row-oriented alternative to ColumnarWriter (same append / flush / close)."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.names = [name for name, _ in columns]
+        new = not os.path.exists(path)
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if new:
+            self._writer.writerow(self.names)
+
+    def append(self, row):
+        self._writer.writerow([row[name] for name in self.names])
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# --- Worker ---
+
+def run_agent_campaign(job):
+    """
+    Train one agent for job['episodes'] episodes (runs in a pool process).
+
+    Returns:
+        dict: Summary (episodes, best/final distance, states, throughput)
+    """
+    name, cities = job['name'], job['cities']
+    base = job['matrix']
+    schedule = job['schedule']
+    agent = job['agent_cls'](cities, dist_matrix=base.copy(), name=name, color=job['color'], **job['options'])
+
+    checkpoint_path = os.path.join(job['out'], 'checkpoints', f'{name}.json')
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    start = 0
+    checkpoint = read_checkpoint(checkpoint_path) if job['resume'] else None
+    if checkpoint is not None:
+        restore_agent(agent, checkpoint['agents'][name])
+        start = checkpoint['episodes']
+        print(f">>> [{name}] Resuming from episode {start}")
+
+    metrics_dir = os.path.join(job['out'], 'metrics', name)
+    if job['metrics'] == 'csv':
+        os.makedirs(metrics_dir, exist_ok=True)
+        metrics = CsvMetricsWriter(os.path.join(metrics_dir, 'metrics.csv'), METRIC_COLUMNS)
+    else:
+        metrics = ColumnarWriter(metrics_dir, METRIC_COLUMNS)
+        if metrics.rows > start:
+            metrics.truncate(start)  # Rows past the checkpoint belong to episodes being re-run
+
+    def save_checkpoint(episodes):
+        metrics.flush()
+        write_json_atomic(checkpoint_path, brain_dump(len(cities), episodes, {name: agent_brain(agent)}))
+
+    points = change_points(schedule)
+    decay = job['decay'] and not hasattr(agent, 'weights')  # Linear agents decay on their own
+    best, dist, active, done = float('inf'), float('inf'), [], start
+    started = time.perf_counter()
+    try:
+        for episode in range(start, start + job['episodes']):
+            if episode == start or episode in points:
+                active = active_disasters(schedule, episode)
+                agent.dist_matrix = schedule_matrix(base, cities, active)
+
+            tick = time.perf_counter()
+            agent.train_episode(objective=job['objective'])
+            dist, _ = agent.get_best_route_distance()
+            dist = float(dist)
+            if decay:
+                agent.epsilon = max(agent.min_epsilon, agent.epsilon * agent.epsilon_decay)
+            best = min(best, dist)
+            done = episode + 1
+
+            metrics.append({
+                'episode': done, 'distance': dist, 'best_distance': best, 'epsilon': agent.epsilon,
+                'states': len(agent.q_table), 'disasters': len(active),
+                'ms': (time.perf_counter() - tick) * 1000
+            })
+            if job['checkpoint_every'] and done % job['checkpoint_every'] == 0:
+                save_checkpoint(done)
+            if job['log_every'] and (done - start) % job['log_every'] == 0:
+                rate = (done - start) / max(time.perf_counter() - started, 1e-9)
+                print(f">>> [{name}] Episode {done}: {dist:.1f} km (best {best:.1f}) - {rate:.0f} ep/s")
+    finally:
+        # Interrupted or not: never lose the episodes already trained
+        save_checkpoint(done)
+        metrics.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'agent': name,
+        'episodes': done,
+        'trained': done - start,
+        'best_distance': round(best, 2),
+        'final_distance': round(dist, 2),
+        'epsilon': round(agent.epsilon, 4),
+        'states': len(agent.q_table),
+        'seconds': round(seconds, 2),
+        'episodes_per_second': round((done - start) / seconds, 1) if seconds > 0 else None
+    }
+
+
+# --- Campaign ---
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description="Headless training campaign (no web server).")
+    parser.add_argument('--episodes', type=int, required=True, help="Episodes per agent")
+    parser.add_argument('--agents', default='all', help="Comma list of ql,sarsa,mc,td,dyna or full names (default: all)")
+    parser.add_argument('--cities', help="City JSON file (default: the built-in Java map)")
+    parser.add_argument('--matrix', help="Distance matrix .npy (default: map store / OSRM / Haversine)")
+    parser.add_argument('--disasters', help="Disaster schedule JSON file")
+    parser.add_argument('--out', default=os.path.join('data', 'campaigns', 'latest'), help="Output directory")
+    parser.add_argument('--workers', type=int, default=min(5, os.cpu_count() or 1), help="Parallel agent processes (1 = inline)")
+    parser.add_argument('--checkpoint-every', type=int, default=10000, help="Episodes between checkpoints (0 = only at the end)")
+    parser.add_argument('--metrics', choices=['columnar', 'csv'], default='columnar')
+    parser.add_argument('--decay', action='store_true', help="Decay epsilon of tabular agents by their epsilon_decay per episode")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoints in --out")
+    parser.add_argument('--log-every', type=int, default=1000, help="Progress line every N episodes (0 = quiet)")
+    return parser
+
+
+def select_roster(roster, selection):
+    """Roster entries (name, class, color, options) matching --agents (aliases: name prefix, e.g. 'ql')."""
+    if selection == 'all':
+        return list(roster)
+    wanted = [s.strip().lower() for s in selection.split(',') if s.strip()]
+    by_alias = {}
+    for entry in roster:
+        by_alias[entry[0].lower()] = entry
+        by_alias[entry[0].split('-')[0].lower()] = entry
+    unknown = [w for w in wanted if w not in by_alias]
+    if unknown:
+        raise ValueError(f"Unknown agent(s): {', '.join(unknown)}")
+    selected = {by_alias[w][0]: by_alias[w] for w in wanted}  # Dedupe by name, keep order
+    return list(selected.values())
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.episodes < 1:
+        print("--episodes must be positive", file=sys.stderr)
+        return 2
+
+    # app.py stays the single source of roster, severities and fleet config (no server is started)
+    from app.api.asgi import load_flask_module
+    flask_module = load_flask_module()
+
+    try:
+        cities = load_cities(args.cities) if args.cities else dict(flask_module.cities_data)
+        matrix = load_matrix(args.matrix, len(cities)) if args.matrix else flask_module.fetch_distance_matrix(cities)
+        schedule = {'disasters': [], 'clears': []}
+        if args.disasters:
+            with open(args.disasters, 'r', encoding='utf-8') as f:
+                schedule = parse_schedule(json.load(f), flask_module.SEVERITY_LEVELS)
+        if flask_module.is_large_map(cities):
+            roster = flask_module.LARGE_MAP_ROSTER
+        else:
+            roster = [(name, cls, color, {}) for name, cls, color in flask_module.AGENT_ROSTER]
+        roster = select_roster(roster, args.agents)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Invalid campaign input: {e}", file=sys.stderr)
+        return 2
+
+    if not args.resume:
+        existing = [name for name, _, _, _ in roster
+                    if os.path.exists(os.path.join(args.out, 'checkpoints', f'{name}.json'))]
+        if existing:
+            print(f"{args.out} already has checkpoints for {', '.join(existing)}: pass --resume or a new --out",
+                  file=sys.stderr)
+            return 2
+
+    jobs = []
+    for name, agent_cls, color, options in roster:
+        conf = flask_module.fleet_config.get(name, flask_module.DEFAULT_CONFIG)
+        jobs.append({
+            'name': name, 'agent_cls': agent_cls, 'color': color, 'options': options,
+            'cities': cities, 'matrix': np.asarray(matrix, dtype=np.float32), 'schedule': schedule,
+            'episodes': args.episodes, 'objective': 'time' if conf['c'] == 'humanitarian' else 'profit',
+            'out': args.out, 'checkpoint_every': args.checkpoint_every, 'metrics': args.metrics,
+            'decay': args.decay, 'resume': args.resume, 'log_every': args.log_every
+        })
+
+    print(f">>> Campaign: {len(jobs)} agent(s) x {args.episodes} episodes on {len(cities)} cities -> {args.out}")
+    workers = max(1, min(args.workers, len(jobs)))
+    if workers == 1:
+        summaries = [run_agent_campaign(job) for job in jobs]
+    else:
+        # spawn: fresh interpreters, one agent each - no GIL, no shared Q-tables
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+            summaries = list(pool.map(run_agent_campaign, jobs))
+
+    # Merge the per-agent checkpoints into one brain for /api/load_brain
+    agents = {}
+    for job in jobs:
+        checkpoint = read_checkpoint(os.path.join(args.out, 'checkpoints', f"{job['name']}.json"))
+        agents.update(checkpoint['agents'])
+    episodes = max(s['episodes'] for s in summaries)
+    write_json_atomic(os.path.join(args.out, 'brain.json'), brain_dump(len(cities), episodes, agents))
+    write_json_atomic(os.path.join(args.out, 'summary.json'), {'agents': summaries, 'cities': len(cities)})
+
+    for s in summaries:
+        print(f">>> {s['agent']:<10} {s['episodes']:>10} ep  best {s['best_distance']:>9.1f} km  "
+              f"{s['states']:>9} states  {s['episodes_per_second']} ep/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
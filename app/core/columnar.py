@@ -0,0 +1,154 @@
+"""
+Columnar Metrics Store (V5.9)
+Append-only column files for long metric streams (training campaigns):
+
+    <dir>/schema.json    {"columns": [[name, dtype], ...], "rows": N}
+    <dir>/<name>.bin     Raw little-endian values of one column
+
+Rows are buffered and appended to every column file in chunks, so a stream of
+millions of rows costs a handful of writes per chunk. Readers memory-map just
+the columns they need (np.memmap), like a minimal Parquet without pages or
+compression. A crash mid-append is tolerated: readers use the shortest column.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from app.core.map_store import write_json_atomic
+
+SCHEMA_FILE = 'schema.json'
+CHUNK_ROWS = 4096
+
+
+def column_path(root, name):
+    return os.path.join(root, f'{name}.bin')
+
+
+class ColumnarWriter:
+    def __init__(self, root, columns, chunk_rows=CHUNK_ROWS):
+        """
+        Args:
+            root: Directory for this table (created; an existing table with the same
+                columns is appended to)
+            columns: [(name, numpy dtype string), ...]
+            chunk_rows: Rows buffered in memory between writes
+
+        Raises:
+            ValueError: If root holds a table with different columns
+        """
+        self.root = root
+        self.columns = [(name, np.dtype(dtype).newbyteorder('<').str) for name, dtype in columns]
+        self.chunk_rows = max(1, chunk_rows)
+        self._pending = {name: [] for name, _ in self.columns}
+        self._pending_rows = 0
+        os.makedirs(root, exist_ok=True)
+        existing = read_schema(root)
+        if existing is not None:
+            if [tuple(c) for c in existing['columns']] != self.columns:
+                raise ValueError(f"{root} holds a table with different columns")
+            self.rows = table_rows(root, existing)
+            self.truncate(self.rows)  # Drop a torn tail so every column lines up again
+        else:
+            self.rows = 0
+            self._write_schema()
+
+    def _write_schema(self):
+        write_json_atomic(os.path.join(self.root, SCHEMA_FILE), {
+            'columns': [list(c) for c in self.columns], 'rows': self.rows
+        })
+
+    def truncate(self, rows):
+        """Cut the table back to its first rows (flushed rows only)."""
+        for name, dtype in self.columns:
+            path = column_path(self.root, name)
+            size = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        self.rows = min(self.rows, rows)
+        self._write_schema()
+
+    def append(self, row):
+        """Buffer one row (dict with a value per column)."""
+        for name, _ in self.columns:
+            self._pending[name].append(row[name])
+        self._pending_rows += 1
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending_rows:
+            return
+        for name, dtype in self.columns:
+            with open(column_path(self.root, name), 'ab') as f:
+                f.write(np.asarray(self._pending[name], dtype=dtype).tobytes())
+            self._pending[name] = []
+        self.rows += self._pending_rows
+        self._pending_rows = 0
+        self._write_schema()
+
+    def write_block(self, columns):
+        """Append whole column arrays at once (dict name -> equal-length array), bypassing the row buffer."""
+        self.flush()
+        rows = len(columns[self.columns[0][0]])
+        if not rows:
+            return
+        for name, dtype in self.columns:
+            with open(column_path(self.root, name), 'ab') as f:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self.rows += rows
+        self._write_schema()
+
+    def close(self):
+        self.flush()
+
+
+def read_schema(root):
+    path = os.path.join(root, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def table_rows(root, schema):
+    """Complete rows on disk (shortest column; the schema's count may lag a crash)."""
+    rows = []
+    for name, dtype in schema['columns']:
+        path = column_path(root, name)
+        rows.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+    return min(rows) if rows else 0
+
+
+def read_columns(root, names=None, mmap=True):
+    """
+    Load a table's columns.
+
+    Args:
+        root: Table directory
+        names: Columns to load (default: all)
+        mmap: Memory-map read-only instead of reading into memory
+
+    Returns:
+        dict: name -> 1-D array (equal lengths)
+
+    Raises:
+        FileNotFoundError: If root holds no table
+    """
+    schema = read_schema(root)
+    if schema is None:
+        raise FileNotFoundError(f"No columnar table in {root}")
+    rows = table_rows(root, schema)
+    dtypes = {name: dtype for name, dtype in schema['columns']}
+    result = {}
+    for name in (names or list(dtypes)):
+        dtype = np.dtype(dtypes[name])
+        if rows == 0:
+            result[name] = np.zeros(0, dtype=dtype)
+        elif mmap:
+            result[name] = np.memmap(column_path(root, name), dtype=dtype, mode='r', shape=(rows,))
+        else:
+            result[name] = np.fromfile(column_path(root, name), dtype=dtype, count=rows)
+    return result
@@ -0,0 +1,290 @@
+"""
+Convergence Monitor (V5.9)
+Per-agent learning progress, epsilon schedules and an adaptive episode budget.
+
+Signals per agent (O(n) per tick, never a full Q-table scan):
+- Route stability: episodes the greedy route's signature has stayed the same.
+- Q-value delta: relative change of the Q-values along the greedy route
+  (the weight vector for linear agents) across a tick, smoothed as an EMA.
+- Improvement: episodes since the agent's best distance - the top entry of its
+  Hall of Fame board - improved by more than IMPROVEMENT_TOLERANCE.
+
+The status drives the budget. 'learning' agents train every tick, 'throttled'
+ones every THROTTLE_EVERY ticks and 'paused' ones not at all. Freed episode
+slots go to learning agents as extra episodes (disturbed ones first, at most
+MAX_EXTRA each), so a tick costs about the same while CPU follows progress.
+A material disruption (disaster, sabotage) wakes every agent, forgets its best
+distance and re-heats its epsilon to explore again. The caller passes the
+matrix without its time-of-day factor, so a new time slot never does.
+"""
+
+import math
+from threading import Lock
+
+import numpy as np
+
+from app.core.halloffame import route_signature
+
+STABLE_EPISODES = 50          # Unchanged greedy route this long counts as stable
+PATIENCE = 200                # Episodes without improvement before an agent may pause
+Q_TOLERANCE = 1e-3            # Relative Q-delta EMA below which values count as settled
+IMPROVEMENT_TOLERANCE = 1e-3  # Relative distance gain that counts as an improvement
+THROTTLE_EVERY = 4            # Throttled agents train one tick in this many
+MAX_EXTRA = 2                 # Extra episodes a learning agent may receive per tick
+DISTURB_TOLERANCE = 0.01      # Relative L1 matrix change that wakes the fleet
+DISTURB_TICKS = 20            # Ticks a disturbed agent is served first
+REHEAT_EPSILON = 0.3          # Epsilon a disturbance raises agents back to
+Q_DELTA_SMOOTHING = 0.2
+
+
+class EpsilonSchedule:
+    KINDS = ('constant', 'exponential', 'linear')
+
+    def __init__(self, kind='exponential', start=1.0, end=0.01, decay=0.9995, episodes=5000):
+        """
+        Args:
+            kind: 'constant' (legacy: epsilon never moves), 'exponential' (start * decay^step)
+                or 'linear' (start -> end over `episodes`)
+            start / end: Epsilon range (end is the floor)
+
+        Raises:
+            ValueError: On an unknown kind or an invalid range
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown epsilon schedule '{kind}' (use {', '.join(self.KINDS)})")
+        if not (0.0 <= end <= start <= 1.0):
+            raise ValueError("Epsilon schedule needs 0 <= end <= start <= 1")
+        if not (0.0 < decay <= 1.0) or episodes < 1:
+            raise ValueError("decay must be within (0, 1] and episodes positive")
+        self.kind = kind
+        self.start = float(start)
+        self.end = float(end)
+        self.decay = float(decay)
+        self.episodes = int(episodes)
+
+    def value(self, step):
+        if self.kind == 'constant':
+            return self.start
+        if self.kind == 'exponential':
+            return max(self.end, self.start * self.decay ** step)
+        return max(self.end, self.start - (self.start - self.end) * step / self.episodes)
+
+    def step_for(self, epsilon):
+        """Inverse of value(): the step at which the schedule reaches epsilon."""
+        epsilon = min(self.start, max(self.end, epsilon))
+        if self.kind == 'constant' or epsilon >= self.start:
+            return 0.0
+        if self.kind == 'exponential':
+            return math.log(max(epsilon, 1e-12) / self.start) / math.log(self.decay) if self.decay < 1 else 0.0
+        return (self.start - epsilon) / max(self.start - self.end, 1e-12) * self.episodes
+
+    def to_dict(self):
+        return {'kind': self.kind, 'start': self.start, 'end': self.end, 'decay': self.decay, 'episodes': self.episodes}
+
+
+def q_probe(agent, route):
+    """Q-values along a route's (state, action) pairs, or a linear agent's weights."""
+    if hasattr(agent, 'weights'):
+        return np.array(agent.weights, dtype=np.float64)
+    if not route:
+        return np.zeros(0)
+    values, mask = [], 1 << route[0]
+    for current, following in zip(route[:-1], route[1:]):
+        state_q = agent.q_table.get((current, mask))  # .get: never grow the defaultdict
+        values.append(state_q.get(following, 0.0) if state_q else 0.0)
+        mask |= 1 << following
+    return np.array(values, dtype=np.float64)
+
+
+class AgentProgress:
+    def __init__(self):
+        self.step = 0.0
+        self.episodes = 0
+        self.signature = None
+        self.stable_for = 0
+        self.q_delta = None
+        self.best = math.inf
+        self.since_improvement = 0
+        self.status = 'learning'
+        self.disturbed_ticks = 0
+        self.last_route = None
+        self.last_distance = None
+        self.last_runs = 0
+
+
+class ConvergenceMonitor:
+    def __init__(self, names, schedule=None, enabled=True, patience=PATIENCE,
+                 stable_episodes=STABLE_EPISODES, q_tolerance=Q_TOLERANCE):
+        """
+        Args:
+            names: Agent names (training order)
+            schedule: EpsilonSchedule applied after every tick (default exponential)
+            enabled: False keeps the legacy behaviour - every agent trains one
+                episode per tick and epsilon is left to the agents
+        """
+        self.schedule = schedule or EpsilonSchedule()
+        self.enabled = enabled
+        self.patience = patience
+        self.stable_episodes = stable_episodes
+        self.q_tolerance = q_tolerance
+        self.progress = {name: AgentProgress() for name in names}
+        self._matrix = None
+        self._matrix_version = None
+        self._lock = Lock()
+
+    def plan(self, tick):
+        """
+        Episodes each agent trains this tick.
+
+        Returns:
+            dict: name -> episode count (0 = skipped, reuse its last route)
+        """
+        with self._lock:
+            if not self.enabled:
+                return {name: 1 for name in self.progress}
+            runs, free = {}, 0
+            for name, p in self.progress.items():
+                if p.last_route is None or p.status == 'learning':
+                    runs[name] = 1
+                elif p.status == 'throttled' and tick % THROTTLE_EVERY == 0:
+                    runs[name] = 1
+                else:
+                    runs[name] = 0
+                    free += 1
+            # Freed slots: disturbed agents first, then the most recently improving
+            receivers = sorted(
+                (name for name, p in self.progress.items() if p.status == 'learning' and p.last_route is not None),
+                key=lambda name: (self.progress[name].disturbed_ticks == 0, self.progress[name].since_improvement)
+            )
+            for extra in range(MAX_EXTRA):
+                for name in receivers:
+                    if free:
+                        runs[name] += 1
+                        free -= 1
+            for name, p in self.progress.items():
+                p.last_runs = runs[name]
+            return runs
+
+    def probe(self, name, agent):
+        """Q-values to compare against after training (call before the tick's episodes)."""
+        return q_probe(agent, self.progress[name].last_route)
+
+    def observe(self, name, agent, runs, distance, route, before):
+        """Update one agent's signals after it trained `runs` episodes; applies the epsilon schedule."""
+        distance = float(distance)
+        route = [int(c) for c in route]
+        signature = route_signature(route) if route else None
+        with self._lock:
+            p = self.progress[name]
+            p.episodes += runs
+            if self.enabled:
+                p.step += runs
+                agent.epsilon = self.schedule.value(p.step)
+
+            p.stable_for = p.stable_for + runs if signature == p.signature else 0
+            p.signature = signature
+            after = q_probe(agent, p.last_route)
+            if before is not None and len(before) and before.shape == after.shape:
+                delta = float(np.linalg.norm(after - before) / (np.linalg.norm(after) + 1e-9))
+                p.q_delta = delta if p.q_delta is None else (1 - Q_DELTA_SMOOTHING) * p.q_delta + Q_DELTA_SMOOTHING * delta
+            if distance < p.best * (1 - IMPROVEMENT_TOLERANCE):
+                p.best = distance
+                p.since_improvement = 0
+            else:
+                p.since_improvement += runs
+            p.disturbed_ticks = max(0, p.disturbed_ticks - 1)
+            p.last_route, p.last_distance = route, distance
+
+            settled = p.q_delta is not None and p.q_delta <= self.q_tolerance
+            if p.stable_for >= self.stable_episodes and p.since_improvement >= self.patience and settled:
+                p.status = 'paused'
+            elif p.stable_for >= self.stable_episodes // 2 and p.since_improvement >= self.patience // 2:
+                p.status = 'throttled'
+            else:
+                p.status = 'learning'
+
+    def last(self, name):
+        """(distance, route) of a skipped agent's last tick."""
+        p = self.progress[name]
+        return p.last_distance, p.last_route
+
+    def check_matrix(self, matrix, version):
+        """
+        Wake the fleet if the matrix changed materially since the last check.
+
+        Args:
+            matrix: Disrupted matrix without the time-of-day factor (slots are not disruptions)
+            version: Disruption version (the check is skipped while it stays the same)
+
+        Returns:
+            bool: True if agents were disturbed
+        """
+        if version == self._matrix_version:
+            return False
+        current = np.array(matrix, dtype=np.float64)
+        previous, self._matrix, self._matrix_version = self._matrix, current, version
+        if previous is None or previous.shape != current.shape:
+            return False
+        change = np.abs(current - previous).sum() / max(np.abs(previous).sum(), 1e-9)
+        if change <= DISTURB_TOLERANCE:
+            return False
+        self.disturb()
+        return True
+
+    def disturb(self, names=None):
+        """New physics: distances are no longer comparable, so learn (and explore) again."""
+        reheat_step = self.schedule.step_for(REHEAT_EPSILON)
+        with self._lock:
+            for name, p in self.progress.items():
+                if names is not None and name not in names:
+                    continue
+                p.status = 'learning'
+                p.stable_for = 0
+                p.since_improvement = 0
+                p.best = math.inf
+                p.disturbed_ticks = DISTURB_TICKS
+                p.step = min(p.step, reheat_step)
+
+    def resume(self, names=None):
+        """Put paused / throttled agents back to full speed (no epsilon re-heat)."""
+        with self._lock:
+            for name, p in self.progress.items():
+                if names is None or name in names:
+                    p.status = 'learning'
+                    p.stable_for = 0
+                    p.since_improvement = 0
+
+    def set_schedule(self, schedule, agents=None):
+        """Switch schedules, keeping each agent's current epsilon (agents: name -> agent)."""
+        with self._lock:
+            for name, p in self.progress.items():
+                if agents is not None and name in agents:
+                    p.step = schedule.step_for(agents[name].epsilon)
+            self.schedule = schedule
+
+    def sync_epsilon(self, name, epsilon):
+        """Continue the schedule from an externally set epsilon (e.g. a loaded brain)."""
+        with self._lock:
+            self.progress[name].step = self.schedule.step_for(epsilon)
+
+    def reset(self):
+        with self._lock:
+            self.progress = {name: AgentProgress() for name in self.progress}
+            self._matrix, self._matrix_version = None, None
+
+    def view(self, agents=None):
+        with self._lock:
+            result = {}
+            for name, p in self.progress.items():
+                result[name] = {
+                    'status': p.status,
+                    'episodes': p.episodes,
+                    'last_tick_episodes': p.last_runs,
+                    'epsilon': round(agents[name].epsilon, 4) if agents else None,
+                    'stable_for': p.stable_for,
+                    'q_delta': round(p.q_delta, 6) if p.q_delta is not None else None,
+                    'since_improvement': p.since_improvement,
+                    'best_distance': round(p.best, 2) if math.isfinite(p.best) else None,
+                    'disturbed': p.disturbed_ticks > 0
+                }
+            return result
@@ -0,0 +1,123 @@
+"""
+Fleet Economics (V5.9)
+Cost, profit and CO2 for route distances under every vehicle/cargo configuration.
+
+Per-km cost of a vehicle is (fuel price / efficiency) + driver wage, so a whole
+(routes x vehicles x cargo) grid is one NumPy broadcast:
+
+    cost[r, v, c]   = distance[r] * per_km[v] * multiplier[c]
+    profit[r, v, c] = revenue[c] - cost[r, v, c]
+    co2[r, v]       = distance[r] * co2_per_km[v]
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# V5.4: Implement Real Economy Constants
+PRICE_DIESEL = 15000   # Rp / Liter
+PRICE_ELECTRIC = 2500  # Rp / kWh
+DRIVER_WAGE_KM = 3000  # Rp / KM (Labor + Maintenance)
+
+# V5.4: Fleet Economy Configuration (Real Efficiency Model)
+VEHICLES = {
+    'diesel': {'label': 'Diesel Heavy', 'co2': 2.6, 'efficiency': 3.0, 'fuel': 'diesel', 'icon': 'bi-truck'}, # 3 km/L
+    'hybrid': {'label': 'Hybrid Wingbox', 'co2': 1.8, 'efficiency': 5.0, 'fuel': 'diesel', 'icon': 'bi-battery-half'}, # 5 km/L
+    'ev': {'label': 'Electric Semi', 'co2': 0.0, 'efficiency': 1.0, 'fuel': 'electric', 'icon': 'bi-lightning-charge'}, # 1 km/kWh (300kWh pack / 300km)
+    'lng': {'label': 'LNG Truck', 'co2': 1.2, 'efficiency': 3.5, 'fuel': 'diesel', 'icon': 'bi-droplet'} # Simplified as diesel-equivalent for now or add LNG price later
+}
+
+CARGO = {
+    'general': {'label': 'General Goods 📦', 'multiplier': 1.0, 'baseRevenue': 25000000},
+    'cold': {'label': 'Cold Chain ❄️', 'multiplier': 1.8, 'baseRevenue': 65000000},
+    'danger': {'label': 'Hazardous ☣️', 'multiplier': 2.5, 'baseRevenue': 85000000},
+    'express': {'label': 'Express ⚡', 'multiplier': 1.5, 'baseRevenue': 45000000},
+    # V5.3: Humanitarian Cargo
+    'humanitarian': {
+        'label': '🚑 Bantuan Bencana',
+        'multiplier': 0.5,        # Low commercial value
+        'baseRevenue': 15000000,  # Flat rate (Rp 15jt)
+        'reputation': 100,        # +100 Karma per delivery
+        'is_emergency': True
+    }
+}
+
+DEFAULT_CONFIG = {'v': 'diesel', 'c': 'general'}
+
+FleetGrid = namedtuple('FleetGrid', ['vehicles', 'cargo', 'cost', 'profit', 'co2'])
+FleetResult = namedtuple('FleetResult', ['cost', 'profit', 'co2'])
+
+
+class FleetEconomics:
+    def __init__(self, vehicles=None, cargo=None, price_diesel=PRICE_DIESEL,
+                 price_electric=PRICE_ELECTRIC, wage_km=DRIVER_WAGE_KM):
+        """
+        Args:
+            vehicles: Vehicle table (default VEHICLES)
+            cargo: Cargo table (default CARGO)
+            price_diesel / price_electric: Rp per liter / kWh
+            wage_km: Driver wage + maintenance, Rp per km
+        """
+        vehicles = VEHICLES if vehicles is None else vehicles
+        cargo = CARGO if cargo is None else cargo
+        self.vehicle_keys = list(vehicles.keys())
+        self.cargo_keys = list(cargo.keys())
+        self._vehicle_index = {k: i for i, k in enumerate(self.vehicle_keys)}
+        self._cargo_index = {k: i for i, k in enumerate(self.cargo_keys)}
+
+        fuel_price = np.array([
+            price_electric if v.get('fuel', 'diesel') == 'electric' else price_diesel
+            for v in vehicles.values()
+        ], dtype=np.float64)
+        efficiency = np.array([v.get('efficiency', 3.0) for v in vehicles.values()], dtype=np.float64)
+        self.per_km = fuel_price / efficiency + wage_km
+        self.co2_per_km = np.array([v.get('co2', 2.6) for v in vehicles.values()], dtype=np.float64)
+        self.multiplier = np.array([c['multiplier'] for c in cargo.values()], dtype=np.float64)
+        self.revenue = np.array([c['baseRevenue'] for c in cargo.values()], dtype=np.float64)
+
+    def indices(self, configs):
+        """Map [{'v': ..., 'c': ...}, ...] to (vehicle_idx, cargo_idx); unknown keys use the defaults."""
+        v_default = self._vehicle_index.get(DEFAULT_CONFIG['v'], 0)
+        c_default = self._cargo_index.get(DEFAULT_CONFIG['c'], 0)
+        v_idx = np.array([self._vehicle_index.get(conf.get('v'), v_default) for conf in configs], dtype=np.intp)
+        c_idx = np.array([self._cargo_index.get(conf.get('c'), c_default) for conf in configs], dtype=np.intp)
+        return v_idx, c_idx
+
+    def grid(self, distances, vehicles=None, cargo=None):
+        """
+        Evaluate every route against every vehicle/cargo configuration.
+
+        Args:
+            distances: Route lengths in km, shape (R,)
+            vehicles / cargo: Optional subsets of keys (default all)
+
+        Returns:
+            FleetGrid: cost/profit (R, V, C), co2 (R, V)
+        Raises:
+            KeyError: On an unknown vehicle or cargo key
+        """
+        v_keys = self.vehicle_keys if vehicles is None else list(vehicles)
+        c_keys = self.cargo_keys if cargo is None else list(cargo)
+        v_idx = np.array([self._vehicle_index[k] for k in v_keys], dtype=np.intp)
+        c_idx = np.array([self._cargo_index[k] for k in c_keys], dtype=np.intp)
+
+        d = np.asarray(distances, dtype=np.float64).reshape(-1)
+        cost = d[:, None, None] * self.per_km[v_idx][None, :, None] * self.multiplier[c_idx][None, None, :]
+        profit = self.revenue[c_idx][None, None, :] - cost
+        co2 = d[:, None] * self.co2_per_km[v_idx][None, :]
+        return FleetGrid(v_keys, c_keys, cost, profit, co2)
+
+    def evaluate(self, distances, configs):
+        """
+        Evaluate route r under its own configuration configs[r] (gather, no grid).
+
+        Returns:
+            FleetResult: cost, profit, co2 arrays of shape (R,)
+        """
+        d = np.asarray(distances, dtype=np.float64).reshape(-1)
+        v_idx, c_idx = self.indices(configs)
+        cost = d * self.per_km[v_idx] * self.multiplier[c_idx]
+        return FleetResult(cost, self.revenue[c_idx] - cost, d * self.co2_per_km[v_idx])
+
+
+fleet_economics = FleetEconomics()
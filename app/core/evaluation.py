@@ -0,0 +1,113 @@
+"""
+Bulk Route Evaluation (V5.9)
+Scores thousands of candidate tours against the current (disaster-adjusted) matrix:
+
+    legs      = matrix[routes[:, :-1], routes[:, 1:]]    One fancy-index gather, (R, L-1)
+    distance  = legs.sum(axis=1)
+    cost, profit, co2 = FleetEconomics.evaluate(distance, configs)   One batched pass
+
+Routes arrive as a 2-D integer array (rows padded to one length - a tour of
+fewer stops repeats its last city, which adds 0 km). Rows are gathered in
+chunks of CHUNK_ROWS so the temporary leg array stays small for any batch size.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK_ROWS = 4096
+BLOCKED_DISTANCE = 9999999.0  # set_road_status marks blocked roads with this length
+
+TourScores = namedtuple('TourScores', ['distance', 'complete', 'blocked_legs', 'cost', 'profit', 'co2'])
+SCORE_FIELDS = TourScores._fields
+SCORE_DTYPE = np.dtype([
+    ('distance', '<f8'), ('complete', '?'), ('blocked_legs', '<u2'),
+    ('cost', '<f8'), ('profit', '<f8'), ('co2', '<f8')
+])
+
+
+def as_route_array(routes, num_cities, closed=False):
+    """
+    Validate candidate tours.
+
+    Args:
+        routes: 2-D integer array-like (R, L)
+        num_cities: Cities on the map
+        closed: Append each route's first city (tours given without the return leg)
+
+    Returns:
+        np.ndarray: (R, L) or (R, L + 1) intp array
+
+    Raises:
+        ValueError: On a ragged / non-integer array or a city index out of range
+    """
+    try:
+        array = np.asarray(routes)
+    except ValueError:
+        raise ValueError("routes must be a rectangular 2-D array (pad short tours)")
+    if array.ndim != 2 or array.shape[1] < 2:
+        raise ValueError("routes must be a 2-D array with at least two cities per route")
+    if array.dtype.kind not in 'iu':
+        raise ValueError("routes must hold integer city indices")
+    if array.size and (array.min() < 0 or array.max() >= num_cities):
+        raise ValueError(f"City indices must be in [0, {num_cities})")
+    array = array.astype(np.intp, copy=False)
+    if closed:
+        array = np.concatenate([array, array[:, :1]], axis=1)
+    return array
+
+
+def tour_lengths(matrix, routes):
+    """
+    Lengths of many tours in one gather per chunk.
+
+    Returns:
+        tuple: (distance (R,) float64, blocked legs per route (R,))
+    """
+    matrix = np.asarray(matrix)
+    distance = np.empty(len(routes), dtype=np.float64)
+    blocked = np.empty(len(routes), dtype=np.int64)
+    for lo in range(0, len(routes), CHUNK_ROWS):
+        chunk = routes[lo:lo + CHUNK_ROWS]
+        legs = matrix[chunk[:, :-1], chunk[:, 1:]]
+        distance[lo:lo + len(chunk)] = legs.sum(axis=1, dtype=np.float64)
+        blocked[lo:lo + len(chunk)] = (legs >= BLOCKED_DISTANCE).sum(axis=1)
+    return distance, blocked
+
+
+def complete_tours(routes, num_cities):
+    """True for rows that visit every city of the map."""
+    seen = np.zeros((len(routes), num_cities), dtype=bool)
+    seen[np.arange(len(routes))[:, None], routes] = True
+    return seen.all(axis=1)
+
+
+def score_tours(matrix, routes, economics, configs):
+    """
+    Distance, completeness, blocked legs and fleet economics for every tour.
+
+    Args:
+        matrix: Current distance matrix
+        routes: Validated (R, L) array (as_route_array)
+        economics: FleetEconomics instance
+        configs: One {'v': ..., 'c': ...} for all routes, or a list with one per route
+
+    Returns:
+        TourScores of (R,) arrays
+    """
+    distance, blocked = tour_lengths(matrix, routes)
+    if isinstance(configs, dict):
+        v_idx, c_idx = economics.indices([configs])
+        cost = distance * economics.per_km[v_idx[0]] * economics.multiplier[c_idx[0]]
+        result = (cost, economics.revenue[c_idx[0]] - cost, distance * economics.co2_per_km[v_idx[0]])
+    else:
+        result = economics.evaluate(distance, configs)
+    return TourScores(distance, complete_tours(routes, len(matrix)), blocked, *result)
+
+
+def scores_to_records(scores):
+    """Pack TourScores into one structured array (the binary response)."""
+    records = np.empty(len(scores.distance), dtype=SCORE_DTYPE)
+    for field in SCORE_FIELDS:
+        records[field] = getattr(scores, field)
+    return records
@@ -0,0 +1,308 @@
+"""
+Event Log (V5.9)
+Append-only binary journal of everything that changed a simulation's physics,
+stamped with the episode it happened at:
+
+    disaster_add, disaster_clear, sabotage, config, reset   What happened
+    keyframe, delta                                         What the matrix became
+
+Every record is a fixed 21-byte header (kind u8, run u32, episode u32, unix
+time f64, payload length u32) followed by its payload: compact JSON for
+disasters and config, a packed struct for sabotage, raw float32 for matrices.
+A full matrix keyframe is written every KEYFRAME_INTERVAL matrix changes (or
+when most cells changed at once); in between only the changed cells are
+stored, so ReplayEngine.as_of(episode) decodes one keyframe plus a handful of
+deltas instead of replaying the simulation from episode 0.
+
+A run starts at every map load, reset or brain load, because the episode
+counter restarts there; "as of episode E" is always asked within one run.
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import namedtuple
+from struct import Struct
+from threading import RLock
+
+import numpy as np
+
+MAGIC = b'TWINEVT1'
+HEADER = Struct('<BIIdI')       # kind, run, episode, timestamp, payload length
+SABOTAGE_RECORD = Struct('<IIB')  # from, to, status code
+MATRIX_META = Struct('<II')     # matrix version, n (keyframe) or changed cells (delta)
+
+DISASTER_ADD = 1
+DISASTER_CLEAR = 2
+SABOTAGE = 3
+CONFIG = 4
+RESET = 5
+KEYFRAME = 16
+DELTA = 17
+
+KIND_NAMES = {
+    DISASTER_ADD: 'disaster_add', DISASTER_CLEAR: 'disaster_clear', SABOTAGE: 'sabotage',
+    CONFIG: 'config', RESET: 'reset', KEYFRAME: 'keyframe', DELTA: 'delta'
+}
+ROAD_STATUS = {'open': 0, 'blocked': 1}
+ROAD_STATUS_NAMES = {v: k for k, v in ROAD_STATUS.items()}
+
+KEYFRAME_INTERVAL = 32      # Deltas between keyframes (bounds the work of one as_of)
+KEYFRAME_RATIO = 0.25       # A change touching more cells than this is stored as a keyframe
+MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+MatrixState = namedtuple('MatrixState', [
+    'run', 'episode', 'matrix_version', 'matrix', 'keyframe_episode', 'deltas_applied'
+])
+
+
+def encode_event(kind, data):
+    if kind == SABOTAGE:
+        u, v, status = data
+        return SABOTAGE_RECORD.pack(int(u), int(v), ROAD_STATUS.get(status, 255))
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def decode_event(kind, payload):
+    if kind == SABOTAGE:
+        u, v, code = SABOTAGE_RECORD.unpack(payload)
+        return {'from': u, 'to': v, 'status': ROAD_STATUS_NAMES.get(code, 'other')}
+    return json.loads(payload.decode('utf-8')) if payload else {}
+
+
+class EventLog:
+    """The raw journal: a file (survives restarts) or an in-memory buffer."""
+
+    def __init__(self, path=None, max_bytes=MAX_MEMORY_BYTES):
+        """
+        Args:
+            path: Journal file (appended to if it exists); None keeps it in memory
+            max_bytes: In-memory cap - the oldest records are dropped at a keyframe
+                boundary beyond it (file journals are never trimmed)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = RLock()
+        self._dropped = 0  # Bytes trimmed off the front of the in-memory buffer
+        if path is None:
+            self._buffer = bytearray(MAGIC)
+            return
+        self._buffer = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not an event log")
+            self._truncate_torn_tail()
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+
+    @property
+    def start(self):
+        """Offset of the oldest retained record."""
+        return len(MAGIC) + self._dropped
+
+    @property
+    def size(self):
+        """Offset one past the newest record."""
+        if self._buffer is None:
+            return os.path.getsize(self.path)
+        return len(self._buffer) + self._dropped
+
+    def _truncate_torn_tail(self):
+        """A crash mid-append leaves a partial record: cut the file back to the last whole one."""
+        end = len(MAGIC)
+        for offset, _, _, _, _, payload in self.scan():
+            end = offset + HEADER.size + len(payload)
+        if end < os.path.getsize(self.path):
+            print(f">>> Event log {self.path}: dropping {os.path.getsize(self.path) - end} bytes of torn tail")
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+    def append(self, kind, run, episode, payload=b''):
+        """Append one record; returns its offset."""
+        record = HEADER.pack(kind, run, episode, time.time(), len(payload)) + payload
+        with self.lock:
+            offset = self.size
+            if self._buffer is None:
+                with open(self.path, 'ab') as f:
+                    f.write(record)
+            else:
+                self._buffer += record
+                if len(self._buffer) > self.max_bytes:
+                    self._trim()
+            return offset
+
+    def _trim(self):
+        """Drop in-memory records up to the first keyframe in the newer half of the buffer."""
+        target = self.size - self.max_bytes // 2
+        cut = None
+        for offset, kind, _, _, _, _ in self.scan():
+            if offset >= target and kind == KEYFRAME:
+                cut = offset - self.start
+                break
+        if cut:
+            del self._buffer[len(MAGIC):len(MAGIC) + cut]
+            self._dropped += cut
+
+    def scan(self, start=None, end=None):
+        """
+        Iterate records from start (default: oldest retained) up to end.
+
+        Yields:
+            tuple: (offset, kind, run, episode, timestamp, payload bytes)
+        """
+        offset = self.start if start is None else start
+        end = self.size if end is None else end
+        if self._buffer is not None:
+            base = self._dropped
+            with memoryview(self._buffer) as view:  # Released on exit: the buffer can grow again
+                while offset + HEADER.size <= end:
+                    kind, run, episode, stamp, length = HEADER.unpack_from(view, offset - base)
+                    if offset + HEADER.size + length > end:
+                        return
+                    body = offset - base + HEADER.size
+                    yield offset, kind, run, episode, stamp, bytes(view[body:body + length])
+                    offset += HEADER.size + length
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while offset + HEADER.size <= end:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                kind, run, episode, stamp, length = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                yield offset, kind, run, episode, stamp, payload
+                offset += HEADER.size + length
+
+
+class ReplayEngine:
+    """Records a simulation's events and matrices; reconstructs the matrix as of any episode."""
+
+    def __init__(self, log, keyframe_interval=KEYFRAME_INTERVAL):
+        self.log = log
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.run = 0
+        self.keyframes = []  # (run, episode, offset), sorted: runs grow, episodes never rewind in a run
+        self._last = None    # Matrix as of the newest record (None = next one is a keyframe)
+        self._last_version = None
+        self._last_episode = 0
+        self._since_keyframe = 0
+        # Reopened journal: rebuild the keyframe index; the next run starts with a keyframe
+        for offset, kind, run, episode, _, _ in log.scan():
+            self.run = max(self.run, run)
+            if kind == KEYFRAME:
+                self.keyframes.append((run, episode, offset))
+
+    def start_run(self, episode=0, reason='reset', **details):
+        """New run (the episode counter restarted); its first matrix is a keyframe."""
+        with self.log.lock:
+            self.run += 1
+            self._last = None
+            self._last_episode = episode
+            self.log.append(RESET, self.run, episode, encode_event(RESET, dict(details, reason=reason)))
+
+    def log_event(self, kind, episode, data):
+        with self.log.lock:
+            self._last_episode = max(self._last_episode, episode)
+            return self.log.append(kind, self.run, episode, encode_event(kind, data))
+
+    def record(self, matrix, episode, matrix_version):
+        """
+        Journal the matrix if it moved on since the last record.
+
+        Returns:
+            int or None: KEYFRAME / DELTA, or None when nothing changed
+        """
+        with self.log.lock:
+            if self._last is not None and matrix_version == self._last_version:
+                return None  # Training ticks publish constantly; the matrix rarely moves
+            if episode < self._last_episode:
+                self.start_run(episode, reason='episodes_rewound')
+            current = np.asarray(matrix, dtype=np.float32)
+            kind = KEYFRAME
+            if (self._last is not None and self._last.shape == current.shape
+                    and self._since_keyframe < self.keyframe_interval):
+                changed = np.flatnonzero(current.ravel() != self._last.ravel())
+                if len(changed) <= current.size * KEYFRAME_RATIO:
+                    kind = DELTA
+            if kind == KEYFRAME:
+                payload = MATRIX_META.pack(matrix_version, len(current)) + current.astype('<f4').tobytes()
+                offset = self.log.append(KEYFRAME, self.run, episode, payload)
+                self.keyframes.append((self.run, episode, offset))
+                self._since_keyframe = 0
+            else:
+                payload = (MATRIX_META.pack(matrix_version, len(changed))
+                           + changed.astype('<u4').tobytes()
+                           + current.ravel()[changed].astype('<f4').tobytes())
+                self.log.append(DELTA, self.run, episode, payload)
+                self._since_keyframe += 1
+            self._last = current.copy()
+            self._last_version = matrix_version
+            self._last_episode = episode
+            return kind
+
+    def as_of(self, episode, run=None):
+        """
+        Matrix at the end of an episode: nearest keyframe at or before it plus the deltas after it.
+
+        Args:
+            episode: Episode number within the run
+            run: Run number (default: the current one)
+
+        Returns:
+            MatrixState or None if the run has no matrix that early (or it was trimmed)
+        """
+        with self.log.lock:
+            run = self.run if run is None else run
+            k = bisect.bisect_right(self.keyframes, (run, episode, float('inf'))) - 1
+            if k < 0 or self.keyframes[k][0] != run or self.keyframes[k][2] < self.log.start:
+                return None
+            _, keyframe_episode, offset = self.keyframes[k]
+            matrix, version, applied = None, None, 0
+            for _, kind, rec_run, rec_episode, _, payload in self.log.scan(start=offset):
+                if rec_run != run or rec_episode > episode:
+                    break
+                if kind == KEYFRAME:
+                    version, n = MATRIX_META.unpack_from(payload)
+                    matrix = np.frombuffer(payload, dtype='<f4', offset=MATRIX_META.size).reshape(n, n).copy()
+                elif kind == DELTA:
+                    version, count = MATRIX_META.unpack_from(payload)
+                    cells = np.frombuffer(payload, dtype='<u4', count=count, offset=MATRIX_META.size)
+                    values = np.frombuffer(payload, dtype='<f4', offset=MATRIX_META.size + 4 * count)
+                    matrix.ravel()[cells] = values
+                    applied += 1
+            return MatrixState(run, episode, version, matrix, keyframe_episode, applied)
+
+    def events(self, run=None, since=0, limit=200):
+        """
+        Decoded non-matrix events, oldest first (the newest `limit` at or after episode `since`).
+
+        Args:
+            run: Run number (default: the current one; 0 = every run)
+        """
+        run = self.run if run is None else run
+        found = []
+        with self.log.lock:
+            for _, kind, rec_run, episode, stamp, payload in self.log.scan():
+                if kind in (KEYFRAME, DELTA) or episode < since or (run and rec_run != run):
+                    continue
+                found.append({
+                    'kind': KIND_NAMES.get(kind, str(kind)), 'run': rec_run, 'episode': episode,
+                    'time': round(stamp, 3), 'data': decode_event(kind, payload)
+                })
+        return found[-limit:] if limit else found
+
+    def stats(self):
+        with self.log.lock:
+            return {
+                'run': self.run,
+                'bytes': self.log.size - self.log.start,
+                'keyframes': sum(1 for k in self.keyframes if k[2] >= self.log.start),
+                'persistent': self.log.path is not None
+            }
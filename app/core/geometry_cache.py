@@ -0,0 +1,245 @@
+"""
+Route Geometry Cache (V5.9)
+Bounded LRU+TTL cache for OSRM route geometry with request coalescing.
+
+Routes barely change between training ticks, so identical coordinate sequences
+are answered from memory; concurrent misses for the same key share a single
+upstream fetch (single-flight), in both the threaded Flask app and ASGI mode.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+import numpy as np
+
+# "lon,lat;lon,lat;..." - at least two points, nothing that could alter the upstream URL
+COORDS_PATTERN = re.compile(r'^-?\d{1,3}(\.\d+)?,-?\d{1,2}(\.\d+)?(;-?\d{1,3}(\.\d+)?,-?\d{1,2}(\.\d+)?)+$')
+
+KEY_PRECISION = 5  # ~1 m: coordinates closer than this share a cache entry
+
+
+def coords_key(coords):
+    """
+    Normalize an OSRM coordinate string into a hashable cache key.
+
+    Returns:
+        tuple: ((lon, lat), ...) rounded to KEY_PRECISION
+    Raises:
+        ValueError: If coords is not a valid "lon,lat;lon,lat" sequence
+    """
+    if not isinstance(coords, str) or not COORDS_PATTERN.match(coords):
+        raise ValueError("Invalid coordinates")
+    return tuple(
+        (round(float(lon), KEY_PRECISION), round(float(lat), KEY_PRECISION))
+        for lon, lat in (pair.split(',') for pair in coords.split(';'))
+    )
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error = None
+
+
+class GeometryCache:
+    def __init__(self, max_entries=512, ttl=600.0):
+        """
+        Args:
+            max_entries: Maximum cached routes (LRU beyond that)
+            ttl: Seconds before an entry is considered stale
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> _InFlight (threads)
+        self._async_inflight = {}      # key -> asyncio.Future (event loop)
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'expired': 0, 'fetches': 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
+
+    def get_or_fetch(self, key, fetch, should_cache=None):
+        """
+        Return the cached value or call fetch() once for all concurrent callers.
+
+        Args:
+            key: Cache key (see coords_key)
+            fetch: Callable returning the value
+            should_cache: Optional predicate; values failing it are returned but not stored
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlight()
+                self._inflight[key] = call
+            else:
+                self._stats['coalesced'] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            with self._lock:
+                self._stats['fetches'] += 1
+            value = fetch()
+            if should_cache is None or should_cache(value):
+                self.put(key, value)
+            call.value = value
+            return value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    async def aget_or_fetch(self, key, fetch, should_cache=None):
+        """Async twin of get_or_fetch: fetch is a coroutine function."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._async_inflight.get(key)
+        if future is not None:
+            with self._lock:
+                self._stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = future
+        try:
+            with self._lock:
+                self._stats['fetches'] += 1
+            value = await fetch()
+            if should_cache is None or should_cache(value):
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: followers re-raise it themselves
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+
+# --- PAYLOAD SHRINKING ---
+
+def simplify_line(points, tolerance):
+    """
+    Douglas-Peucker simplification of an (N, 2) coordinate array.
+
+    Args:
+        points: Sequence of [lon, lat]
+        tolerance: Max perpendicular deviation (degrees) a dropped point may have
+
+    Returns:
+        numpy.ndarray: Simplified points (endpoints always kept)
+    """
+    pts = np.asarray(points, dtype=np.float64)
+    n = len(pts)
+    if n < 3 or tolerance <= 0:
+        return pts
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = pts[end] - pts[start]
+        inner = pts[start + 1:end] - pts[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0:
+            dists = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dists = np.abs(seg[0] * inner[:, 1] - seg[1] * inner[:, 0]) / seg_len
+        idx = int(np.argmax(dists))
+        if dists[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return pts[keep]
+
+
+def shrink_route_payload(payload, simplify=None, precision=None):
+    """
+    Return a copy of an OSRM GeoJSON route response with lighter geometry.
+
+    Args:
+        payload: OSRM /route JSON (geometries=geojson)
+        simplify: Douglas-Peucker tolerance in degrees (None = off)
+        precision: Decimal places kept per coordinate (None = off)
+    """
+    if not simplify and precision is None:
+        return payload
+
+    routes = []
+    for route in payload.get('routes', []):
+        route = dict(route)
+        geometry = route.get('geometry')
+        if isinstance(geometry, dict) and geometry.get('coordinates'):
+            coords = np.asarray(geometry['coordinates'], dtype=np.float64)
+            if simplify:
+                coords = simplify_line(coords, simplify)
+            if precision is not None:
+                coords = np.round(coords, int(precision))
+            route['geometry'] = dict(geometry, coordinates=coords.tolist())
+        routes.append(route)
+    return dict(payload, routes=routes)
@@ -0,0 +1,196 @@
+"""
+Hall of Fame (V5.9)
+Best tours found by the fleet, kept in bounded top-K structures:
+
+- A max-heap on distance holds at most K tours, so the current worst entry is
+  heap[0]: a candidate that cannot beat it costs one comparison, one that can
+  costs O(log K) - no scan, sort or truncate per agent per episode.
+- Dedup is exact: a tour is identified by the signature of its canonical city
+  sequence (same cycle, same direction), not by a distance within 0.01 km.
+  The same tour found again is only updated when it got shorter.
+- Every record keeps its route indices, so a winning tour can be replayed.
+
+HallOfFame combines an overall board, one board per agent and, when a store
+path is configured, an all-time board persisted as JSON that survives resets
+and restarts.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import time
+from threading import Lock
+
+import numpy as np
+
+from app.core.map_store import write_json_atomic
+
+SAVE_INTERVAL = 5.0  # Seconds between all-time board writes while it keeps changing
+
+
+def route_signature(route):
+    """
+    Stable ID of a closed tour: rotated to start at its smallest city, return leg dropped.
+
+    Returns:
+        str: 16-char hex digest
+    """
+    cycle = [int(c) for c in route]
+    if len(cycle) > 1 and cycle[0] == cycle[-1]:
+        cycle = cycle[:-1]
+    if cycle:
+        k = cycle.index(min(cycle))
+        cycle = cycle[k:] + cycle[:k]
+    return hashlib.blake2b(np.asarray(cycle, dtype='<u4').tobytes(), digest_size=8).hexdigest()
+
+
+class TopK:
+    """K shortest distinct tours; ties go to the tour found first."""
+
+    def __init__(self, k):
+        self.k = max(1, k)
+        self._heap = []     # (-distance, -seq, signature): the worst record sits at [0]
+        self._records = {}  # signature -> record (its 'seq' marks the live heap entry)
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def _worst(self):
+        """Drop stale heap entries (superseded records) until the top is live."""
+        while self._heap:
+            _, neg_seq, signature = self._heap[0]
+            record = self._records.get(signature)
+            if record is not None and record['seq'] == -neg_seq:
+                return record
+            heapq.heappop(self._heap)
+        return None
+
+    def offer(self, distance, route, agent=None, episode=None, signature=None):
+        """
+        Returns:
+            bool: True if the board changed
+        """
+        if not (distance > 0 and math.isfinite(distance)):
+            return False
+        signature = signature or route_signature(route)
+        existing = self._records.get(signature)
+        if existing is not None and distance >= existing['distance']:
+            return False
+        if existing is None and len(self._records) >= self.k:
+            worst = self._worst()
+            if distance >= worst['distance']:
+                return False  # Ties keep the tour found first
+
+        self._seq += 1
+        self._records[signature] = {
+            'agent': agent, 'distance': float(distance), 'route': tuple(int(c) for c in route),
+            'signature': signature, 'episode': episode, 'seq': self._seq
+        }
+        heapq.heappush(self._heap, (-float(distance), -self._seq, signature))
+        if len(self._records) > self.k:
+            del self._records[self._worst()['signature']]
+        if len(self._heap) > 4 * self.k:
+            # Superseded entries pile up when known tours keep improving: rebuild
+            self._heap = [(-r['distance'], -r['seq'], s) for s, r in self._records.items()]
+            heapq.heapify(self._heap)
+        return True
+
+    def records(self):
+        """Ranked records, best first (route as a tuple of city indices)."""
+        ranked = sorted(self._records.values(), key=lambda r: (r['distance'], r['seq']))
+        return [{
+            'agent': r['agent'], 'distance': round(r['distance'], 2), 'route': r['route'],
+            'signature': r['signature'], 'episode': r['episode'], 'rank': i + 1
+        } for i, r in enumerate(ranked)]
+
+    def clear(self):
+        self._heap, self._records = [], {}
+
+    def load(self, records):
+        for r in sorted(records, key=lambda r: r['rank']):
+            self.offer(r['distance'], r['route'], r.get('agent'), r.get('episode'), r.get('signature'))
+
+
+class HallOfFame:
+    def __init__(self, k=5, per_agent_k=5, store_path=None):
+        """
+        Args:
+            k: Size of the overall (and all-time) board
+            per_agent_k: Size of each agent's board
+            store_path: JSON file for the all-time board (None = no all-time board)
+        """
+        self.k = k
+        self.per_agent_k = per_agent_k
+        self.store_path = store_path
+        self.overall = TopK(k)
+        self.per_agent = {}
+        self.all_time = TopK(k) if store_path else None
+        self._dirty = False
+        self._saved_at = 0.0
+        self._lock = Lock()
+        if store_path and os.path.exists(store_path):
+            try:
+                with open(store_path, 'r', encoding='utf-8') as f:
+                    self.all_time.load(json.load(f).get('records', []))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f">>> Hall of Fame store {store_path} unreadable ({e}); starting empty")
+
+    def offer(self, agent, distance, route, episode=None):
+        """
+        Record one agent's tour on every board.
+
+        Returns:
+            bool: True if the overall board changed
+        """
+        distance = float(distance)
+        signature = route_signature(route)
+        with self._lock:
+            board = self.per_agent.get(agent)
+            if board is None:
+                board = self.per_agent[agent] = TopK(self.per_agent_k)
+            board.offer(distance, route, agent, episode, signature)
+            if self.all_time is not None and self.all_time.offer(distance, route, agent, episode, signature):
+                self._dirty = True
+            return self.overall.offer(distance, route, agent, episode, signature)
+
+    def top_records(self):
+        with self._lock:
+            return self.overall.records()
+
+    def view(self, agent=None):
+        """JSON-ready boards (one agent's board only when agent is given)."""
+        with self._lock:
+            per_agent = {name: board.records() for name, board in self.per_agent.items()
+                         if agent is None or name == agent}
+            return {
+                'overall': self.overall.records(),
+                'per_agent': per_agent,
+                'all_time': self.all_time.records() if self.all_time is not None else None
+            }
+
+    def reset(self):
+        """Forget this run's boards; the all-time board survives."""
+        with self._lock:
+            self.overall.clear()
+            self.per_agent = {}
+        self.save(force=True)
+
+    def save(self, force=False):
+        """Persist the all-time board if it changed (throttled to SAVE_INTERVAL unless forced)."""
+        if self.all_time is None:
+            return False
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._saved_at < SAVE_INTERVAL):
+                return False
+            payload = {'records': [dict(r, route=list(r['route'])) for r in self.all_time.records()]}
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            write_json_atomic(self.store_path, payload)
+        except OSError as e:
+            print(f">>> Hall of Fame save failed: {e}")
+            return False
+        return True
@@ -0,0 +1,208 @@
+"""
+Hierarchical Solver (V5.9)
+Cluster-first, route-second TSP for maps of hundreds to thousands of cities.
+
+1. Cluster: vectorized k-means on lat/lon (longitude scaled by cos(latitude)).
+2. Route: every cluster's subtour (nearest neighbour + 2-opt) is solved
+   independently - in a process pool when there are enough clusters.
+3. Order: the clusters themselves form a small TSP over the mean road distance
+   between their members.
+4. Stitch: each cluster is entered at the city closest to the previous exit and
+   walked in the direction that ends nearest the next cluster; a windowed 2-opt
+   then repairs every boundary.
+"""
+
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+import numpy as np
+
+from app.core.scenario import nearest_neighbour_tour, tour_length, two_opt
+
+CLUSTER_SIZE = 40            # Target cities per cluster (2-opt stays cheap below ~50)
+BOUNDARY_WINDOW = 12         # Cities on each side of a boundary that repair may reorder
+MIN_PARALLEL_CLUSTERS = 4    # Below this a pool round-trip costs more than it saves
+
+HierarchicalResult = namedtuple('HierarchicalResult', [
+    'route', 'distance', 'clusters', 'cluster_order', 'elapsed_ms', 'parallel'
+])
+
+
+def kmeans(points, k, iterations=50, seed=0):
+    """
+    Vectorized k-means with k-means++ seeding.
+
+    Args:
+        points: (n, 2) array
+        k: Number of clusters (clamped to n)
+
+    Returns:
+        tuple: (labels (n,) int array, centroids (k, 2) array); every cluster is non-empty
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    centroids = [points[rng.integers(n)]]
+    for _ in range(1, k):
+        d2 = ((points[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        centroids.append(points[rng.choice(n, p=d2 / total)] if total > 0 else points[rng.integers(n)])
+    centroids = np.array(centroids)
+
+    labels = np.zeros(n, dtype=np.intp)
+    for _ in range(iterations):
+        d2 = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = d2.argmin(axis=1)
+        # Re-seed an emptied cluster with the point farthest from its centroid
+        counts = np.bincount(new_labels, minlength=k)
+        for empty in np.flatnonzero(counts == 0):
+            far = int(d2[np.arange(n), new_labels].argmax())
+            new_labels[far] = empty
+            d2[far] = 0.0
+        counts = np.bincount(new_labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, new_labels, points)
+        centroids = sums / counts[:, None]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return labels, centroids
+
+
+def geo_points(cities):
+    """(n, 2) lat/lon in sorted id order, longitude scaled so distances are roughly isotropic."""
+    ids = sorted(cities.keys())
+    lat = np.array([cities[i]['lat'] for i in ids], dtype=np.float64)
+    lon = np.array([cities[i]['lon'] for i in ids], dtype=np.float64)
+    return np.column_stack([lat, lon * math.cos(math.radians(lat.mean()))]) if len(ids) else np.zeros((0, 2))
+
+
+def solve_subtour(sub_matrix):
+    """Closed subtour over a cluster (local indices), nearest neighbour + 2-opt."""
+    sub_matrix = np.asarray(sub_matrix, dtype=np.float64)
+    if len(sub_matrix) == 1:
+        return [0, 0]
+    return two_opt(sub_matrix, nearest_neighbour_tour(sub_matrix, 0))
+
+
+def _walk(matrix, cycle, entry, target):
+    """
+    Open path through a cluster's cycle starting at entry, in whichever direction
+    is cheaper including the hop from its exit towards target (member ids or None).
+    """
+    ring = cycle[:-1]
+    k = ring.index(entry)
+    forward = ring[k:] + ring[:k]
+    backward = [forward[0]] + forward[1:][::-1]
+    best, best_cost = None, math.inf
+    for path in (forward, backward):
+        cost = tour_length(matrix, path)
+        if target is not None:
+            cost += float(matrix[path[-1], target].min())
+        if cost < best_cost:
+            best, best_cost = path, cost
+    return best
+
+
+def repair_boundaries(matrix, route, boundaries, window=BOUNDARY_WINDOW):
+    """Windowed 2-opt around each stitch position (window endpoints stay fixed)."""
+    route = list(route)
+    for position in boundaries:
+        lo = max(0, position - window)
+        hi = min(len(route) - 1, position + window)
+        if hi - lo >= 4:
+            route[lo:hi + 1] = two_opt(matrix, route[lo:hi + 1])
+    return route
+
+
+class HierarchicalSolver:
+    def __init__(self, cluster_size=None, workers=None):
+        """
+        Args:
+            cluster_size: Target cities per cluster (default HIER_CLUSTER_SIZE env or CLUSTER_SIZE)
+            workers: Pool size (default HIER_WORKERS env or min(4, cpu count)); 1 = inline
+        """
+        if cluster_size is None:
+            cluster_size = int(os.getenv('HIER_CLUSTER_SIZE', str(CLUSTER_SIZE)))
+        if workers is None:
+            workers = int(os.getenv('HIER_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.cluster_size = max(2, cluster_size)
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pool_lock = Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: never fork a threaded server process
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def solve(self, cities, matrix, start=0):
+        """
+        Solve a closed tour from start over every city.
+
+        Args:
+            cities: City dict (ids 0..n-1, lat/lon)
+            matrix: (n, n) distance matrix (may be asymmetric; never modified)
+            start: Depot city
+
+        Returns:
+            HierarchicalResult
+        """
+        started = time.perf_counter()
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(matrix)
+        k = max(1, math.ceil(n / self.cluster_size))
+        labels, _ = kmeans(geo_points(cities), k)
+        members = [np.flatnonzero(labels == c) for c in range(k)]
+
+        # Per-cluster subtours (local indices -> city ids)
+        blocks = [matrix[np.ix_(m, m)] for m in members]
+        parallel = self.workers > 1 and k >= MIN_PARALLEL_CLUSTERS
+        if parallel:
+            local = list(self._get_pool().map(solve_subtour, blocks))
+        else:
+            local = [solve_subtour(block) for block in blocks]
+        cycles = [[int(m[i]) for i in tour] for m, tour in zip(members, local)]
+
+        # Top level: cluster order over mean member-to-member distance
+        home = int(labels[start])
+        if k > 1:
+            between = np.array([[matrix[np.ix_(a, b)].mean() for b in members] for a in members])
+            np.fill_diagonal(between, 0.0)
+            order = two_opt(between, nearest_neighbour_tour(between, home))[:-1]
+        else:
+            order = [home]
+
+        # Stitch: enter each cluster next to the previous exit, leave towards the next one
+        route, boundaries = [], []
+        for position, c in enumerate(order):
+            target = members[order[position + 1]] if position + 1 < len(order) else np.array([start])
+            if position == 0:
+                entry = start
+            else:
+                entry = int(members[c][matrix[route[-1], members[c]].argmin()])
+                boundaries.append(len(route))
+            route.extend(_walk(matrix, cycles[c], entry, target))
+        route.append(start)
+        boundaries.append(len(route) - 1)
+
+        route = repair_boundaries(matrix, route, boundaries)
+        return HierarchicalResult(
+            route, tour_length(matrix, route), k, [int(c) for c in order],
+            (time.perf_counter() - started) * 1000, parallel
+        )
@@ -0,0 +1,252 @@
+"""
+Episode History (V5.9)
+Every agent's result of every training episode, kept as columns:
+
+    episode u4 | agent u1 | distance f4 | cost f4 | profit f4 | epsilon f4 | states u4
+
+The newest `capacity` rows live in an in-memory ring buffer (one NumPy array
+per field, 25 bytes a row; pages are only committed as they fill). With a
+spill directory the rows are also appended, SPILL_ROWS at a time, to a
+columnar table (app/core/columnar.py), so older ranges are read back through
+np.memmap and the history survives restarts; without one the oldest rows are
+simply overwritten.
+
+Rows are stored in episode order, so an episode range is two binary searches.
+Series are answered with true rolling means (cumulative sums) and min/max/mean
+buckets (np.*.reduceat), so a chart of a million episodes costs one pass and
+returns a few hundred points. An episode that goes backwards (reset, brain
+load) drops every row at or after it.
+"""
+
+import bisect
+import os
+from threading import Lock
+
+import numpy as np
+
+from app.core.columnar import ColumnarWriter, read_columns
+
+FIELDS = [
+    ('episode', '<u4'), ('agent', '<u1'), ('distance', '<f4'), ('cost', '<f4'),
+    ('profit', '<f4'), ('epsilon', '<f4'), ('states', '<u4')
+]
+SERIES_FIELDS = ('distance', 'cost', 'profit', 'epsilon', 'states')
+CAPACITY = 1000000
+SPILL_ROWS = 4096
+
+
+class _EpisodeIndex:
+    """Sequence view of the episode column over logical rows [lo, hi) (for bisect)."""
+
+    def __init__(self, ring, disk, ring_lo, lo, hi):
+        self.ring, self.disk, self.ring_lo = ring, disk, ring_lo
+        self.lo, self.hi = lo, hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __getitem__(self, i):
+        row = self.lo + i
+        return int(self.ring[row % len(self.ring)] if row >= self.ring_lo else self.disk[row])
+
+
+def downsample(x, y, points):
+    """
+    Bucket a series into at most `points` buckets.
+
+    Returns:
+        tuple: (first x of each bucket, min, max, mean, index of each bucket's last row)
+    """
+    n = len(y)
+    if n <= points:
+        return x, y, y, y.astype(np.float64), np.arange(n)
+    starts = np.unique(np.linspace(0, n, points + 1).astype(np.intp)[:-1])
+    counts = np.diff(np.append(starts, n))
+    mean = np.add.reduceat(y, starts, dtype=np.float64) / counts
+    return x[starts], np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts), mean, starts + counts - 1
+
+
+def rolling_mean(y, window):
+    """Mean of the last `window` values at every position (shorter at the start)."""
+    c = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    hi = np.arange(1, len(y) + 1)
+    lo = np.maximum(0, hi - window)
+    return (c[hi] - c[lo]) / (hi - lo)
+
+
+class EpisodeHistory:
+    def __init__(self, agents, capacity=CAPACITY, spill_dir=None, spill_rows=SPILL_ROWS):
+        """
+        Args:
+            agents: Agent names (stored as their position, so at most 256)
+            capacity: Rows kept in memory
+            spill_dir: Columnar table directory (None = memory only); an existing
+                table is continued
+            spill_rows: Rows collected before each spill
+        """
+        self.agents = list(agents)
+        self._agent_ids = {name: i for i, name in enumerate(self.agents)}
+        self.capacity = max(1, capacity)
+        self.spill_dir = spill_dir
+        self.spill_rows = max(1, min(spill_rows, self.capacity))
+        self._ring = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in FIELDS}
+        self._lock = Lock()
+        self._writer = ColumnarWriter(spill_dir, FIELDS) if spill_dir else None
+        self.rows = self._writer.rows if self._writer else 0
+        self._spilled = self.rows
+        self._ring_start = self.rows  # Rows before this exist only on disk
+
+    # --- writing ---
+    def append(self, episode, distance, cost, profit, epsilon, states, agents=None):
+        """One training tick: a value per agent in each argument (agents default to all, in order)."""
+        ids = np.array([self._agent_ids[name] for name in (agents or self.agents)], dtype=np.uint8)
+        with self._lock:
+            if self.rows and episode < self._episode_at(self.rows - 1):
+                self._rewind(episode)
+            k = len(ids)
+            slots = np.arange(self.rows, self.rows + k) % self.capacity
+            ring = self._ring
+            ring['episode'][slots] = episode
+            ring['agent'][slots] = ids
+            ring['distance'][slots] = distance
+            ring['cost'][slots] = cost
+            ring['profit'][slots] = profit
+            ring['epsilon'][slots] = epsilon
+            ring['states'][slots] = states
+            self.rows += k
+            if self._writer is not None and self.rows - self._spilled >= self.spill_rows:
+                self._spill()
+
+    def _spill(self):
+        slots = np.arange(self._spilled, self.rows) % self.capacity
+        self._writer.write_block({name: self._ring[name][slots] for name, _ in FIELDS})
+        self._spilled = self.rows
+
+    def spill(self):
+        """Write every pending row to the spill table (checkpoints, shutdown)."""
+        with self._lock:
+            if self._writer is not None and self.rows > self._spilled:
+                self._spill()
+
+    def rewind(self, episode):
+        """Drop every row at or after episode."""
+        with self._lock:
+            self._rewind(episode)
+
+    def _rewind(self, episode):
+        cut = self._first_row(episode)
+        ring_lo = self._ring_lo()
+        self.rows = cut
+        self._ring_start = ring_lo if cut >= ring_lo else cut  # Older ring slots were overwritten
+        if self._writer is not None and self._spilled > cut:
+            self._writer.truncate(cut)
+            self._spilled = cut
+
+    # --- reading (caller holds the lock) ---
+    def _ring_lo(self):
+        return max(self._ring_start, self.rows - self.capacity)
+
+    def _disk(self, names):
+        return read_columns(self.spill_dir, names) if self._writer is not None else None
+
+    def _episode_at(self, row):
+        if row >= self._ring_lo():
+            return self._ring['episode'][row % self.capacity]
+        return self._disk(['episode'])['episode'][row]
+
+    def _first_row(self, episode):
+        """First logical row whose episode is >= episode (rows older than memory and disk count as 0)."""
+        ring_lo = self._ring_lo()
+        lo = ring_lo if self._writer is None else 0
+        disk = self._disk(['episode'])['episode'] if lo < ring_lo else None
+        return lo + bisect.bisect_left(_EpisodeIndex(self._ring['episode'], disk, ring_lo, lo, self.rows), episode)
+
+    def _columns(self, names, first, last):
+        """Logical rows [first, last) of some columns, from disk and/or the ring."""
+        ring_lo = self._ring_lo()
+        parts = {name: [] for name in names}
+        if first < ring_lo and self._writer is not None:
+            disk = self._disk(names)
+            for name in names:
+                parts[name].append(np.asarray(disk[name][first:min(last, ring_lo)]))
+        lo = max(first, ring_lo)
+        if lo < last:
+            slots = np.arange(lo, last) % self.capacity
+            for name in names:
+                parts[name].append(self._ring[name][slots])
+        return {name: np.concatenate(p) if p else np.zeros(0, dtype=dict(FIELDS)[name]) for name, p in parts.items()}
+
+    @property
+    def oldest_episode(self):
+        with self._lock:
+            lo = 0 if self._writer is not None else self._ring_lo()
+            return int(self._episode_at(lo)) if self.rows > lo else None
+
+    def series(self, field, agents=None, start=None, end=None, points=500, window=50):
+        """
+        Downsampled per-agent series of one field over episodes [start, end].
+
+        Returns:
+            dict: name -> {episode, min, max, mean, rolling (at each bucket's end), count}
+
+        Raises:
+            ValueError: On an unknown field or agent
+        """
+        if field not in SERIES_FIELDS:
+            raise ValueError(f"field must be one of {', '.join(SERIES_FIELDS)}")
+        names = list(agents or self.agents)
+        unknown = [name for name in names if name not in self._agent_ids]
+        if unknown:
+            raise ValueError(f"Unknown agents: {', '.join(unknown)}")
+        with self._lock:
+            first = self._first_row(start) if start is not None else (0 if self._writer is not None else self._ring_lo())
+            last = self._first_row(end + 1) if end is not None else self.rows
+            cols = self._columns(['episode', 'agent', field], first, max(first, last))
+
+        result = {}
+        for name in names:
+            pick = cols['agent'] == self._agent_ids[name]
+            x, y = cols['episode'][pick], cols[field][pick]
+            rolling = rolling_mean(y, max(1, window))
+            bx, bmin, bmax, bmean, ends = downsample(x, y, max(1, points))
+            result[name] = {
+                'episode': bx.tolist(),
+                'min': np.round(bmin.astype(np.float64), 4).tolist(),
+                'max': np.round(bmax.astype(np.float64), 4).tolist(),
+                'mean': np.round(bmean, 4).tolist(),
+                'rolling': np.round(rolling[ends], 4).tolist(),
+                'count': int(len(y))
+            }
+        return result
+
+    def averages(self, last=100, fields=('distance', 'cost', 'profit')):
+        """
+        Mean of each agent's last `last` episodes.
+
+        Returns:
+            dict: name -> {field: mean, 'episodes': n} (agents without history are left out)
+        """
+        with self._lock:
+            lo = max(self._ring_lo(), self.rows - last * len(self.agents))
+            cols = self._columns(['agent'] + list(fields), lo, self.rows)
+        result = {}
+        for name, agent_id in self._agent_ids.items():
+            pick = cols['agent'] == agent_id
+            if pick.any():
+                result[name] = {f: float(cols[f][pick].mean(dtype=np.float64)) for f in fields}
+                result[name]['episodes'] = int(pick.sum())
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'in_memory': self.rows - self._ring_lo(),
+                'spilled': self._spilled if self._writer is not None else 0,
+                'capacity': self.capacity,
+                'persistent': self._writer is not None
+            }
+
+
+def history_dir(root, sim_id, fingerprint):
+    return os.path.join(root, f'{sim_id}-{fingerprint}') if root else None
@@ -0,0 +1,202 @@
+"""
+Leg Geometry Store (V5.9)
+Every tour over an n-city map is made of at most n*(n-1) directed legs, so leg
+polylines are fetched (or loaded) once and any route is drawn by concatenating
+them. One OSRM call with steps=true fills every missing leg of a route at once.
+
+A failed call backs off (RETRY_BACKOFF seconds, doubling up to MAX_RETRY_BACKOFF)
+before the store asks again: while OSRM is down, routes are drawn from straight
+fallback legs instead of every request waiting out another timeout.
+"""
+
+import json
+import os
+import time
+from threading import Lock
+
+import numpy as np
+
+from app.core.map_store import write_json_atomic
+
+POLYLINE_PRECISION = 5
+RETRY_BACKOFF = 30.0        # Seconds without fetches after a failed one
+MAX_RETRY_BACKOFF = 600.0
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """
+    Encode [[lat, lon], ...] with the Google encoded polyline algorithm.
+
+    Returns:
+        str: Encoded polyline
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) == 0:
+        return ''
+    scaled = np.round(pts * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    out = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else (value << 1)
+        while value >= 0x20:
+            out.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        out.append(chr(value + 63))
+    return ''.join(out)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """
+    Decode a Google encoded polyline.
+
+    Returns:
+        numpy.ndarray: (N, 2) array of [lat, lon]
+    """
+    values = []
+    shift = result = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        result |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift = result = 0
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / float(10 ** precision)
+
+
+class LegGeometryStore:
+    def __init__(self, cities, path=None, fetch_legs=None, retry_backoff=RETRY_BACKOFF):
+        """
+        Args:
+            cities: Dict city_id -> {'lat', 'lon', ...}
+            path: Optional legs.json to load from / persist to
+            fetch_legs: Callable [[lat, lon], ...] -> list of (k, 2) leg arrays, or None on failure
+            retry_backoff: Seconds before fetching again after a failure (doubles per failure)
+        """
+        ids = sorted(cities.keys())
+        self.coords = np.array([[cities[i]['lat'], cities[i]['lon']] for i in ids], dtype=np.float64)
+        self.path = path
+        self._fetch_legs = fetch_legs
+        self._legs = {}          # (i, j) -> (k, 2) array of [lat, lon]
+        self._fallback = set()   # Straight-line legs: drawn, never persisted, retried later
+        self._lock = Lock()
+        self._fetch_lock = Lock()  # One upstream fetch at a time per map
+        self.fetches = 0
+        self.retry_backoff = retry_backoff
+        self._failures = 0       # Consecutive failed fetches
+        self._retry_at = 0.0     # time.monotonic() before which nothing is fetched
+        self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._legs)
+
+    def missing(self, route):
+        """Directed legs of route with no real (fetched) geometry yet."""
+        with self._lock:
+            return [(u, v) for u, v in zip(route[:-1], route[1:])
+                    if u != v and ((u, v) not in self._legs or (u, v) in self._fallback)]
+
+    def backing_off(self):
+        """True while a recent failed fetch keeps the store from asking upstream again."""
+        return time.monotonic() < self._retry_at
+
+    def ensure(self, route, fetch=True):
+        """
+        Make sure every leg of route has geometry, fetching missing ones in one call.
+
+        Returns:
+            int: Number of legs still drawn as straight-line fallbacks
+        """
+        if fetch and self._fetch_legs is not None and not self.backing_off() and self.missing(route):
+            with self._fetch_lock:
+                # Another request may have filled them - or failed - meanwhile
+                if not self.backing_off() and self.missing(route):
+                    self._fetch_route(route)
+
+        fallbacks = 0
+        with self._lock:
+            for u, v in zip(route[:-1], route[1:]):
+                if u == v:
+                    continue
+                if (u, v) not in self._legs:
+                    self._legs[(u, v)] = self.coords[[u, v]]
+                    self._fallback.add((u, v))
+                if (u, v) in self._fallback:
+                    fallbacks += 1
+        return fallbacks
+
+    def assemble(self, route, fetch=True):
+        """
+        Concatenate leg geometry for a route.
+
+        Returns:
+            numpy.ndarray: (N, 2) array of [lat, lon]
+        """
+        route = [int(c) for c in route]
+        if len(route) < 2:
+            return self.coords[route]
+        self.ensure(route, fetch=fetch)
+        with self._lock:
+            parts = [self._legs[(u, v)] for u, v in zip(route[:-1], route[1:]) if u != v]
+        if not parts:
+            return self.coords[route[:1]]
+        # Drop each leg's first point: it repeats the previous leg's last point
+        return np.concatenate([parts[0]] + [p[1:] for p in parts[1:]])
+
+    def encoded(self, route, fetch=True):
+        return encode_polyline(self.assemble(route, fetch=fetch))
+
+    def stats(self):
+        n = len(self.coords)
+        with self._lock:
+            real = len(self._legs) - len(self._fallback)
+            fallback = len(self._fallback)
+        return {'legs_cached': real, 'legs_fallback': fallback,
+                'legs_possible': n * (n - 1), 'fetches': self.fetches,
+                'retry_in': round(max(0.0, self._retry_at - time.monotonic()), 1)}
+
+    def _fetch_route(self, route):
+        self.fetches += 1
+        legs = self._fetch_legs(self.coords[route].tolist())
+        if not legs or len(legs) != len(route) - 1:
+            self._failures += 1
+            backoff = min(self.retry_backoff * 2 ** (self._failures - 1), MAX_RETRY_BACKOFF)
+            self._retry_at = time.monotonic() + backoff
+            return False
+        self._failures = 0
+        self._retry_at = 0.0
+        with self._lock:
+            for (u, v), leg in zip(zip(route[:-1], route[1:]), legs):
+                leg = np.asarray(leg, dtype=np.float64).reshape(-1, 2)
+                if u == v or len(leg) < 2:
+                    continue
+                self._legs[(u, v)] = leg
+                self._fallback.discard((u, v))
+        self.save()
+        return True
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            precision = data.get('precision', POLYLINE_PRECISION)
+            for key, encoded in data.get('legs', {}).items():
+                u, v = (int(x) for x in key.split('-'))
+                if u < len(self.coords) and v < len(self.coords):
+                    self._legs[(u, v)] = decode_polyline(encoded, precision)
+        except (ValueError, OSError) as e:
+            print(f">>> Leg store {self.path} unreadable ({e}). Starting empty.")
+
+    def save(self):
+        """Persist real (fetched) legs next to the distance matrix."""
+        if not self.path:
+            return None
+        with self._lock:
+            legs = {f"{u}-{v}": encode_polyline(leg) for (u, v), leg in self._legs.items()
+                    if (u, v) not in self._fallback}
+        write_json_atomic(self.path, {'version': 1, 'precision': POLYLINE_PRECISION, 'legs': legs})
+        return self.path
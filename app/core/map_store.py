@@ -0,0 +1,72 @@
+"""
+Map Store (V5.9)
+On-disk cache of per-map physics, one directory per map fingerprint:
+
+    <root>/<fingerprint>/matrix.npy   OSRM distance matrix (km, float32)
+    <root>/<fingerprint>/legs.json    Encoded city-to-city leg polylines
+    <root>/<fingerprint>/slices.npy   Optional (T, n, n) time-of-day stack (memory-mapped)
+
+Only real OSRM data is persisted; Haversine fallbacks are always recomputed so
+the routing service is retried on the next start.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def map_fingerprint(cities):
+    """
+    Stable ID for a map: hash of the ordered city coordinates.
+
+    Returns:
+        str: 16-char hex digest
+    """
+    ids = sorted(cities.keys())
+    payload = ";".join(f"{i}:{cities[i]['lat']:.6f},{cities[i]['lon']:.6f}" for i in ids)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class MapStore:
+    def __init__(self, root):
+        self.root = root
+
+    def map_dir(self, cities):
+        return os.path.join(self.root, map_fingerprint(cities))
+
+    def matrix_path(self, cities):
+        return os.path.join(self.map_dir(cities), 'matrix.npy')
+
+    def legs_path(self, cities):
+        return os.path.join(self.map_dir(cities), 'legs.json')
+
+    def slices_path(self, cities):
+        return os.path.join(self.map_dir(cities), 'slices.npy')
+
+    def load_matrix(self, cities):
+        """Return the persisted matrix for this map, or None."""
+        path = self.matrix_path(cities)
+        if not os.path.exists(path):
+            return None
+        matrix = np.load(path)
+        if matrix.shape != (len(cities), len(cities)):
+            return None
+        return matrix.astype(np.float32, copy=False)
+
+    def save_matrix(self, cities, matrix):
+        path = self.matrix_path(cities)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, np.asarray(matrix, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return path
+
+
+def write_json_atomic(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,160 @@
+"""
+Compact Training Payloads (V5.9)
+The dashboard polls /api/train four times a second, and most of each response
+repeats the last one. In compact mode a tick is sent as:
+
+- routes as city-index arrays (the city-name table is one more field, sent when
+  the map changes),
+- only the fields that differ from the version the client acknowledged
+  (`?since=<v>`), per agent for the agent rows,
+- gzip or brotli when the client accepts it and the body is large enough.
+
+    {"v": 42, "base": 41, "set": {"episode": 43, ...},
+     "agents": {"QL-Bot": {"distance": 812.4, "route": [0, 3, 1, 2, 0]}}}
+
+"base" is null when the whole state is sent (first request, or an acknowledged
+version that is no longer retained); the client then replaces its state rather
+than merging into it.
+"""
+
+import gzip
+import json
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+RETAINED_VERSIONS = 16
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+AGENT_FIELDS = ('distance', 'cost', 'profit', 'epsilon', 'color', 'cargo')
+
+
+def compact_state(tick, route_indices, city_names):
+    """
+    Compact form of a train_tick() payload.
+
+    Args:
+        tick: train_tick() result
+        route_indices: agent -> route as city indices (train_tick's indices_out)
+        city_names: City names in index order
+
+    Returns:
+        dict: Top-level fields, 'tick' (the episode every row was trained in),
+        'order' (agent names), 'agents' (name -> row with 'route' as indices),
+        'best' (Hall of Fame) and 'cities'
+    """
+    state = {key: value for key, value in tick.items() if key not in ('routes', 'best_routes')}
+    state['tick'] = tick['routes'][0]['episode'] if tick['routes'] else None
+    state['order'] = [row['agent'] for row in tick['routes']]
+    state['agents'] = {
+        row['agent']: dict({field: row[field] for field in AGENT_FIELDS if field in row},
+                           route=list(route_indices[row['agent']]))
+        for row in tick['routes']
+    }
+    state['best'] = [
+        {'agent': r['agent'], 'distance': r['distance'], 'route': list(r['route']), 'episode': r['episode']}
+        for r in tick.get('best_routes') or []
+    ]
+    state['cities'] = list(city_names)
+    return state
+
+
+def diff_state(old, new):
+    """
+    Fields of new that differ from old.
+
+    Returns:
+        dict: {'set': changed top-level fields, 'agents': name -> changed row fields}
+    """
+    changed = {key: value for key, value in new.items() if key != 'agents' and old.get(key) != value}
+    agents = {}
+    for name, row in new['agents'].items():
+        before = old['agents'].get(name, {})
+        delta = {field: value for field, value in row.items() if before.get(field) != value}
+        if delta:
+            agents[name] = delta
+    return {'set': changed, 'agents': agents}
+
+
+class PayloadEncoder:
+    """Versioned compact states of one simulation; encodes each tick against the client's version."""
+
+    def __init__(self, retained=RETAINED_VERSIONS):
+        self.retained = max(1, retained)
+        self.version = 0
+        self._states = OrderedDict()  # version -> compact state (newest last)
+        self._lock = Lock()
+
+    def encode(self, tick, route_indices, city_names, since=None):
+        """
+        Record a tick and encode it for a client that holds version `since`.
+
+        Returns:
+            dict: {'v', 'base', 'set', 'agents'}
+        """
+        state = compact_state(tick, route_indices, city_names)
+        with self._lock:
+            self.version += 1
+            version = self.version
+            self._states[version] = state
+            while len(self._states) > self.retained:
+                self._states.popitem(last=False)
+            base = self._states.get(since) if since is not None else None
+
+        if base is None:
+            return {'v': version, 'base': None,
+                    'set': {key: value for key, value in state.items() if key != 'agents'},
+                    'agents': state['agents']}
+        return dict(diff_state(base, state), v=version, base=since)
+
+
+def accepted_encoding(header):
+    """
+    Best content coding the client accepts (brotli over gzip).
+
+    Args:
+        header: Accept-Encoding header value
+
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def encode_body(obj, accept_encoding=None, min_bytes=COMPRESS_MIN_BYTES):
+    """
+    Serialize to compact JSON and compress it when worthwhile.
+
+    Returns:
+        tuple: (body bytes, content coding or None)
+    """
+    body = json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    coding = accepted_encoding(accept_encoding) if len(body) >= min_bytes else None
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), coding
+    if coding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), coding
+    return body, None
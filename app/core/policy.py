@@ -0,0 +1,184 @@
+"""
+Compiled Policies (V5.9)
+A trained agent's greedy policy distilled into a compact, read-only lookup table:
+
+    offsets   int64  [n + 1]   Row range of each current city
+    masks     uint64 [states]  Visited masks, sorted within each city's range
+    next_city uint16 [states]  Greedy action for (city, mask)
+    nearest   uint16 [n, n]    Cities by distance from each city (fallback order)
+
+next_city(city, mask) is a binary search (np.searchsorted) in one city's slice
+instead of a walk over a dict-of-dicts Q-table, and an unseen state falls back
+to the nearest unvisited city rather than to the lowest index. Artifacts are
+.npz files of a few hundred KB that load in milliseconds, so read-only HTTP
+workers answer route queries without ever holding the Q-table.
+
+Tabular agents learn tours from their depot; a closed tour is the same cycle
+from any city, so route(start) rotates the depot tour to begin and end at start.
+"""
+
+import os
+import time
+from threading import Lock
+
+import numpy as np
+
+MAX_CITIES = 64  # Visited masks must fit a uint64
+
+
+class CompiledPolicy:
+    def __init__(self, offsets, masks, next_city, nearest, meta=None):
+        self.offsets = offsets
+        self.masks = masks
+        self.next_city_table = next_city
+        self.nearest = nearest
+        self.num_cities = len(offsets) - 1
+        self.meta = dict(meta or {})
+
+    @property
+    def states(self):
+        return len(self.masks)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.masks.nbytes + self.next_city_table.nbytes + self.nearest.nbytes
+
+    def lookup(self, city, mask):
+        """Greedy action stored for (city, mask), or None for a state the agent never learned."""
+        lo, hi = int(self.offsets[city]), int(self.offsets[city + 1])
+        i = lo + int(np.searchsorted(self.masks[lo:hi], np.uint64(mask)))
+        if i < hi and int(self.masks[i]) == mask:
+            return int(self.next_city_table[i])
+        return None
+
+    def next_city(self, city, mask):
+        """
+        Returns:
+            tuple: (next city or None when every city is visited, whether the table answered)
+        """
+        action = self.lookup(city, mask)
+        if action is not None and not (mask >> action) & 1:
+            return action, True
+        for candidate in self.nearest[city]:
+            candidate = int(candidate)
+            if not (mask >> candidate) & 1:
+                return candidate, False
+        return None, False
+
+    def walk(self, city, mask):
+        """
+        Greedy completion from city with mask visited, back to the route's first city.
+
+        Returns:
+            tuple: (cities after `city` in visiting order, steps answered by the table)
+        """
+        order, hits = [], 0
+        while True:
+            city, hit = self.next_city(city, mask)
+            if city is None:
+                return order, hits
+            hits += hit
+            mask |= 1 << city
+            order.append(city)
+
+    def route(self, start=0, origin=None):
+        """
+        Closed greedy tour beginning and ending at start.
+
+        Args:
+            origin: City the tour is walked from (default: the agent's depot)
+
+        Returns:
+            tuple: (route list, fraction of steps answered by the table)
+        """
+        if not 0 <= start < self.num_cities:
+            raise ValueError(f"start must be a city index below {self.num_cities}")
+        origin = int(self.meta.get('depot', 0)) if origin is None else origin
+        order, hits = self.walk(origin, 1 << origin)
+        cycle = [origin] + order
+        k = cycle.index(start)
+        cycle = cycle[k:] + cycle[:k]
+        return cycle + [start], (hits / len(order) if order else 1.0)
+
+    def save(self, path):
+        """Write the artifact atomically (readers never see half a file)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, offsets=self.offsets, masks=self.masks, next_city=self.next_city_table,
+                     nearest=self.nearest, meta_keys=np.array(list(self.meta), dtype=str),
+                     meta_values=np.array([str(v) for v in self.meta.values()], dtype=str))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = dict(zip(data['meta_keys'].tolist(), data['meta_values'].tolist()))
+            return cls(data['offsets'], data['masks'], data['next_city'], data['nearest'], meta)
+
+    def stats(self):
+        return {'states': self.states, 'bytes': int(self.nbytes), 'cities': self.num_cities, 'meta': self.meta}
+
+
+def distill_policy(agent, matrix=None, meta=None):
+    """
+    Compile an agent's greedy Q-table policy (call under the agent's lock).
+
+    Args:
+        agent: Tabular agent with a (city, mask) -> {action: q} table
+        matrix: Distances for the nearest-city fallback (default: the agent's matrix)
+        meta: Extra string-able fields stored with the artifact
+
+    Returns:
+        CompiledPolicy
+
+    Raises:
+        ValueError: For agents without a Q-table (linear agents) or maps beyond MAX_CITIES
+    """
+    n = agent.num_cities
+    if hasattr(agent, 'weights') or n > MAX_CITIES:
+        raise ValueError(f"{agent.name} has no tabular policy to distill")
+    cities, masks, actions = [], [], []
+    for city, mask in list(agent.q_table):
+        best = agent.greedy_action(city, mask)  # Same choice as get_route
+        if best is not None:
+            cities.append(city)
+            masks.append(mask)
+            actions.append(best)
+
+    cities = np.asarray(cities, dtype=np.int64)
+    masks = np.asarray(masks, dtype=np.uint64)
+    order = np.lexsort((masks, cities))
+    offsets = np.searchsorted(cities[order], np.arange(n + 1)).astype(np.int64)
+    matrix = np.asarray(agent.dist_matrix if matrix is None else matrix, dtype=np.float64)
+    nearest = np.argsort(matrix + np.diag(np.full(n, np.inf)), axis=1, kind='stable').astype(np.uint16)
+
+    meta = dict(meta or {}, agent=agent.name, depot=agent.start_city, compiled_at=round(time.time(), 3))
+    return CompiledPolicy(offsets, masks[order], np.asarray(actions, dtype=np.uint16)[order], nearest, meta)
+
+
+class PolicyCache:
+    """Loaded artifacts keyed by path, reloaded when the file is replaced."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = Lock()
+
+    def get(self, path):
+        """
+        Returns:
+            CompiledPolicy or None if there is no artifact at path
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        policy = CompiledPolicy.load(path)
+        with self._lock:
+            self._entries[path] = (stamp, policy)
+        return policy
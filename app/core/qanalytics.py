@@ -0,0 +1,316 @@
+"""
+Q-Table Analytics (V5.9)
+Whole-table policy statistics, refreshed in the background per Q-table version.
+
+Under the agent's lock the table is only shallow-copied (one dict copy per
+state, plus the visit counters); everything else runs off-lock on flat arrays, one entry per learned
+(state, action):
+
+    city, depth, action, q        (state = (city, visited mask), depth = bits - 1)
+
+- Coverage by depth: learned states against the C(n-1, d) * d states a tour
+  can be in after d stops (np.bincount).
+- Action entropy: Boltzmann policy over each state's learned actions, Q in
+  units of the table's standard deviation (segment max / sum via
+  np.*.reduceat), normalized by log(actions) - 0 is decisive, 1 is indifferent.
+- Q-value histogram and percentiles.
+- Visitation heatmap: roads actually driven while training, per (city, next
+  city) pair (the agent's edge_visits counters), next to the learned entries
+  per pair and their mean Q (np.bincount over city * n + action).
+- Route diversity: effective number of roads driven, exp(entropy) of the
+  visit distribution - 1 for an agent that always drives one road, n(n-1) for
+  one that spreads evenly over every road.
+
+Each agent's result records the Q version it was computed from; training bumps
+the version, so results are recomputed at most every min_interval seconds and
+only for agents that trained since.
+"""
+
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+
+ENTROPY_TEMPERATURE = 1.0  # Boltzmann temperature in Q standard deviations
+ENTROPY_BINS = 10
+Q_BINS = 20
+TOP_PAIRS = 10
+
+QAnalytics = namedtuple('QAnalytics', [
+    'version', 'summary', 'visits', 'learned', 'mean_q', 'built_at', 'compute_ms'
+])
+
+# One background thread for every simulation (like the vulnerability index)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='q-analytics')
+
+
+def copy_q_table(q_table):
+    """Shallow copy of a Q-table as (state, actions) pairs. Caller holds the agent's lock."""
+    return [(state, dict(actions)) for state, actions in q_table.items()]
+
+
+def q_arrays(items):
+    """
+    Flatten copied (state, actions) pairs, skipping states without learned actions.
+
+    Returns:
+        tuple: (depth per state, entries per state, city / action / q per entry)
+    """
+    items = [(state, actions) for state, actions in items if actions]
+    k = len(items)
+    counts = np.fromiter((len(actions) for _, actions in items), dtype=np.intp, count=k)
+    total = int(counts.sum())
+    city = np.fromiter((state[0] for state, _ in items), dtype=np.intp, count=k)
+    depth = np.fromiter((int(state[1]).bit_count() - 1 for state, _ in items), dtype=np.intp, count=k)
+    action = np.fromiter((a for _, actions in items for a in actions), dtype=np.intp, count=total)
+    q = np.fromiter((v for _, actions in items for v in actions.values()), dtype=np.float64, count=total)
+    return depth, counts, np.repeat(city, counts), action, q
+
+
+def state_entropy(q, counts, temperature=ENTROPY_TEMPERATURE):
+    """
+    Normalized entropy of each multi-action state's Boltzmann policy.
+
+    Args:
+        q: Entry Q-values, grouped by state
+        counts: Entries per state (all > 0)
+
+    Returns:
+        np.ndarray: One value in [0, 1] per state with at least two actions
+    """
+    if not len(q):
+        return np.zeros(0)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    scale = q.std() * temperature
+    z = q / scale if scale > 0 else np.zeros_like(q)
+    e = np.exp(z - np.repeat(np.maximum.reduceat(z, starts), counts))
+    p = e / np.repeat(np.add.reduceat(e, starts), counts)
+    h = -np.add.reduceat(p * np.log(np.maximum(p, 1e-300)), starts)
+    multi = counts > 1
+    return np.clip(h[multi] / np.log(counts[multi]), 0.0, 1.0)
+
+
+def route_diversity(visits):
+    """Effective number of roads driven: exp(entropy) of the visit distribution (None before any)."""
+    counts = np.asarray(visits, dtype=np.float64).ravel()
+    total = counts.sum()
+    if total <= 0:
+        return None
+    p = counts[counts > 0] / total
+    return float(np.exp(-(p * np.log(p)).sum()))
+
+
+def analyze_q_table(items, num_cities, city_names=None, visits=None):
+    """
+    Policy statistics of one copied Q-table.
+
+    Args:
+        items: copy_q_table() result
+        num_cities: Cities on the map
+        city_names: Names by index for the top pairs (optional)
+        visits: Copy of the agent's edge_visits (n, n) (optional, zeros)
+
+    Returns:
+        tuple: (summary dict, visits (n, n), learned entries (n, n),
+        mean Q (n, n) - NaN where unlearned)
+    """
+    n = num_cities
+    depth, counts, city, action, q = q_arrays(items)
+    states = len(counts)
+
+    # Coverage by depth (depth 0 is the depot state itself)
+    observed = np.bincount(np.clip(depth, 0, n - 1), minlength=n)
+    coverage = []
+    for d in range(n):
+        possible = 1 if d == 0 else math.comb(n - 1, d) * d
+        coverage.append({'depth': d, 'states': int(observed[d]), 'possible': possible,
+                         'coverage': round(float(observed[d]) / possible, 6)})
+
+    entropy = state_entropy(q, counts)
+    entropy_counts, entropy_edges = np.histogram(entropy, bins=ENTROPY_BINS, range=(0.0, 1.0))
+
+    if len(q):
+        q_counts, q_edges = np.histogram(q, bins=Q_BINS)
+        p5, p50, p95 = np.percentile(q, [5, 50, 95])
+        q_stats = {'min': float(q.min()), 'max': float(q.max()), 'mean': float(q.mean()), 'std': float(q.std()),
+                   'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+    else:
+        q_counts, q_edges = np.zeros(0, dtype=np.intp), np.zeros(0)
+        q_stats = {}
+
+    pair = city * n + action
+    learned = np.bincount(pair, minlength=n * n).reshape(n, n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_q = np.bincount(pair, weights=q, minlength=n * n).reshape(n, n) / learned
+    visits = np.zeros((n, n), dtype=np.int64) if visits is None else np.asarray(visits, dtype=np.int64)
+    top = np.argsort(-visits, axis=None, kind='stable')[:TOP_PAIRS]
+    diversity = route_diversity(visits)
+    names = city_names or {}
+
+    summary = {
+        'states': states,
+        'entries': int(len(q)),
+        'coverage_by_depth': coverage,
+        'entropy': {
+            'states': int(len(entropy)),
+            'mean': round(float(entropy.mean()), 4) if len(entropy) else None,
+            'median': round(float(np.median(entropy)), 4) if len(entropy) else None,
+            'bins': np.round(entropy_edges, 2).tolist(),
+            'counts': entropy_counts.tolist()
+        },
+        'q_histogram': {
+            'bins': np.round(q_edges, 2).tolist(),
+            'counts': q_counts.tolist(),
+            **{key: round(value, 2) for key, value in q_stats.items()}
+        },
+        'steps_driven': int(visits.sum()),
+        'roads_driven': int(np.count_nonzero(visits)),
+        'route_diversity': round(diversity, 1) if diversity is not None else None,
+        'learned_pairs': int(np.count_nonzero(learned)),
+        'top_pairs': [{
+            'from': int(i // n), 'to': int(i % n),
+            'from_name': names.get(int(i // n)), 'to_name': names.get(int(i % n)),
+            'visits': int(visits.flat[i]), 'learned_entries': int(learned.flat[i]),
+            'mean_q': round(float(mean_q.flat[i]), 2) if learned.flat[i] else None
+        } for i in top if visits.flat[i] > 0]
+    }
+    return summary, visits, learned, mean_q
+
+
+class QAnalyticsTracker:
+    """Per-agent Q versions and the latest analytics; rebuilds run on the shared background thread."""
+
+    def __init__(self, names, min_interval=2.0):
+        """
+        Args:
+            names: Agent names
+            min_interval: Minimum seconds between rebuilds (training bumps versions every tick)
+        """
+        self.min_interval = min_interval
+        self.versions = {name: 0 for name in names}
+        self.latest = {}  # name -> QAnalytics (replaced, never mutated)
+        self._last_build = 0.0
+        self._pending = None
+        self._running = False
+        self._lock = Lock()
+
+    @property
+    def computing(self):
+        with self._lock:
+            return self._running
+
+    def bump(self, name, episodes=1):
+        """An agent's Q-table changed (caller holds that agent's lock)."""
+        self.versions[name] += episodes
+
+    def invalidate(self):
+        """Every Q-table was replaced (reset, brain load)."""
+        for name in self.versions:
+            self.versions[name] += 1
+
+    def stale(self):
+        latest = self.latest
+        return [name for name, version in self.versions.items()
+                if name not in latest or latest[name].version != version]
+
+    def refresh_if_stale(self, agents, locks, cities):
+        """Schedule a rebuild of every agent whose Q version moved (coalesced)."""
+        if not self.stale():
+            return
+        with self._lock:
+            self._pending = (agents, locks, cities)
+            if self._running:
+                return
+            self._running = True
+        _executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._running = False
+                    return
+            wait = self._last_build + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                with self._lock:
+                    job, self._pending = self._pending or job, None
+            try:
+                self._build(*job)
+            except Exception as e:
+                print(f">>> Q analytics failed: {e}")
+            self._last_build = time.time()
+
+    def _build(self, agents, locks, cities):
+        names = {pid: info['name'] for pid, info in cities.items()}
+        latest = dict(self.latest)
+        for name in self.stale():
+            agent = agents.get(name)
+            if agent is None:
+                continue
+            started = time.perf_counter()
+            with locks[name]:
+                version = self.versions[name]
+                items = copy_q_table(agent.q_table)
+                visits = np.array(agent.edge_visits) if getattr(agent, 'edge_visits', None) is not None else None
+            summary, visits, learned, mean_q = analyze_q_table(items, len(cities), names, visits)
+            latest[name] = QAnalytics(version, summary, visits, learned, mean_q, time.time(),
+                                      (time.perf_counter() - started) * 1000.0)
+        self.latest = latest  # Atomic reference swap
+
+    def summaries(self):
+        """name -> summary dict with its version (what snapshots carry)."""
+        return {name: dict(a.summary, version=a.version, current_version=self.versions.get(name),
+                           compute_ms=round(a.compute_ms, 1))
+                for name, a in self.latest.items()}
+
+    def wait(self, timeout=10.0):
+        """Block until no rebuild is pending (tests / CLI)."""
+        deadline = time.monotonic() + timeout
+        while self.computing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.latest
+
+
+def decision_factors(root_q, distances, epsilon, summary=None):
+    """
+    What drives the choice at the root state, weighted to 100.
+
+    - Learned preference: gap between the best and runner-up Q, in Q standard deviations
+    - Short distance: correlation between the learned Q-values and closeness
+    - Policy certainty: 1 - mean action entropy over the whole table
+    - Exploration: epsilon
+
+    Args:
+        root_q: action -> Q at the root state
+        distances: Distance row of the root city (indexed by action)
+        epsilon: Current exploration rate
+        summary: analyze_q_table() summary (optional)
+
+    Returns:
+        list: [{'factor', 'weight', 'score'}], strongest first
+    """
+    actions = sorted(root_q)
+    q = np.array([root_q[a] for a in actions], dtype=np.float64)
+    spread = (summary or {}).get('q_histogram', {}).get('std') or (q.std() if len(q) > 1 else 0.0)
+    scores = {'Exploration': float(epsilon)}
+    if len(q) > 1:
+        top2 = np.sort(q)[-2:]
+        scores['Learned preference'] = min(1.0, (top2[1] - top2[0]) / spread) if spread > 0 else 0.0
+    if len(q) > 2:
+        closeness = -np.asarray(distances, dtype=np.float64)[actions]
+        if q.std() > 0 and closeness.std() > 0:
+            scores['Short distance'] = max(0.0, float(np.corrcoef(q, closeness)[0, 1]))
+    entropy = (summary or {}).get('entropy', {}).get('mean')
+    if entropy is not None:
+        scores['Policy certainty'] = 1.0 - entropy
+    total = sum(scores.values())
+    if total <= 0:
+        return [{'factor': 'Exploration', 'weight': 100, 'score': 0.0}]
+    factors = [{'factor': name, 'weight': round(100 * score / total), 'score': round(score, 3)}
+               for name, score in scores.items()]
+    return sorted(factors, key=lambda f: -f['score'])
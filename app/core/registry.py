@@ -0,0 +1,238 @@
+"""
+Simulation Registry (V5.9)
+Keeps many independent simulations (one per regional map) alive in one process.
+
+Each entry is created lazily on first use, carries its own lock, and is evicted
+in LRU order once the registry is full or the entry has been idle too long.
+An optional checkpoint hook runs before an entry is dropped so its brain can be
+restored on the next request for the same ID.
+"""
+
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+SIM_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+class InvalidSimulationId(ValueError):
+    """Raised when a simulation ID fails validation."""
+
+
+def validate_sim_id(sim_id):
+    """
+    Validate a simulation ID (letters, digits, '-' and '_', max 32 chars).
+
+    Returns:
+        str: The validated ID
+    """
+    if not isinstance(sim_id, str) or not SIM_ID_PATTERN.match(sim_id):
+        raise InvalidSimulationId(f"Invalid simulation id: {sim_id!r}")
+    return sim_id
+
+
+class _PendingEntry:
+    """Placeholder while a simulation is being built outside the registry lock."""
+
+    def __init__(self):
+        self.ready = Event()
+        self.sim = None
+        self.error = None
+
+
+class SimulationRegistry:
+    def __init__(self, factory, max_active=8, idle_timeout=None, on_evict=None):
+        """
+        Args:
+            factory: Callable sim_id -> simulation (may be slow, e.g. OSRM fetch)
+            max_active: Maximum simulations kept in memory
+            idle_timeout: Seconds of inactivity before eviction (None = never)
+            on_evict: Optional callable (sim_id, sim) run before eviction (checkpoint)
+        """
+        self._factory = factory
+        self.max_active = max(1, int(max_active))
+        self.idle_timeout = idle_timeout
+        self._on_evict = on_evict
+
+        self._sims = OrderedDict()   # sim_id -> sim (LRU order, oldest first)
+        self._last_used = {}         # sim_id -> monotonic timestamp
+        self._pending = {}           # sim_id -> _PendingEntry
+        self._pinned = set()
+        self._lock = Lock()
+
+    def __contains__(self, sim_id):
+        with self._lock:
+            return sim_id in self._sims
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sims)
+
+    def ids(self):
+        with self._lock:
+            return list(self._sims.keys())
+
+    def items(self):
+        with self._lock:
+            return list(self._sims.items())
+
+    def idle_seconds(self, sim_id):
+        with self._lock:
+            last = self._last_used.get(sim_id)
+        return None if last is None else time.monotonic() - last
+
+    def pin(self, sim_id):
+        """Never evict this simulation (e.g. the default map)."""
+        with self._lock:
+            self._pinned.add(sim_id)
+
+    def peek(self, sim_id):
+        """Return a live simulation without creating it or touching LRU order."""
+        with self._lock:
+            return self._sims.get(sim_id)
+
+    def get(self, sim_id, create=True):
+        """
+        Return the simulation for sim_id, building it lazily if needed.
+
+        Concurrent first requests for the same ID share a single build; other
+        IDs stay available while the build runs.
+        """
+        validate_sim_id(sim_id)
+        self.evict_idle()
+
+        with self._lock:
+            sim = self._sims.get(sim_id)
+            if sim is not None:
+                self._touch(sim_id)
+                return sim
+            if not create:
+                return None
+            pending = self._pending.get(sim_id)
+            is_builder = pending is None
+            if is_builder:
+                pending = _PendingEntry()
+                self._pending[sim_id] = pending
+
+        if not is_builder:
+            pending.ready.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.sim
+
+        try:
+            sim = self._factory(sim_id)
+        except Exception as e:
+            pending.error = e
+            with self._lock:
+                self._pending.pop(sim_id, None)
+            pending.ready.set()
+            raise
+
+        self.put(sim_id, sim)
+        pending.sim = sim
+        with self._lock:
+            self._pending.pop(sim_id, None)
+        pending.ready.set()
+        return sim
+
+    def put(self, sim_id, sim):
+        """Register (or replace) a simulation, evicting LRU entries if full."""
+        validate_sim_id(sim_id)
+        with self._lock:
+            self._sims[sim_id] = sim
+            self._touch(sim_id)
+        self._shrink()
+
+    def evict(self, sim_id, checkpoint=True):
+        """
+        Drop a simulation, running the checkpoint hook first.
+
+        Returns:
+            bool: True if the simulation was evicted
+        """
+        with self._lock:
+            sim = self._sims.get(sim_id)
+        if sim is None:
+            return False
+
+        sim_lock = getattr(sim, 'lock', None)
+        if sim_lock is not None:
+            sim_lock.acquire()  # Wait for an in-flight training step to finish
+        try:
+            if checkpoint and self._on_evict is not None:
+                try:
+                    self._on_evict(sim_id, sim)
+                except Exception as e:
+                    print(f">>> Checkpoint failed for simulation '{sim_id}': {e}")
+            with self._lock:
+                if self._sims.get(sim_id) is not sim:
+                    return False
+                del self._sims[sim_id]
+                self._last_used.pop(sim_id, None)
+        finally:
+            if sim_lock is not None:
+                sim_lock.release()
+        print(f">>> Simulation '{sim_id}' evicted")
+        return True
+
+    def evict_idle(self):
+        """Evict every unpinned simulation idle longer than idle_timeout."""
+        if not self.idle_timeout:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            stale = [sid for sid, last in self._last_used.items()
+                     if sid not in self._pinned and now - last > self.idle_timeout]
+        return sum(1 for sid in stale if self.evict(sid))
+
+    def _touch(self, sim_id):
+        # Caller holds self._lock
+        self._sims.move_to_end(sim_id)
+        self._last_used[sim_id] = time.monotonic()
+
+    def _shrink(self):
+        """Evict least-recently-used simulations until within max_active."""
+        while True:
+            with self._lock:
+                if len(self._sims) <= self.max_active:
+                    return
+                candidates = [sid for sid in self._sims if sid not in self._pinned]
+            if not candidates:
+                return
+            victim = candidates[0]
+            sim = self.peek(victim)
+            sim_lock = getattr(sim, 'lock', None)
+            # Prefer idle victims: skip one that is busy training right now
+            if sim_lock is not None and sim_lock.locked() and len(candidates) > 1:
+                victim = candidates[1]
+            self.evict(victim)
+
+
+class JsonCheckpointStore:
+    """Stores simulation checkpoints as <directory>/<sim_id>.json"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, sim_id):
+        return os.path.join(self.directory, f"{validate_sim_id(sim_id)}.json")
+
+    def save(self, sim_id, payload):
+        path = self.path(sim_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)  # Atomic: never leave a half-written checkpoint
+        return path
+
+    def load(self, sim_id):
+        path = self.path(sim_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
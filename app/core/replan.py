@@ -0,0 +1,132 @@
+"""
+Route Re-planning (V5.9)
+Completes a partially driven tour: a truck at `current` that already served
+`visited` needs the best order for the remaining stops and the way back to the depot.
+
+1. Agent walk: the agent's learned greedy action for every (city, visited mask)
+   state it knows - live Q-table or compiled policy. Linear agents plan the
+   whole remainder in one walk over a boolean visited array (follow_route).
+2. Unseen states fall back to the nearest unvisited city.
+3. When any step fell back, delta 2-opt polishes the open path between the
+   fixed current city and depot: all O(m^2) move deltas in one vectorized pass
+   per move (prefix sums keep it exact on asymmetric road matrices), stopped
+   at the first local optimum or when the latency budget runs out.
+
+A 60-city completion costs well under a millisecond without 2-opt and a few
+milliseconds with it, so per-truck live re-planning fits hundreds of queries
+per second on one worker.
+"""
+
+import time
+
+import numpy as np
+
+DEFAULT_BUDGET_MS = 5.0
+MAX_BUDGET_MS = 50.0
+
+
+def two_opt_path(path, matrix, deadline=None):
+    """
+    Best-improvement 2-opt on an open path with fixed endpoints.
+
+    Args:
+        path: City indices, path[0] and path[-1] stay in place
+        matrix: Distance matrix (may be asymmetric)
+        deadline: time.perf_counter() value to stop at (None = run to a local optimum)
+
+    Returns:
+        tuple: (improved path list, moves applied)
+    """
+    p = np.asarray(path, dtype=np.intp)
+    m = len(p) - 1
+    if m < 3:
+        return [int(c) for c in p], 0
+    I, J = np.triu_indices(m, k=1)
+    keep = I >= 1  # Reverse p[i..j] for 1 <= i < j <= m-1
+    I, J = I[keep], J[keep]
+    moves = 0
+    while deadline is None or time.perf_counter() < deadline:
+        fwd = np.concatenate(([0.0], np.cumsum(matrix[p[:-1], p[1:]], dtype=np.float64)))
+        bwd = np.concatenate(([0.0], np.cumsum(matrix[p[1:], p[:-1]], dtype=np.float64)))
+        delta = (matrix[p[I - 1], p[J]] + matrix[p[I], p[J + 1]]
+                 - matrix[p[I - 1], p[I]] - matrix[p[J], p[J + 1]]
+                 + (bwd[J] - bwd[I]) - (fwd[J] - fwd[I]))
+        k = int(np.argmin(delta))
+        if delta[k] >= -1e-9:
+            break
+        i, j = I[k], J[k]
+        p[i:j + 1] = p[i:j + 1][::-1].copy()
+        moves += 1
+    return [int(c) for c in p], moves
+
+
+def follow_route(route):
+    """choose() for a remainder planned in one pass (linear agents): each city -> the stop after it."""
+    following = {int(a): int(b) for a, b in zip(route[:-1], route[1:])}
+    return lambda city, mask: following.get(city)
+
+
+def complete_route(choose, matrix, current, visited=(), depot=0, budget_ms=DEFAULT_BUDGET_MS, improve=None):
+    """
+    Remaining route of a partially driven tour.
+
+    Args:
+        choose: (city, visited mask) -> learned next city or None for an unseen state
+            (None = nearest-neighbour heuristic only)
+        matrix: Current (disaster-adjusted) distance matrix
+        current: City the truck is at
+        visited: Cities already served (current and depot are implied)
+        depot: City the tour ends at
+        budget_ms: Latency budget for 2-opt (capped at MAX_BUDGET_MS)
+        improve: 2-opt always (True), never (False) or only after a fallback (None)
+
+    Returns:
+        dict: route [current, ..., depot], distance, learned_steps, steps, source,
+            two_opt_moves, elapsed_ms
+
+    Raises:
+        ValueError: If a city index is out of range
+    """
+    started = time.perf_counter()
+    matrix = np.asarray(matrix)
+    n = len(matrix)
+    visited = [int(c) for c in visited]
+    if any(not 0 <= c < n for c in visited + [current, depot]):
+        raise ValueError(f"City indices must be below {n}")
+
+    mask = (1 << current) | (1 << depot)
+    for city in visited:
+        mask |= 1 << city
+    remaining = np.ones(n, dtype=bool)
+    remaining[[current, depot] + visited] = False
+
+    route, learned, city = [current], 0, current
+    while remaining.any():
+        action = choose(city, mask) if choose is not None else None
+        if action is not None and remaining[action]:
+            learned += 1
+        else:
+            candidates = np.flatnonzero(remaining)
+            action = int(candidates[np.argmin(matrix[city, candidates])])
+        remaining[action] = False
+        mask |= 1 << action
+        route.append(int(action))
+        city = action
+    route.append(depot)
+
+    steps = len(route) - 2
+    moves = 0
+    if improve or (improve is None and learned < steps):
+        budget = min(max(0.0, budget_ms), MAX_BUDGET_MS) / 1000.0
+        route, moves = two_opt_path(route, matrix, deadline=started + budget)
+
+    r = np.asarray(route, dtype=np.intp)
+    return {
+        'route': route,
+        'distance': float(matrix[r[:-1], r[1:]].sum()),
+        'learned_steps': learned,
+        'steps': steps,
+        'source': 'agent' if learned == steps else ('heuristic' if learned == 0 else 'mixed'),
+        'two_opt_moves': moves,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 3)
+    }
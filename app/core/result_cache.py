@@ -0,0 +1,130 @@
+"""
+Result Cache (V5.9)
+Small LRU+TTL cache for computed results: solver baselines, scenario previews.
+
+Concurrent misses for one key share a single computation (single-flight).
+submit() runs the computation on a background thread instead and answers None
+until the result is in, so a request never waits for a slow solve.
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+# One background thread for every cache (like the vulnerability index)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results')
+
+
+class _Computation:
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, max_entries=64, ttl=600.0):
+        """
+        Args:
+            max_entries: Maximum cached results (LRU beyond that)
+            ttl: Seconds before a result is considered stale
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> _Computation
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'computed': 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), computing=len(self._inflight))
+
+    def _claim(self, key):
+        """(computation, True) for the caller that must compute key, (running one, False) otherwise."""
+        with self._lock:
+            call = self._inflight.get(key)
+            if call is not None:
+                self._stats['coalesced'] += 1
+                return call, False
+            call = self._inflight[key] = _Computation()
+            return call, True
+
+    def _compute(self, key, compute, call):
+        try:
+            call.value = compute()
+            self.put(key, call.value)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats['computed'] += 1
+            call.done.set()
+
+    def get_or_compute(self, key, compute):
+        """Cached result, or compute() once for every concurrent caller (errors are re-raised)."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        call, leader = self._claim(key)
+        if leader:
+            self._compute(key, compute, call)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def submit(self, key, compute):
+        """
+        Cached result, or schedule compute() on the background thread.
+
+        Returns:
+            The result, or None while it is being computed (ask again later)
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        call, leader = self._claim(key)
+        if leader:
+            _executor.submit(self._compute_logged, key, compute, call)
+        return None
+
+    def _compute_logged(self, key, compute, call):
+        self._compute(key, compute, call)
+        if call.error is not None:
+            print(f">>> Background result {key!r} failed: {call.error}")
+
+    def wait(self, timeout=10.0):
+        """Block until no computation is in flight (tests / CLI)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._inflight:
+                    return True
+            time.sleep(0.01)
+        return False
@@ -0,0 +1,191 @@
+"""
+Scenario Engine (V5.9)
+What-if disaster previews without touching the live matrix.
+
+A preview copies the current (read-only) snapshot matrix only when the disaster
+actually reaches a city, patches just the affected rows/columns, then
+re-optimizes every agent's greedily extracted route against that scratch copy
+(seeded also with a nearest-neighbour tour, improved by delta 2-opt). Detours
+are measured against the same re-optimization on the undisturbed matrix.
+Results are cached per (disaster params, matrix version, routes).
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from app.core.result_cache import ResultCache
+
+PENALTY_CAP = 100000  # km: effectively closed road
+EARTH_RADIUS_KM = 6371.0
+
+AgentImpact = namedtuple('AgentImpact', [
+    'agent', 'route', 'distance', 'impacted_distance', 'baseline_distance',
+    'rerouted_route', 'rerouted_distance', 'rerouted_real_distance', 'penalized_legs'
+])
+ScenarioResult = namedtuple('ScenarioResult', ['affected', 'impacts', 'elapsed_ms'])
+
+
+def cities_within(cities, lat, lon, radius):
+    """
+    City ids within radius km of (lat, lon), Haversine over all cities at once.
+
+    Returns:
+        list: Sorted city ids
+    """
+    ids = np.array(sorted(cities.keys()))
+    if len(ids) == 0:
+        return []
+    lats = np.radians([cities[i]['lat'] for i in ids])
+    lons = np.radians([cities[i]['lon'] for i in ids])
+    lat0, lon0 = np.radians(lat), np.radians(lon)
+    a = np.sin((lats - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2) ** 2
+    dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return ids[dist <= radius].tolist()
+
+
+def apply_disaster(matrix, affected, multiplier, severity):
+    """
+    Penalize roads around a disaster in place, touching only affected rows/columns.
+
+    V5.1 graduated severity: L1 penalizes roads with both endpoints in the zone,
+    L2/L3 any road touching it. A road is multiplied once per affected endpoint
+    (twice when both are inside), capped at PENALTY_CAP.
+    """
+    if not affected:
+        return matrix
+    n = len(matrix)
+    idx = np.asarray(affected, dtype=np.intp)
+    diagonal = matrix[idx, idx].copy()
+
+    if severity == 1:
+        block = np.ix_(idx, idx)
+        matrix[block] = np.minimum(matrix[block] * (multiplier ** 2), PENALTY_CAP)
+    else:
+        inside = np.zeros(n, dtype=bool)
+        inside[idx] = True
+        # Rows of affected cities: x1 per endpoint inside (columns inside count twice)
+        matrix[idx, :] = np.minimum(matrix[idx, :] * np.where(inside, multiplier ** 2, multiplier), PENALTY_CAP)
+        # Columns of affected cities from outside rows
+        outside = np.ix_(~inside, idx)
+        matrix[outside] = np.minimum(matrix[outside] * multiplier, PENALTY_CAP)
+
+    matrix[idx, idx] = diagonal
+    return matrix
+
+
+def tour_length(matrix, route):
+    route = np.asarray(route, dtype=np.intp)
+    if len(route) < 2:
+        return 0.0
+    return float(matrix[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour_tour(matrix, start=0):
+    """Greedy closed tour: always drive to the closest unvisited city."""
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    route = [start]
+    current = start
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, matrix[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        route.append(current)
+    route.append(start)
+    return route
+
+
+def two_opt(matrix, route, max_rounds=200):
+    """
+    Best-improvement 2-opt on a closed tour, exact for asymmetric matrices.
+
+    Every (i, j) segment reversal is scored in one broadcast: the two new edges
+    minus the two removed ones, plus the reversed-minus-forward cost of the
+    segment interior from prefix sums.
+
+    Returns:
+        list: Improved closed tour (same start/end)
+    """
+    r = np.asarray(route, dtype=np.intp)
+    n = len(r) - 1
+    if n < 4:
+        return r.tolist()
+    ii, jj = np.triu_indices(n, k=1)
+    valid = (ii >= 1) & (jj <= n - 1)
+    ii, jj = ii[valid], jj[valid]
+
+    for _ in range(max_rounds):
+        fwd = matrix[r[:-1], r[1:]]
+        bwd = matrix[r[1:], r[:-1]]
+        cf = np.concatenate(([0.0], np.cumsum(fwd, dtype=np.float64)))
+        cb = np.concatenate(([0.0], np.cumsum(bwd, dtype=np.float64)))
+        delta = (matrix[r[ii - 1], r[jj]] + matrix[r[ii], r[jj + 1]] - fwd[ii - 1] - fwd[jj]
+                 + (cb[jj] - cb[ii]) - (cf[jj] - cf[ii]))
+        best = int(np.argmin(delta))
+        if delta[best] >= -1e-6:
+            break
+        i, j = ii[best], jj[best]
+        r[i:j + 1] = r[i:j + 1][::-1].copy()
+    return r.tolist()
+
+
+def reoptimize(matrix, route, seeds=()):
+    """Best of 2-opt from the agent's route, a nearest-neighbour tour and any extra seeds."""
+    start = int(route[0]) if len(route) else 0
+    candidates = [two_opt(matrix, seed) for seed in [route, nearest_neighbour_tour(matrix, start)] + list(seeds)]
+    return min(candidates, key=lambda c: tour_length(matrix, c))
+
+
+class ScenarioEngine:
+    def __init__(self, max_entries=256, ttl=120.0):
+        self.cache = ResultCache(max_entries=max_entries, ttl=ttl)
+
+    def preview(self, snapshot, lat, lon, radius, severity, multiplier, scope=None):
+        """
+        Re-route every agent against a scratch matrix with one extra disaster.
+
+        Args:
+            snapshot: SimulationSnapshot (read-only; never modified)
+            lat, lon, radius: Disaster zone (degrees, km)
+            severity, multiplier: V5.1 severity level and its penalty
+            scope: Extra cache key component (e.g. simulation id)
+
+        Returns:
+            ScenarioResult
+        """
+        routes = tuple((name, tuple(summary.route)) for name, summary in snapshot.agents.items())
+        key = (scope, round(lat, 5), round(lon, 5), round(radius, 3), severity, multiplier,
+               snapshot.matrix_version, routes)
+        return self.cache.get_or_compute(
+            key, lambda: self._run(snapshot, lat, lon, radius, severity, multiplier))
+
+    def _run(self, snapshot, lat, lon, radius, severity, multiplier):
+        started = time.perf_counter()
+        affected = cities_within(snapshot.cities, lat, lon, radius)
+        base = snapshot.matrix
+        if affected:
+            # Copy-on-write: only a disaster that reaches a city needs its own matrix
+            scratch = apply_disaster(np.array(base, dtype=np.float64), affected, multiplier, severity)
+        else:
+            scratch = base
+
+        impacts = []
+        for name, summary in snapshot.agents.items():
+            route = [int(c) for c in summary.route]
+            impacted = tour_length(scratch, route)
+            # Detours are measured optimizer-vs-optimizer: the same re-optimization
+            # without the disaster is the baseline, so a young agent's poor route
+            # does not show up as a negative detour
+            baseline = reoptimize(base, route)
+            rerouted = reoptimize(scratch, route, seeds=[baseline]) if affected else baseline
+            legs = np.asarray(rerouted, dtype=np.intp)
+            penalized = int(np.count_nonzero(scratch[legs[:-1], legs[1:]] > base[legs[:-1], legs[1:]] + 1e-6))
+            impacts.append(AgentImpact(
+                name, route, tour_length(base, route), impacted, tour_length(base, baseline),
+                rerouted, tour_length(scratch, rerouted), tour_length(base, rerouted), penalized
+            ))
+
+        return ScenarioResult(affected, impacts, (time.perf_counter() - started) * 1000)
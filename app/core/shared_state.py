@@ -0,0 +1,189 @@
+"""
+Shared Simulation State (V5.9)
+Cross-process mirror of published snapshots for the pre-fork deployment.
+
+The trainer process writes, per simulation:
+
+    <root>/<sim_id>/matrix-<matrix_version>.npy   Frozen matrix (readers memory-map it)
+    <root>/<sim_id>/snapshot.json                 Routes, metrics, disasters, records
+
+Both are replaced atomically (write + rename), the matrix before the JSON that
+points at it. HTTP workers re-read snapshot.json only when its inode / mtime
+changed and map each matrix version once, so a read endpoint costs one stat().
+Put the root on tmpfs (/dev/shm) and nothing ever touches a disk.
+"""
+
+import json
+import os
+from threading import Lock
+from types import MappingProxyType
+
+import numpy as np
+
+from app.core.map_store import write_json_atomic
+from app.core.snapshots import AgentSummary, SimulationSnapshot
+
+SNAPSHOT_FILE = 'snapshot.json'
+KEEP_MATRICES = 2  # Older versions are unlinked; readers still mapping one keep their view
+
+
+def snapshot_to_payload(snapshot, matrix_file):
+    """JSON-safe dict for a SimulationSnapshot (the matrix is referenced, not embedded)."""
+    return {
+        'version': snapshot.version,
+        'episode': snapshot.episode,
+        'matrix_version': snapshot.matrix_version,
+        'disruption_version': snapshot.disruption_version,
+        'matrix_file': matrix_file,
+        'cities': {str(k): dict(v) for k, v in snapshot.cities.items()},
+        'agents': [{
+            'name': s.name, 'color': s.color, 'route': list(s.route), 'distance': s.distance,
+            'epsilon': s.epsilon, 'state_count': s.state_count,
+            'root_q': {str(a): float(q) for a, q in s.root_q.items()}
+        } for s in snapshot.agents.values()],
+        'disasters': list(snapshot.disasters),
+        'reputation': snapshot.reputation,
+        'top_records': list(snapshot.top_records),
+        'published_at': snapshot.published_at,
+        'q_analytics': dict(snapshot.q_analytics)
+    }
+
+
+def payload_to_snapshot(payload, matrix):
+    """Rebuild the immutable SimulationSnapshot a worker's endpoints expect."""
+    agents = {}
+    for a in payload['agents']:
+        agents[a['name']] = AgentSummary(
+            name=a['name'], color=a['color'], route=tuple(a['route']), distance=a['distance'],
+            epsilon=a['epsilon'], state_count=a['state_count'],
+            root_q=MappingProxyType({int(k): v for k, v in a['root_q'].items()})
+        )
+    return SimulationSnapshot(
+        version=payload['version'],
+        episode=payload['episode'],
+        matrix_version=payload['matrix_version'],
+        matrix=matrix,
+        cities=MappingProxyType({int(k): v for k, v in payload['cities'].items()}),
+        agents=MappingProxyType(agents),
+        disasters=tuple(payload['disasters']),
+        reputation=payload['reputation'],
+        top_records=tuple(payload['top_records']),
+        published_at=payload['published_at'],
+        q_analytics=MappingProxyType(payload.get('q_analytics', {})),
+        disruption_version=payload.get('disruption_version', payload['matrix_version'])
+    )
+
+
+class SharedStateWriter:
+    """Trainer side: mirror each published snapshot (install as app.snapshot_mirror)."""
+
+    def __init__(self, root, keep_matrices=KEEP_MATRICES):
+        self.root = root
+        self.keep_matrices = max(1, keep_matrices)
+        self._written = {}  # sim_id -> list of matrix versions on disk (oldest first)
+        self._lock = Lock()
+
+    def __call__(self, sim_id, snapshot):
+        """app.snapshot_mirror protocol: a snapshot to publish, or None when the simulation is evicted."""
+        if snapshot is None:
+            self.discard(sim_id)
+        else:
+            self.write(sim_id, snapshot)
+
+    def write(self, sim_id, snapshot):
+        sim_dir = os.path.join(self.root, sim_id)
+        matrix_file = f'matrix-{snapshot.matrix_version}.npy'
+        with self._lock:
+            versions = self._written.setdefault(sim_id, [])
+            if snapshot.matrix_version not in versions:
+                os.makedirs(sim_dir, exist_ok=True)
+                tmp_path = os.path.join(sim_dir, matrix_file + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(snapshot.matrix, dtype=np.float32))
+                os.replace(tmp_path, os.path.join(sim_dir, matrix_file))
+                versions.append(snapshot.matrix_version)
+            write_json_atomic(os.path.join(sim_dir, SNAPSHOT_FILE), snapshot_to_payload(snapshot, matrix_file))
+            while len(versions) > self.keep_matrices:
+                stale = versions.pop(0)
+                try:
+                    os.remove(os.path.join(sim_dir, f'matrix-{stale}.npy'))
+                except FileNotFoundError:
+                    pass
+
+    def discard(self, sim_id):
+        """Remove a simulation's files (snapshot first, so workers stop reading it at once)."""
+        sim_dir = os.path.join(self.root, sim_id)
+        with self._lock:
+            versions = self._written.pop(sim_id, [])
+            for name in [SNAPSHOT_FILE] + [f'matrix-{v}.npy' for v in versions]:
+                try:
+                    os.remove(os.path.join(sim_dir, name))
+                except FileNotFoundError:
+                    pass
+
+
+class SharedStateReader:
+    """Worker side: latest snapshot per simulation, re-read only when the file changed."""
+
+    def __init__(self, root):
+        self.root = root
+        self._cache = {}  # sim_id -> (stat key, snapshot)
+        self._lock = Lock()
+
+    def exists(self, sim_id):
+        return os.path.exists(os.path.join(self.root, sim_id, SNAPSHOT_FILE))
+
+    def latest(self, sim_id):
+        """
+        Returns:
+            SimulationSnapshot or None if the trainer never published this simulation
+        """
+        path = os.path.join(self.root, sim_id, SNAPSHOT_FILE)
+        for _ in range(3):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return None
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            with self._lock:
+                cached = self._cache.get(sim_id)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            try:
+                snapshot = self._load(sim_id, path, cached[1] if cached else None)
+            except (FileNotFoundError, ValueError):
+                continue  # Replaced (or its matrix pruned) mid-read: stat again
+            with self._lock:
+                self._cache[sim_id] = (key, snapshot)
+            return snapshot
+        return cached[1] if cached else None
+
+    def _load(self, sim_id, path, previous):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if previous is not None and previous.matrix_version == payload['matrix_version']:
+            matrix = previous.matrix
+        else:
+            # Read-only mapping: every worker shares the trainer's page cache copy
+            matrix = np.load(os.path.join(self.root, sim_id, payload['matrix_file']), mmap_mode='r')
+        return payload_to_snapshot(payload, matrix)
+
+
+class SharedSimulationView:
+    """Stand-in for SimulationManager on read endpoints (sim_id, snapshots.latest, cities)."""
+
+    def __init__(self, sim_id, reader):
+        self.sim_id = sim_id
+        self._reader = reader
+
+    @property
+    def snapshots(self):
+        return self
+
+    @property
+    def latest(self):
+        return self._reader.latest(self.sim_id)
+
+    @property
+    def cities(self):
+        return self.latest.cities
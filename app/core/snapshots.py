@@ -0,0 +1,113 @@
+"""
+Simulation Snapshots (V5.9)
+Read-copy-update for dashboard endpoints.
+
+Training publishes an immutable SimulationSnapshot after every step; readers grab
+the latest reference without taking the training lock. Publishing is a single
+reference swap, so a reader always sees one complete step - never a torn one.
+"""
+
+import copy
+import time
+from collections import namedtuple
+from threading import Lock
+from types import MappingProxyType
+
+import numpy as np
+
+# Per-agent summary: everything the read endpoints need, nothing mutable
+AgentSummary = namedtuple('AgentSummary', [
+    'name', 'color', 'route', 'distance', 'epsilon', 'state_count', 'root_q'
+])
+
+SimulationSnapshot = namedtuple('SimulationSnapshot', [
+    'version', 'episode', 'matrix_version', 'matrix', 'cities',
+    'agents', 'disasters', 'reputation', 'top_records', 'published_at', 'q_analytics', 'disruption_version'
+], defaults=(MappingProxyType({}), None))
+# q_analytics: agent -> latest Q-table analytics summary
+# disruption_version: moves with disasters / sabotage / map loads, not with time-of-day slots
+
+
+def freeze_matrix(matrix):
+    """Return a read-only copy of a distance matrix."""
+    frozen = np.array(matrix, dtype=np.float32, copy=True)
+    frozen.setflags(write=False)
+    return frozen
+
+
+def summarize_agent(agent, route=None, distance=None, start_city=None):
+    """
+    Build an immutable AgentSummary. Caller must hold the agent's lock.
+
+    Args:
+        agent: TSPBaseAgent instance
+        route: Best route if already computed this step (else extracted now)
+        distance: Distance of that route
+        start_city: Root state city used for Q-value explanations (default: the agent's depot)
+    """
+    if route is None:
+        distance, route = agent.get_best_route_distance()
+    if start_city is None:
+        start_city = getattr(agent, 'start_city', 0)
+    root_state = (start_city, 1 << start_city)
+    root_q = agent.q_table[root_state] if root_state in agent.q_table else {}
+    return AgentSummary(
+        name=agent.name,
+        color=agent.color,
+        route=tuple(int(c) for c in route),
+        distance=float(distance),
+        epsilon=float(agent.epsilon),
+        state_count=len(agent.q_table),
+        root_q=MappingProxyType(dict(root_q))
+    )
+
+
+class SnapshotPublisher:
+    """Holds the latest SimulationSnapshot; writers publish, readers just read .latest"""
+
+    def __init__(self):
+        self._latest = None
+        self._version = 0
+        self._frozen_matrix = None
+        self._frozen_matrix_version = None
+        self._lock = Lock()  # Serializes writers only - readers never take it
+
+    @property
+    def latest(self):
+        return self._latest
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, episode, matrix, matrix_version, cities, summaries,
+                disasters=(), reputation=0, top_records=(), q_analytics=None, disruption_version=None):
+        """
+        Publish a new snapshot. The matrix is only copied when matrix_version changed.
+        disruption_version defaults to matrix_version (every change counts).
+
+        Returns:
+            SimulationSnapshot: The published snapshot
+        """
+        with self._lock:
+            if self._frozen_matrix is None or self._frozen_matrix_version != matrix_version:
+                self._frozen_matrix = freeze_matrix(matrix)
+                self._frozen_matrix_version = matrix_version
+
+            self._version += 1
+            snapshot = SimulationSnapshot(
+                version=self._version,
+                episode=episode,
+                matrix_version=matrix_version,
+                matrix=self._frozen_matrix,
+                cities=MappingProxyType(dict(cities)),
+                agents=MappingProxyType({s.name: s for s in summaries}),
+                disasters=tuple(copy.deepcopy(d) for d in disasters),
+                reputation=reputation,
+                top_records=tuple(dict(r) for r in top_records),
+                published_at=time.time(),
+                q_analytics=MappingProxyType(dict(q_analytics or {})),
+                disruption_version=matrix_version if disruption_version is None else disruption_version
+            )
+            self._latest = snapshot  # Atomic reference swap
+            return snapshot
@@ -0,0 +1,176 @@
+"""
+Scenario Sweep (V5.9)
+Stress-test many candidate disasters / road closures in one call.
+
+The base matrix is placed once in a SharedMemory block; pool workers map it
+read-only and only copy it for a candidate that actually changes a road
+(copy-on-write), re-route every distinct agent route with the scenario engine's
+2-opt, and the candidates come back ranked by how much longer the fleet drives.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+
+import numpy as np
+
+from app.core.scenario import apply_disaster, cities_within, reoptimize, tour_length
+
+ROAD_BLOCKED_KM = 9999999.0  # Same sentinel as TSPBaseAgent.set_road_status('blocked')
+MIN_PARALLEL_CANDIDATES = 8  # Below this a pool round-trip costs more than it saves
+
+Candidate = namedtuple('Candidate', ['kind', 'params'])
+
+
+def disaster_candidate(lat, lon, radius, severity, multiplier):
+    return Candidate('disaster', (float(lat), float(lon), float(radius), int(severity), float(multiplier)))
+
+
+def edge_candidate(u, v):
+    return Candidate('edge', (int(u), int(v)))
+
+
+def block_edge(matrix, u, v):
+    """Close a road both ways, like set_road_status(u, v, 'blocked')."""
+    matrix[u, v] = ROAD_BLOCKED_KM
+    matrix[v, u] = ROAD_BLOCKED_KM
+    return matrix
+
+
+def evaluate_candidates(base, cities, routes, baselines, candidates):
+    """
+    Score candidates against read-only base.
+
+    Args:
+        base: (n, n) matrix (never modified)
+        cities: City dict (for disaster radius lookup)
+        routes: Distinct current routes (closed tours)
+        baselines: Re-optimized routes on base, aligned with routes
+        candidates: Candidate list
+
+    Returns:
+        list: One dict per candidate (fleet-wide increase, worst route, routes hit)
+    """
+    baseline_lengths = [tour_length(base, b) for b in baselines]
+    route_lengths = [tour_length(base, r) for r in routes]
+    results = []
+    for candidate in candidates:
+        if candidate.kind == 'edge':
+            u, v = candidate.params
+            affected = [u, v]
+            scratch = block_edge(np.array(base, dtype=np.float64), u, v)
+        else:
+            lat, lon, radius, severity, multiplier = candidate.params
+            affected = cities_within(cities, lat, lon, radius)
+            scratch = apply_disaster(np.array(base, dtype=np.float64), affected, multiplier, severity) if affected else base
+
+        increase, real_detour, worst, hit = 0.0, 0.0, 0.0, 0
+        if affected:
+            for route, length, baseline, baseline_length in zip(routes, route_lengths, baselines, baseline_lengths):
+                if tour_length(scratch, route) > length + 1e-6:
+                    hit += 1
+                rerouted = reoptimize(scratch, route, seeds=[baseline])
+                delta = max(0.0, tour_length(scratch, rerouted) - baseline_length)
+                increase += delta
+                real_detour += max(0.0, tour_length(base, rerouted) - baseline_length)
+                worst = max(worst, delta)
+        results.append({
+            'kind': candidate.kind,
+            'params': list(candidate.params),
+            'affected_cities': list(affected),
+            'routes_hit': hit,
+            'total_increase': increase,
+            'worst_increase': worst,
+            'real_detour_km': real_detour
+        })
+    return results
+
+
+def _evaluate_shared(shm_name, shape, dtype, cities, routes, baselines, candidates):
+    """Pool task: map the shared base matrix read-only and evaluate a chunk."""
+    # Spawned workers share the parent's resource tracker, which unlinks the block once
+    shm = SharedMemory(name=shm_name)
+    try:
+        base = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        base.flags.writeable = False
+        results = evaluate_candidates(base, cities, routes, baselines, candidates)
+        del base
+        return results
+    finally:
+        shm.close()
+
+
+class SweepRunner:
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: Pool size (default SWEEP_WORKERS env or min(4, cpu count)); 1 = inline
+        """
+        if workers is None:
+            workers = int(os.getenv('SWEEP_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pool_lock = Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: never fork a threaded server process
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def run(self, matrix, cities, routes, candidates):
+        """
+        Evaluate and rank candidates (most damaging first).
+
+        Args:
+            matrix: Current matrix (e.g. snapshot.matrix)
+            cities: City dict
+            routes: Agent routes (duplicates are evaluated once)
+            candidates: Candidate list
+
+        Returns:
+            list: Result dicts with 'rank', sorted by total_increase desc
+        """
+        base = np.ascontiguousarray(matrix, dtype=np.float64)
+        distinct = [list(r) for r in dict.fromkeys(tuple(int(c) for c in r) for r in routes)]
+        baselines = [reoptimize(base, r) for r in distinct]
+
+        if self.workers <= 1 or len(candidates) < MIN_PARALLEL_CANDIDATES:
+            results = evaluate_candidates(base, cities, distinct, baselines, candidates)
+        else:
+            results = self._run_parallel(base, cities, distinct, baselines, candidates)
+
+        results.sort(key=lambda r: (-r['total_increase'], -r['worst_increase']))
+        for rank, result in enumerate(results, 1):
+            result['rank'] = rank
+        return results
+
+    def _run_parallel(self, base, cities, routes, baselines, candidates):
+        shm = SharedMemory(create=True, size=base.nbytes)
+        try:
+            shared = np.ndarray(base.shape, dtype=base.dtype, buffer=shm.buf)
+            shared[:] = base
+            del shared
+            chunk = max(1, -(-len(candidates) // (self.workers * 4)))
+            futures = [
+                self._get_pool().submit(_evaluate_shared, shm.name, base.shape, base.dtype.str,
+                                        cities, routes, baselines, candidates[k:k + chunk])
+                for k in range(0, len(candidates), chunk)
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,259 @@
+"""
+Capacitated VRP Solver (V5.9)
+Multi-depot, capacity and optional time windows on the existing distance matrix.
+
+1. Cluster: each stop goes to its nearest depot that can serve it alone.
+2. Construct: Clarke-Wright savings per depot (savings matrix in one broadcast).
+3. Improve: inter-route relocate / exchange with vectorized move deltas,
+   first-improvement until no move helps or the time budget runs out.
+
+Stops are node indices into the matrix; several stops may share a city (orders),
+so 200+ stops run on the 25-city map.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+VRPRoute = namedtuple('VRPRoute', ['depot', 'stops', 'load', 'distance', 'arrivals'])
+VRPSolution = namedtuple('VRPSolution', ['routes', 'unassigned', 'distance', 'iterations'])
+
+EPS = 1e-9
+CANDIDATES_PER_MOVE = 5  # Best-delta candidates checked against time windows
+
+
+class VRPProblem:
+    def __init__(self, dist_matrix, depots, demands, capacity, time_windows=None,
+                 service_time=0.0, speed_kmh=60.0):
+        """
+        Args:
+            dist_matrix: (N, N) km between nodes (may be asymmetric)
+            depots: Node indices vehicles start and end at
+            demands: Length-N demand per node (depots ignored)
+            capacity: Vehicle capacity (same unit as demands)
+            time_windows: Optional {node: (earliest, latest)} in hours from dispatch
+            service_time: Hours spent at each stop
+            speed_kmh: Average speed to convert km to hours
+        Raises:
+            ValueError: On inconsistent sizes or non-positive capacity / speed
+        """
+        self.dist = np.asarray(dist_matrix, dtype=np.float64)
+        n = len(self.dist)
+        if self.dist.shape != (n, n):
+            raise ValueError("Distance matrix must be square")
+        if capacity <= 0 or speed_kmh <= 0:
+            raise ValueError("capacity and speed_kmh must be positive")
+        self.depots = [int(d) for d in depots]
+        if not self.depots or any(d < 0 or d >= n for d in self.depots):
+            raise ValueError("depots must be valid node indices")
+
+        self.demand = np.asarray(demands, dtype=np.float64)
+        if self.demand.shape != (n,):
+            raise ValueError("demands must have one entry per node")
+        self.demand[self.depots] = 0.0
+        self.capacity = float(capacity)
+
+        self.travel = self.dist / float(speed_kmh)
+        self.service = float(service_time)
+        self.earliest = np.zeros(n)
+        self.latest = np.full(n, np.inf)
+        self.has_tw = bool(time_windows)
+        for node, (earliest, latest) in (time_windows or {}).items():
+            self.earliest[int(node)] = float(earliest)
+            self.latest[int(node)] = float(latest)
+
+        depot_set = set(self.depots)
+        self.customers = [u for u in range(n) if u not in depot_set]
+
+    def route_distance(self, depot, stops):
+        if not stops:
+            return 0.0
+        seq = np.array([depot] + list(stops) + [depot])
+        return float(self.dist[seq[:-1], seq[1:]].sum())
+
+    def schedule(self, depot, stops):
+        """Arrival hour at each stop, or None if a time window is violated."""
+        t = self.earliest[depot]
+        prev = depot
+        arrivals = []
+        for u in stops:
+            t = max(t + self.travel[prev, u], self.earliest[u])
+            if t > self.latest[u] + EPS:
+                return None
+            arrivals.append(t)
+            t += self.service
+            prev = u
+        if t + self.travel[prev, depot] > self.latest[depot] + EPS:
+            return None
+        return arrivals
+
+    def feasible(self, depot, stops):
+        return not self.has_tw or self.schedule(depot, stops) is not None
+
+
+def _cluster(problem):
+    """Assign stops to the nearest depot able to serve them alone."""
+    D = problem.dist
+    groups = {d: [] for d in problem.depots}
+    unassigned = []
+    for u in problem.customers:
+        if problem.demand[u] > problem.capacity:
+            unassigned.append(u)
+            continue
+        options = sorted(problem.depots, key=lambda d: D[d, u] + D[u, d])
+        depot = next((d for d in options if problem.feasible(d, [u])), None)
+        if depot is None:
+            unassigned.append(u)
+        else:
+            groups[depot].append(u)
+    return groups, unassigned
+
+
+def _savings(problem, depot, customers):
+    """Clarke-Wright savings for one depot; returns a list of stop lists."""
+    if not customers:
+        return []
+    D = problem.dist
+    c = np.array(customers)
+    # Joining a route ending at i with one starting at j saves D[i,0] + D[0,j] - D[i,j]
+    S = D[c, depot][:, None] + D[depot, c][None, :] - D[np.ix_(c, c)]
+    np.fill_diagonal(S, -np.inf)
+    ii, jj = np.nonzero(S > EPS)
+    order = np.argsort(-S[ii, jj], kind='stable')
+
+    routes = {u: [u] for u in customers}
+    load = {u: problem.demand[u] for u in customers}
+    route_of = {u: u for u in customers}
+    for k in order:
+        i, j = int(c[ii[k]]), int(c[jj[k]])
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj or routes[ri][-1] != i or routes[rj][0] != j:
+            continue
+        if load[ri] + load[rj] > problem.capacity + EPS:
+            continue
+        merged = routes[ri] + routes[rj]
+        if not problem.feasible(depot, merged):
+            continue
+        routes[ri] = merged
+        load[ri] += load.pop(rj)
+        for u in routes.pop(rj):
+            route_of[u] = ri
+    return list(routes.values())
+
+
+class _RouteIndex:
+    """Flat arrays (route, prev, next per stop; all edges) for vectorized deltas."""
+
+    def __init__(self, problem, routes, route_depot):
+        n = len(problem.dist)
+        self.route_of = np.full(n, -1, dtype=np.intp)
+        self.prev = np.zeros(n, dtype=np.intp)
+        self.next = np.zeros(n, dtype=np.intp)
+        edge_from, edge_to, edge_route, edge_pos = [], [], [], []
+        for r, stops in enumerate(routes):
+            seq = [route_depot[r]] + stops + [route_depot[r]]
+            for k, u in enumerate(stops):
+                self.route_of[u] = r
+                self.prev[u] = seq[k]
+                self.next[u] = seq[k + 2]
+            edge_from.extend(seq[:-1])
+            edge_to.extend(seq[1:])
+            edge_route.extend([r] * (len(seq) - 1))
+            edge_pos.extend(range(len(seq) - 1))
+        self.edge_from = np.array(edge_from, dtype=np.intp)
+        self.edge_to = np.array(edge_to, dtype=np.intp)
+        self.edge_route = np.array(edge_route, dtype=np.intp)
+        self.edge_pos = np.array(edge_pos, dtype=np.intp)  # Insert position in the stop list
+        self.load = np.array([problem.demand[stops].sum() if stops else 0.0 for stops in routes])
+
+
+def _try_relocate(problem, routes, route_depot, idx, u):
+    D = problem.dist
+    a = idx.route_of[u]
+    p, nx = idx.prev[u], idx.next[u]
+    gain = D[p, u] + D[u, nx] - D[p, nx]
+    insert = D[idx.edge_from, u] + D[u, idx.edge_to] - D[idx.edge_from, idx.edge_to]
+    delta = insert - gain
+    ok = (idx.edge_route != a) & (idx.load[idx.edge_route] + problem.demand[u] <= problem.capacity + EPS) & (delta < -EPS)
+    candidates = np.nonzero(ok)[0]
+    for e in candidates[np.argsort(delta[candidates])][:CANDIDATES_PER_MOVE]:
+        b, pos = idx.edge_route[e], idx.edge_pos[e]
+        new_a = [s for s in routes[a] if s != u]
+        new_b = routes[b][:pos] + [u] + routes[b][pos:]
+        if problem.feasible(route_depot[a], new_a) and problem.feasible(route_depot[b], new_b):
+            routes[a], routes[b] = new_a, new_b
+            return True
+    return False
+
+
+def _try_exchange(problem, routes, route_depot, idx, u, stops):
+    D = problem.dist
+    a = idx.route_of[u]
+    pu, nu = idx.prev[u], idx.next[u]
+    v = stops
+    pv, nv = idx.prev[v], idx.next[v]
+    delta = (D[pu, v] + D[v, nu] - D[pu, u] - D[u, nu]) + (D[pv, u] + D[u, nv] - D[pv, v] - D[v, nv])
+    rb = idx.route_of[v]
+    swap = problem.demand[v] - problem.demand[u]
+    ok = ((rb != a) & (idx.load[a] + swap <= problem.capacity + EPS)
+          & (idx.load[rb] - swap <= problem.capacity + EPS) & (delta < -EPS))
+    candidates = np.nonzero(ok)[0]
+    for k in candidates[np.argsort(delta[candidates])][:CANDIDATES_PER_MOVE]:
+        w, b = int(v[k]), rb[k]
+        new_a = [w if s == u else s for s in routes[a]]
+        new_b = [u if s == w else s for s in routes[b]]
+        if problem.feasible(route_depot[a], new_a) and problem.feasible(route_depot[b], new_b):
+            routes[a], routes[b] = new_a, new_b
+            return True
+    return False
+
+
+def solve_vrp(problem, time_limit=1.0):
+    """
+    Solve a (multi-depot, capacitated, time-windowed) VRP.
+
+    Args:
+        problem: VRPProblem
+        time_limit: Seconds for local search after construction
+
+    Returns:
+        VRPSolution: routes (VRPRoute list), unassigned stops, total km, improving moves applied
+    """
+    deadline = time.monotonic() + time_limit
+    groups, unassigned = _cluster(problem)
+
+    routes, route_depot = [], []
+    for depot, customers in groups.items():
+        for stops in _savings(problem, depot, customers):
+            routes.append(stops)
+            route_depot.append(depot)
+
+    served = np.array([u for stops in routes for u in stops], dtype=np.intp)
+    moves = 0
+    improved = True
+    idx = None
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for u in served.tolist():
+            if time.monotonic() >= deadline:
+                break
+            if idx is None:
+                idx = _RouteIndex(problem, routes, route_depot)
+            if _try_relocate(problem, routes, route_depot, idx, u) or \
+                    _try_exchange(problem, routes, route_depot, idx, u, served):
+                moves += 1
+                improved = True
+                idx = None
+                # Drop routes emptied by relocation
+                keep = [r for r, stops in enumerate(routes) if stops]
+                routes = [routes[r] for r in keep]
+                route_depot = [route_depot[r] for r in keep]
+
+    result = []
+    for depot, stops in zip(route_depot, routes):
+        arrivals = problem.schedule(depot, stops) or []
+        result.append(VRPRoute(depot, stops, float(problem.demand[stops].sum()),
+                               problem.route_distance(depot, stops), arrivals))
+    total = sum(r.distance for r in result)
+    return VRPSolution(result, unassigned, total, moves)
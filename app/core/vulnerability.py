@@ -0,0 +1,251 @@
+"""
+Vulnerability Index (V5.9)
+Precomputed network criticality, refreshed in the background on disruptions
+(disasters, sabotage, map loads - a new time-of-day slot keeps the index).
+
+- Edge blocking cost: how much longer a tour gets when one of its roads is
+  closed (2-opt repair around the closure), on the agents' current best tours
+  and on a nearest-neighbour tour (each 2-opt polished first).
+- City detour cost: how the length of each tour through a city changes when
+  that city becomes unreachable - every road into and out of it is closed, it
+  is dropped from the tour and the rest is repaired by 2-opt (negative when
+  the remaining stops are cheaper to serve without it).
+
+Repairs are local: 2-opt may only reorder the REPAIR_WINDOW stops on either
+side of the closed road (or dropped city), the rest of the tour stays as it
+was. Each repair is cached by its window, so a rebuild only recomputes the
+repairs whose window has a road between its own cities that changed length -
+a disaster re-prices the roads around it, not every tour through the map. Tours shorter
+than a window are repaired whole, as before.
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+
+from app.core.scenario import nearest_neighbour_tour, tour_length, two_opt
+from app.core.sweep import ROAD_BLOCKED_KM, block_edge
+
+VulnerabilityIndex = namedtuple('VulnerabilityIndex', [
+    'matrix_version', 'snapshot_version', 'edges', 'cities', 'tour_costs',
+    'city_costs', 'matrix', 'built_at', 'compute_ms', 'recomputed', 'reused', 'disruption_version', 'repairs'
+])
+
+REPAIR_WINDOW = 6  # Stops on either side of a closure that its 2-opt repair may reorder
+
+# One background thread for every simulation: index builds never compete with each other
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vulnerability')
+
+
+def tour_edges(tour):
+    return [(int(u), int(v)) for u, v in zip(tour[:-1], tour[1:]) if u != v]
+
+
+def edge_blocking_cost(matrix, tour, u, v):
+    """Tour length increase when road u-v is closed and the tour is repaired by 2-opt."""
+    blocked = block_edge(np.array(matrix, dtype=np.float64), u, v)
+    return max(0.0, tour_length(blocked, two_opt(blocked, tour)) - tour_length(matrix, tour))
+
+
+def changed_entries(old, new):
+    """Boolean (n, n) mask of the roads whose length differs between two matrices (all when incomparable)."""
+    if old is None or np.shape(old) != np.shape(new):
+        return np.ones(np.shape(new), dtype=bool)
+    return np.asarray(old) != np.asarray(new)
+
+
+def city_drop_cost(matrix, tour, c):
+    """
+    Tour length change when city c becomes unreachable: its roads are closed, it is
+    dropped from the tour and the remaining stops are repaired by 2-opt.
+    """
+    stops = [int(x) for x in tour[:-1] if x != c]
+    if len(stops) < 2:
+        return 0.0
+    blocked = np.array(matrix, dtype=np.float64)
+    blocked[c, :] = ROAD_BLOCKED_KM
+    blocked[:, c] = ROAD_BLOCKED_KM
+    blocked[c, c] = 0.0
+    repaired = two_opt(blocked, stops + stops[:1])
+    return tour_length(blocked, repaired) - tour_length(matrix, tour)
+
+
+def repair_window(tour, first, count):
+    """
+    count stops of a closed tour from cyclic position first, as an open path.
+
+    Returns:
+        tuple or None: City indices, or None when the tour is shorter than the window
+    """
+    stops = tour[:-1]
+    m = len(stops)
+    if count > m:
+        return None
+    return tuple(int(stops[(first + i) % m]) for i in range(count))
+
+
+def window_blocking_cost(matrix, window):
+    """Path length increase when the middle road of a repair window is closed (ends stay fixed)."""
+    idx = np.asarray(window, dtype=np.intp)
+    sub = matrix[np.ix_(idx, idx)].astype(np.float64)
+    path = list(range(len(idx)))
+    before = tour_length(sub, path)
+    middle = len(idx) // 2
+    block_edge(sub, middle - 1, middle)
+    return max(0.0, tour_length(sub, two_opt(sub, path)) - before)
+
+
+def window_drop_cost(matrix, window):
+    """Path length change when the middle city of a repair window is dropped (ends stay fixed)."""
+    middle = len(window) // 2
+    idx = np.asarray(window[:middle] + window[middle + 1:], dtype=np.intp)
+    sub = matrix[np.ix_(idx, idx)].astype(np.float64)
+    return tour_length(sub, two_opt(sub, list(range(len(idx))))) - tour_length(matrix, window)
+
+
+def city_detour_costs(matrix, tours):
+    """
+    Per-city detour cost summed over every tour visiting the city.
+
+    Returns:
+        numpy.ndarray: (n,) km
+    """
+    costs = np.zeros(len(matrix))
+    for tour in tours:
+        for c in set(int(x) for x in tour):
+            costs[c] += city_drop_cost(matrix, tour, c)
+    return costs
+
+
+def build_index(snapshot, previous=None):
+    """
+    Build the vulnerability index for a snapshot, reusing previous where valid.
+
+    Returns:
+        VulnerabilityIndex
+    """
+    started = time.perf_counter()
+    matrix = np.asarray(snapshot.matrix, dtype=np.float64)
+    start = int(next(iter(snapshot.agents.values())).route[0]) if snapshot.agents else 0
+    # 2-opt polish first, so a closure's cost is measured against a locally optimal
+    # tour (a young agent's random route would otherwise "improve" when blocked)
+    seeds = [[int(c) for c in s.route] for s in snapshot.agents.values()]
+    seeds.append(nearest_neighbour_tour(matrix, start))
+    tours = [list(t) for t in dict.fromkeys(tuple(two_opt(matrix, seed)) for seed in seeds)]
+
+    changed = changed_entries(previous.matrix if previous else None, matrix)
+    old_repairs = previous.repairs if previous else {}
+    # (kind, window, target) -> cost; a window of None means the whole tour is repaired
+    repairs, recomputed, reused = {}, 0, 0
+    tour_costs, city_costs = {}, {}
+    cities = np.zeros(len(matrix))
+    for tour in tours:
+        key = tuple(tour)
+        jobs = []
+        for k, (u, v) in enumerate(zip(tour[:-1], tour[1:])):
+            if u != v:
+                window = repair_window(tour, k - REPAIR_WINDOW, 2 * REPAIR_WINDOW + 2)
+                jobs.append((('edge', window or key, (int(u), int(v))), (key, k), tour_costs))
+        for p, c in enumerate(tour[:-1]):
+            window = repair_window(tour, p - REPAIR_WINDOW, 2 * REPAIR_WINDOW + 1)
+            jobs.append((('city', window or key, int(c)), (key, int(c)), city_costs))
+
+        for repair, slot, costs in jobs:
+            kind, window, target = repair
+            if repair not in repairs:
+                cached = old_repairs.get(repair)
+                # A repair only reads the roads between the cities of its window
+                idx = np.asarray(window, dtype=np.intp)
+                if cached is not None and not changed[np.ix_(idx, idx)].any():
+                    repairs[repair] = cached
+                    reused += 1
+                else:
+                    if window == key:
+                        cost = (edge_blocking_cost(matrix, tour, *target) if kind == 'edge'
+                                else city_drop_cost(matrix, tour, target))
+                    else:
+                        cost = window_blocking_cost(matrix, window) if kind == 'edge' else window_drop_cost(matrix, window)
+                    repairs[repair] = cost
+                    recomputed += 1
+            costs[slot] = repairs[repair]
+        for c in set(int(x) for x in tour[:-1]):
+            cities[c] += city_costs[(key, c)]
+
+    edges = {}
+    for (key, k), cost in tour_costs.items():
+        edge = (key[k], key[k + 1])
+        entry = edges.setdefault(edge, {'max_increase': 0.0, 'total_increase': 0.0, 'tours': 0})
+        entry['max_increase'] = max(entry['max_increase'], cost)
+        entry['total_increase'] += cost
+        entry['tours'] += 1
+
+    return VulnerabilityIndex(
+        snapshot.matrix_version, snapshot.version, edges, cities,
+        tour_costs, city_costs, matrix, time.time(), (time.perf_counter() - started) * 1000, recomputed, reused,
+        snapshot.disruption_version, repairs
+    )
+
+
+class VulnerabilityTracker:
+    """Keeps the latest index for one simulation; rebuilds run on the shared background thread."""
+
+    def __init__(self, min_interval=1.0):
+        """
+        Args:
+            min_interval: Minimum seconds between rebuilds (moving storms bump the matrix every tick)
+        """
+        self.min_interval = min_interval
+        self.latest = None
+        self._requested_version = None
+        self._pending = None
+        self._running = False
+        self._lock = Lock()
+
+    @property
+    def computing(self):
+        with self._lock:
+            return self._running
+
+    def request(self, snapshot):
+        """Schedule a rebuild for snapshot (coalesced: only the newest pending one runs)."""
+        with self._lock:
+            self._pending = snapshot
+            if self._running:
+                return
+            self._running = True
+        _executor.submit(self._drain)
+
+    def refresh_if_stale(self, snapshot):
+        """Rebuild once per disruption version (training ticks and time slots alone don't trigger it)."""
+        if self._requested_version != snapshot.disruption_version:
+            self._requested_version = snapshot.disruption_version
+            self.request(snapshot)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    self._running = False
+                    return
+            if self.latest is not None:
+                wait = self.latest.built_at + self.min_interval - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                    with self._lock:
+                        # Pick up anything newer that arrived while throttled
+                        snapshot, self._pending = self._pending or snapshot, None
+            try:
+                self.latest = build_index(snapshot, previous=self.latest)
+            except Exception as e:
+                print(f">>> Vulnerability index failed: {e}")
+
+    def wait(self, timeout=10.0):
+        """Block until no rebuild is pending (tests / CLI)."""
+        deadline = time.monotonic() + timeout
+        while self.computing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.latest
@@ -0,0 +1,39 @@
+"""
+Gunicorn config for the pre-fork serving mode (V5.9):
+
+    gunicorn -c gunicorn.conf.py
+
+The master starts one trainer process (python -m app.api.prefork) that owns every
+simulation, then forks WEB_CONCURRENCY HTTP workers that read shared snapshots and
+forward writes to the trainer (see app/api/prefork.py).
+"""
+
+import os
+import secrets
+import subprocess
+import sys
+
+bind = os.getenv('GUNICORN_BIND', f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+wsgi_app = 'app.api.prefork:create_worker_app()'
+timeout = 120  # Sweeps / VRP solves run inside workers
+
+_trainer = None
+
+
+def on_starting(server):
+    global _trainer
+    # One secret per deployment; workers inherit it from the master's environment
+    os.environ.setdefault('TRAINER_AUTHKEY', secrets.token_hex(16))
+    _trainer = subprocess.Popen([sys.executable, '-m', 'app.api.prefork'], env=os.environ.copy())
+    server.log.info("Trainer process started (pid %s)", _trainer.pid)
+
+
+def on_exit(server):
+    if _trainer is not None and _trainer.poll() is None:
+        _trainer.terminate()
+        try:
+            _trainer.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _trainer.kill()
@@ -29,6 +29,12 @@ def app():
     return flask_app
 
 
+@pytest.fixture
+def flask_module():
+    """Get the loaded app.py module (simulation registry, config, helpers)."""
+    return app_module
+
+
 @pytest.fixture
 def client(app):
     """Create a test client for the Flask application."""
@@ -4,7 +4,13 @@ Tests for Flask routes, API endpoints, and core functionality.
 """
 
 import pytest
+import io
+import gzip
 import json
+import os
+import subprocess
+import sys
+import numpy as np
 
 
 class TestFlaskApp:
@@ -33,6 +39,31 @@ class TestFlaskApp:
         assert 'version' in data
         assert 'cities' in data
 
+    @pytest.mark.api
+    def test_readiness_follows_warmup(self, client, flask_module):
+        """Test that /health/ready turns 200 once the default simulation exists."""
+        flask_module.start_warmup().join(timeout=30)
+        response = client.get('/health/ready')
+        assert response.status_code == 200
+        assert json.loads(client.get('/health').data)['ready'] is True
+
+    @pytest.mark.unit
+    def test_import_is_lazy(self):
+        """Test that importing app.py builds no simulation and tsp_agent skips requests."""
+        code = (
+            "import importlib.util, sys\n"
+            "import tsp_agent\n"
+            "assert 'requests' not in sys.modules\n"
+            "spec = importlib.util.spec_from_file_location('twin', 'app.py')\n"
+            "module = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(module)\n"
+            "assert len(module.registry) == 0 and not module.is_ready()\n"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True,
+                                timeout=60, env=dict(os.environ, MAP_DATA_DIR=''))
+        assert result.returncode == 0, result.stderr
+
     @pytest.mark.api
     def test_get_cities_endpoint(self, client):
         """Test the /get_cities endpoint."""
@@ -41,6 +72,397 @@ class TestFlaskApp:
         data = json.loads(response.data)
         assert isinstance(data, dict)  # Should return cities dictionary
 
+    @pytest.mark.api
+    def test_simulations_are_isolated(self, client):
+        """Test that disasters in one simulation do not leak into another."""
+        response = client.post('/api/disaster?sim=test-isolated', json={
+            'lat': -6.9, 'lon': 109.1, 'severity': 2, 'radius': 50
+        })
+        assert response.status_code == 200
+
+        isolated = json.loads(client.get('/api/disasters?sim=test-isolated').data)
+        default = json.loads(client.get('/api/disasters').data)
+        assert isolated['count'] == 1
+        assert default['count'] == 0
+
+        response = client.delete('/api/sims/test-isolated')
+        assert response.status_code == 200
+
+    @pytest.mark.api
+    def test_invalid_simulation_id(self, client):
+        """Test that malformed simulation IDs are rejected."""
+        response = client.get('/api/disasters?sim=not valid!')
+        assert response.status_code == 400
+
+    @pytest.mark.api
+    def test_route_polylines_endpoint(self, client):
+        """Test that every agent route comes back as an encoded polyline."""
+        response = client.get('/api/route_polylines?fetch=0')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert len(data['routes']) == 5
+        for entry in data['routes']:
+            assert entry['polyline']
+            assert entry['points'] == len(entry['route'])  # Straight legs: one point per city
+
+    @pytest.mark.api
+    def test_fleet_matrix_endpoint(self, client):
+        """Test the route x vehicle x cargo grid for posted distances."""
+        response = client.post('/api/fleet_matrix', json={'distances': [100, 250.5], 'cargo': ['general', 'cold']})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert len(data['cost']) == 2
+        assert len(data['cost'][0]) == len(data['vehicles'])
+        assert len(data['cost'][0][0]) == 2
+        assert len(data['best']) == 2
+
+        response = client.post('/api/fleet_matrix', json={'distances': [-1]})
+        assert response.status_code == 400
+
+    @pytest.mark.api
+    def test_vrp_endpoint(self, client):
+        """Test multi-depot dispatch of repeated orders with costs per vehicle."""
+        orders = [{'city': c % 25, 'demand': 1} for c in range(1, 60) if c % 25 not in (0, 10, 19)]
+        response = client.post('/api/vrp', json={'orders': orders, 'capacity': 8, 'time_limit': 0.2})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        served = sorted(o for v in data['vehicles'] for o in v['orders'])
+        assert served == list(range(len(orders)))
+        assert all(v['load'] <= 8 for v in data['vehicles'])
+        assert data['total_cost'] > 0
+
+        response = client.post('/api/vrp', json={'depots': [99]})
+        assert response.status_code == 400
+
+    @pytest.mark.api
+    def test_disaster_impact_reroutes(self, client):
+        """Test that the what-if preview reports real re-routed distances."""
+        response = client.post('/api/disaster_impact', json={
+            'lat': -6.8797, 'lon': 109.1256, 'severity': 3, 'radius': 30
+        })
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['impact_summary']['affected_cities_count'] >= 1
+        for impact in data['agent_impacts']:
+            assert impact['rerouted_distance'] <= impact['impacted_distance']
+        assert json.loads(client.get('/api/disasters').data)['count'] == 0
+
+    @pytest.mark.api
+    def test_scenario_sweep_endpoint(self, client):
+        """Test that a mixed sweep returns a ranked criticality report."""
+        response = client.post('/api/scenario_sweep', json={
+            'edges': 'route_edges',
+            'grid': {'lat': [-7.5, -6.5, 2], 'lon': [107, 112, 2], 'severity': [3]},
+            'top': 5
+        })
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['candidates'] >= 4
+        assert [r['rank'] for r in data['ranking']] == list(range(1, len(data['ranking']) + 1))
+
+        response = client.post('/api/scenario_sweep', json={})
+        assert response.status_code == 400
+
+    @pytest.mark.api
+    def test_vulnerability_endpoint(self, client, flask_module):
+        """Test that the background index is served once built."""
+        flask_module.sim_manager.vulnerability.wait()
+        response = client.get('/api/vulnerability?top=3')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert len(data['roads']) == 3
+        assert data['roads'][0]['max_increase'] >= data['roads'][-1]['max_increase']
+
+
+    @pytest.mark.api
+    def test_time_slices_clock_drives_matrix(self, client, flask_module, monkeypatch):
+        """Test that rush hour changes the matrix and training advances the clock."""
+        response = client.post('/api/time_slices?sim=clocktest', json={
+            'profile': 'rush_hour', 'clock': '03:00', 'minutes_per_episode': 240
+        })
+        assert response.status_code == 200
+        sim = flask_module.registry.get('clocktest')
+        night = sim.snapshots.latest.matrix.copy()
+
+        data = json.loads(client.get('/api/train?sim=clocktest').data)
+        assert data['clock'] == '03:00'
+        status = json.loads(client.get('/api/time_slices?sim=clocktest').data)
+        assert status['clock'] == '07:00' and status['slot'] == 7
+
+        client.get('/api/train?sim=clocktest')
+        rush = sim.snapshots.latest.matrix
+        assert rush.sum() > night.sum()
+
+        # Sabotage survives slot changes; a slot change is a config event, not a new disruption
+        names = [sim.cities[0]['name'], sim.cities[1]['name']]
+        client.post('/api/sabotage?sim=clocktest', json={'from': names[0], 'to': names[1], 'status': 'blocked'})
+        disruption, keyframes = sim.disruption_version, sim.replay.stats()['keyframes']
+        disturbed = []
+        monkeypatch.setattr(sim.convergence, 'disturb', lambda names=None: disturbed.append(names))
+        for _ in range(3):
+            sim.train_tick()  # /api/train is rate limited
+        assert len(disturbed) == 1  # The sabotage, not the three new slots
+        latest = sim.snapshots.latest
+        assert latest.matrix[0, 1] == latest.matrix[1, 0] == 9999999.0
+        assert latest.disruption_version == disruption and sim.replay.stats()['keyframes'] == keyframes
+        events = json.loads(client.get('/api/events?sim=clocktest').data)['events']
+        assert sum(e['data'].get('action') == 'time_slot' for e in events) >= 3
+        client.post('/api/sabotage?sim=clocktest', json={'from': names[0], 'to': names[1], 'status': 'open'})
+        assert sim.snapshots.latest.matrix[0, 1] < 9999999.0 and sim.disruption_version == disruption + 1
+
+        response = client.post('/api/time_slices?sim=clocktest', json={'clock': '25:00'})
+        assert response.status_code == 400
+        response = client.post('/api/time_slices?sim=clocktest', json={'interpolate': 'false'})
+        assert response.status_code == 400 and sim.interpolate_slices is False
+
+    @pytest.mark.api
+    def test_matrix_as_of_replays_disasters(self, client, flask_module):
+        """Test that the journal records a disaster and replays the matrix before and after it."""
+        client.get('/api/reset?sim=journal')
+        client.get('/api/train?sim=journal')
+        sim = flask_module.registry.get('journal')
+        before = sim.snapshots.latest.matrix.copy()
+
+        client.post('/api/disaster?sim=journal', json={'lat': -7.25, 'lon': 112.75, 'severity': 3, 'radius': 30})
+        client.get('/api/train?sim=journal')
+        after = sim.snapshots.latest.matrix.copy()
+        assert not np.array_equal(before, after)
+
+        data = json.loads(client.get('/api/matrix_as_of?sim=journal&episode=0').data)
+        assert np.allclose(data['matrix'], before, atol=1e-3)
+        response = client.get('/api/matrix_as_of?sim=journal&format=npy')
+        assert np.array_equal(np.load(io.BytesIO(response.data)), after)
+        assert client.get('/api/matrix_as_of?sim=journal&episode=-1').status_code == 400
+        assert client.get('/api/matrix_as_of?sim=journal&episode=99999').status_code == 404
+
+        events = json.loads(client.get('/api/events?sim=journal').data)['events']
+        assert [e['kind'] for e in events] == ['reset', 'disaster_add']
+        assert events[1]['episode'] == 1 and events[1]['data']['severity'] == 3
+
+    @pytest.mark.api
+    def test_hall_of_fame_boards_and_reset(self, client, flask_module, monkeypatch, tmp_path):
+        """Test that the boards hold replayable tours and only the all-time board survives a reset."""
+        monkeypatch.setattr(flask_module, 'HALL_OF_FAME_DIR', str(tmp_path))
+        for _ in range(3):
+            train = json.loads(client.get('/api/train?sim=halltest').data)
+        assert train['best_routes'] and 'route' in train['best_routes'][0]
+
+        data = json.loads(client.get('/api/hall_of_fame?sim=halltest').data)
+        best = data['overall'][0]
+        assert data['persistent'] and len(data['per_agent']) == 5
+        assert best['route'][0] == best['route'][-1] == 0 and len(best['path']) == len(best['route'])
+        assert best['current_distance'] == pytest.approx(best['distance'], abs=0.01)
+        assert len({r['signature'] for r in data['overall']}) == len(data['overall'])
+
+        client.get('/api/reset?sim=halltest')
+        data = json.loads(client.get('/api/hall_of_fame?sim=halltest').data)
+        assert data['overall'] == [] and data['all_time'][0]['distance'] == best['distance']
+
+    @pytest.mark.api
+    def test_convergence_schedule_and_budget(self, client, flask_module):
+        """Test that training applies the epsilon schedule and paused agents hand their episodes over."""
+        schedule = {'kind': 'exponential', 'decay': 0.5, 'end': 0.05}
+        data = json.loads(client.post('/api/convergence?sim=convtest', json={'schedule': schedule}).data)
+        assert data['enabled'] and data['schedule']['decay'] == 0.5 and data['counts'] == {'learning': 5}
+
+        train = json.loads(client.get('/api/train?sim=convtest').data)
+        assert all(r['epsilon'] == 0.5 for r in train['routes'])
+
+        sim = flask_module.registry.get('convtest')
+        for name in ('QL-Bot', 'Sarsa-Bot'):
+            sim.convergence.progress[name].status = 'paused'
+        train = json.loads(client.get('/api/train?sim=convtest').data)
+        data = json.loads(client.get('/api/convergence?sim=convtest').data)
+        assert data['agents']['QL-Bot']['last_tick_episodes'] == 0 and len(train['routes']) == 5
+        assert sum(a['last_tick_episodes'] for a in data['agents'].values()) == 5
+
+        data = json.loads(client.post('/api/convergence?sim=convtest', json={'resume': True}).data)
+        assert data['counts'] == {'learning': 5}
+        assert client.post('/api/convergence?sim=convtest', json={'schedule': {'kind': 'cosine'}}).status_code == 400
+        assert client.post('/api/convergence?sim=convtest', json={'resume': ['Nobody']}).status_code == 400
+
+    @pytest.mark.api
+    def test_compiled_policy_route(self, client, flask_module, monkeypatch, tmp_path):
+        """Test that a compiled policy answers route queries from any start without the Q-table."""
+        monkeypatch.setattr(flask_module, 'POLICY_DIR', str(tmp_path))
+        assert client.get('/api/policy/route?sim=policytest&agent=QL-Bot').status_code == 404
+        for _ in range(3):
+            client.get('/api/train?sim=policytest')
+
+        data = json.loads(client.post('/api/policy/compile?sim=policytest', json={'agents': ['QL-Bot']}).data)
+        assert data['policies']['QL-Bot']['states'] > 0
+        sim = flask_module.registry.get('policytest')
+        sim.agents['QL-Bot'].q_table.clear()  # Serving never touches the live table
+
+        data = json.loads(client.get('/api/policy/route?sim=policytest&agent=QL-Bot&start=2').data)
+        assert data['route'][0] == data['route'][-1] == 2 and len(data['path']) == len(sim.cities) + 1
+        assert sorted(data['route'][:-1]) == list(range(len(sim.cities)))
+        assert client.get('/api/policy/route?sim=policytest&agent=QL-Bot&start=999').status_code == 400
+        assert client.post('/api/policy/compile?sim=policytest', json={'agents': ['Nobody']}).status_code == 400
+
+    @pytest.mark.api
+    def test_replan_from_partial_route(self, client, flask_module, monkeypatch, tmp_path):
+        """Test that a truck mid-tour gets the remaining stops from the live agent or its compiled policy."""
+        monkeypatch.setattr(flask_module, 'POLICY_DIR', str(tmp_path))
+        for _ in range(3):
+            client.get('/api/train?sim=replantest')
+        sim = flask_module.registry.get('replantest')
+        names = [sim.cities[i]['name'] for i in range(len(sim.cities))]
+
+        body = {'agent': 'QL-Bot', 'current': names[5], 'visited': [1, 2, names[3]]}
+        data = json.loads(client.post('/api/replan?sim=replantest', json=body).data)
+        assert data['route'][0] == 5 and data['route'][-1] == 0 and data['policy'] == 'agent'
+        assert sorted(data['route'][1:-1]) == [c for c in range(len(names)) if c not in (0, 1, 2, 3, 5)]
+        assert data['path'][0] == names[5] and data['steps'] == len(names) - 5
+
+        assert client.post('/api/replan?sim=replantest', json=dict(body, source='policy')).status_code == 404
+        client.post('/api/policy/compile?sim=replantest', json={'agents': ['QL-Bot']})
+        data = json.loads(client.post('/api/replan?sim=replantest', json=dict(body, source='policy')).data)
+        assert data['policy'] == 'policy' and data['route'][0] == 5
+
+        assert client.post('/api/replan?sim=replantest', json={'current': 'Atlantis'}).status_code == 400
+        assert client.post('/api/replan?sim=replantest', json={'visited': [1]}).status_code == 400
+        assert client.post('/api/replan?sim=replantest', json=[body]).status_code == 400
+        assert client.post('/api/replan?sim=replantest', json=dict(body, improve='false')).status_code == 400
+
+    @pytest.mark.api
+    def test_evaluate_routes_json_binary_and_streamed(self, client, flask_module, monkeypatch):
+        """Test that bulk scoring agrees across JSON, raw binary and .npy bodies, streamed or not."""
+        snapshot = flask_module.default_simulation().snapshots.latest
+        n = len(snapshot.cities)
+        routes = np.array([np.roll(np.arange(n), k) for k in range(5)], dtype=np.uint16)
+        expected = [flask_module.tour_length(snapshot.matrix, list(r) + [r[0]]) for r in routes]
+
+        data = json.loads(client.post('/api/evaluate_routes', json={'routes': routes.tolist(), 'closed': True,
+                                                                     'config': {'v': 'ev', 'c': 'cold'}}).data)
+        assert data['count'] == 5 and all(data['complete'])
+        assert data['distance'] == pytest.approx(expected, abs=0.01)
+
+        monkeypatch.setattr(flask_module, 'EVALUATE_STREAM_ROWS', 2)
+        response = client.post(f'/api/evaluate_routes?length={n}&closed=true&v=ev&c=cold', data=routes.tobytes(),
+                               content_type='application/octet-stream')
+        assert response.status_code == 200 and response.is_streamed
+        streamed = json.loads(response.data)
+        assert streamed['distance'] == data['distance'] and streamed['profit'] == data['profit']
+
+        buffer = io.BytesIO()
+        np.save(buffer, np.concatenate([routes, routes[:, :1]], axis=1).astype(np.int32))
+        response = client.post('/api/evaluate_routes?format=npy&v=ev&c=cold', data=buffer.getvalue(),
+                               content_type='application/x-npy')
+        records = np.load(io.BytesIO(response.data))
+        assert records['distance'] == pytest.approx(expected, abs=0.01) and records['complete'].all()
+
+        for body in ({'routes': [[0, n]]}, {'routes': []}, {'routes': [[0, 1]], 'configs': [{}, {}]}, [[0, 1]],
+                     {'routes': [[0, 1]], 'closed': 'false'}, {'routes': [[0, 1]], 'config': {'v': 'rocket'}}):
+            assert client.post('/api/evaluate_routes', json=body).status_code == 400
+        assert client.post(f'/api/evaluate_routes?length={n}&c=gold', data=routes.tobytes(),
+                           content_type='application/octet-stream').status_code == 400
+        assert client.post('/api/evaluate_routes?length=3', data=b'\x00' * 5,
+                           content_type='application/octet-stream').status_code == 400
+        for body in (b'', b'not an npy file'):
+            response = client.post('/api/evaluate_routes', data=body, content_type='application/x-npy')
+            assert response.status_code == 400 and response.get_json()['status'] == 'error'
+
+    @pytest.mark.api
+    def test_history_series_and_comparison_averages(self, client):
+        """Test that trained episodes are kept, served downsampled and averaged by agent_comparison."""
+        routes = [json.loads(client.get('/api/train?sim=historytest').data)['routes'] for _ in range(4)]
+        data = json.loads(client.get('/api/history?sim=historytest&agent=QL-Bot&points=2&window=4').data)
+        series = data['agents']['QL-Bot']
+        distances = [next(r['distance'] for r in tick if r['agent'] == 'QL-Bot') for tick in routes]
+        assert data['rows'] == 20 and series['count'] == 4 and series['episode'] == [0, 2]
+        assert series['rolling'][-1] == pytest.approx(np.mean(distances), abs=0.01)
+        assert series['max'][0] == pytest.approx(max(distances[:2]), abs=0.01)
+
+        comparison = json.loads(client.get('/api/agent_comparison?sim=historytest').data)
+        agent = next(a for a in comparison['comparison'] if a['agent'] == 'QL-Bot')
+        assert agent['metrics']['episodes_averaged'] == 4
+        assert agent['metrics']['avg_distance'] == pytest.approx(np.mean(distances), abs=0.1)
+
+        assert client.get('/api/history?sim=historytest&field=reward').status_code == 400
+        client.get('/api/reset?sim=historytest')
+        assert json.loads(client.get('/api/history?sim=historytest').data)['rows'] == 0
+
+    @pytest.mark.api
+    def test_compact_train_deltas_and_gzip(self, client):
+        """Test that compact ticks send index routes, deltas against the acknowledged version and gzip bodies."""
+        first = client.get('/api/train?sim=compacttest&compact=1', headers={'Accept-Encoding': 'gzip'})
+        assert first.headers['Content-Encoding'] == 'gzip' and first.headers['Vary'] == 'Accept-Encoding'
+        state = json.loads(gzip.decompress(first.data))
+        cities = state['set']['cities']
+        assert state['base'] is None and set(state['agents']) == set(state['set']['order'])
+        route = state['agents']['QL-Bot']['route']
+        assert route[0] == route[-1] and sorted(route[:-1]) == list(range(len(cities)))
+
+        delta = json.loads(client.get(f"/api/train?sim=compacttest&compact=1&since={state['v']}").data)
+        assert delta['base'] == state['v'] and delta['v'] == state['v'] + 1
+        assert 'cities' not in delta['set'] and delta['set']['episode'] == state['set']['episode'] + 1
+        assert all(set(row) <= {'distance', 'cost', 'profit', 'epsilon', 'route'} for row in delta['agents'].values())
+        assert 'path' in json.loads(client.get('/api/train?sim=compacttest').data)['routes'][0]
+
+    @pytest.mark.api
+    def test_q_analytics_drive_explain_and_comparison(self, client, flask_module):
+        """Test that background Q analytics feed /api/q_analytics, explain factors and route diversity."""
+        client.get('/api/train?sim=qanalytics')
+        sim = flask_module.registry.get('qanalytics')
+        sim.q_analytics.min_interval = 0.0
+        for _ in range(5):
+            client.get('/api/train?sim=qanalytics')
+        sim.q_analytics.wait()
+        data = json.loads(client.get('/api/q_analytics?sim=qanalytics&agent=QL-Bot&heatmap=1').data)
+        assert data['status'] == 'ready'
+        analytics = data['agents']['QL-Bot']
+        n = len(sim.cities)
+        assert analytics['coverage_by_depth'][0]['states'] == 1 and len(analytics['coverage_by_depth']) == n
+        assert len(analytics['heatmap']['visits']) == n
+        assert analytics['roads_driven'] == sum(v > 0 for row in analytics['heatmap']['visits'] for v in row)
+        assert analytics['learned_pairs'] == sum(v > 0 for row in analytics['heatmap']['learned_entries'] for v in row)
+
+        explain = json.loads(client.get('/api/explain/QL-Bot?sim=qanalytics').data)
+        assert explain['analytics']['roads_driven'] == analytics['roads_driven']
+        assert 'Exploration' in {f['factor'] for f in explain['decision_factors']}
+        comparison = json.loads(client.get('/api/agent_comparison?sim=qanalytics').data)
+        agent = next(a for a in comparison['comparison'] if a['agent'] == 'QL-Bot')
+        assert agent['metrics']['route_diversity'] == analytics['route_diversity'] > 1
+        assert client.get('/api/q_analytics?sim=qanalytics&agent=Nobody').status_code == 404
+
+    @pytest.mark.unit
+    def test_large_map_uses_linear_agents(self, flask_module):
+        """Test that maps beyond LARGE_MAP_CITIES train linear agents and round-trip their weights."""
+        n = flask_module.LARGE_MAP_CITIES + 5
+        cities = {i: {'name': f'C{i}', 'lat': -7.0 + 0.01 * i, 'lon': 112.0 + 0.02 * (i % 7)} for i in range(n)}
+        matrix = flask_module.TSPBaseAgent(cities, dist_matrix=np.zeros((1, 1))).get_haversine_matrix(cities)
+        sim = flask_module.SimulationManager(cities, dist_matrix=matrix, sim_id='largemap')
+        assert all(isinstance(a, flask_module.LinearQAgent) for a in sim.agents.values())
+
+        payload = sim.train_tick()
+        assert all(len(r['path']) == n + 1 for r in payload['routes'])
+
+        brain = sim.export_brain()
+        sim.reset()
+        sim.import_brain(brain)
+        assert sim.agents['QL-Bot'].weights.tolist() == brain['agents']['QL-Bot']['weights']
+
+
+    @pytest.mark.api
+    def test_agent_comparison_with_hierarchical_solver(self, client, flask_module):
+        """Test that ?solvers=hierarchical is solved in the background, then adds a ranked solver baseline."""
+        response = client.get('/api/agent_comparison?solvers=hierarchical&sim=solvertest')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['pending_solvers'] == ['hierarchical']
+        assert not any(entry.get('solver') for entry in data['comparison'])
+
+        assert flask_module.solver_results.wait()
+        data = json.loads(client.get('/api/agent_comparison?solvers=hierarchical&sim=solvertest').data)
+        solver = next(entry for entry in data['comparison'] if entry.get('solver') == 'hierarchical')
+        assert data['pending_solvers'] == [] and solver['metrics']['route_diversity'] is None
+        assert solver['metrics']['avg_distance'] > 0
+        assert solver['ranking']['cost'] >= 1
+
+        response = client.get('/api/agent_comparison?solvers=simulated_annealing')
+        assert response.status_code == 400
+
 
 class TestStaticAssets:
     """Test suite for static assets and templates."""
@@ -0,0 +1,80 @@
+"""
+Unit Tests for ASGI Serving Mode
+Tests for the async OSRM proxy and the Flask pass-through.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.api.asgi import create_asgi_app
+
+
+def fake_osrm(request):
+    """Stand-in OSRM backend: echoes the requested coordinates."""
+    coords = request.url.path.rsplit('/', 1)[-1]
+    return httpx.Response(200, json={'code': 'Ok', 'routes': [{'geometry': {'coordinates': coords}}]})
+
+
+def run(asgi_app, method, path, **kwargs):
+    async def go():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://twin') as client:
+            try:
+                return await client.request(method, path, **kwargs)
+            finally:
+                await asgi_app.shutdown()
+    return asyncio.run(go())
+
+
+class TestAsgiApp:
+    """Test suite for the ASGI app factory."""
+
+    @pytest.mark.api
+    def test_route_proxy_uses_async_client(self, flask_module):
+        asgi_app = create_asgi_app(flask_module, osrm_transport=httpx.MockTransport(fake_osrm))
+        response = run(asgi_app, 'POST', '/api/route', json={'coords': '106.88,-6.10;107.16,-6.28'})
+
+        assert response.status_code == 200
+        assert response.json()['routes'][0]['geometry']['coordinates'] == '106.88,-6.10;107.16,-6.28'
+
+    @pytest.mark.api
+    def test_route_proxy_serves_repeats_from_cache(self, flask_module):
+        calls = []
+
+        def counting_osrm(request):
+            calls.append(request.url.path)
+            return fake_osrm(request)
+
+        flask_module.route_cache.clear()
+        asgi_app = create_asgi_app(flask_module, osrm_transport=httpx.MockTransport(counting_osrm))
+
+        async def go():
+            transport = httpx.ASGITransport(app=asgi_app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://twin') as client:
+                body = {'coords': '110.43,-6.94;112.73,-7.20'}
+                responses = await asyncio.gather(*[client.post('/api/route', json=body) for _ in range(4)])
+            await asgi_app.shutdown()
+            return responses
+
+        responses = asyncio.run(go())
+        assert all(r.status_code == 200 for r in responses)
+        assert len(calls) == 1
+
+    @pytest.mark.api
+    def test_route_proxy_rejects_malformed_coords(self, flask_module):
+        asgi_app = create_asgi_app(flask_module, osrm_transport=httpx.MockTransport(fake_osrm))
+        response = run(asgi_app, 'POST', '/api/route', json={'coords': '../../admin'})
+
+        assert response.status_code == 400
+
+    @pytest.mark.api
+    def test_flask_routes_pass_through(self, flask_module):
+        asgi_app = create_asgi_app(flask_module, osrm_transport=httpx.MockTransport(fake_osrm))
+        response = run(asgi_app, 'GET', '/health')
+
+        assert response.status_code == 200
+        assert json.loads(response.content)['status'] == 'healthy'
@@ -0,0 +1,65 @@
+"""
+Unit Tests for the Headless Campaign CLI
+Tests for disaster schedules, checkpoints, metrics and resuming.
+"""
+
+import json
+
+import pytest
+import numpy as np
+
+from app.cli import active_disasters, main, parse_schedule
+from app.core.columnar import read_columns
+
+SEVERITY = {2: {'multiplier': 2.5}, 3: {'multiplier': 100.0}}
+
+
+@pytest.fixture
+def campaign_files(sample_cities, sample_distance_matrix, tmp_path):
+    cities = tmp_path / 'cities.json'
+    cities.write_text(json.dumps({'cities': {str(k): v for k, v in sample_cities.items()}}))
+    matrix = tmp_path / 'matrix.npy'
+    np.save(matrix, np.array(sample_distance_matrix, dtype=np.float32))
+    schedule = tmp_path / 'schedule.json'
+    schedule.write_text(json.dumps([
+        {'episode': 3, 'lat': sample_cities[1]['lat'], 'lon': sample_cities[1]['lon'], 'severity': 3, 'radius': 5},
+        {'episode': 8, 'clear': True}
+    ]))
+    return ['--cities', str(cities), '--matrix', str(matrix), '--disasters', str(schedule), '--log-every', '0']
+
+
+class TestCampaignCLI:
+    """Test suite for app.cli."""
+
+    @pytest.mark.unit
+    def test_schedule_windows_and_clears(self):
+        """Test that durations end disasters and a clear removes earlier ones only."""
+        schedule = parse_schedule([
+            {'episode': 0, 'lat': 0, 'lon': 0, 'severity': 2, 'duration': 5},
+            {'episode': 2, 'lat': 0, 'lon': 0, 'severity': 3},
+            {'episode': 10, 'clear': True},
+            {'episode': 10, 'lat': 0, 'lon': 0, 'severity': 2}
+        ], SEVERITY)
+        assert [len(active_disasters(schedule, e)) for e in (0, 3, 5, 9, 10)] == [1, 2, 1, 1, 1]
+        with pytest.raises(ValueError):
+            parse_schedule([{'episode': 1, 'lat': 0, 'lon': 0, 'severity': 7}], SEVERITY)
+
+    @pytest.mark.integration
+    def test_campaign_checkpoints_metrics_and_resume(self, campaign_files, tmp_path):
+        """Test that a campaign writes a loadable brain and per-episode metrics, then resumes."""
+        out = str(tmp_path / 'run')
+        args = campaign_files + ['--out', out, '--agents', 'ql,mc', '--workers', '2', '--checkpoint-every', '4']
+        assert main(['--episodes', '10'] + args) == 0
+
+        with open(f'{out}/brain.json') as f:
+            brain = json.load(f)
+        assert brain['version'] == '4.9' and brain['episodes'] == 10
+        assert set(brain['agents']) == {'QL-Bot', 'MC-Bot'} and brain['agents']['QL-Bot']['q_table']
+        metrics = read_columns(f'{out}/metrics/QL-Bot')
+        assert metrics['episode'].tolist() == list(range(1, 11))
+        assert metrics['disasters'].tolist() == [0, 0, 0, 1, 1, 1, 1, 1, 0, 0]
+        assert (np.diff(metrics['best_distance']) <= 0).all()
+
+        assert main(['--episodes', '5'] + args) == 2  # Existing checkpoints need --resume
+        assert main(['--episodes', '5', '--resume', '--workers', '1'] + args) == 0
+        assert read_columns(f'{out}/metrics/MC-Bot')['episode'].tolist() == list(range(1, 16))
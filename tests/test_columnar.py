@@ -0,0 +1,50 @@
+"""
+Unit Tests for the Columnar Metrics Store
+Tests for chunked appends, memory-mapped reads and torn-tail recovery.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.columnar import ColumnarWriter, column_path, read_columns
+
+COLUMNS = [('episode', 'u8'), ('distance', 'f4')]
+
+
+class TestColumnarStore:
+    """Test suite for ColumnarWriter / read_columns."""
+
+    @pytest.mark.unit
+    def test_chunked_append_and_mmap_read(self, tmp_path):
+        """Test that rows survive chunking and reopen as an appendable table."""
+        writer = ColumnarWriter(str(tmp_path), COLUMNS, chunk_rows=4)
+        for i in range(10):
+            writer.append({'episode': i + 1, 'distance': 100.0 - i})
+        assert read_columns(str(tmp_path))['episode'].tolist() == list(range(1, 9))  # Two chunks flushed
+        writer.close()
+
+        ColumnarWriter(str(tmp_path), COLUMNS).append({'episode': 11, 'distance': 1.5})
+        table = read_columns(str(tmp_path), mmap=False)
+        assert len(table['episode']) == 10  # Unflushed row of the second writer not visible
+        columns = read_columns(str(tmp_path), names=['distance'])
+        assert isinstance(columns['distance'], np.memmap) and columns['distance'][-1] == 91.0
+
+        with pytest.raises(ValueError):
+            ColumnarWriter(str(tmp_path), [('episode', 'u4')])
+
+    @pytest.mark.unit
+    def test_torn_tail_is_dropped(self, tmp_path):
+        """Test that a partially written column is cut back to whole rows on reopen."""
+        writer = ColumnarWriter(str(tmp_path), COLUMNS)
+        for i in range(5):
+            writer.append({'episode': i, 'distance': float(i)})
+        writer.close()
+        with open(column_path(str(tmp_path), 'episode'), 'ab') as f:
+            f.write(np.uint64(99).tobytes() + b'\x01')
+
+        assert len(read_columns(str(tmp_path))['episode']) == 5
+        reopened = ColumnarWriter(str(tmp_path), COLUMNS)
+        assert reopened.rows == 5
+        reopened.append({'episode': 5, 'distance': 5.0})
+        reopened.close()
+        assert read_columns(str(tmp_path))['episode'].tolist() == list(range(6))
@@ -0,0 +1,77 @@
+"""
+Unit Tests for the Convergence Monitor
+Tests for epsilon schedules, status transitions and the adaptive episode budget.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.convergence import ConvergenceMonitor, EpsilonSchedule, REHEAT_EPSILON
+
+
+class FakeAgent:
+    def __init__(self):
+        self.epsilon = 1.0
+        self.q_table = {}
+
+
+class TestConvergence:
+    """Test suite for EpsilonSchedule / ConvergenceMonitor."""
+
+    @pytest.mark.unit
+    def test_schedules_decay_and_invert(self):
+        """Test that every schedule stays within its range and step_for inverts value."""
+        assert EpsilonSchedule('constant').value(10 ** 6) == 1.0
+        exponential = EpsilonSchedule('exponential', end=0.05, decay=0.99)
+        linear = EpsilonSchedule('linear', end=0.1, episodes=100)
+        assert exponential.value(0) == 1.0 and exponential.value(10 ** 6) == 0.05
+        assert linear.value(50) == pytest.approx(0.55) and linear.value(500) == 0.1
+        for schedule in (exponential, linear):
+            assert schedule.value(schedule.step_for(0.3)) == pytest.approx(0.3)
+        with pytest.raises(ValueError):
+            EpsilonSchedule('cosine')
+        with pytest.raises(ValueError):
+            EpsilonSchedule(start=0.1, end=0.5)
+
+    @pytest.mark.unit
+    def test_stable_agent_pauses_and_frees_its_budget(self):
+        """Test that a stable, settled agent goes throttled then paused and its slots go to the others."""
+        monitor = ConvergenceMonitor(['A', 'B'], EpsilonSchedule(decay=0.9), patience=10, stable_episodes=4)
+        agents = {'A': FakeAgent(), 'B': FakeAgent()}
+        route = [0, 1, 2, 3, 0]
+        statuses = []
+        for tick in range(30):
+            runs = monitor.plan(tick)
+            for name, agent in agents.items():
+                if runs[name]:
+                    before = monitor.probe(name, agent)
+                    # B keeps finding new tours, A has settled on one
+                    moving = [0, 1 + tick % 3, 1 + (tick + 1) % 3, 1 + (tick + 2) % 3, 0]
+                    monitor.observe(name, agent, runs[name], 10.0 if name == 'A' else 100.0 - tick,
+                                    route if name == 'A' else moving, before)
+            statuses.append(monitor.view(agents)['A']['status'])
+
+        assert 'throttled' in statuses and statuses[-1] == 'paused'
+        assert monitor.plan(31) == {'A': 0, 'B': 2}
+        assert monitor.last('A') == (10.0, route)
+        assert agents['A'].epsilon < 1.0  # The schedule was applied
+
+    @pytest.mark.unit
+    def test_matrix_change_wakes_and_reheats(self):
+        """Test that a material matrix change resumes paused agents with a re-heated epsilon."""
+        monitor = ConvergenceMonitor(['A'], EpsilonSchedule(decay=0.5), patience=1, stable_episodes=1, q_tolerance=1.0)
+        agent = FakeAgent()
+        for tick in range(4):
+            monitor.observe('A', agent, 1, 10.0, [0, 1, 2, 0], monitor.probe('A', agent))
+        assert monitor.view()['A']['status'] == 'paused' and agent.epsilon < REHEAT_EPSILON
+
+        matrix = np.ones((3, 3))
+        assert not monitor.check_matrix(matrix, 1)           # First sight only records it
+        assert not monitor.check_matrix(matrix * 1.001, 2)   # Below tolerance
+        assert monitor.check_matrix(matrix * 3, 3)
+        assert monitor.view()['A']['status'] == 'learning' and monitor.view()['A']['disturbed']
+        assert monitor.plan(5) == {'A': 1}
+
+        monitor.observe('A', agent, 1, 30.0, [0, 1, 2, 0], None)
+        assert agent.epsilon == pytest.approx(REHEAT_EPSILON * 0.5)
+        assert monitor.view()['A']['best_distance'] == 30.0  # Old distances were forgotten
@@ -0,0 +1,60 @@
+"""
+Unit Tests for Fleet Economics
+Tests for the vectorized cost / profit / CO2 engine.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.economics import (
+    FleetEconomics, VEHICLES, CARGO, PRICE_DIESEL, PRICE_ELECTRIC, DRIVER_WAGE_KM
+)
+
+
+def scalar_cost(dist, vehicle, cargo):
+    """Reference: the original per-agent arithmetic."""
+    fuel_price = PRICE_ELECTRIC if vehicle['fuel'] == 'electric' else PRICE_DIESEL
+    cost = (dist / vehicle['efficiency'] * fuel_price + dist * DRIVER_WAGE_KM) * cargo['multiplier']
+    return cost, cargo['baseRevenue'] - cost, dist * vehicle['co2']
+
+
+class TestFleetEconomics:
+    """Test suite for FleetEconomics."""
+
+    @pytest.mark.unit
+    def test_grid_matches_scalar_formula(self):
+        """Test that the broadcast grid equals the scalar formula everywhere."""
+        fleet = FleetEconomics()
+        distances = [0.0, 120.5, 980.0]
+        grid = fleet.grid(distances)
+        assert grid.cost.shape == (3, len(VEHICLES), len(CARGO))
+        assert grid.co2.shape == (3, len(VEHICLES))
+
+        for r, dist in enumerate(distances):
+            for v, v_key in enumerate(grid.vehicles):
+                for c, c_key in enumerate(grid.cargo):
+                    cost, profit, co2 = scalar_cost(dist, VEHICLES[v_key], CARGO[c_key])
+                    assert grid.cost[r, v, c] == pytest.approx(cost)
+                    assert grid.profit[r, v, c] == pytest.approx(profit)
+                    assert grid.co2[r, v] == pytest.approx(co2)
+
+    @pytest.mark.unit
+    def test_evaluate_gathers_own_config(self):
+        """Test that evaluate picks each route's configuration, with defaults for unknown keys."""
+        fleet = FleetEconomics()
+        configs = [{'v': 'ev', 'c': 'express'}, {'v': 'nope', 'c': 'nope'}]
+        result = fleet.evaluate([300.0, 300.0], configs)
+
+        cost, profit, co2 = scalar_cost(300.0, VEHICLES['ev'], CARGO['express'])
+        assert result.cost[0] == pytest.approx(cost) and result.co2[0] == 0.0
+        cost, profit, co2 = scalar_cost(300.0, VEHICLES['diesel'], CARGO['general'])
+        assert result.profit[1] == pytest.approx(profit)
+
+    @pytest.mark.unit
+    def test_grid_subset_and_unknown_key(self):
+        """Test vehicle/cargo filtering and rejection of unknown keys."""
+        fleet = FleetEconomics()
+        grid = fleet.grid(np.arange(10), vehicles=['ev'], cargo=['cold', 'danger'])
+        assert grid.cost.shape == (10, 1, 2)
+        with pytest.raises(KeyError):
+            fleet.grid([1.0], vehicles=['rocket'])
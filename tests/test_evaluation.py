@@ -0,0 +1,51 @@
+"""
+Unit Tests for Bulk Route Evaluation
+Tests for batched tour gathers, validation and the fleet economics pass.
+"""
+
+import numpy as np
+import pytest
+
+from app.core import evaluation
+from app.core.economics import FleetEconomics
+from app.core.evaluation import as_route_array, score_tours, scores_to_records
+from tsp_agent import calculate_total_distance
+
+
+class TestEvaluation:
+    """Test suite for as_route_array / score_tours."""
+
+    @pytest.mark.unit
+    def test_batched_scores_match_single_route_scoring(self, sample_distance_matrix, monkeypatch):
+        """Test that chunked gathers equal per-route sums and economics match FleetEconomics.evaluate."""
+        monkeypatch.setattr(evaluation, 'CHUNK_ROWS', 7)  # Force several chunks
+        matrix = np.array(sample_distance_matrix, dtype=np.float32)
+        matrix[1, 2] = evaluation.BLOCKED_DISTANCE
+        rng = np.random.default_rng(3)
+        routes = np.array([rng.permutation(5) for _ in range(50)])
+        routes[0] = [0, 1, 2, 3, 3]  # Padded short tour: misses city 4, crosses the blocked road
+        batch = as_route_array(routes, 5, closed=True)
+        assert batch.shape == (50, 6) and (batch[:, 0] == batch[:, -1]).all()
+
+        economics = FleetEconomics()
+        configs = [{'v': 'ev', 'c': 'cold'} if k % 2 else {'v': 'diesel', 'c': 'general'} for k in range(50)]
+        scores = score_tours(matrix, batch, economics, configs)
+        expected = [calculate_total_distance(list(r), matrix) for r in batch]
+        assert scores.distance == pytest.approx(expected)
+        assert not scores.complete[0] and scores.complete[1:].all()
+        assert scores.blocked_legs[0] >= 1
+
+        reference = economics.evaluate(expected, configs)
+        assert scores.cost == pytest.approx(reference.cost) and scores.co2 == pytest.approx(reference.co2)
+        shared = score_tours(matrix, batch, economics, {'v': 'ev', 'c': 'cold'})
+        assert shared.profit[1::2] == pytest.approx(scores.profit[1::2])
+
+        records = scores_to_records(scores)
+        assert records['distance'] == pytest.approx(scores.distance) and records.dtype.names[0] == 'distance'
+
+    @pytest.mark.unit
+    def test_invalid_batches_are_rejected(self):
+        """Test ragged, non-integer, out-of-range and too-short route arrays."""
+        for routes in ([[0, 1, 2], [0, 1]], [[0.5, 1.0]], [[0, 5]], [[0]], [0, 1, 2]):
+            with pytest.raises(ValueError):
+                as_route_array(routes, 5)
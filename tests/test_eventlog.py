@@ -0,0 +1,93 @@
+"""
+Unit Tests for the Event Log
+Tests for the binary journal, keyframe + delta replay and torn-tail recovery.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.eventlog import DELTA, KEYFRAME, SABOTAGE, EventLog, ReplayEngine
+
+
+def perturbed_history(base, episodes, seed=0):
+    """Matrices after each episode: one road changes per episode, everything every 10th."""
+    rng = np.random.default_rng(seed)
+    matrix, history = base.copy(), {}
+    for episode in range(episodes):
+        if episode % 10 == 9:
+            matrix = matrix * np.float32(1.1)
+        else:
+            i, j = rng.integers(len(base), size=2)
+            matrix[i, j] = rng.uniform(1, 500)
+        history[episode] = matrix.copy()
+    return history
+
+
+class TestReplayEngine:
+    """Test suite for EventLog / ReplayEngine."""
+
+    @pytest.mark.unit
+    def test_as_of_matches_recorded_history(self, sample_distance_matrix):
+        """Test that keyframe + delta replay reproduces the matrix at every episode."""
+        base = np.array(sample_distance_matrix, dtype=np.float32)
+        replay = ReplayEngine(EventLog(), keyframe_interval=4)
+        replay.start_run(0)
+        history = perturbed_history(base, 30)
+        kinds = [replay.record(m, episode, episode + 1) for episode, m in history.items()]
+        assert replay.record(history[29], 29, 30) is None  # Same matrix version: nothing written
+        assert DELTA in kinds and kinds.count(KEYFRAME) < len(kinds) // 2
+
+        for episode in (0, 3, 9, 17, 29):
+            state = replay.as_of(episode)
+            assert np.array_equal(state.matrix, history[episode])
+            assert state.matrix_version == episode + 1 and state.deltas_applied <= 4
+        assert replay.as_of(0, run=2) is None
+
+    @pytest.mark.unit
+    def test_events_and_runs(self, sample_distance_matrix):
+        """Test that events decode per run and an episode rewind starts a new run."""
+        base = np.array(sample_distance_matrix, dtype=np.float32)
+        replay = ReplayEngine(EventLog())
+        replay.start_run(0, reason='load_map')
+        replay.record(base, 0, 1)
+        replay.log_event(SABOTAGE, 5, (1, 2, 'blocked'))
+        replay.record(base * 2, 3, 2)  # Episode counter went backwards
+        assert replay.run == 2
+        assert np.array_equal(replay.as_of(100, run=1).matrix, base)
+
+        events = replay.events(run=0)
+        assert [e['kind'] for e in events] == ['reset', 'sabotage', 'reset']
+        assert events[1]['data'] == {'from': 1, 'to': 2, 'status': 'blocked'}
+        assert events[2]['data']['reason'] == 'episodes_rewound'
+
+    @pytest.mark.unit
+    def test_file_journal_survives_restart_and_torn_tail(self, sample_distance_matrix, tmp_path):
+        """Test that a reopened journal rebuilds its index and drops a partial record."""
+        base = np.array(sample_distance_matrix, dtype=np.float32)
+        path = str(tmp_path / 'default.evlog')
+        replay = ReplayEngine(EventLog(path))
+        replay.start_run(0)
+        history = perturbed_history(base, 12)
+        for episode, m in history.items():
+            replay.record(m, episode, episode + 1)
+        with open(path, 'ab') as f:
+            f.write(b'\x11\x01\x00')  # Crash mid-append
+
+        reopened = ReplayEngine(EventLog(path))
+        assert reopened.run == 1 and len(reopened.keyframes) == len(replay.keyframes)
+        assert np.array_equal(reopened.as_of(7, run=1).matrix, history[7])
+        reopened.start_run(0)
+        assert reopened.as_of(7) is None  # New run, nothing recorded yet
+
+    @pytest.mark.unit
+    def test_memory_journal_is_trimmed_at_a_keyframe(self, sample_distance_matrix):
+        """Test that the in-memory cap drops old history but keeps recent episodes replayable."""
+        base = np.array(sample_distance_matrix, dtype=np.float32)
+        replay = ReplayEngine(EventLog(max_bytes=4096), keyframe_interval=4)
+        replay.start_run(0)
+        history = perturbed_history(base, 200)
+        for episode, m in history.items():
+            replay.record(m, episode, episode + 1)
+        assert replay.log.size - replay.log.start <= 4096
+        assert replay.as_of(0) is None
+        assert np.array_equal(replay.as_of(199).matrix, history[199])
@@ -0,0 +1,92 @@
+"""
+Unit Tests for Route Geometry Cache
+Tests for LRU/TTL behaviour, request coalescing and payload shrinking.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.core.geometry_cache import GeometryCache, coords_key, simplify_line, shrink_route_payload
+
+
+class TestGeometryCache:
+    """Test suite for GeometryCache."""
+
+    @pytest.mark.unit
+    def test_lru_eviction_and_stats(self):
+        cache = GeometryCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')          # 'b' is now least recently used
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        stats = cache.stats()
+        assert stats['evictions'] == 1
+        assert stats['hits'] == 2 and stats['misses'] == 1
+
+    @pytest.mark.unit
+    def test_ttl_expiry(self):
+        cache = GeometryCache(ttl=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+
+        assert cache.get('a') is None
+        assert cache.stats()['expired'] == 1
+
+    @pytest.mark.unit
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = GeometryCache()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return (200, {'routes': []})
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('k', slow_fetch)))
+                   for _ in range(6)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert len(calls) == 1
+        assert len(results) == 6
+        assert cache.stats()['coalesced'] == 5
+
+    @pytest.mark.unit
+    def test_failed_fetch_not_cached(self):
+        cache = GeometryCache()
+        cache.get_or_fetch('k', lambda: (504, {}), should_cache=lambda r: r[0] == 200)
+        assert len(cache) == 0
+
+
+class TestRoutePayload:
+    """Test suite for coordinate keys and geometry shrinking."""
+
+    @pytest.mark.unit
+    def test_coords_key_normalizes_and_validates(self):
+        assert coords_key('106.8837,-6.1096;107.16,-6.28') == coords_key('106.883700001,-6.1096;107.16,-6.28')
+        with pytest.raises(ValueError):
+            coords_key('106.88,-6.10;../../table')
+
+    @pytest.mark.unit
+    def test_simplify_keeps_endpoints(self):
+        xs = np.linspace(0, 1, 101)
+        line = np.column_stack([xs, 0.5 - np.abs(xs - 0.5)])  # Tent: one real corner
+        simplified = simplify_line(line, 0.01)
+
+        assert len(simplified) == 3
+        assert np.allclose(simplified[0], line[0]) and np.allclose(simplified[-1], line[-1])
+
+    @pytest.mark.unit
+    def test_precision_reduction(self):
+        payload = {'routes': [{'geometry': {'type': 'LineString', 'coordinates': [[106.123456789, -6.987654321]]}}]}
+        shrunk = shrink_route_payload(payload, precision=3)
+
+        assert shrunk['routes'][0]['geometry']['coordinates'] == [[106.123, -6.988]]
+        assert payload['routes'][0]['geometry']['coordinates'][0][0] == 106.123456789
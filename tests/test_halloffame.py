@@ -0,0 +1,54 @@
+"""
+Unit Tests for the Hall of Fame
+Tests for the bounded top-K heap, exact route dedup and the all-time board.
+"""
+
+import pytest
+
+from app.core.halloffame import HallOfFame, TopK, route_signature
+
+
+class TestHallOfFame:
+    """Test suite for TopK / HallOfFame."""
+
+    @pytest.mark.unit
+    def test_signature_ignores_rotation_but_not_direction(self):
+        """Test that the same cycle from another start is one tour, the reversed cycle another."""
+        assert route_signature([0, 1, 2, 3, 0]) == route_signature([2, 3, 0, 1, 2])
+        assert route_signature([0, 1, 2, 3, 0]) != route_signature([0, 3, 2, 1, 0])
+
+    @pytest.mark.unit
+    def test_bounded_board_dedups_exactly(self):
+        """Test that equal distances of different tours both count and a known tour only improves."""
+        board = TopK(3)
+        assert board.offer(10.0, [0, 1, 2, 3, 0], 'A')
+        assert not board.offer(10.0, [0, 1, 2, 3, 0], 'B')      # Same tour again
+        assert board.offer(10.0, [0, 2, 1, 3, 0], 'B')          # Different tour, same length
+        assert board.offer(12.0, [0, 3, 1, 2, 0], 'C')
+        assert not board.offer(15.0, [0, 3, 2, 1, 0], 'D')      # Full, and worse than the worst
+        assert board.offer(8.0, [0, 3, 1, 2, 0], 'C')           # Known tour got shorter
+        assert board.offer(9.0, [0, 1, 3, 2, 0], 'E')           # Evicts a 10 km tour
+
+        records = board.records()
+        assert [r['distance'] for r in records] == [8.0, 9.0, 10.0]
+        assert records[2]['agent'] == 'A'  # Ties keep the tour found first
+        assert records[0]['route'] == (0, 3, 1, 2, 0) and records[0]['rank'] == 1
+        assert not board.offer(0.0, [0, 0], 'F')
+
+    @pytest.mark.unit
+    def test_all_time_board_survives_reset_and_restart(self, tmp_path):
+        """Test that per-run boards reset while the persisted all-time board is kept."""
+        path = str(tmp_path / 'board.json')
+        hall = HallOfFame(k=2, per_agent_k=1, store_path=path)
+        hall.offer('QL-Bot', 20.0, [0, 1, 2, 0], episode=1)
+        hall.offer('QL-Bot', 15.0, [0, 2, 1, 0], episode=2)
+        hall.offer('MC-Bot', 30.0, [0, 1, 2, 0], episode=2)
+        view = hall.view()
+        assert [r['distance'] for r in view['per_agent']['QL-Bot']] == [15.0]
+        assert [r['agent'] for r in view['overall']] == ['QL-Bot', 'QL-Bot']
+
+        hall.reset()
+        assert hall.top_records() == [] and hall.view()['per_agent'] == {}
+        restarted = HallOfFame(k=2, store_path=path)
+        assert [r['distance'] for r in restarted.view()['all_time']] == [15.0, 20.0]
+        assert HallOfFame(k=2).view()['all_time'] is None
@@ -0,0 +1,60 @@
+"""
+Unit Tests for the Hierarchical Solver
+Tests for k-means clustering, stitched tours and the per-cluster worker pool.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.hierarchical import HierarchicalSolver, kmeans
+from app.core.scenario import nearest_neighbour_tour, tour_length, two_opt
+from tsp_agent import TSPBaseAgent
+
+
+@pytest.fixture
+def large_network():
+    rng = np.random.default_rng(3)
+    coords = rng.uniform([-8.5, 110.0], [-6.0, 114.5], (300, 2))
+    cities = {i: {'lat': float(lat), 'lon': float(lon)} for i, (lat, lon) in enumerate(coords)}
+    matrix = TSPBaseAgent(cities, dist_matrix=np.zeros((1, 1))).get_haversine_matrix(cities)
+    return cities, matrix
+
+
+class TestHierarchicalSolver:
+    """Test suite for kmeans and HierarchicalSolver."""
+
+    @pytest.mark.unit
+    def test_kmeans_separates_blobs(self):
+        """Test that two well separated blobs end up in two non-empty clusters."""
+        rng = np.random.default_rng(0)
+        points = np.vstack([rng.normal(0, 0.1, (20, 2)), rng.normal(5, 0.1, (20, 2))])
+        labels, centroids = kmeans(points, 2)
+        assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1
+        assert labels[0] != labels[-1]
+        assert centroids.shape == (2, 2)
+
+    @pytest.mark.unit
+    def test_stitched_tour_is_complete_and_competitive(self, large_network):
+        """Test that the stitched tour visits every city once and stays close to full 2-opt."""
+        cities, matrix = large_network
+        result = HierarchicalSolver(cluster_size=40, workers=1).solve(cities, matrix, start=5)
+        assert result.route[0] == result.route[-1] == 5
+        assert sorted(result.route[:-1]) == list(range(300))
+        assert result.clusters == 8 and not result.parallel
+        assert result.distance == pytest.approx(tour_length(matrix, result.route))
+
+        full = two_opt(matrix, nearest_neighbour_tour(matrix, 5))
+        assert result.distance < 1.25 * tour_length(matrix, full)
+
+    @pytest.mark.slow
+    def test_parallel_matches_inline(self, large_network):
+        """Test that pooled cluster solves give the same tour as inline ones."""
+        cities, matrix = large_network
+        inline = HierarchicalSolver(cluster_size=40, workers=1).solve(cities, matrix)
+        solver = HierarchicalSolver(cluster_size=40, workers=2)
+        try:
+            pooled = solver.solve(cities, matrix)
+        finally:
+            solver.shutdown()
+        assert pooled.parallel
+        assert pooled.route == inline.route
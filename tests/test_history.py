@@ -0,0 +1,63 @@
+"""
+Unit Tests for the Episode History
+Tests for the columnar ring buffer, memmap spill, rewinds and downsampled queries.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.history import EpisodeHistory, downsample, rolling_mean
+
+
+def fill(history, episodes, first=0):
+    for e in range(first, first + episodes):
+        history.append(e, [100.0 + e, 200.0 - e], [10.0, 20.0], [1.0, 2.0], [0.5, 0.5], [e, 2 * e])
+
+
+class TestHistory:
+    """Test suite for EpisodeHistory and its helpers."""
+
+    @pytest.mark.unit
+    def test_rolling_mean_and_min_max_buckets(self):
+        """Test true rolling means and that downsampled buckets keep every extreme."""
+        y = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        assert rolling_mean(y, 3).tolist() == [1.0, 1.5, 2.0, 3.0, 4.0, 5.0]
+        y = np.random.default_rng(1).normal(size=1000).astype(np.float32)
+        y[437] = 50.0
+        x, lo, hi, mean, ends = downsample(np.arange(1000), y, 10)
+        assert len(x) == 10 and hi.max() == 50.0 and lo.min() == y.min()
+        assert mean.mean() == pytest.approx(y.mean(), abs=1e-4) and ends[-1] == 999
+
+    @pytest.mark.unit
+    def test_ring_overwrites_without_spill_and_rewinds(self):
+        """Test the memory-only ring keeps the newest rows and an episode going back drops the rest."""
+        history = EpisodeHistory(['A', 'B'], capacity=20)
+        fill(history, 30)
+        assert history.oldest_episode == 20 and history.stats()['in_memory'] == 20
+        series = history.series('distance', agents=['A'], start=25, end=27)
+        assert series['A']['episode'] == [25, 26, 27] and series['A']['max'] == [125.0, 126.0, 127.0]
+
+        fill(history, 3, first=26)  # Episodes rewound: 26..29 are replaced
+        assert history.series('distance', agents=['A'], start=25)['A']['episode'] == [25, 26, 27, 28]
+        history.rewind(0)
+        assert history.series('distance')['A']['count'] == 0
+        with pytest.raises(ValueError):
+            history.series('reward')
+
+    @pytest.mark.unit
+    def test_spilled_history_spans_disk_and_memory(self, tmp_path):
+        """Test that ranges older than the ring come back from the memory-mapped table, also after a restart."""
+        history = EpisodeHistory(['A', 'B'], capacity=16, spill_dir=str(tmp_path), spill_rows=8)
+        fill(history, 100)
+        series = history.series('distance', agents=['B'], points=1000, window=1)
+        assert series['B']['episode'] == list(range(100))
+        assert series['B']['rolling'] == [200.0 - e for e in range(100)]
+        assert history.averages(last=4)['A']['distance'] == pytest.approx(100.0 + 97.5)
+
+        history.spill()
+        reopened = EpisodeHistory(['A', 'B'], capacity=16, spill_dir=str(tmp_path))
+        assert reopened.series('states', agents=['A'], start=10, end=12)['A']['mean'] == [10.0, 11.0, 12.0]
+        reopened.rewind(50)  # A brain from episode 50 was loaded
+        fill(reopened, 5, first=50)
+        assert reopened.series('distance', agents=['A'], start=45, points=1000)['A']['episode'] == list(range(45, 55))
+        assert reopened.stats()['rows'] == 110
@@ -0,0 +1,84 @@
+"""
+Unit Tests for Leg Geometry
+Tests for polyline encoding, leg assembly and the on-disk map store.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.legs import LegGeometryStore, encode_polyline, decode_polyline
+from app.core.map_store import MapStore, map_fingerprint
+
+
+def fake_fetch(calls):
+    """OSRM stand-in: each leg gets a midpoint, so real legs have 3 points."""
+    def fetch(points):
+        calls.append(len(points))
+        return [[a, [(a[0] + b[0]) / 2, (a[1] + b[1]) / 2 + 0.01], b] for a, b in zip(points[:-1], points[1:])]
+    return fetch
+
+
+class TestPolyline:
+    """Test suite for the encoded polyline codec."""
+
+    @pytest.mark.unit
+    def test_reference_encoding(self):
+        """Test against the reference example of the polyline format."""
+        points = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+        encoded = encode_polyline(points)
+        assert encoded == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+        assert np.allclose(decode_polyline(encoded), points)
+
+
+class TestLegGeometryStore:
+    """Test suite for LegGeometryStore."""
+
+    @pytest.mark.unit
+    def test_route_assembled_from_cached_legs(self, sample_cities):
+        """Test that one fetch fills a route and reversed/re-used legs hit the cache."""
+        calls = []
+        store = LegGeometryStore(sample_cities, fetch_legs=fake_fetch(calls))
+
+        line = store.assemble([0, 1, 2, 0])
+        assert calls == [4]
+        assert len(line) == 7  # 3 legs x 3 points, 2 shared joints
+        assert np.allclose(line[0], line[-1])
+
+        store.assemble([1, 2, 0])
+        assert calls == [4]
+        assert store.stats()['legs_cached'] == 3
+
+    @pytest.mark.unit
+    def test_fallback_legs_not_persisted(self, sample_cities, tmp_path):
+        """Test that straight-line legs are drawn but retried instead of saved."""
+        path = str(tmp_path / 'legs.json')
+        store = LegGeometryStore(sample_cities, path=path, fetch_legs=lambda points: None)
+        assert store.ensure([0, 1, 2]) == 2
+        assert store.missing([0, 1, 2]) == [(0, 1), (1, 2)]
+
+        # A failed fetch backs off: the next routes are drawn straight without asking upstream
+        calls = []
+        store._fetch_legs = fake_fetch(calls)
+        assert store.ensure([0, 1, 2]) == 2 and store.ensure([2, 3]) == 1 and calls == []
+        assert store.stats()['retry_in'] > 0
+
+        store._retry_at = 0.0  # Backoff elapsed
+        assert store.ensure([0, 1, 2]) == 0 and calls == [3]
+
+        reloaded = LegGeometryStore(sample_cities, path=path)
+        assert reloaded.stats()['legs_cached'] == 2
+        assert np.allclose(reloaded.assemble([0, 1, 2], fetch=False), store.assemble([0, 1, 2]), atol=1e-5)
+
+
+class TestMapStore:
+    """Test suite for MapStore."""
+
+    @pytest.mark.unit
+    def test_matrix_roundtrip(self, sample_cities, sample_distance_matrix, tmp_path):
+        """Test that the matrix is stored under the map fingerprint."""
+        store = MapStore(str(tmp_path))
+        assert store.load_matrix(sample_cities) is None
+
+        store.save_matrix(sample_cities, sample_distance_matrix)
+        assert map_fingerprint(sample_cities) in store.matrix_path(sample_cities)
+        assert np.allclose(store.load_matrix(sample_cities), sample_distance_matrix)
@@ -0,0 +1,69 @@
+"""
+Unit Tests for Compact Training Payloads
+Tests for index routes, versioned deltas and content-coding negotiation.
+"""
+
+import gzip
+import json
+
+import pytest
+
+from app.core import payload
+from app.core.payload import PayloadEncoder, accepted_encoding, encode_body
+
+CITIES = ['Depot', 'A', 'B', 'A']  # Names need not be unique: routes travel as indices
+
+
+def tick(episode, distance, route, best=()):
+    return {
+        'routes': [
+            {'agent': 'QL-Bot', 'episode': episode, 'distance': distance, 'cost': 10.0, 'profit': 5.0,
+             'epsilon': 0.5, 'color': '#f00', 'path': [CITIES[c] for c in route], 'cargo': 'general'},
+            {'agent': 'Sarsa-Bot', 'episode': episode, 'distance': 99.0, 'cost': 10.0, 'profit': 5.0,
+             'epsilon': 0.5, 'color': '#0f0', 'path': ['Depot', 'A', 'B', 'A', 'Depot'], 'cargo': 'general'}
+        ],
+        'best_routes': [{'agent': 'QL-Bot', 'distance': 1.0, 'route': (0, 1, 2, 3, 0), 'signature': 'x',
+                         'episode': 0, 'rank': 1}] if best else [],
+        'episode': episode + 1, 'disasters_expired': 0, 'reputation': 0, 'clock': '08:00', 'time_slot': None
+    }
+
+
+def encode(encoder, episode, distance, route, best=False, since=None):
+    indices = {'QL-Bot': route, 'Sarsa-Bot': [0, 3, 2, 1, 0]}
+    return encoder.encode(tick(episode, distance, route, best), indices, CITIES, since=since)
+
+
+class TestPayload:
+    """Test suite for PayloadEncoder / encode_body."""
+
+    @pytest.mark.unit
+    def test_deltas_carry_only_changed_fields(self):
+        """Test a full first state, per-field deltas against an acknowledged version and full resends."""
+        encoder = PayloadEncoder(retained=2)
+        first = encode(encoder, 0, 50.0, [0, 1, 2, 3, 0])
+        assert first['base'] is None and first['set']['cities'] == CITIES
+        assert first['agents']['QL-Bot']['route'] == [0, 1, 2, 3, 0] and 'path' not in first['agents']['QL-Bot']
+
+        second = encode(encoder, 1, 48.0, [0, 2, 1, 3, 0], best=True, since=first['v'])
+        assert second['base'] == first['v']
+        assert set(second['set']) == {'episode', 'tick', 'best'}
+        assert second['agents'] == {'QL-Bot': {'distance': 48.0, 'route': [0, 2, 1, 3, 0]}}
+        assert first['agents']['Sarsa-Bot']['route'] == [0, 3, 2, 1, 0]  # Both 'A's kept apart
+
+        third = encode(encoder, 2, 48.0, [0, 2, 1, 3, 0], best=True, since=second['v'])
+        assert third['agents'] == {} and set(third['set']) == {'episode', 'tick'}
+        # Version 1 fell out of the two retained states: the whole state comes back
+        assert encode(encoder, 3, 48.0, [0, 1, 2, 3, 0], since=first['v'])['base'] is None
+
+    @pytest.mark.unit
+    def test_compression_is_negotiated(self, monkeypatch):
+        """Test q-values, the brotli preference and the size threshold."""
+        assert accepted_encoding('gzip, deflate') == 'gzip'
+        assert accepted_encoding('gzip;q=0, identity') is None
+        monkeypatch.setattr(payload, 'brotli', None)
+        assert accepted_encoding('br, gzip') == 'gzip'
+
+        obj = {'cities': ['Kota 🏙️ %d' % i for i in range(200)]}
+        body, coding = encode_body(obj, 'gzip', min_bytes=64)
+        assert coding == 'gzip' and json.loads(gzip.decompress(body)) == obj
+        assert encode_body({'v': 1}, 'gzip', min_bytes=64) == (b'{"v":1}', None)
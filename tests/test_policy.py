@@ -0,0 +1,70 @@
+"""
+Unit Tests for Compiled Policies
+Tests for Q-table distillation, binary-search lookup and the .npz artifact.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.policy import CompiledPolicy, PolicyCache, distill_policy
+from tsp_agent import LinearQAgent, QLearningAgent
+
+
+class TestPolicy:
+    """Test suite for distill_policy / CompiledPolicy."""
+
+    @pytest.mark.unit
+    def test_distilled_policy_matches_greedy_route(self, sample_cities, sample_distance_matrix):
+        """Test that the compiled table reproduces get_route and rotates it to any start city."""
+        matrix = np.array(sample_distance_matrix, dtype=np.float32)
+        agent = QLearningAgent(sample_cities, dist_matrix=matrix)
+        for _ in range(300):
+            agent.train_episode()
+
+        policy = distill_policy(agent)
+        expected = agent.get_route()
+        route, coverage = policy.route(0)
+        assert route == expected and coverage == 1.0
+        assert policy.states <= len(agent.q_table)
+        assert policy.masks.dtype == np.uint64 and policy.next_city_table.dtype == np.uint16
+
+        rotated, _ = policy.route(3)
+        assert rotated[0] == rotated[-1] == 3 and sorted(rotated[:-1]) == list(range(5))
+        k = expected.index(3)
+        assert rotated == expected[k:-1] + expected[:k] + [3]
+        with pytest.raises(ValueError):
+            policy.route(5)
+
+    @pytest.mark.unit
+    def test_unseen_states_fall_back_to_nearest(self, sample_cities, sample_distance_matrix):
+        """Test the nearest-unvisited fallback and that linear agents are refused."""
+        matrix = np.array(sample_distance_matrix, dtype=np.float32)
+        agent = QLearningAgent(sample_cities, dist_matrix=matrix)
+        agent.q_table[(0, 0b1)][4] = 5.0
+        policy = distill_policy(agent)
+        assert policy.lookup(0, 0b1) == 4 and policy.lookup(1, 0b11) is None
+        # From 4 the nearest is 3 (15), then 1 (25 from 3), then 2
+        assert policy.route(0) == ([0, 4, 3, 1, 2, 0], 0.25)
+
+        with pytest.raises(ValueError):
+            distill_policy(LinearQAgent(sample_cities, dist_matrix=matrix))
+
+    @pytest.mark.unit
+    def test_artifact_round_trip_and_cache(self, tmp_path, sample_cities, sample_distance_matrix):
+        """Test that a saved artifact loads back identically and the cache reloads replaced files."""
+        agent = QLearningAgent(sample_cities, dist_matrix=np.array(sample_distance_matrix, dtype=np.float32))
+        for _ in range(50):
+            agent.train_episode()
+        policy = distill_policy(agent, meta={'map': 'abc', 'episode': 50})
+        path = str(tmp_path / 'sim' / 'QL-Bot.npz')
+        policy.save(path)
+
+        cache = PolicyCache()
+        loaded = cache.get(path)
+        assert cache.get(path) is loaded and cache.get(str(tmp_path / 'missing.npz')) is None
+        assert loaded.meta['map'] == 'abc' and loaded.meta['episode'] == '50'
+        assert np.array_equal(loaded.masks, policy.masks) and loaded.route(2) == policy.route(2)
+
+        CompiledPolicy(policy.offsets, policy.masks[:0], policy.next_city_table[:0], policy.nearest,
+                       dict(policy.meta, episode=99)).save(path)
+        assert cache.get(path).meta['episode'] == '99'
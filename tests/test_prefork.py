@@ -0,0 +1,79 @@
+"""
+Unit Tests for the Pre-fork Serving Mode
+Tests for the shared snapshot files and trainer / worker request forwarding.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+import numpy as np
+
+from app.api.asgi import load_flask_module
+from app.api.prefork import TrainerClient, TrainerServer, install_worker
+from app.core.shared_state import SharedStateReader, SharedStateWriter
+from app.core.snapshots import SnapshotPublisher, summarize_agent
+from tsp_agent import QLearningAgent
+
+
+class TestSharedState:
+    """Test suite for SharedStateWriter / SharedStateReader."""
+
+    @pytest.mark.unit
+    def test_round_trip_and_matrix_pruning(self, sample_cities, sample_distance_matrix, tmp_path):
+        """Test that workers see the published snapshot with a memory-mapped matrix."""
+        matrix = np.array(sample_distance_matrix, dtype=np.float32)
+        agent = QLearningAgent(sample_cities, dist_matrix=matrix)
+        agent.train_episode()
+        publisher = SnapshotPublisher()
+        writer = SharedStateWriter(str(tmp_path), keep_matrices=1)
+        reader = SharedStateReader(str(tmp_path))
+
+        published = publisher.publish(3, matrix, 1, sample_cities, [summarize_agent(agent)])
+        writer('sim-a', published)
+        seen = reader.latest('sim-a')
+        assert seen.episode == 3 and seen.agents[agent.name].route == published.agents[agent.name].route
+        assert isinstance(seen.matrix, np.memmap) and not seen.matrix.flags.writeable
+        assert np.array_equal(seen.matrix, matrix)
+        assert reader.latest('sim-a') is seen  # Unchanged file: no re-read
+
+        writer('sim-a', publisher.publish(4, matrix * 2, 2, sample_cities, [summarize_agent(agent)]))
+        assert reader.latest('sim-a').matrix_version == 2
+        assert sorted(os.listdir(tmp_path / 'sim-a')) == ['matrix-2.npy', 'snapshot.json']
+
+        writer('sim-a', None)
+        assert reader.latest('sim-a') is None
+
+
+class TestPreforkForwarding:
+    """Test suite for a trainer and a worker app wired over a Unix socket."""
+
+    @pytest.mark.integration
+    def test_worker_reads_locally_and_forwards_writes(self, flask_module, tmp_path):
+        """Test that training runs in the trainer while reads are served from shared files."""
+        socket_path = os.path.join(tempfile.mkdtemp(), 'trainer.sock')
+        flask_module.snapshot_mirror = SharedStateWriter(str(tmp_path))
+        server = TrainerServer(flask_module.app, address=socket_path, authkey=b'test')
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            worker_module = load_flask_module('twin_prefork_worker')
+            install_worker(worker_module, TrainerClient(socket_path, authkey=b'test', timeout=30),
+                           SharedStateReader(str(tmp_path)))
+            worker = worker_module.app.test_client()
+
+            response = worker.get('/api/train?sim=prefork')
+            assert response.status_code == 200
+            episode = json.loads(response.data)['episode']
+
+            response = worker.get('/api/agent_comparison?sim=prefork')
+            assert response.status_code == 200
+            assert json.loads(response.data)['episode'] == episode
+            assert len(worker_module.registry) == 0  # The worker never built a simulation
+            assert 'prefork' in flask_module.registry
+        finally:
+            flask_module.snapshot_mirror = None
+            server.close()
+            thread.join(timeout=5)
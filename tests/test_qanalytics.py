@@ -0,0 +1,85 @@
+"""
+Unit Tests for Q-Table Analytics
+Tests for depth coverage, action entropy, visitation heatmaps and background rebuilds.
+"""
+
+import math
+from collections import defaultdict
+from threading import Lock
+
+import numpy as np
+import pytest
+
+from app.core.qanalytics import QAnalyticsTracker, analyze_q_table, copy_q_table, decision_factors, state_entropy
+from tsp_agent import QLearningAgent
+
+
+class TestQAnalytics:
+    """Test suite for analyze_q_table / QAnalyticsTracker."""
+
+    @pytest.mark.unit
+    def test_entropy_matches_per_state_softmax(self):
+        """Test the segmented Boltzmann entropy against a per-state loop."""
+        rng = np.random.default_rng(5)
+        counts = np.array([3, 1, 4, 2])
+        q = rng.normal(size=counts.sum()) * 10
+        expected, lo, scale = [], 0, q.std()
+        for k in counts:
+            z = q[lo:lo + k] / scale
+            p = np.exp(z - z.max()) / np.exp(z - z.max()).sum()
+            if k > 1:
+                expected.append(-(p * np.log(p)).sum() / math.log(k))
+            lo += k
+        assert state_entropy(q, counts) == pytest.approx(expected)
+        assert state_entropy(np.array([5.0, 5.0]), np.array([2])) == pytest.approx([1.0])
+
+    @pytest.mark.unit
+    def test_table_statistics(self):
+        """Test coverage by depth, the Q histogram, learned entries and driven-road visits on a hand-made table."""
+        table = defaultdict(lambda: defaultdict(float))
+        table[(0, 0b0001)].update({1: 10.0, 2: 1.0, 3: 1.0})   # Depth 0: the depot
+        table[(1, 0b0011)].update({2: 5.0, 3: 5.0})           # Depth 1
+        table[(2, 0b0101)].update({1: 2.0})                   # Depth 1, single action
+        table[(3, 0b1011)]                                   # Looked up, never learned
+        driven = np.zeros((4, 4), dtype=np.uint32)
+        driven[0, 1], driven[1, 2], driven[2, 3] = 30, 20, 10   # Roads the agent actually drove
+        summary, visits, learned, mean_q = analyze_q_table(copy_q_table(table), 4, {0: 'D', 1: 'A', 2: 'B', 3: 'C'}, driven)
+
+        assert summary['states'] == 3 and summary['entries'] == 6
+        depth = summary['coverage_by_depth']
+        assert [d['states'] for d in depth] == [1, 2, 0, 0]
+        assert [d['possible'] for d in depth] == [1, 3, 6, 3]
+        assert summary['entropy']['states'] == 2 and sum(summary['entropy']['counts']) == 2
+        assert sum(summary['q_histogram']['counts']) == 6 and summary['q_histogram']['max'] == 10.0
+        assert learned[0].tolist() == [0, 1, 1, 1] and learned[2, 1] == 1 and summary['learned_pairs'] == 6
+        assert mean_q[1, 2] == 5.0 and np.isnan(mean_q[3, 0])
+        assert visits[0, 1] == 30 and summary['roads_driven'] == 3 and summary['steps_driven'] == 60
+        p = np.array([30, 20, 10]) / 60
+        assert summary['route_diversity'] == pytest.approx(np.exp(-(p * np.log(p)).sum()), abs=0.05)
+        top = summary['top_pairs'][0]
+        assert (top['from_name'], top['to_name'], top['visits'], top['learned_entries']) == ('D', 'A', 30, 1)
+
+        factors = decision_factors(table[(0, 1)], [0.0, 1.0, 9.0, 9.0], 0.2, summary)
+        assert {f['factor'] for f in factors} == {'Exploration', 'Learned preference', 'Short distance', 'Policy certainty'}
+        assert sum(f['weight'] for f in factors) == pytest.approx(100, abs=2)
+
+    @pytest.mark.unit
+    def test_tracker_rebuilds_only_stale_agents(self, sample_cities, sample_distance_matrix):
+        """Test that background builds follow Q versions and record the version they read."""
+        agent = QLearningAgent(sample_cities, dist_matrix=np.array(sample_distance_matrix, dtype=np.float32))
+        for _ in range(50):
+            agent.train_episode()
+        agents, locks = {'QL': agent}, {'QL': Lock()}
+        cities = {i: {'name': f'C{i}'} for i in range(5)}
+        tracker = QAnalyticsTracker(['QL'], min_interval=0.0)
+        tracker.refresh_if_stale(agents, locks, cities)
+        first = tracker.wait()['QL']
+        assert first.version == 0 and first.summary['states'] > 0 and tracker.stale() == []
+        assert first.summary['steps_driven'] == agent.edge_visits.sum() == 50 * 4  # Return leg is not a step
+
+        tracker.refresh_if_stale(agents, locks, cities)  # Nothing trained: no rebuild
+        assert tracker.wait()['QL'] is first
+        agent.train_episode()
+        tracker.bump('QL')
+        tracker.refresh_if_stale(agents, locks, cities)
+        assert tracker.wait()['QL'].version == 1 and tracker.summaries()['QL']['current_version'] == 1
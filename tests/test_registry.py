@@ -0,0 +1,77 @@
+"""
+Unit Tests for Simulation Registry
+Tests for lazy creation, LRU eviction and checkpoint hooks.
+"""
+
+import pytest
+import threading
+import time
+
+from app.core.registry import SimulationRegistry, JsonCheckpointStore, InvalidSimulationId
+
+
+class FakeSim:
+    def __init__(self, sim_id):
+        self.sim_id = sim_id
+        self.lock = threading.Lock()
+
+
+class TestSimulationRegistry:
+    """Test suite for SimulationRegistry."""
+
+    @pytest.mark.unit
+    def test_lazy_creation_reuses_instance(self):
+        built = []
+        registry = SimulationRegistry(lambda sid: built.append(sid) or FakeSim(sid))
+
+        first = registry.get('java')
+        second = registry.get('java')
+
+        assert first is second
+        assert built == ['java']
+        assert registry.get('sumatra', create=False) is None
+
+    @pytest.mark.unit
+    def test_lru_eviction_checkpoints_oldest(self):
+        evicted = []
+        registry = SimulationRegistry(FakeSim, max_active=2, on_evict=lambda sid, sim: evicted.append(sid))
+        registry.pin('default')
+
+        registry.get('default')
+        registry.get('java')
+        registry.get('sumatra')  # Full: 'java' is the oldest unpinned entry
+
+        assert evicted == ['java']
+        assert sorted(registry.ids()) == ['default', 'sumatra']
+
+    @pytest.mark.unit
+    def test_concurrent_first_access_builds_once(self):
+        calls = []
+
+        def slow_factory(sid):
+            calls.append(sid)
+            time.sleep(0.05)
+            return FakeSim(sid)
+
+        registry = SimulationRegistry(slow_factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('kalimantan'))) for _ in range(5)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert calls == ['kalimantan']
+        assert all(r is results[0] for r in results)
+
+    @pytest.mark.unit
+    def test_invalid_sim_id_rejected(self):
+        registry = SimulationRegistry(FakeSim)
+        with pytest.raises(InvalidSimulationId):
+            registry.get('../etc/passwd')
+
+    @pytest.mark.unit
+    def test_checkpoint_store_roundtrip(self, tmp_path):
+        store = JsonCheckpointStore(str(tmp_path))
+        store.save('java', {'episodes': 42})
+
+        assert store.load('java') == {'episodes': 42}
+        assert store.load('sumatra') is None
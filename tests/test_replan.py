@@ -0,0 +1,81 @@
+"""
+Unit Tests for Route Re-planning
+Tests for partial-route completion, the nearest-neighbour fallback and delta 2-opt.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.core.replan import complete_route, follow_route, two_opt_path
+from tsp_agent import LinearQAgent, QLearningAgent
+
+
+def path_length(matrix, path):
+    return sum(matrix[a][b] for a, b in zip(path[:-1], path[1:]))
+
+
+class TestReplan:
+    """Test suite for complete_route / two_opt_path."""
+
+    @pytest.mark.unit
+    def test_two_opt_is_exact_on_asymmetric_matrices(self):
+        """Test that applied moves shorten the path by their computed delta and endpoints stay put."""
+        rng = np.random.default_rng(7)
+        matrix = rng.uniform(1.0, 100.0, size=(9, 9))
+        path = [3, 0, 1, 2, 4, 5, 6, 7, 8]
+        improved, moves = two_opt_path(path, matrix)
+        assert moves > 0 and improved[0] == 3 and improved[-1] == 8
+        assert sorted(improved) == sorted(path)
+        assert path_length(matrix, improved) < path_length(matrix, path)
+        # Local optimum: no single reversal improves it any further
+        for i, j in itertools.combinations(range(1, len(path) - 1), 2):
+            candidate = improved[:i] + improved[i:j + 1][::-1] + improved[j + 1:]
+            assert path_length(matrix, candidate) >= path_length(matrix, improved) - 1e-9
+
+    @pytest.mark.unit
+    def test_completion_follows_the_agent_then_falls_back(self, sample_cities, sample_distance_matrix):
+        """Test that learned states are followed and unseen ones use nearest-neighbour plus 2-opt."""
+        matrix = np.array(sample_distance_matrix, dtype=np.float64)
+        agent = QLearningAgent(sample_cities, dist_matrix=matrix.astype(np.float32))
+        for _ in range(300):
+            agent.train_episode()
+
+        # At city 2 having served 1 (depot 0): the Q-table knows every state on the way
+        result = complete_route(agent.greedy_action, matrix, current=2, visited=[1], depot=0)
+        assert result['route'] == agent.get_route(start_city=2, visited=[1], depot=0)
+        assert result['source'] == 'agent' and result['two_opt_moves'] == 0
+        assert result['route'][0] == 2 and result['route'][-1] == 0 and sorted(result['route'][1:-1]) == [3, 4]
+
+        heuristic = complete_route(None, matrix, current=1, visited=[], depot=0)
+        assert heuristic['source'] == 'heuristic' and heuristic['learned_steps'] == 0
+        assert sorted(heuristic['route'][1:-1]) == [2, 3, 4]
+        assert heuristic['distance'] == pytest.approx(path_length(matrix, heuristic['route']))
+        with pytest.raises(ValueError):
+            complete_route(None, matrix, current=9)
+
+    @pytest.mark.unit
+    def test_agent_routes_continue_from_any_state(self, sample_cities, sample_distance_matrix):
+        """Test get_route with a start city, a visited set and a separate depot."""
+        agent = QLearningAgent(sample_cities, dist_matrix=np.array(sample_distance_matrix, dtype=np.float32))
+        assert agent.get_route() == [0, 1, 2, 3, 4, 0]  # Untrained: lowest index first
+        assert agent.get_route(start_city=3, visited=[0, 1], depot=0) == [3, 2, 4, 0]
+        assert len(agent.q_table) == 0  # Queries never create states
+
+    @pytest.mark.unit
+    def test_linear_agent_completion_heads_for_the_depot(self):
+        """Test that a linear agent's remainder is walked once, towards the requested depot."""
+        rng = np.random.default_rng(5)
+        pts = rng.uniform(0, 100, (80, 2))
+        matrix = np.hypot(*(pts[:, None, :] - pts[None, :, :]).transpose(2, 0, 1)).astype(np.float32)
+        agent = LinearQAgent({i: {'lat': 0.0, 'lon': 0.0} for i in range(80)}, dist_matrix=matrix)
+        agent.weights[:] = [0.0, -1.0, 0.0, 0.0, -2.0, 0.0]  # Near first, and prefer cities near home late
+        agent.train_episode()
+
+        planned = agent.get_route(start_city=10, visited=[3, 4], depot=7)
+        result = complete_route(follow_route(planned), matrix, current=10, visited=[3, 4], depot=7)
+        assert result['route'] == planned and result['source'] == 'agent' and result['route'][-1] == 7
+        mask = sum(1 << c for c in (10, 3, 4, 7))
+        assert agent.visited_array(mask).nonzero()[0].tolist() == [3, 4, 7, 10]
+        assert agent.greedy_action(10, mask, depot=7) == planned[1]
@@ -0,0 +1,64 @@
+"""
+Unit Tests for the Result Cache
+Tests for LRU/TTL behaviour, single-flight computation and background submits.
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.core.result_cache import ResultCache
+
+
+class TestResultCache:
+    """Test suite for ResultCache."""
+
+    @pytest.mark.unit
+    def test_lru_and_ttl(self):
+        """Test that the least recently used entry is evicted and stale entries expire."""
+        cache = ResultCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert cache.get('b') is None and cache.get('a') == 1 and cache.stats()['evictions'] == 1
+
+        short = ResultCache(ttl=0.01)
+        short.put('a', 1)
+        time.sleep(0.02)
+        assert short.get('a') is None
+
+    @pytest.mark.unit
+    def test_concurrent_misses_compute_once(self):
+        """Test that callers missing the same key share one computation."""
+        cache = ResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'solved'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == ['solved'] * 4 and len(calls) == 1
+
+    @pytest.mark.unit
+    def test_submit_answers_none_until_computed(self):
+        """Test that submit() computes in the background and a failed computation is retried."""
+        cache = ResultCache()
+        release = threading.Event()
+        assert cache.submit('k', lambda: release.wait(5) and 42) is None
+        assert cache.submit('k', lambda: 0) is None and cache.stats()['coalesced'] == 1
+        release.set()
+        assert cache.wait() and cache.submit('k', lambda: 0) == 42
+
+        assert cache.submit('bad', lambda: 1 / 0) is None
+        assert cache.wait() and cache.get('bad') is None
+        assert cache.submit('bad', lambda: 7) is None and cache.wait() and cache.get('bad') == 7
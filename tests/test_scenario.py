@@ -0,0 +1,92 @@
+"""
+Unit Tests for the Scenario Engine
+Tests for disaster patching, 2-opt re-routing and what-if previews.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.scenario import (
+    ScenarioEngine, apply_disaster, cities_within, tour_length, two_opt, PENALTY_CAP
+)
+from app.core.snapshots import SnapshotPublisher, summarize_agent
+from tsp_agent import QLearningAgent
+
+
+def loop_reference(matrix, affected, multiplier, severity):
+    """The original V5.1 nested-loop penalty, for equivalence checks."""
+    n = len(matrix)
+    others = affected if severity == 1 else range(n)
+    for i in affected:
+        for j in others:
+            if i != j:
+                matrix[i][j] = min(matrix[i][j] * multiplier, PENALTY_CAP)
+                matrix[j][i] = min(matrix[j][i] * multiplier, PENALTY_CAP)
+    return matrix
+
+
+def random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(10, 500, (n, n))
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
+class TestApplyDisaster:
+    """Test suite for the vectorized severity patch."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("severity,multiplier", [(1, 1.2), (2, 2.5), (3, 100.0)])
+    def test_matches_loop_reference(self, severity, multiplier):
+        """Test that the patch equals the original loop for every severity."""
+        base = random_matrix(12)
+        affected = [2, 3, 7]
+        expected = loop_reference(base.copy(), affected, multiplier, severity)
+        actual = apply_disaster(base.copy(), affected, multiplier, severity)
+        assert np.allclose(actual, expected)
+
+    @pytest.mark.unit
+    def test_cities_within(self, sample_cities):
+        """Test the vectorized radius lookup."""
+        assert cities_within(sample_cities, 1.0, 1.0, 10) == [1]
+        assert cities_within(sample_cities, 2.0, 2.0, 200) == [1, 2, 3]
+
+
+class TestReroute:
+    """Test suite for 2-opt re-routing."""
+
+    @pytest.mark.unit
+    def test_two_opt_asymmetric(self):
+        """Test that 2-opt keeps a valid closed tour and never gets worse."""
+        matrix = random_matrix(25, seed=3)
+        route = list(range(25)) + [0]
+        improved = two_opt(matrix, route)
+        assert improved[0] == improved[-1] == 0
+        assert sorted(improved[:-1]) == list(range(25))
+        assert tour_length(matrix, improved) < tour_length(matrix, route)
+
+
+class TestScenarioEngine:
+    """Test suite for ScenarioEngine previews."""
+
+    @pytest.fixture
+    def snapshot(self, sample_cities, sample_distance_matrix):
+        matrix = np.array(sample_distance_matrix, dtype=np.float32)
+        agent = QLearningAgent(sample_cities, dist_matrix=matrix)
+        agent.train_episode()
+        return SnapshotPublisher().publish(1, matrix, 1, sample_cities, [summarize_agent(agent)])
+
+    @pytest.mark.unit
+    def test_preview_reroutes_without_mutation(self, snapshot):
+        """Test that previews re-route on a scratch copy and are cached."""
+        before = np.array(snapshot.matrix)
+        engine = ScenarioEngine()
+        result = engine.preview(snapshot, 0.0, 0.0, 5, 3, 100.0)
+
+        assert result.affected == [0]
+        assert np.array_equal(snapshot.matrix, before)
+        impact = result.impacts[0]
+        assert impact.rerouted_distance <= impact.impacted_distance
+        assert impact.impacted_distance > impact.distance
+        assert engine.preview(snapshot, 0.0, 0.0, 5, 3, 100.0) is result
+        assert result.elapsed_ms < 100
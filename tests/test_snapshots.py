@@ -0,0 +1,53 @@
+"""
+Unit Tests for Simulation Snapshots
+Tests for the read-copy-update publisher used by the read endpoints.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.snapshots import SnapshotPublisher, summarize_agent
+from tsp_agent import QLearningAgent
+
+
+@pytest.fixture
+def agent(sample_cities):
+    matrix = np.array([[0, 1, 2], [1, 0, 1], [2, 1, 0]], dtype=np.float32)
+    cities = {k: sample_cities[k] for k in range(3)}
+    return QLearningAgent(cities, dist_matrix=matrix)
+
+
+class TestSnapshotPublisher:
+    """Test suite for SnapshotPublisher."""
+
+    @pytest.mark.unit
+    def test_matrix_is_frozen_copy(self, agent):
+        publisher = SnapshotPublisher()
+        snap = publisher.publish(0, agent.dist_matrix, 1, agent.cities, [summarize_agent(agent)])
+
+        agent.dist_matrix[0][1] = 99.0
+        assert snap.matrix[0][1] == 1.0
+        with pytest.raises(ValueError):
+            snap.matrix[0][1] = 5.0
+
+    @pytest.mark.unit
+    def test_matrix_copied_only_on_version_change(self, agent):
+        publisher = SnapshotPublisher()
+        first = publisher.publish(0, agent.dist_matrix, 1, agent.cities, [])
+        second = publisher.publish(1, agent.dist_matrix, 1, agent.cities, [])
+        third = publisher.publish(2, agent.dist_matrix, 2, agent.cities, [])
+
+        assert second.version == first.version + 1
+        assert second.matrix is first.matrix
+        assert third.matrix is not first.matrix
+
+    @pytest.mark.unit
+    def test_summary_is_detached_from_training(self, agent):
+        agent.train_episode()
+        summary = summarize_agent(agent)
+
+        agent.q_table.clear()
+        assert summary.state_count > 0
+        assert summary.route[0] == 0 and summary.route[-1] == 0
+        with pytest.raises(TypeError):
+            summary.root_q[1] = 0.0
@@ -0,0 +1,55 @@
+"""
+Unit Tests for Scenario Sweeps
+Tests for candidate evaluation, ranking and the shared-memory worker pool.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.sweep import SweepRunner, disaster_candidate, edge_candidate
+
+
+@pytest.fixture
+def network():
+    rng = np.random.default_rng(7)
+    n = 12
+    cities = {i: {'lat': -7 + rng.random(), 'lon': 107 + rng.random() * 3} for i in range(n)}
+    matrix = rng.uniform(10, 300, (n, n))
+    np.fill_diagonal(matrix, 0.0)
+    route = [0] + list(range(1, n)) + [0]
+    return cities, matrix, [route, route]
+
+
+class TestSweepRunner:
+    """Test suite for SweepRunner."""
+
+    @pytest.mark.unit
+    def test_ranking_and_no_mutation(self, network):
+        """Test that candidates are ranked and the base matrix is untouched."""
+        cities, matrix, routes = network
+        before = matrix.copy()
+        candidates = [edge_candidate(0, 1), edge_candidate(2, 3),
+                      disaster_candidate(-6.5, 108.5, 80, 3, 100.0),
+                      disaster_candidate(10.0, 10.0, 1, 3, 100.0)]
+        results = SweepRunner(workers=1).run(matrix, cities, routes, candidates)
+
+        assert np.array_equal(matrix, before)
+        assert [r['rank'] for r in results] == [1, 2, 3, 4]
+        increases = [r['total_increase'] for r in results]
+        assert increases == sorted(increases, reverse=True)
+        far_away = next(r for r in results if r['params'][0] == 10.0)
+        assert far_away['affected_cities'] == [] and far_away['total_increase'] == 0.0
+
+    @pytest.mark.slow
+    def test_parallel_matches_inline(self, network):
+        """Test that shared-memory workers produce the same ranking as inline evaluation."""
+        cities, matrix, routes = network
+        candidates = [edge_candidate(u, v) for u in range(6) for v in range(u + 1, 6)]
+        inline = SweepRunner(workers=1).run(matrix, cities, routes, candidates)
+        runner = SweepRunner(workers=2)
+        try:
+            parallel = runner.run(matrix, cities, routes, candidates)
+        finally:
+            runner.shutdown()
+        assert [r['params'] for r in parallel] == [r['params'] for r in inline]
+        assert np.allclose([r['total_increase'] for r in parallel], [r['total_increase'] for r in inline])
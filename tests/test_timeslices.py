@@ -0,0 +1,52 @@
+"""
+Unit Tests for Time-Sliced Matrices
+Tests for slot lookup, interpolation, rush-hour profiles and memory-mapped storage.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.timeslices import TimeSlicedMatrix, format_clock, parse_clock
+
+
+@pytest.fixture
+def base_matrix(sample_distance_matrix):
+    return np.array(sample_distance_matrix, dtype=np.float32)
+
+
+class TestTimeSlicedMatrix:
+    """Test suite for TimeSlicedMatrix and the clock helpers."""
+
+    @pytest.mark.unit
+    def test_clock_parsing(self):
+        """Test that clocks round-trip and out-of-range values are rejected."""
+        assert parse_clock('07:30') == 450
+        assert format_clock(450) == '07:30'
+        with pytest.raises(ValueError):
+            parse_clock('24:00')
+
+    @pytest.mark.unit
+    def test_slot_lookup_and_interpolation(self, base_matrix):
+        """Test that the clock picks its slot and interpolation blends neighbours."""
+        stack = np.stack([base_matrix * (t + 1) for t in range(4)])  # 6-hour slots
+        slices = TimeSlicedMatrix(stack)
+        assert slices.slot_for(7 * 60) == 1
+        assert np.array_equal(slices.at(7 * 60), base_matrix * 2)
+        # 06:00 lies halfway between the centres of slot 0 (03:00) and slot 1 (09:00)
+        assert np.allclose(slices.at(6 * 60, interpolate=True), base_matrix * 1.5)
+
+    @pytest.mark.unit
+    def test_synthetic_rush_hour_is_slower_than_night(self, base_matrix):
+        """Test that the synthetic profile congests 08:00 more than 03:00."""
+        slices = TimeSlicedMatrix.synthetic(base_matrix, slots=24)
+        factors = slices.mean_factors(base_matrix)
+        assert factors[8] > 1.0 > factors[3]
+        assert np.allclose(slices.stack, slices.stack.transpose(0, 2, 1))
+
+    @pytest.mark.unit
+    def test_save_and_memory_map(self, base_matrix, tmp_path):
+        """Test that a saved stack is memory-mapped back read-only."""
+        path = TimeSlicedMatrix.synthetic(base_matrix, slots=6).save(str(tmp_path / 'slices.npy'))
+        slices = TimeSlicedMatrix.load(path)
+        assert slices.memory_mapped and slices.slots == 6
+        assert not slices.at(0).flags.writeable
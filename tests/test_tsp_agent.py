@@ -95,3 +95,62 @@ class TestDistanceMatrixOperations:
         assert matrix.shape[0] == matrix.shape[1]
         assert matrix.shape[0] == len(sample_cities)
         assert np.all(np.diag(matrix) == 0)
+
+    @pytest.mark.unit
+    def test_agent_accepts_list_of_lists_matrix(self, sample_cities, sample_distance_matrix):
+        """Test that a plain nested-list matrix trains, scores routes and survives a blocked road."""
+        matrix = [list(map(float, row)) for row in sample_distance_matrix]
+        agent = tsp_agent.QLearningAgent(sample_cities, dist_matrix=matrix)
+        for _ in range(5):
+            agent.train_episode()
+        route = agent.get_route()
+        assert agent.calculate_route_dist(route) == pytest.approx(tsp_agent.calculate_total_distance(route, matrix))
+
+        agent.set_road_status(0, 1, 'blocked')
+        assert agent.dist_matrix[0, 1] == 9999999.0 and agent.original_distance_matrix[0][1] == matrix[0][1]
+        agent.set_road_status(0, 1, 'open')
+        assert agent.dist_matrix[0, 1] == matrix[0][1]
+
+
+@pytest.fixture
+def large_map():
+    """300 random cities: far beyond what a (city, bitmask) Q-table can hold."""
+    rng = np.random.default_rng(7)
+    coords = rng.uniform([-8.0, 110.0], [-6.0, 114.0], (300, 2))
+    return {i: {'lat': float(lat), 'lon': float(lon)} for i, (lat, lon) in enumerate(coords)}
+
+
+@pytest.mark.skipif(tsp_agent is None, reason="tsp_agent module not found")
+class TestLinearQAgent:
+    """Test suite for the large-map linear function approximation agent."""
+
+    @pytest.mark.unit
+    def test_haversine_matrix_matches_scalar_formula(self, sample_cities):
+        """Test that the vectorized Haversine fallback matches create_distance_matrix."""
+        agent = tsp_agent.TSPBaseAgent(sample_cities, dist_matrix=np.zeros((5, 5)))
+        assert np.allclose(agent.get_haversine_matrix(sample_cities),
+                           tsp_agent.create_distance_matrix(sample_cities), rtol=1e-4)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('options', [{}, {'on_policy': True, 'lambda_val': 0.7}, {'planning_steps': 3}])
+    def test_trains_on_large_map_with_bounded_memory(self, large_map, options):
+        """Test that episodes on a 300-city map produce full tours without Q-table growth."""
+        matrix = tsp_agent.TSPBaseAgent(large_map, dist_matrix=np.zeros((1, 1))).get_haversine_matrix(large_map)
+        agent = tsp_agent.LinearQAgent(large_map, dist_matrix=matrix, **options)
+        for _ in range(3):
+            agent.train_episode()
+        distance, route = agent.get_best_route_distance()
+        assert route[0] == route[-1] == 0
+        assert sorted(route[:-1]) == list(range(300))
+        assert len(agent.q_table) == 0 and agent.edge_visits is None  # No n x n visit counters either
+        assert np.isfinite(agent.weights).all() and distance > 0
+
+    @pytest.mark.unit
+    def test_learns_to_prefer_near_cities(self, large_map):
+        """Test that training beats a random tour by a wide margin."""
+        matrix = tsp_agent.TSPBaseAgent(large_map, dist_matrix=np.zeros((1, 1))).get_haversine_matrix(large_map)
+        agent = tsp_agent.LinearQAgent(large_map, dist_matrix=matrix, epsilon_decay=0.8)
+        for _ in range(10):
+            agent.train_episode()
+        random_tour = list(range(300)) + [0]
+        assert agent.get_best_route_distance()[0] < 0.5 * agent.calculate_route_dist(random_tour)
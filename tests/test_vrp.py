@@ -0,0 +1,65 @@
+"""
+Unit Tests for the VRP Solver
+Tests for savings construction, local search and constraints.
+"""
+
+import time
+
+import pytest
+import numpy as np
+
+from app.core.vrp import VRPProblem, solve_vrp
+
+
+def random_instance(n, seed=1):
+    rng = np.random.default_rng(seed)
+    pts = rng.random((n, 2)) * 300
+    matrix = np.hypot(pts[:, None, 0] - pts[None, :, 0], pts[:, None, 1] - pts[None, :, 1])
+    return matrix, rng.integers(1, 5, n).astype(float), rng
+
+
+def check_solution(problem, solution):
+    served = sorted(u for r in solution.routes for u in r.stops) + sorted(solution.unassigned)
+    assert sorted(served) == problem.customers
+    for route in solution.routes:
+        assert route.load <= problem.capacity
+        assert problem.feasible(route.depot, route.stops)
+
+
+class TestVRPSolver:
+    """Test suite for solve_vrp."""
+
+    @pytest.mark.unit
+    def test_single_depot_capacity(self):
+        """Test that capacity splits the stops and every stop is served once."""
+        matrix, demands, _ = random_instance(30)
+        problem = VRPProblem(matrix, [0], demands, capacity=10)
+        solution = solve_vrp(problem, time_limit=0.5)
+        check_solution(problem, solution)
+        assert len(solution.routes) >= demands[1:].sum() / 10
+        assert solution.distance == pytest.approx(sum(r.distance for r in solution.routes))
+
+    @pytest.mark.unit
+    def test_time_windows_and_oversized_stop(self):
+        """Test that windows are respected and impossible stops are reported."""
+        matrix, demands, rng = random_instance(40, seed=2)
+        demands[5] = 99
+        windows = {u: (float(a), float(a) + 3) for u, a in zip(range(2, 40), rng.uniform(0, 6, 38))}
+        problem = VRPProblem(matrix, [0, 1], demands, capacity=12, time_windows=windows, service_time=0.2)
+        solution = solve_vrp(problem, time_limit=0.5)
+        check_solution(problem, solution)
+        assert 5 in solution.unassigned
+        for route in solution.routes:
+            for u, t in zip(route.stops, route.arrivals):
+                assert windows[u][0] <= t <= windows[u][1] + 1e-9
+
+    @pytest.mark.slow
+    def test_250_stops_interactive(self):
+        """Test that 250 stops across three depots solve within interactive time."""
+        matrix, demands, _ = random_instance(253, seed=3)
+        problem = VRPProblem(matrix, [0, 1, 2], demands, capacity=20)
+        started = time.time()
+        solution = solve_vrp(problem, time_limit=1.0)
+        assert time.time() - started < 3.0
+        check_solution(problem, solution)
+        assert {r.depot for r in solution.routes} == {0, 1, 2}
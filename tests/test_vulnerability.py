@@ -0,0 +1,85 @@
+"""
+Unit Tests for the Vulnerability Index
+Tests for edge closure costs, city detours and incremental rebuilds.
+"""
+
+import pytest
+import numpy as np
+
+from app.core.scenario import apply_disaster, tour_length
+from app.core.snapshots import SnapshotPublisher, summarize_agent
+from app.core.vulnerability import VulnerabilityTracker, build_index, city_detour_costs
+from tsp_agent import QLearningAgent
+
+
+@pytest.fixture
+def publisher_and_agent(sample_cities, sample_distance_matrix):
+    matrix = np.array(sample_distance_matrix, dtype=np.float32)
+    agent = QLearningAgent(sample_cities, dist_matrix=matrix)
+    agent.train_episode()
+    return SnapshotPublisher(), agent
+
+
+class TestVulnerabilityIndex:
+    """Test suite for build_index and VulnerabilityTracker."""
+
+    @pytest.mark.unit
+    def test_unreachable_city_cost_is_the_repaired_tour_change(self):
+        """Test that every stop is charged the 2-opt repaired tour length without it minus the original."""
+        # 0 --- 1 --- 2 on a line, 3 off to the side
+        pts = np.array([[0, 0], [1, 0], [2, 0], [1, 3]], dtype=float)
+        matrix = np.hypot(*(pts[:, None, :] - pts[None, :, :]).transpose(2, 0, 1))
+        tour = [0, 1, 2, 3, 0]
+        costs = city_detour_costs(matrix, [tour])
+        original = tour_length(matrix, tour)
+        assert costs[3] == pytest.approx(4.0 - original)   # 0-1-2-0 remains
+        assert costs[1] == pytest.approx(0.0)              # 1 lies on the 0-2 road
+        assert costs[0] == pytest.approx(tour_length(matrix, [1, 2, 3, 1]) - original)
+        assert costs[3] < costs[0] < costs[1] and np.count_nonzero(costs) == 3
+
+    @pytest.mark.unit
+    def test_incremental_rebuild_reuses_untouched_tours(self, publisher_and_agent):
+        """Test that costs are reused for an unchanged matrix and recomputed for tours through a changed city."""
+        publisher, agent = publisher_and_agent
+        matrix = agent.dist_matrix
+        first = build_index(publisher.publish(0, matrix, 1, agent.cities, [summarize_agent(agent)]))
+        assert first.recomputed > 0 and first.reused == 0
+        assert all(entry['max_increase'] >= 0 for entry in first.edges.values())
+
+        again = build_index(publisher.publish(1, matrix, 1, agent.cities, [summarize_agent(agent)]), previous=first)
+        assert again.recomputed == 0
+
+        changed = apply_disaster(np.array(matrix, dtype=np.float64), [4], 2.5, 2)
+        third = build_index(publisher.publish(2, changed, 2, agent.cities, [summarize_agent(agent)]), previous=first)
+        # Five-stop tours are shorter than a repair window: each is repaired whole, so nothing is reused
+        assert third.recomputed == first.recomputed and third.reused == 0
+
+    @pytest.mark.unit
+    def test_disaster_only_reprices_nearby_windows(self):
+        """Test that a rebuild after a local change recomputes only the windows it touches, matching a full build."""
+        rng = np.random.default_rng(3)
+        pts = rng.uniform(0, 100, (40, 2))
+        matrix = np.hypot(*(pts[:, None, :] - pts[None, :, :]).transpose(2, 0, 1))
+        cities = {i: {'name': f'C{i}', 'lat': float(y), 'lon': float(x)} for i, (x, y) in enumerate(pts)}
+        agent = QLearningAgent(cities, dist_matrix=matrix)
+        agent.train_episode()
+        publisher = SnapshotPublisher()
+        first = build_index(publisher.publish(0, matrix, 1, cities, [summarize_agent(agent)]))
+
+        changed = apply_disaster(matrix.copy(), [7], 2.5, 2)
+        snapshot = publisher.publish(1, changed, 2, cities, [summarize_agent(agent)])
+        incremental = build_index(snapshot, previous=first)
+        full = build_index(snapshot)
+        assert incremental.reused > 0 and incremental.recomputed < full.recomputed
+        assert incremental.tour_costs == pytest.approx(full.tour_costs)
+        assert np.allclose(incremental.cities, full.cities)
+
+    @pytest.mark.unit
+    def test_tracker_builds_in_background(self, publisher_and_agent):
+        """Test that the tracker builds once per matrix version."""
+        publisher, agent = publisher_and_agent
+        tracker = VulnerabilityTracker(min_interval=0)
+        snapshot = publisher.publish(0, agent.dist_matrix, 7, agent.cities, [summarize_agent(agent)])
+        tracker.refresh_if_stale(snapshot)
+        index = tracker.wait()
+        assert index is not None and index.matrix_version == 7
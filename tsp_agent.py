@@ -1,10 +1,9 @@
 import numpy as np
 import random
-import requests
 import math
 import time
 import os
-from collections import defaultdict
+from collections import defaultdict, deque
 
 # === V5.7: Test Helper Functions (Module-Level) ===
 # These standalone functions are required by test suite
@@ -20,11 +19,11 @@ def calculate_total_distance(route, distance_matrix):
     Returns:
         float: Total distance of the route
     """
-    total = 0.0
-    for i in range(len(route) - 1):
-        from_city, to_city = route[i], route[i + 1]
-        total += distance_matrix[from_city][to_city]
-    return total
+    # V5.9: One gather over all legs instead of a Python loop
+    if len(route) < 2:
+        return 0.0
+    r = np.asarray(route, dtype=np.intp)
+    return float(np.asarray(distance_matrix)[r[:-1], r[1:]].sum())
 
 
 def generate_random_route(num_cities):
@@ -136,6 +135,8 @@ def create_distance_matrix(cities):
 
 
 class TSPBaseAgent:
+    TRACKS_EDGE_VISITS = True  # V5.9: Tabular agents count the roads they drive (n x n counters)
+
     def __init__(self, cities, dist_matrix=None, alpha=0.1, gamma=0.99, epsilon=1.0, epsilon_decay=0.9995, **kwargs):
         self.cities = cities
         self.num_cities = len(cities)
@@ -148,7 +149,9 @@ class TSPBaseAgent:
         
         # Physics: Distance Matrix (OSRM / Haversine)
         if dist_matrix is not None:
-            self.dist_matrix = dist_matrix
+            # V5.9: Array view (a shared ndarray stays shared; list-of-lists input is converted once)
+            self.dist_matrix = np.asarray(dist_matrix)
+            self.matrix_source = 'shared'
             print(f"[{self.name}] Using Shared Distance Matrix.")
         else:
             self.dist_matrix = self.calculate_distance_matrix(cities)
@@ -162,9 +165,14 @@ class TSPBaseAgent:
         self.epsilon = epsilon
         self.epsilon_decay = epsilon_decay
         self.min_epsilon = 0.01
+        # V5.9: Depot every episode starts from and returns to (states always include its bit)
+        self.start_city = kwargs.get('start_city', 0)
         
         # Q-Table: Dictionary of Dictionaries (Sparse Matrix)
         self.q_table = defaultdict(lambda: defaultdict(float))
+        # V5.9: Roads actually driven while training, (from, to) -> steps (visitation heatmap)
+        self.edge_visits = (np.zeros((self.num_cities, self.num_cities), dtype=np.uint32)
+                            if self.TRACKS_EDGE_VISITS else None)
 
     def calculate_distance_matrix(self, cities):
         """Fetch OSRM Matrix dengan Fallback ke Haversine"""
@@ -180,6 +188,7 @@ class TSPBaseAgent:
         
         print(f"--- Fetching OSRM Matrix for {self.num_cities} cities ---")
         try:
+            import requests  # V5.9: Lazy - importing tsp_agent must not pay for the HTTP stack
             resp = requests.get(url, timeout=15)
             if resp.status_code != 200:
                 print(f"OSRM Error {resp.status_code}. Fallback to Haversine.")
@@ -199,6 +208,7 @@ class TSPBaseAgent:
                  return self.get_haversine_matrix(cities)
             
             print(">>> SUCCESS: OSRM Real Distances Loaded.")
+            self.matrix_source = 'osrm'
             return distances
             
         except Exception as e:
@@ -206,23 +216,17 @@ class TSPBaseAgent:
             return self.get_haversine_matrix(cities)
 
     def get_haversine_matrix(self, cities):
-        n = len(cities)
+        self.matrix_source = 'haversine'
         ids = sorted(cities.keys())
-        mat = np.zeros((n, n), dtype=np.float32)
-        for i in range(n):
-            for j in range(n):
-                if i == j: continue
-                c1 = cities[ids[i]]
-                c2 = cities[ids[j]]
-                # Haversine Formula
-                R = 6371
-                d_lat = math.radians(c2['lat'] - c1['lat'])
-                d_lon = math.radians(c2['lon'] - c1['lon'])
-                a = (math.sin(d_lat / 2) ** 2 +
-                     math.cos(math.radians(c1['lat'])) * math.cos(math.radians(c2['lat'])) *
-                     math.sin(d_lon / 2) ** 2)
-                c = 2 * math.asin(math.sqrt(a))
-                mat[i][j] = R * c
+        # Haversine Formula (V5.9: all pairs at once - 500-city maps build instantly)
+        R = 6371
+        lat = np.radians([cities[i]['lat'] for i in ids])
+        lon = np.radians([cities[i]['lon'] for i in ids])
+        d_lat = lat[None, :] - lat[:, None]
+        d_lon = lon[None, :] - lon[:, None]
+        a = np.sin(d_lat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(d_lon / 2) ** 2
+        mat = (2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))).astype(np.float32)
+        np.fill_diagonal(mat, 0.0)
         return mat
 
     def get_valid_actions(self, mask):
@@ -278,30 +282,46 @@ class TSPBaseAgent:
         # ... (Existing implementation not used by API-driven logic)
         pass
 
-    def get_route(self):
-        """Extract rute terbaik berdasarkan Q-Table saat ini"""
-        start_city = 0
+    def greedy_action(self, current_city, mask):
+        """Best learned action among unvisited cities, or None if the state was never learned."""
+        state_actions = self.q_table.get(self.get_state(current_city, mask))  # .get: no empty state
+        if not state_actions:
+            return None
+        best_action = None
+        max_q = -float('inf')
+        for action in sorted(state_actions):  # Index order: ties go to the lowest city
+            if (mask >> action) & 1:
+                continue
+            q = state_actions[action]
+            if q > max_q:
+                max_q = q
+                best_action = action
+        return best_action
+
+    def get_route(self, start_city=None, visited=None, depot=None):
+        """
+        Extract rute terbaik berdasarkan Q-Table saat ini
+
+        Args:
+            start_city: City the route continues from (default: the depot)
+            visited: Cities already served, left out of the rest of the route
+            depot: City the route ends at (default: start_city)
+        """
+        start_city = self.start_city if start_city is None else start_city
+        depot = start_city if depot is None else depot
         current_city = start_city
-        mask = 1 << start_city
+        mask = (1 << start_city) | (1 << depot)
+        for city in (visited or ()):
+            mask |= 1 << city
         route = [start_city]
         
         while True:
-            state = self.get_state(current_city, mask)
             valid_actions = self.get_valid_actions(mask)
             if not valid_actions:
-                route.append(start_city) # Kembali ke awal
+                route.append(depot) # Kembali ke awal
                 break
             
-            best_action = None
-            max_q = -float('inf')
-            state_actions = self.q_table[state]
-            
-            for action in valid_actions:
-                q = state_actions.get(action, -float('inf'))
-                if q > max_q:
-                    max_q = q
-                    best_action = action
-            
+            best_action = self.greedy_action(current_city, mask)
             if best_action is None: 
                 best_action = valid_actions[0]
                 
@@ -312,11 +332,8 @@ class TSPBaseAgent:
         return route
 
     def calculate_route_dist(self, route):
-        d = 0
-        for k in range(len(route)-1):
-            u, v = route[k], route[k+1]
-            d += self.dist_matrix[u][v]
-        return d
+        r = np.asarray(route, dtype=np.intp)
+        return float(self.dist_matrix[r[:-1], r[1:]].sum()) if len(r) > 1 else 0.0
 
     def apply_two_opt(self, route):
         """Algoritma 'Setrika' Rute: Menghilangkan silang-silang"""
@@ -376,6 +393,7 @@ class TSPBaseAgent:
     def set_road_status(self, u, v, status):
         """Fitur God Mode: Blokir Jalan"""
         limit = 9999999.0
+        self.dist_matrix = np.asarray(self.dist_matrix)  # V5.9: May have been replaced by a list
         if status == 'blocked':
             self.dist_matrix[u][v] = limit
             self.dist_matrix[v][u] = limit
@@ -394,7 +412,7 @@ class QLearningAgent(TSPBaseAgent):
 
     def train_episode(self, objective='profit'):
         # Q-Learning (Off-Policy): Max Q(s', a')
-        start_city = 0
+        start_city = self.start_city
         current_city = start_city
         mask = 1 << start_city
         done = False
@@ -409,6 +427,7 @@ class QLearningAgent(TSPBaseAgent):
             
             action = self.choose_action(state, valid_actions)
             dist = self.dist_matrix[current_city][action]
+            self.edge_visits[current_city, action] += 1
             reward = self.calculate_reward(dist, objective=objective)
             
             next_city = action
@@ -441,7 +460,7 @@ class SarsaAgent(TSPBaseAgent):
 
     def train_episode(self, objective='profit'):
         # SARSA (On-Policy): Pilih a' sekarang juga
-        start_city = 0
+        start_city = self.start_city
         current_city = start_city
         mask = 1 << start_city
         
@@ -455,6 +474,7 @@ class SarsaAgent(TSPBaseAgent):
         
         while not done:
             dist = self.dist_matrix[current_city][action]
+            self.edge_visits[current_city, action] += 1
             reward = self.calculate_reward(dist, objective=objective)
             
             next_city = action
@@ -491,7 +511,7 @@ class MonteCarloAgent(TSPBaseAgent):
     def train_episode(self, objective='profit'):
         # Monte Carlo: First-Visit MC Control
         # 1. Generate Episode sampai selesai
-        start_city = 0
+        start_city = self.start_city
         current_city = start_city
         mask = 1 << start_city
         self.episode_memory = []  # Reset memory
@@ -504,12 +524,14 @@ class MonteCarloAgent(TSPBaseAgent):
             if not valid_actions:
                 # Terminal step: Balik ke Jakarta
                 dist = self.dist_matrix[current_city][start_city]
+                self.edge_visits[current_city, start_city] += 1
                 reward = self.calculate_reward(dist, objective=objective)
                 self.episode_memory.append((state, start_city, reward))
                 break
             
             action = self.choose_action(state, valid_actions)
             dist = self.dist_matrix[current_city][action]
+            self.edge_visits[current_city, action] += 1
             reward = self.calculate_reward(dist, objective=objective)
             
             self.episode_memory.append((state, action, reward))
@@ -541,7 +563,7 @@ class TDLambdaAgent(TSPBaseAgent):
         # Sarsa(Lambda) Implementation
         self.e_traces.clear() # Reset jejak ingatan tiap episode
         
-        start_city = 0
+        start_city = self.start_city
         current_city = start_city
         mask = 1 << start_city
         
@@ -554,6 +576,7 @@ class TDLambdaAgent(TSPBaseAgent):
         
         while not done:
             dist = self.dist_matrix[current_city][action]
+            self.edge_visits[current_city, action] += 1
             reward = self.calculate_reward(dist, objective=objective)
             
             next_city = action
@@ -608,7 +631,7 @@ class DynaQAgent(TSPBaseAgent):
 
     def train_episode(self, objective='profit'):
         # Q-Learning + Planning
-        start_city = 0
+        start_city = self.start_city
         current_city = start_city
         mask = 1 << start_city
         done = False
@@ -623,6 +646,7 @@ class DynaQAgent(TSPBaseAgent):
             
             action = self.choose_action(state, valid_actions)
             dist = self.dist_matrix[current_city][action]
+            self.edge_visits[current_city, action] += 1
             reward = self.calculate_reward(dist, objective=objective)
             
             next_city = action
@@ -672,3 +696,198 @@ class DynaQAgent(TSPBaseAgent):
                 
             curr_q = self.q_table[s][a]
             self.q_table[s][a] = curr_q + self.alpha * (r + (self.gamma * max_n_q) - curr_q)
+
+
+# --- CHILD CLASS 6: Linear Function Approximation (V5.9, large maps) ---
+class LinearQAgent(TSPBaseAgent):
+    """
+    Scalable agent for maps where (city, bitmask) Q-tables are hopeless (64+ cities).
+
+    State abstraction: the agent only considers the K nearest unvisited cities,
+    each described by a small feature vector, and Q(s, a) = w . phi(s, a).
+    Memory is one weight vector (plus a bounded replay buffer for planning);
+    visited cities are a boolean array instead of a Python-int bitmask.
+
+    Variants through kwargs: on_policy (Sarsa), lambda_val (eligibility traces;
+    1.0 ~ Monte Carlo), planning_steps (Dyna-style replay).
+    """
+
+    FEATURES = ('bias', 'distance', 'rank', 'isolation', 'return_late', 'remaining')
+    TRACKS_EDGE_VISITS = False  # No n x n counters: large maps have no Q analytics anyway
+    FEATURE_CLIP = 5.0  # Blocked roads (9999999 km) must not blow up the weights
+    REPLAY_SIZE = 5000
+
+    def __init__(self, cities, neighbours=10, on_policy=False, lambda_val=0.0, planning_steps=0,
+                 alpha=0.003, gamma=0.9, **kwargs):
+        super().__init__(cities, alpha=alpha, gamma=gamma, **kwargs)
+        self.name = kwargs.get('name', 'Linear-Bot')
+        self.color = kwargs.get('color', 'teal')
+        self.neighbours = neighbours
+        self.on_policy = on_policy
+        self.lambda_val = lambda_val
+        self.planning_steps = planning_steps
+        self.weights = np.zeros(len(self.FEATURES))
+        self.replay = deque(maxlen=self.REPLAY_SIZE)  # (phi, reward, next phi or None, terminal value)
+
+    def distance_scale(self):
+        """Mean road length: keeps features and rewards O(1) on any map."""
+        m = self.dist_matrix
+        roads = m[(m > 0) & (m < 9999999.0)]
+        return float(roads.mean()) if roads.size else 1.0
+
+    def candidate_features(self, current_city, visited, start_city, scale):
+        """
+        Candidate actions (K nearest unvisited cities) and their feature rows.
+
+        Returns:
+            tuple: (candidates (K,) int array sorted by distance, phi (K, F) array)
+        """
+        m = self.dist_matrix
+        unvisited = np.flatnonzero(~visited)
+        d = m[current_city, unvisited]
+        k = min(self.neighbours, len(unvisited))
+        nearest = np.argpartition(d, k - 1)[:k] if k < len(unvisited) else np.arange(len(unvisited))
+        nearest = nearest[np.argsort(d[nearest], kind='stable')]
+        candidates = unvisited[nearest]
+
+        # Isolation: distance from each candidate to its closest other unvisited city
+        if len(unvisited) > 1:
+            others = m[np.ix_(candidates, unvisited)].astype(np.float64)
+            others[np.arange(k), nearest] = np.inf
+            isolation = others.min(axis=1)
+        else:
+            isolation = np.zeros(k)
+
+        done_fraction = 1.0 - len(unvisited) / self.num_cities
+        home = m[candidates, start_city]
+        phi = np.empty((k, len(self.FEATURES)))
+        phi[:, 0] = 1.0
+        phi[:, 1] = d[nearest] / scale
+        phi[:, 2] = np.arange(k) / max(1, self.neighbours)
+        phi[:, 3] = isolation / scale
+        phi[:, 4] = home / scale * done_fraction
+        np.clip(phi[:, 1:5], 0.0, self.FEATURE_CLIP, out=phi[:, 1:5])
+        phi[:, 5] = 1.0 - done_fraction
+        return candidates, phi
+
+    def choose_index(self, q_values):
+        """Epsilon-greedy over candidate Q-values -> (index, explored)."""
+        if random.random() < self.epsilon:
+            return random.randrange(len(q_values)), True
+        best = np.flatnonzero(q_values >= q_values.max() - 1e-12)
+        return int(random.choice(best)), False
+
+    def train_episode(self, objective='profit'):
+        # Rewards are -km / mean road length for both objectives: a linear model
+        # needs bounded rewards, and 1000/dist explodes on short hops
+        if self.num_cities < 2:
+            return
+        start_city = self.start_city
+        scale = self.distance_scale()
+        gamma, w = self.gamma, self.weights
+        visited = np.zeros(self.num_cities, dtype=bool)
+        visited[start_city] = True
+        current_city = start_city
+        traces = np.zeros_like(w)
+
+        candidates, phi = self.candidate_features(current_city, visited, start_city, scale)
+        index, _ = self.choose_index(phi @ w)
+
+        for step in range(self.num_cities - 1):
+            action = int(candidates[index])
+            x = phi[index]
+            reward = -float(self.dist_matrix[current_city, action]) / scale
+            visited[action] = True
+
+            if step == self.num_cities - 2:
+                # Last city: the drive home is fixed, so it is the terminal value
+                next_phi, terminal = None, -float(self.dist_matrix[action, start_city]) / scale
+                target = reward + gamma * terminal
+                explored = False
+            else:
+                candidates, next_phi = self.candidate_features(action, visited, start_city, scale)
+                next_q = next_phi @ w
+                next_index, explored = self.choose_index(next_q)
+                terminal = 0.0
+                target = reward + gamma * (next_q[next_index] if self.on_policy else next_q.max())
+
+            delta = target - x @ w
+            traces = gamma * self.lambda_val * traces + x if self.lambda_val > 0 else x
+            w += self.alpha * delta * traces / max(1.0, traces @ traces)  # Normalized: long traces stay stable
+            if explored and not self.on_policy:
+                traces = np.zeros_like(w)  # Watkins: stop crediting past a random action
+
+            if self.planning_steps:
+                self.replay.append((x, reward, next_phi, terminal))
+                self.run_planning()
+
+            current_city = action
+            if next_phi is not None:
+                phi, index = next_phi, next_index
+
+        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+
+    def run_planning(self):
+        w = self.weights
+        for _ in range(self.planning_steps):
+            x, reward, next_phi, terminal = random.choice(self.replay)
+            future = (next_phi @ w).max() if next_phi is not None else terminal
+            w += self.alpha * (reward + self.gamma * future - x @ w) * x / max(1.0, x @ x)
+
+    def visited_array(self, mask):
+        """Bitmask -> boolean array, unpacked in C (no per-city Python loop)."""
+        raw = np.frombuffer(mask.to_bytes((self.num_cities + 7) // 8, 'little'), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder='little')[:self.num_cities].astype(bool)
+
+    def greedy_action(self, current_city, mask, depot=None):
+        """Greedy action under the learned weights (never None: the features generalize)."""
+        visited = self.visited_array(mask)
+        if visited.all():
+            return None
+        depot = self.start_city if depot is None else depot
+        candidates, phi = self.candidate_features(current_city, visited, depot, self.distance_scale())
+        return int(candidates[int(np.argmax(phi @ self.weights))])
+
+    def get_route(self, start_city=None, visited=None, depot=None):
+        """Greedy route under the learned weights (no exploration); arguments as in TSPBaseAgent."""
+        start_city = self.start_city if start_city is None else start_city
+        depot = start_city if depot is None else depot
+        if self.num_cities < 2:
+            return [start_city, depot]
+        scale = self.distance_scale()
+        seen = np.zeros(self.num_cities, dtype=bool)
+        seen[[start_city, depot]] = True
+        if visited:
+            seen[list(visited)] = True
+        route = [start_city]
+        current_city = start_city
+        for _ in range(int((~seen).sum())):
+            candidates, phi = self.candidate_features(current_city, seen, depot, scale)
+            current_city = int(candidates[int(np.argmax(phi @ self.weights))])
+            seen[current_city] = True
+            route.append(current_city)
+        route.append(depot)
+        return route
+
+    def reinforce_route(self, route):
+        """Fit a good closed route (e.g. a 2-opt result) towards its Monte Carlo returns."""
+        scale = self.distance_scale()
+        start_city = route[0]
+        visited = np.zeros(self.num_cities, dtype=bool)
+        visited[start_city] = True
+        steps = []
+        for k in range(len(route) - 2):
+            current_city, action = route[k], route[k + 1]
+            candidates, phi = self.candidate_features(current_city, visited, start_city, scale)
+            hit = np.flatnonzero(candidates == action)
+            visited[action] = True
+            reward = -float(self.dist_matrix[current_city, action]) / scale
+            # A leg outside the K nearest can't be represented, but still counts in the return
+            steps.append((phi[hit[0]] if len(hit) else None, reward))
+
+        ret = -float(self.dist_matrix[route[-2], route[-1]]) / scale if len(route) > 1 else 0.0
+        w = self.weights
+        for x, reward in reversed(steps):
+            ret = reward + self.gamma * ret
+            if x is not None:
+                w += self.alpha * (ret - x @ w) * x / max(1.0, x @ x)